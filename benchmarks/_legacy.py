@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+import math
+import re
+from collections import defaultdict, deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from taiwan_stock_broker_analysis.domain.broker_names import BRANCH_RE, BROKER_PREFIXES
+
+FEE_RATE_STD = 0.001425
+
+
+def legacy_fifo_pnl_with_carry(df_mother: pd.DataFrame, fee_discount: float, day_trade_tax: float) -> pd.DataFrame:
+    d = df_mother.copy()
+    for column in ["序號", "價格", "買進股數", "賣出股數"]:
+        d[column] = pd.to_numeric(d[column], errors="coerce")
+    d = d.dropna(subset=["序號"])
+    buy_ev = d.loc[d["買進股數"] > 0, ["序號", "母券商", "價格", "買進股數"]].rename(columns={"買進股數": "數量"})
+    buy_ev["方向"] = "B"
+    sell_ev = d.loc[d["賣出股數"] > 0, ["序號", "母券商", "價格", "賣出股數"]].rename(columns={"賣出股數": "數量"})
+    sell_ev["方向"] = "S"
+    events = pd.concat([buy_ev, sell_ev], ignore_index=True).sort_values(["母券商", "序號", "方向"])
+    fee_rate = FEE_RATE_STD * fee_discount
+
+    rows = []
+    for broker, group in events.groupby("母券商", sort=False):
+        long_lots, short_lots = deque(), deque()
+        realized = 0.0
+        fee_sum = 0.0
+        tax_sum = 0.0
+        matched_shares = 0
+        for _, row in group.sort_values(["序號", "方向"]).iterrows():
+            side = row["方向"]
+            qty = int(row["數量"])
+            px = float(row["價格"])
+            if side == "B":
+                while qty > 0 and short_lots:
+                    short_qty, short_px = short_lots[0]
+                    matched = min(qty, short_qty)
+                    realized += matched * (short_px - px)
+                    fee_sum += (matched * px) * fee_rate + (matched * short_px) * fee_rate
+                    tax_sum += (matched * short_px) * day_trade_tax
+                    matched_shares += matched
+                    qty -= matched
+                    short_qty -= matched
+                    if short_qty == 0:
+                        short_lots.popleft()
+                    else:
+                        short_lots[0] = (short_qty, short_px)
+                if qty > 0:
+                    long_lots.append((qty, px))
+            else:
+                while qty > 0 and long_lots:
+                    long_qty, long_px = long_lots[0]
+                    matched = min(qty, long_qty)
+                    realized += matched * (px - long_px)
+                    fee_sum += (matched * long_px) * fee_rate + (matched * px) * fee_rate
+                    tax_sum += (matched * px) * day_trade_tax
+                    matched_shares += matched
+                    qty -= matched
+                    long_qty -= matched
+                    if long_qty == 0:
+                        long_lots.popleft()
+                    else:
+                        long_lots[0] = (long_qty, long_px)
+                if qty > 0:
+                    short_lots.append((qty, px))
+
+        rem_long_qty = sum(qty for qty, _ in long_lots)
+        rem_short_qty = sum(qty for qty, _ in short_lots)
+        rem_long_amt = sum(qty * px for qty, px in long_lots)
+        rem_short_amt = sum(qty * px for qty, px in short_lots)
+        rem_long_avg = (rem_long_amt / rem_long_qty) if rem_long_qty > 0 else np.nan
+        rem_short_avg = (rem_short_amt / rem_short_qty) if rem_short_qty > 0 else np.nan
+        broker_df = d[d["母券商"] == broker]
+        buy_shares = int(broker_df["買進股數"].sum())
+        sell_shares = int(broker_df["賣出股數"].sum())
+        buy_amt = float((broker_df["價格"] * broker_df["買進股數"]).sum())
+        sell_amt = float((broker_df["價格"] * broker_df["賣出股數"]).sum())
+        avg_buy = (buy_amt / buy_shares) if buy_shares > 0 else np.nan
+        avg_sell = (sell_amt / sell_shares) if sell_shares > 0 else np.nan
+        net_pos = rem_long_qty - rem_short_qty
+        if net_pos > 0:
+            net_side = "多"
+            net_avg = rem_long_avg
+        elif net_pos < 0:
+            net_side = "空"
+            net_avg = rem_short_avg
+        else:
+            net_side = "平"
+            net_avg = np.nan
+        rows.append({
+            "母券商": broker,
+            "回轉股數(FIFO)": matched_shares,
+            "回轉張數(FIFO)": int(round(matched_shares / 1000)),
+            "已實現毛利(FIFO)": realized,
+            "手續費合計(FIFO)": fee_sum,
+            "證交稅合計(FIFO)": tax_sum,
+            "已實現淨損益(FIFO)": realized - fee_sum - tax_sum,
+            "買股數(全日)": buy_shares,
+            "賣股數(全日)": sell_shares,
+            "均買價(全日)": None if math.isnan(avg_buy) else round(avg_buy, 2),
+            "均賣價(全日)": None if math.isnan(avg_sell) else round(avg_sell, 2),
+            "相抵後_買股數": rem_long_qty,
+            "相抵後_買張數": int(round(rem_long_qty / 1000)),
+            "相抵後_買均價": None if rem_long_qty == 0 else round(rem_long_avg, 2),
+            "相抵後_賣股數": rem_short_qty,
+            "相抵後_賣張數": int(round(rem_short_qty / 1000)),
+            "相抵後_賣均價": None if rem_short_qty == 0 else round(rem_short_avg, 2),
+            "期末淨部位(股)": int(net_pos),
+            "期末淨部位方向": net_side,
+            "期末部位均價": None if net_side == "平" else round(net_avg, 2),
+        })
+    out = pd.DataFrame(rows).set_index("母券商").copy()
+    for column in ["已實現毛利(FIFO)", "手續費合計(FIFO)", "證交稅合計(FIFO)", "已實現淨損益(FIFO)"]:
+        out[column] = pd.to_numeric(out[column], errors="coerce").round(0).astype("Int64")
+    return out.sort_values("已實現淨損益(FIFO)", ascending=False)
+
+
+def legacy_normalize_to_mother(bname: str) -> str:
+    if not isinstance(bname, str):
+        bname = str(bname)
+
+    name = str(bname).replace("\u3000", "").strip()
+    match = re.match(r"^[0-9A-Za-z]{1,4}([\u4e00-\u9fff].*)$", name)
+    if match:
+        name = match.group(1)
+
+    name = re.sub(r"^\d{3,4}", "", name)
+    name = re.sub("(分公司|分行|營業部|營業處)$", "", name)
+
+    for prefix in BROKER_PREFIXES:
+        if name.startswith(prefix):
+            return prefix
+
+    name = re.sub(BRANCH_RE, "", name)
+    name = re.sub("(分公司|分行|營業部|營業處)$", "", name)
+
+    for prefix in BROKER_PREFIXES:
+        if name.startswith(prefix):
+            return prefix
+
+    return name or bname
+
+
+def legacy_read_raw_csv(file_path: Path):
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"檔案不存在: {file_path}")
+
+    raw_bytes = path.read_bytes()
+    for encoding in ["utf-8-sig", "utf-8", "cp950"]:
+        try:
+            content = raw_bytes.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("無法解析檔案編碼")
+
+    lines = content.splitlines()
+    header_row = None
+    header_line = None
+
+    for i, line in enumerate(lines):
+        if "序號" in line and "券商" in line:
+            header_row = i
+            header_line = line
+            break
+
+    if header_row is None:
+        raise ValueError("找不到包含'序號'和'券商'的標題行")
+
+    if header_line.count("序號") >= 2:
+        parts = header_line.split(",,")
+        if len(parts) == 2:
+            left_columns = [col.strip() for col in parts[0].split(",")]
+            right_columns = [col.strip() for col in parts[1].split(",")]
+            all_records = []
+            for line in lines[header_row + 1:]:
+                if not line.strip():
+                    continue
+                data_parts = line.split(",,")
+                if len(data_parts) == 2:
+                    left_data = [val.strip() for val in data_parts[0].split(",")]
+                    if len(left_data) == len(left_columns) and left_data[0]:
+                        all_records.append(left_data)
+
+                    right_data = [val.strip() for val in data_parts[1].split(",")]
+                    if len(right_data) == len(right_columns) and right_data[0]:
+                        all_records.append(right_data)
+            df = pd.DataFrame(all_records, columns=left_columns)
+        else:
+            df = pd.read_csv(file_path, skiprows=header_row, encoding="utf-8-sig")
+    else:
+        df = pd.read_csv(file_path, skiprows=header_row, encoding="utf-8-sig")
+
+    return df, header_line
+
+
+def legacy_flatten_two_groups(df: pd.DataFrame) -> pd.DataFrame:
+    base = ["序號", "券商", "價格", "買進股數", "賣出股數"]
+    right = [c + ".1" for c in base]
+    left_df = df[[c for c in base if c in df.columns]].copy()
+    right_df = df[[c for c in right if c in df.columns]].copy()
+    if not right_df.empty:
+        right_df.columns = base
+        flat = pd.concat([left_df, right_df], ignore_index=True)
+    else:
+        flat = left_df.copy()
+    flat = flat[flat["序號"].notna()].copy()
+    for column in ["序號", "價格", "買進股數", "賣出股數"]:
+        flat[column] = pd.to_numeric(flat[column], errors="coerce")
+    flat["券商"] = (
+        flat["券商"].astype(str)
+        .str.replace("\u3000", "", regex=False)
+        .str.replace(r"\s+", "", regex=True)
+        .str.strip()
+    )
+    return flat.dropna(subset=["序號"]).sort_values(["序號", "券商", "價格"], ignore_index=True)
+
+
+def legacy_group_by_broker(df: pd.DataFrame, by_col: str) -> pd.DataFrame:
+    d = df.copy()
+    for column in ["價格", "買進股數", "賣出股數"]:
+        d[column] = pd.to_numeric(d[column], errors="coerce")
+    d["買金額"] = d["價格"] * d["買進股數"]
+    d["賣金額"] = d["價格"] * d["賣出股數"]
+    grouped = d.groupby(by_col, dropna=False).agg(
+        買股數=("買進股數", "sum"),
+        賣股數=("賣出股數", "sum"),
+        買金額=("買金額", "sum"),
+        賣金額=("賣金額", "sum"),
+    )
+    out = pd.DataFrame({
+        "買張": (grouped["買股數"] / 1000).round(0).astype(int),
+        "賣張": (grouped["賣股數"] / 1000).round(0).astype(int),
+    }, index=grouped.index)
+    out["買賣超"] = out["買張"] - out["賣張"]
+    out["均買價"] = np.where(grouped["買股數"] > 0, grouped["買金額"] / grouped["買股數"], np.nan).round(2)
+    out["均賣價"] = np.where(grouped["賣股數"] > 0, grouped["賣金額"] / grouped["賣股數"], np.nan).round(2)
+    return out.sort_values(by=["買賣超", "買張", "賣張"], ascending=[False, False, True])
+
+
+def legacy_avg_method_pnl(df_mother: pd.DataFrame, fee_discount: float, day_trade_tax: float) -> pd.DataFrame:
+    d = df_mother.copy()
+    for column in ["價格", "買進股數", "賣出股數"]:
+        d[column] = pd.to_numeric(d[column], errors="coerce")
+    d["買金額"] = d["價格"] * d["買進股數"]
+    d["賣金額"] = d["價格"] * d["賣出股數"]
+    grouped = d.groupby("母券商", dropna=False).agg(
+        買股數=("買進股數", "sum"),
+        賣股數=("賣出股數", "sum"),
+        買金額=("買金額", "sum"),
+        賣金額=("賣金額", "sum"),
+    )
+    avg_buy = np.where(grouped["買股數"] > 0, grouped["買金額"] / grouped["買股數"], np.nan)
+    avg_sell = np.where(grouped["賣股數"] > 0, grouped["賣金額"] / grouped["賣股數"], np.nan)
+    matched = np.minimum(grouped["買股數"], grouped["賣股數"])
+    spread = avg_sell - avg_buy
+    gross = matched * spread
+    fee_rate = FEE_RATE_STD * fee_discount
+    buy_turnover = matched * avg_buy
+    sell_turnover = matched * avg_sell
+    fee_buy = buy_turnover * fee_rate
+    fee_sell = sell_turnover * fee_rate
+    tax = sell_turnover * day_trade_tax
+    net = gross - fee_buy - fee_sell - tax
+    return pd.DataFrame({
+        "母券商": grouped.index,
+        "回轉股數": matched.astype("Int64"),
+        "均買價": np.round(avg_buy, 2),
+        "均賣價": np.round(avg_sell, 2),
+        "價差": np.round(spread, 3),
+        "毛利(均價法)": np.round(gross, 0).astype("Int64"),
+        "手續費_買": np.round(fee_buy, 0).astype("Int64"),
+        "手續費_賣": np.round(fee_sell, 0).astype("Int64"),
+        "證交稅": np.round(tax, 0).astype("Int64"),
+        "淨損益(均價法)": np.round(net, 0).astype("Int64"),
+    }).set_index("母券商").sort_values("淨損益(均價法)", ascending=False)
+
+
+def legacy_download_csv_text(stock_code, captcha_solver, max_retries, base_url, http_client, rate_limiter=None, timeout=30):
+    from urllib.parse import urljoin
+
+    from bs4 import BeautifulSoup
+
+    from taiwan_stock_broker_analysis.domain.scraping import _download_captcha_bytes, _extract_form_params
+
+    for _ in range(max_retries):
+        session = http_client.new_session()
+        response = session.get(base_url, timeout=timeout)
+        if response.status_code != 200:
+            continue
+        soup = BeautifulSoup(response.text, "lxml")
+        params = _extract_form_params(soup)
+        captcha_bytes = _download_captcha_bytes(session, soup, base_url, timeout=timeout, verify=False)
+        if captcha_bytes is None:
+            continue
+        captcha_code = captcha_solver(captcha_bytes)
+        if not captcha_code:
+            continue
+        params["CaptchaControl1"] = captcha_code
+        params["TextBox_Stkno"] = stock_code
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = session.post(base_url, data=params, timeout=timeout)
+        soup = BeautifulSoup(response.text, "lxml")
+        download_links = soup.select("#HyperLink_DownloadCSV")
+        if not download_links:
+            continue
+        csv_response = session.get(urljoin(base_url, download_links[0]["href"]), timeout=timeout)
+        if csv_response.status_code == 200:
+            return True, csv_response.text, None
+    return False, None, f"所有 {max_retries} 次嘗試均失敗"
+
+
+def legacy_log_broker_summary(csv_text, stock_code, logger):
+    try:
+        lines = csv_text.split("\n")[2:]
+        flattened_lines = []
+        for line in lines:
+            for segment in line.split(",,"):
+                cleaned = segment.replace("\u3000", "")
+                if cleaned.strip():
+                    flattened_lines.append(cleaned)
+
+        records = []
+        for line in flattened_lines:
+            fields = line.split(",")
+            if len(fields) >= 5:
+                fields[1] = re.sub(r"[0-9A-Za-z]+", "", fields[1])
+                records.append(fields)
+
+        if len(records) > 2:
+            records = records[2:]
+
+        broker_stats = defaultdict(lambda: {"買進": 0, "賣出": 0, "次數": 0})
+        total_records = 0
+        for row in records:
+            if len(row) < 5:
+                continue
+            try:
+                broker = row[1].strip()
+                if not broker:
+                    continue
+                buy_vol = float(row[3].replace(",", "")) if row[3].strip() else 0
+                sell_vol = float(row[4].replace(",", "")) if row[4].strip() else 0
+                broker_stats[broker]["買進"] += buy_vol
+                broker_stats[broker]["賣出"] += sell_vol
+                broker_stats[broker]["次數"] += 1
+                total_records += 1
+            except (ValueError, IndexError):
+                continue
+
+        logger(f"=== 資料分析結果 (股票代碼: {stock_code}) ===")
+        logger(f"總交易筆數: {total_records}")
+        logger(f"券商家數: {len(broker_stats)}")
+
+        broker_netbuy = []
+        for broker, stats in broker_stats.items():
+            net_buy = (stats["買進"] - stats["賣出"]) / 1000
+            broker_netbuy.append((broker, net_buy, stats["買進"] / 1000, stats["賣出"] / 1000))
+        broker_netbuy.sort(key=lambda item: item[1], reverse=True)
+
+        logger("前 10 大買超券商:")
+        for index, (broker, net_buy, buy, sell) in enumerate(broker_netbuy[:10], start=1):
+            logger(f"  {index:2d}. {broker:<10} 買超: {net_buy:8.0f}張 (買: {buy:8.0f}張, 賣: {sell:8.0f}張)")
+
+        if len(broker_netbuy) > 10:
+            logger("前 10 大賣超券商:")
+            for index, (broker, net_buy, buy, sell) in enumerate(broker_netbuy[-10:], start=1):
+                logger(f"  {index:2d}. {broker:<10} 賣超: {abs(net_buy):8.0f}張 (買: {buy:8.0f}張, 賣: {sell:8.0f}張)")
+    except Exception as exc:
+        logger(f"資料分析時發生錯誤: {exc}")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+多檔分析吞吐量：每檔各啟動一次 broker_pipeline vs 批次模式（行程池）
+用法：
+  python benchmarks/bench_batch.py --files 20 --rows 20000 --workers 1 2 4
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+
+PIPELINE_SCRIPT = REPO_ROOT / "broker_pipeline.py"
+
+
+def _run(command) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="批次模式吞吐量比較")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir) / "processed"
+        input_dir.mkdir()
+        for index in range(args.files):
+            write_twse_csv(input_dir / f"{1000 + index}_處理後資料.csv", args.rows, seed=index)
+        files = sorted(input_dir.glob("*.csv"))
+
+        per_launch = sum(
+            _run([sys.executable, str(PIPELINE_SCRIPT), str(path), "--outdir", str(Path(temp_dir) / "single")])
+            for path in files
+        )
+        print(f"{'模式':<16} {'秒':>8} {'檔/秒':>8} {'加速':>7}")
+        print(f"{'每檔各啟動一次':<16} {per_launch:>8.2f} {args.files / per_launch:>8.2f} {1.0:>6.1f}x")
+        for workers in args.workers:
+            elapsed = _run([
+                sys.executable, str(PIPELINE_SCRIPT), str(input_dir),
+                "--outdir", str(Path(temp_dir) / f"batch_{workers}"), "--workers", str(workers),
+            ])
+            label = f"批次 workers={workers}"
+            print(f"{label:<16} {elapsed:>8.2f} {args.files / elapsed:>8.2f} {per_launch / elapsed:>6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
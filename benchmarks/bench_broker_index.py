@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+券商索引：逐檔重新解析處理後 CSV 找某分點 vs 查 tsbaidx 倒排索引
+- 掃描：read_flat_csv 每個檔案，篩出該分點的列再加總（沒有索引時的做法）
+- 索引：index_csv 逐檔建立（每檔一個分段，超過上限自動合併），之後 BrokerIndex.lookup 完整名稱 / 前綴
+用法：
+  python benchmarks/bench_broker_index.py --stocks 100 --days 5 --rows 5000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+os.environ["TSBA_BROKER_CACHE"] = ""
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import read_flat_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.broker_index import BrokerIndex  # noqa: E402
+from taiwan_stock_broker_analysis.domain.schema import numeric_array  # noqa: E402
+from taiwan_stock_broker_analysis.services.index_service import index_csv  # noqa: E402
+
+FIRST_DAY = date(2026, 1, 5)
+
+
+def scan(files, name: str) -> tuple:
+    buy = sell = 0.0
+    hits = 0
+    for _, _, path in files:
+        flat = read_flat_csv(path)
+        mask = (flat["券商"] == name).to_numpy()
+        if mask.any():
+            hits += 1
+            buy += numeric_array(flat, "買進股數")[mask].sum()
+            sell += numeric_array(flat, "賣出股數")[mask].sum()
+    return hits, int(buy), int(sell)
+
+
+def timed(function, repeat: int):
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - started)
+    return result, statistics.median(seconds)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="券商索引：逐檔掃描 vs 倒排索引查詢")
+    parser.add_argument("--stocks", type=int, default=100)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        files = []
+        for day_offset in range(args.days):
+            day = FIRST_DAY + timedelta(days=day_offset)
+            for stock in range(args.stocks):
+                code = str(1101 + stock)
+                path = write_twse_csv(
+                    temp_dir / f"{code}_{day:%Y%m%d}.csv", args.rows, stock_code=code, seed=stock * 1000 + day_offset,
+                    broker_skew=1.0,
+                )
+                files.append((code, day, path))
+        size = sum(path.stat().st_size for _, _, path in files)
+        print(f"{len(files)} 個處理後 CSV（{args.stocks} 檔 × {args.days} 天，共 {size / 1e6:.1f} MB）")
+
+        index = BrokerIndex(temp_dir / "index")
+        started = time.perf_counter()
+        for code, day, path in files:
+            index_csv(index, path, code, day)
+        build_seconds = time.perf_counter() - started
+        stats = index.stats()
+        print(
+            f"建立索引 {build_seconds:.2f} 秒（每檔 {build_seconds / len(files) * 1000:.1f} ms），"
+            f"{stats['segments']} 個分段、{stats['bytes'] / 1e6:.1f} MB"
+        )
+
+        name = index.terms(field="券商")[0]
+        prefix = name[:4]
+        (hits, buy, sell), scan_seconds = timed(lambda: scan(files, name), 1)
+        exact, exact_seconds = timed(lambda: index.lookup(name, field="券商"), args.repeat)
+        by_prefix, prefix_seconds = timed(lambda: index.lookup(prefix, prefix=True, field="券商"), args.repeat)
+        index.compact()
+        _, compact_seconds = timed(lambda: index.lookup(name, field="券商"), args.repeat)
+        same = (len(exact), int(exact["買股數"].sum()), int(exact["賣股數"].sum())) == (hits, buy, sell)
+        print(f"{'查詢':<28} {'秒':>10} {'筆數':>8}")
+        print(f"{'逐檔掃描 ' + name:<28} {scan_seconds:>10.3f} {hits:>8,}")
+        print(f"{'索引完整名稱':<28} {exact_seconds:>10.4f} {len(exact):>8,}")
+        print(f"{'索引前綴 ' + prefix:<28} {prefix_seconds:>10.4f} {len(by_prefix):>8,}")
+        print(f"{'合併成單一分段後完整名稱':<28} {compact_seconds:>10.4f} {len(exact):>8,}")
+        print(f"加速 {scan_seconds / exact_seconds:,.0f}x，結果{'相同 ✅' if same else '不同 ❌'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
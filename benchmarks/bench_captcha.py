@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+驗證碼送出前本地檢查：舊版照單全收直接送出 vs 長度 / 字元集檢查後在同一 session 換圖
+以本機假站模擬；OCR 結果依比例產生「長度或字元明顯錯誤」「看似合理但錯誤」「正確」三種。
+多檔並行下載時，每次送出表單都要占用一個全域查詢間隔，送出次數即為瓶頸。
+用法：
+  python benchmarks/bench_captcha.py --stocks 40 --concurrency 4 --implausible 0.45 --wrong 0.25 --min-interval 0.3
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "tests"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_download_csv_text  # noqa: E402
+from fake_twse_server import FakeTwseServer, solve_fake_captcha  # noqa: E402
+from taiwan_stock_broker_analysis.domain.captcha import CaptchaStats  # noqa: E402
+from taiwan_stock_broker_analysis.domain.http_client import PooledHttpClient  # noqa: E402
+from taiwan_stock_broker_analysis.domain.scraping import download_csv_text  # noqa: E402
+from taiwan_stock_broker_analysis.services.download_scheduler import RateLimiter  # noqa: E402
+
+
+def make_solver(implausible: float, wrong: float, seed: int):
+    rng = random.Random(seed)
+
+    def solve(image_bytes):
+        answer = solve_fake_captcha(image_bytes)
+        roll = rng.random()
+        if roll < implausible:
+            return answer[: rng.randint(2, 4)].lower() + "亿"
+        if roll < implausible + wrong:
+            return answer[::-1] if answer[::-1] != answer else "ZZZZZ"
+        return answer
+
+    return solve
+
+
+def run(label, download, args):
+    stock_codes = [f"{1000 + index}" for index in range(args.stocks)]
+    client = PooledHttpClient()
+    limiter = RateLimiter(args.min_interval)
+    with FakeTwseServer(latency=args.latency) as server:
+        solver = make_solver(args.implausible, args.wrong, seed=0)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(lambda code: download(code, solver, server.base_url, client, limiter), stock_codes))
+        succeeded = sum(ok for ok, _, _ in results)
+        elapsed = time.perf_counter() - started
+    requests_count = client.stats()["requests"]
+    print(
+        f"{label:<12} {elapsed:>7.2f} {succeeded:>4}/{args.stocks:<4} {len(server.submits):>6} "
+        f"{requests_count:>6} {requests_count / args.stocks:>7.1f}"
+    )
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="驗證碼本地檢查效能比較")
+    parser.add_argument("--stocks", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--implausible", type=float, default=0.45, help="OCR 結果長度或字元明顯錯誤的比例")
+    parser.add_argument("--wrong", type=float, default=0.25, help="OCR 結果看似合理但錯誤的比例")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--min-interval", type=float, default=0.3, help="全域查詢間隔（等比例縮小）")
+    parser.add_argument("--retries", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'模式':<12} {'秒':>7} {'成功':>9} {'送出數':>6} {'請求數':>6} {'請求/檔':>7}")
+    legacy = run(
+        "舊版",
+        lambda code, solver, url, client, limiter: legacy_download_csv_text(
+            code, solver, args.retries, url, client, rate_limiter=limiter
+        ),
+        args,
+    )
+    stats = CaptchaStats()
+    current = run(
+        "本地檢查",
+        lambda code, solver, url, client, limiter: download_csv_text(
+            code, solver, max_retries=args.retries, base_url=url, http_client=client,
+            rate_limiter=limiter, captcha_stats=stats,
+        ),
+        args,
+    )
+    print(f"加速 {legacy / current:.1f}x；送出通過率 {stats.snapshot()['success_rate']:.0%}，"
+          f"最後的重試預算 {stats.retry_budget(args.retries)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
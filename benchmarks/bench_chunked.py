@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+分塊分析：整表讀入 vs 以記憶體預算分塊累加券商帳本（只比 step2–step4）
+- 峰值以 tracemalloc 量測 Python / numpy 配置的記憶體（分析開始到結束），耗時另跑一次不開 tracemalloc
+- 多個合併檔模擬研究用的大型 CSV（每段重複表頭）
+用法：
+  python benchmarks/bench_chunked.py --rows 200000 --parts 3 --budgets 4 16 64
+"""
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ["TSBA_BROKER_CACHE"] = ""
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import CHUNKED_STEPS, analyze_csv_file, chunk_rows_for_budget  # noqa: E402
+
+
+def _analyze(csv_path: Path, outdir: Path, memory_budget: float = None):
+    analyze_csv_file(
+        csv_path, outdir, fee_discount=0.28, day_trade_tax=0.0015,
+        incremental=False, excel="none", background_writes=False, memory_budget=memory_budget,
+    )
+
+
+def _measure(csv_path: Path, outdir: Path, memory_budget: float = None):
+    # tracemalloc 會讓執行慢數倍，耗時與峰值分兩次量
+    started = time.perf_counter()
+    _analyze(csv_path, outdir, memory_budget)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    _analyze(csv_path, outdir.with_name(outdir.name + "_traced"), memory_budget)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def _same_reports(left: Path, right: Path) -> bool:
+    reports = sorted(right.glob("step*.csv"))
+    return [path.name.split("_")[0] for path in reports] == list(CHUNKED_STEPS) and all(
+        filecmp.cmp(path, left / path.name, shallow=False) for path in reports
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="整表讀入 vs 分塊累加")
+    parser.add_argument("--rows", type=int, default=200000, help="每段的筆數")
+    parser.add_argument("--parts", type=int, default=3, help="合併幾段")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[4, 16, 64], help="記憶體預算 MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        csv_path = temp_dir / "2330_research.csv"
+        with csv_path.open("wb") as merged:
+            for part in range(args.parts):
+                merged.write(write_twse_csv(temp_dir / f"part{part}.csv", args.rows, seed=part).read_bytes())
+        size_mb = csv_path.stat().st_size / 1024 / 1024
+
+        full_dir = temp_dir / "full"
+        results = [("整表讀入", "-", *_measure(csv_path, full_dir), True)]
+        for budget in args.budgets:
+            outdir = temp_dir / f"chunked_{budget:g}"
+            elapsed, peak = _measure(csv_path, outdir, budget)
+            results.append((f"--memory-budget {budget:g}", f"{chunk_rows_for_budget(budget):,}", elapsed, peak, _same_reports(full_dir, outdir)))
+
+        print(f"合併 {args.parts} 段 × {args.rows:,} 筆（{size_mb:.1f} MB），整表模式另產生 step1/5–7，分塊模式只產生 step2–4")
+        print(f"{'模式':<24} {'每塊筆數':>10} {'秒':>8} {'峰值 MB':>9} {'step2–4':>8}")
+        for label, chunk_rows, elapsed, peak, same in results:
+            print(f"{label:<24} {chunk_rows:>10} {elapsed:>8.2f} {peak:>9.1f} {'相同' if same else '不同':>8}")
+    return 0 if all(row[-1] for row in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
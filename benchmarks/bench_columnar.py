@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+展平資料重新載入：step1 CSV vs 欄式格式（npy + schema；有 pyarrow 時另測 Feather）
+「載入 + 掃描」另外對買進股數與價格檔位做一次加總，避免 memory map 只量到建立映射的時間。
+用法：
+  python benchmarks/bench_columnar.py --rows 1000000 --repeat 5
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import read_flat_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.columnar import has_pyarrow, load_table, table_path, write_table  # noqa: E402
+from taiwan_stock_broker_analysis.domain.schema import to_display  # noqa: E402
+
+
+def _median_seconds(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _scan(frame: pd.DataFrame) -> int:
+    return int(frame["買進股數"].sum()) + int(frame["價格_tick"].sum() if "價格_tick" in frame else 0)
+
+
+def _disk_bytes(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*")) if path.is_dir() else path.stat().st_size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="欄式格式載入時間比較")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        write_twse_csv(temp_dir / "input.csv", args.rows)
+        flat = read_flat_csv(temp_dir / "input.csv")
+        csv_path = temp_dir / "step1_flattened.csv"
+        to_display(flat).to_csv(csv_path, index=False, encoding="utf-8-sig")
+
+        cases = [
+            ("CSV read_flat_csv", csv_path, lambda: read_flat_csv(csv_path)),
+            ("CSV pd.read_csv", csv_path, lambda: pd.read_csv(csv_path, encoding="utf-8-sig")),
+        ]
+        formats = ["npy"] + (["feather"] if has_pyarrow() else [])
+        for fmt in formats:
+            write_table(flat, temp_dir / f"step1_{fmt}", fmt)
+            path = table_path(temp_dir / f"step1_{fmt}", fmt)
+            cases.append((f"{fmt} memory map", path, lambda path=path: load_table(path)))
+            cases.append((f"{fmt} 讀入記憶體", path, lambda path=path: load_table(path, mmap=False)))
+
+        rows = []
+        for label, path, load in cases:
+            load_seconds = _median_seconds(load, args.repeat)
+            scan_seconds = _median_seconds(lambda: _scan(load()), args.repeat)
+            rows.append((label, _disk_bytes(path), load_seconds, scan_seconds))
+
+    baseline = rows[0][2]
+    print(f"{args.rows:,} 列，{args.repeat} 次中位數")
+    print(f"{'格式':<20} {'MB':>7} {'載入秒':>8} {'加速':>8} {'載入+掃描秒':>11}")
+    for label, size, load_seconds, scan_seconds in rows:
+        print(
+            f"{label:<20} {size / 1e6:>7.1f} {load_seconds:>8.4f} {baseline / load_seconds:>7.0f}x {scan_seconds:>11.4f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
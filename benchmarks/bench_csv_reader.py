@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+TWSE 雙欄 CSV 讀取比較：舊版 read_raw_csv + flatten_two_groups vs 串流解析
+用法：
+  python benchmarks/bench_csv_reader.py
+  python benchmarks/bench_csv_reader.py --rows 100000 1000000 --encodings utf-8-sig cp950
+"""
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_flatten_two_groups, legacy_read_raw_csv  # noqa: E402
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import read_flat_csv  # noqa: E402
+
+
+def legacy_read_flat_csv(path):
+    raw_df, _ = legacy_read_raw_csv(path)
+    return legacy_flatten_two_groups(raw_df)
+
+
+def measure(func, path):
+    gc.collect()
+    started = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - started
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TWSE CSV 讀取效能比較")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--encodings", nargs="+", default=["utf-8-sig", "cp950"])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'encoding':>10} {'MB':>7} {'舊版秒':>8} {'舊版峰值MB':>10} {'新版秒':>8} {'新版峰值MB':>10}  相同")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for rows in args.rows:
+            for encoding in args.encodings:
+                path = write_twse_csv(Path(temp_dir) / f"bench_{rows}_{encoding}.csv", rows, encoding=encoding)
+                size_mb = path.stat().st_size / 1024 / 1024
+                old_time, old_peak, old_flat = measure(legacy_read_flat_csv, path)
+                new_time, new_peak, new_flat = measure(read_flat_csv, path)
+                identical = old_flat.equals(new_flat)
+                print(
+                    f"{rows:>9} {encoding:>10} {size_mb:>7.1f} {old_time:>8.2f} {old_peak:>10.1f} "
+                    f"{new_time:>8.2f} {new_peak:>10.1f}  {identical}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
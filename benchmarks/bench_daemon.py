@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+常駐服務：每檔各啟動一次 `tsba analyze` vs 以 `--daemon` 送到已預熱的常駐服務
+- 冷啟動：每次都重新載入 pandas、分析模組與券商名稱磁碟快取
+- 常駐：客戶端只載入 urllib 轉送參數，分析在常駐行程內執行（另量測不啟動新直譯器、直接送工作的延遲）
+用法：
+  python benchmarks/bench_daemon.py --files 20 --rows 2000
+"""
+import argparse
+import filecmp
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.services.daemon_client import (  # noqa: E402
+    daemon_status,
+    forward_to_daemon,
+    shutdown_daemon,
+)
+
+TSBA_SCRIPT = REPO_ROOT / "tsba.py"
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _run(command, cwd: Path) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def _wait_until_ready(url: str, timeout: float = 30.0) -> float:
+    started = time.perf_counter()
+    while True:
+        try:
+            daemon_status(url=url)
+            return time.perf_counter() - started
+        except RuntimeError:
+            if time.perf_counter() - started > timeout:
+                raise
+            time.sleep(0.05)
+
+
+def _same_reports(left: Path, right: Path) -> bool:
+    for report in sorted(left.rglob("step*.csv")):
+        if not filecmp.cmp(report, right / report.relative_to(left), shallow=False):
+            return False
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="常駐服務 vs 每次冷啟動")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        os.environ["TSBA_BROKER_CACHE"] = str(temp_dir / "broker_mother_map.json")
+        files = [
+            write_twse_csv(temp_dir / f"{1101 + index}.csv", args.rows, seed=index, stock_code=str(1101 + index)).name
+            for index in range(args.files)
+        ]
+        analyze = ["analyze", "--force", "--excel", "none"]
+
+        cold = [_run([sys.executable, str(TSBA_SCRIPT), *analyze, name, "--outdir", "cold"], temp_dir) for name in files]
+
+        url = f"http://127.0.0.1:{_free_port()}"
+        os.environ["TSBA_DAEMON"] = url
+        daemon = subprocess.Popen(
+            [sys.executable, str(TSBA_SCRIPT), "daemon", "start", "--port", url.rsplit(":", 1)[1]],
+            cwd=temp_dir, stdout=subprocess.DEVNULL,
+        )
+        try:
+            ready = _wait_until_ready(url)
+            forwarded = [
+                _run([sys.executable, str(TSBA_SCRIPT), *analyze, name, "--outdir", "daemon", "--daemon"], temp_dir)
+                for name in files
+            ]
+            previous_cwd = os.getcwd()
+            os.chdir(temp_dir)
+            in_process = []
+            try:
+                for name in files:
+                    started = time.perf_counter()
+                    forward_to_daemon("analyze", [*analyze[1:], name, "--outdir", "client"], logger=lambda line: None)
+                    in_process.append(time.perf_counter() - started)
+            finally:
+                os.chdir(previous_cwd)
+        finally:
+            shutdown_daemon(url=url)
+            daemon.wait(timeout=30)
+
+        same = _same_reports(temp_dir / "cold", temp_dir / "daemon") and _same_reports(temp_dir / "cold", temp_dir / "client")
+        print(f"{args.files} 個處理後 CSV（每檔 {args.rows:,} 筆），常駐服務啟動到可接受工作 {ready:.2f}s")
+        print(f"{'模式':<28} {'中位數秒':>8} {'總秒':>8}")
+        for label, samples in [
+            ("每次冷啟動 tsba analyze", cold),
+            ("tsba analyze --daemon", forwarded),
+            ("同行程直接送工作", in_process),
+        ]:
+            print(f"{label:<28} {statistics.median(samples):>8.3f} {sum(samples):>8.2f}")
+        print(f"報表{'相同 ✅' if same else '不同 ❌'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
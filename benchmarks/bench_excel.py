@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 輸出模式：各步驟各一檔（pandas to_excel）vs 單一串流活頁簿（openpyxl write-only）vs 不產生
+1) 完整分析：K 檔股票、每檔 N 列，`analyze_csv_file(..., incremental=False)` 的總耗時
+2) 只看 xlsx：同一組報表，pandas 各自 to_excel 與串流活頁簿的耗時與 tracemalloc 峰值
+用法：
+  python benchmarks/bench_excel.py --stocks 10 --rows 200000 --brokers 900
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import (  # noqa: E402
+    INDEXED_REPORTS,
+    WORKBOOK_TABLES,
+    analyze_csv_file,
+    build_workbook,
+    load_report,
+)
+from taiwan_stock_broker_analysis.domain.workbook import EXCEL_MODES, write_workbook  # noqa: E402
+
+
+def _measure(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Excel 輸出模式耗時比較")
+    parser.add_argument("--stocks", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--brokers", type=int, default=900)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        inputs = [
+            write_twse_csv(temp_dir / f"stock{index}.csv", args.rows, n_brokers=args.brokers, seed=index)
+            for index in range(args.stocks)
+        ]
+        analyze_csv_file(inputs[0], temp_dir / "warmup", 0.28, 0.0015, incremental=False)
+
+        totals = {}
+        for mode in EXCEL_MODES:
+            started = time.perf_counter()
+            for input_csv in inputs:
+                analyze_csv_file(input_csv, temp_dir / mode / input_csv.stem, 0.28, 0.0015, incremental=False, excel=mode)
+            totals[mode] = time.perf_counter() - started
+        started = time.perf_counter()
+        for input_csv in inputs:
+            build_workbook(temp_dir / "none" / input_csv.stem)
+        on_demand = time.perf_counter() - started
+
+        outdir = temp_dir / "separate" / inputs[0].stem
+        tables = {name: load_report(outdir, name, mmap=False) for name in WORKBOOK_TABLES}
+
+        def separate():
+            for name, frame in tables.items():
+                frame.to_excel(temp_dir / f"{name}.xlsx", index=name in INDEXED_REPORTS)
+
+        def streaming():
+            write_workbook(
+                ((name, frame, name in INDEXED_REPORTS) for name, frame in tables.items()), temp_dir / "streaming.xlsx"
+            )
+
+        xlsx = {"pandas to_excel（8 張表各一檔）": _measure(separate), "串流活頁簿（單檔 8 個工作表）": _measure(streaming)}
+        report_rows = sum(len(frame) for frame in tables.values())
+
+    print(f"{args.stocks} 檔 × {args.rows:,} 列，{args.brokers} 家分點；報表共 {report_rows:,} 列 / 檔")
+    print(f"{'模式':<14} {'總秒':>8} {'每檔秒':>8}")
+    for mode, seconds in totals.items():
+        print(f"{mode:<14} {seconds:>8.2f} {seconds / args.stocks:>8.3f}")
+    print(f"{'none + 事後產生':<14} {totals['none'] + on_demand:>8.2f} {(totals['none'] + on_demand) / args.stocks:>8.3f}")
+    print(f"只計 xlsx（單檔）：")
+    for label, (seconds, peak) in xlsx.items():
+        print(f"  {label:<24} {seconds:>7.3f}s  峰值 {peak / 1e6:>6.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
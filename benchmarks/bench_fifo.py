@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+FIFO 撮合效能比較：舊版 iterrows 實作 vs 陣列版引擎
+用法：
+  python benchmarks/bench_fifo.py
+  python benchmarks/bench_fifo.py --sizes 10000 100000 1000000 --skip-legacy-above 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_fifo_pnl_with_carry  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import fifo_pnl_with_carry  # noqa: E402
+
+
+def make_mother_frame(n_rows: int, n_brokers: int = 60, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    brokers = np.array([f"券商{i:03d}" for i in range(n_brokers)], dtype=object)
+    ladder = np.round(np.arange(95.0, 105.0, 0.5), 2)
+    is_buy = rng.random(n_rows) < 0.5
+    shares = rng.integers(1, 30, n_rows) * 1000
+    return pd.DataFrame({
+        "序號": np.arange(1, n_rows + 1),
+        "券商": brokers[rng.integers(0, n_brokers, n_rows)],
+        "價格": ladder[rng.integers(0, len(ladder), n_rows)],
+        "買進股數": np.where(is_buy, shares, 0),
+        "賣出股數": np.where(is_buy, 0, shares),
+    }).assign(母券商=lambda frame: frame["券商"])
+
+
+def _time(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="FIFO 撮合效能比較")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy-above", type=int, default=None, help="超過此筆數不跑舊版")
+    args = parser.parse_args()
+
+    print(f"{'events':>10} {'legacy(s)':>10} {'array(s)':>10} {'speedup':>8}  identical")
+    for size in args.sizes:
+        frame = make_mother_frame(size)
+        new_time, new_out = _time(fifo_pnl_with_carry, frame, fee_discount=0.28, day_trade_tax=0.0015)
+        if args.skip_legacy_above is not None and size > args.skip_legacy_above:
+            print(f"{size:>10} {'-':>10} {new_time:>10.3f} {'-':>8}  -")
+            continue
+        old_time, old_out = _time(legacy_fifo_pnl_with_carry, frame, fee_discount=0.28, day_trade_tax=0.0015)
+        identical = old_out.equals(new_out)
+        print(f"{size:>10} {old_time:>10.3f} {new_time:>10.3f} {old_time / new_time:>7.1f}x  {identical}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+跨日 FIFO：每天重播全部歷史 vs 承接前一日未平倉快照
+情境：同一檔股票連續 D 個交易日、每日 N 列。
+- 重播：第 d 天把第 1..d 天的事件串起來重新撮合（沒有快照時要得到正確期末部位的唯一做法）
+- 結轉：第 d 天只撮合當天事件，開盤部位從第 d-1 天的 npy 快照 memory map 讀入
+用法：
+  python benchmarks/bench_fifo_carry.py --days 20 --rows 100000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import add_mother_column, fifo_carry, read_flat_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.open_lots import OpenLotStore  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="跨日 FIFO 結轉與全歷史重播比較")
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        frames = []
+        for index in range(args.days):
+            path = write_twse_csv(temp_dir / f"day{index}.csv", args.rows, seed=index)
+            frames.append(add_mother_column(read_flat_csv(path)))
+        days = [date(2026, 1, 5) + timedelta(days=index) for index in range(args.days)]
+
+        replay_seconds = []
+        for index in range(args.days):
+            started = time.perf_counter()
+            history = pd.concat(
+                [frame.assign(序號=frame["序號"] + offset * args.rows) for offset, frame in enumerate(frames[: index + 1])],
+                ignore_index=True,
+            )
+            replay, replay_lots = fifo_carry(history, fee_discount=0.28, day_trade_tax=0.0015)
+            replay_seconds.append(time.perf_counter() - started)
+
+        store = OpenLotStore(temp_dir / "carry", fmt="npy")
+        carry_seconds, load_seconds = [], []
+        for index, (day, frame) in enumerate(zip(days, frames)):
+            started = time.perf_counter()
+            _, opening = store.latest_before("9999", day)
+            load_seconds.append(time.perf_counter() - started)
+            carried, closing = fifo_carry(frame, fee_discount=0.28, day_trade_tax=0.0015, opening_lots=opening)
+            store.save("9999", day, closing)
+            carry_seconds.append(time.perf_counter() - started)
+
+        assert closing["股數"].sum() == replay_lots["股數"].sum()
+        assert (carried["期末淨部位(股)"] == replay["期末淨部位(股)"].reindex(carried.index)).all()
+        snapshot_bytes = sum(path.stat().st_size for path in (temp_dir / "carry" / "9999" / f"{days[-1]}.npcols").iterdir())
+
+    print(f"{args.days} 個交易日 × {args.rows:,} 列；最後一天期末 {len(closing):,} 筆未平倉，快照 {snapshot_bytes / 1e6:.2f} MB")
+    print(f"{'方式':<10} {'第1天秒':>9} {'最後一天秒':>10} {'累計秒':>9}")
+    print(f"{'重播':<10} {replay_seconds[0]:>9.3f} {replay_seconds[-1]:>10.3f} {sum(replay_seconds):>9.2f}")
+    print(f"{'結轉':<10} {carry_seconds[0]:>9.3f} {carry_seconds[-1]:>10.3f} {sum(carry_seconds):>9.2f}")
+    print(f"快照載入（最後一天）{load_seconds[-1] * 1000:.2f} ms；最後一天加速 {replay_seconds[-1] / carry_seconds[-1]:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
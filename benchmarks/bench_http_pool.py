@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+下載連線重用：每次嘗試新建 requests.Session vs 共用 keep-alive 連線池
+本機假站在每條新連線建立時加上固定延遲，模擬 TCP + TLS 交握成本。
+用法：
+  python benchmarks/bench_http_pool.py --stocks 20 --handshake 0.15 --latency 0.02
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "tests"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from bench_scheduler import make_solver  # noqa: E402
+from fake_twse_server import FakeTwseServer  # noqa: E402
+from taiwan_stock_broker_analysis.domain.http_client import PooledHttpClient  # noqa: E402
+from taiwan_stock_broker_analysis.domain.scraping import download_csv_text  # noqa: E402
+
+
+class SessionPerAttemptClient:
+    def __init__(self):
+        self.sessions = 0
+
+    def new_session(self):
+        self.sessions += 1
+        return requests.Session()
+
+    def timeout(self, read_timeout=None):
+        return read_timeout
+
+
+def run(server, client, stock_codes, error_rate):
+    solver = make_solver(error_rate, seed=0)
+    started = time.perf_counter()
+    for stock_code in stock_codes:
+        ok, _, error = download_csv_text(stock_code, solver, max_retries=10, base_url=server.base_url, http_client=client)
+        if not ok:
+            raise RuntimeError(error)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="下載連線重用效能比較")
+    parser.add_argument("--stocks", type=int, default=20)
+    parser.add_argument("--handshake", type=float, default=0.15, help="每條新連線的模擬交握秒數")
+    parser.add_argument("--latency", type=float, default=0.02, help="每個請求的模擬延遲秒數")
+    parser.add_argument("--captcha-error-rate", type=float, default=0.4)
+    args = parser.parse_args()
+
+    stock_codes = [f"{1000 + index}" for index in range(args.stocks)]
+    rows = []
+    for label, client in [("每次嘗試新 Session", SessionPerAttemptClient()), ("共用連線池", PooledHttpClient())]:
+        with FakeTwseServer(latency=args.latency, handshake_latency=args.handshake) as server:
+            elapsed = run(server, client, stock_codes, args.captcha_error_rate)
+            rows.append((label, elapsed, client.sessions, len(server.connections)))
+
+    baseline = rows[0][1]
+    print(f"{'模式':<14} {'秒':>7} {'秒/檔':>7} {'加速':>6} {'嘗試數':>6} {'TCP 連線':>8}")
+    for label, elapsed, sessions, connections in rows:
+        print(
+            f"{label:<14} {elapsed:>7.2f} {elapsed / args.stocks:>7.3f} {baseline / elapsed:>5.1f}x "
+            f"{sessions:>6} {connections:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+CLI 冷啟動時間：各入口 `--help` 的中位數耗時，可與指定 git 版本比較，並檢查分析指令是否超出預算
+用法：
+  python benchmarks/bench_import.py --repeat 7 --baseline-rev HEAD~1 --budget 1.5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+COMMANDS = [
+    ["broker_pipeline.py", "--help"],
+    ["tsba.py", "analyze", "--help"],
+    ["run_pipeline.py", "--help"],
+]
+ANALYSIS_COMMANDS = {"broker_pipeline.py --help", "tsba.py analyze --help"}
+
+
+def cold_start(tree: Path, command, repeat: int):
+    if not (tree / command[0]).exists():
+        return None
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *command], cwd=tree, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CLI 冷啟動時間")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline-rev", type=str, default=None, help="比較用的 git 版本（以 worktree 檢出）")
+    parser.add_argument("--budget", type=float, default=1.5, help="分析指令冷啟動預算秒數")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        baseline_tree = None
+        if args.baseline_rev:
+            baseline_tree = Path(temp_dir) / "baseline"
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", str(baseline_tree), args.baseline_rev],
+                cwd=REPO_ROOT, check=True, capture_output=True,
+            )
+        try:
+            over_budget = False
+            print(f"{'指令':<28} {'基準秒':>7} {'目前秒':>7}")
+            for command in COMMANDS:
+                label = " ".join(command)
+                current = cold_start(REPO_ROOT, command, args.repeat)
+                baseline = cold_start(baseline_tree, command, args.repeat) if baseline_tree else None
+                baseline_text = f"{baseline:>7.2f}" if baseline is not None else f"{'-':>7}"
+                print(f"{label:<28} {baseline_text} {current:>7.2f}")
+                over_budget |= label in ANALYSIS_COMMANDS and current > args.budget
+        finally:
+            if baseline_tree is not None:
+                subprocess.run(["git", "worktree", "remove", "--force", str(baseline_tree)], cwd=REPO_ROOT, check=False)
+
+    if over_budget:
+        print(f"❌ 分析指令冷啟動超過預算 {args.budget:.2f}s")
+        return 1
+    print(f"✅ 分析指令冷啟動在預算 {args.budget:.2f}s 內")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+下載後分析：寫原始 / 處理後 CSV 再讀回 vs 下載內容在記憶體只解析一次
+- 檔案流程：save_raw_csv + save_processed_csv（逐行重寫）+ 手寫切分的券商摘要 + 讀回處理後 CSV 分析
+- 記憶體流程：analyze_downloaded_text（解析一次，摘要與分析共用同一張展平表），可選擇另存原始 CSV
+兩者都關閉原始 CSV 快取，並各自從空的輸出資料夾開始；最後比對 step1–step7 CSV 完全相同。
+用法：
+  python benchmarks/bench_in_memory.py --rows 200000 1000000 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_log_broker_summary  # noqa: E402
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.scraping import save_processed_csv, save_raw_csv  # noqa: E402
+from taiwan_stock_broker_analysis.services.analysis_service import analyze_existing_csv  # noqa: E402
+from taiwan_stock_broker_analysis.services.pipeline_service import analyze_downloaded_text  # noqa: E402
+
+
+def downloaded_text(path: Path) -> str:
+    lines = path.read_text(encoding="utf-8-sig").split("\n")
+    return "券商買賣股票成交價量資訊\n股票代碼,=\"9999\"\n" + "\n".join(lines[3:])
+
+
+def file_route(csv_text: str, outdir: Path) -> Path:
+    save_raw_csv(csv_text, "9999")
+    processed = save_processed_csv(csv_text, "9999")
+    legacy_log_broker_summary(csv_text, "9999", lambda message: None)
+    return analyze_existing_csv(Path(processed), outdir, 0.28, 0.0015)
+
+
+def memory_route(csv_text: str, outdir: Path, archive: bool) -> Path:
+    return analyze_downloaded_text("9999", csv_text, outdir, 0.28, 0.0015, archive=archive, logger=lambda message: None)[0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="下載後分析：檔案往返 vs 記憶體單次解析")
+    parser.add_argument("--rows", type=int, nargs="+", default=[200_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'列數':>10} {'檔案往返秒':>10} {'記憶體秒':>9} {'記憶體+原始檔秒':>14} {'加速':>6} {'報表相同':>6}")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        os.chdir(temp_dir)
+        try:
+            for rows in args.rows:
+                csv_text = downloaded_text(write_twse_csv(temp_dir / f"source_{rows}.csv", rows))
+                timings = {"file": [], "memory": [], "archive": []}
+                for attempt in range(args.repeat):
+                    for label, run in [
+                        ("file", lambda outdir: file_route(csv_text, outdir)),
+                        ("memory", lambda outdir: memory_route(csv_text, outdir, archive=False)),
+                        ("archive", lambda outdir: memory_route(csv_text, outdir, archive=True)),
+                    ]:
+                        outdir = temp_dir / f"{label}_{rows}_{attempt}"
+                        started = time.perf_counter()
+                        result_dir = run(outdir)
+                        timings[label].append(time.perf_counter() - started)
+                        if label != "archive":
+                            timings.setdefault(f"{label}_dir", result_dir)
+                file_dir, memory_dir = timings["file_dir"], timings["memory_dir"]
+                same = all(
+                    (memory_dir / report.name).read_bytes() == report.read_bytes() for report in file_dir.glob("*.csv")
+                )
+                file_seconds, memory_seconds, archive_seconds = (
+                    statistics.median(timings[label]) for label in ("file", "memory", "archive")
+                )
+                print(
+                    f"{rows:>10,} {file_seconds:>10.3f} {memory_seconds:>9.3f} {archive_seconds:>14.3f} "
+                    f"{file_seconds / memory_seconds:>5.2f}x {'✅' if same else '❌':>6}"
+                )
+        finally:
+            os.chdir(cwd)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+增量分析：同一輸入重跑、調整手續費折扣、刪除單一報表後重跑
+用法：
+  python benchmarks/bench_incremental.py --rows 200000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import analyze_csv_file  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="增量分析效能比較")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_csv = Path(temp_dir) / "input.csv"
+        outdir = Path(temp_dir) / "output"
+        write_twse_csv(input_csv, args.rows)
+
+        def remove_step5_xlsx():
+            (outdir / "step5_fifo_with_carry.xlsx").unlink()
+
+        scenarios = [
+            ("完整計算（--force）", 0.28, False, None),
+            ("首次執行", 0.28, True, None),
+            ("相同輸入重跑", 0.28, True, None),
+            ("調整手續費折扣", 0.5, True, None),
+            ("刪除 step5 xlsx 後重跑", 0.5, True, remove_step5_xlsx),
+        ]
+        rows = []
+        for label, fee_discount, incremental, prepare in scenarios:
+            if prepare is not None:
+                prepare()
+            started = time.perf_counter()
+            manifest = analyze_csv_file(input_csv, outdir, fee_discount, 0.0015, incremental=incremental)
+            rows.append((label, time.perf_counter() - started, manifest["computed"]))
+
+    baseline = rows[0][1]
+    print(f"{'情境':<22} {'秒':>7} {'加速':>7}  重新計算")
+    for label, elapsed, computed in rows:
+        print(f"{label:<22} {elapsed:>7.3f} {baseline / elapsed:>6.1f}x  {', '.join(computed) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
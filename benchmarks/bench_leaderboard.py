@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+跨股票母券商排行：把所有 step5 報表串成一張大表再排序 vs 逐檔串流進 top-K 堆積與可合併的總計
+- 全表：pd.concat(每檔 step5) → groupby 母券商加總 → sort_values 取前 K；個股層級也整表排序
+- 串流：MarketLeaderboard.add 逐檔累加，個股層級只保留 K 筆
+兩者都從同一批 analysis_<代碼>_<日期>/step5_fifo_with_carry.csv 讀取，比較耗時與 tracemalloc 峰值，並檢查排行相同。
+用法：
+  python benchmarks/bench_leaderboard.py --stocks 200 1000 --brokers 600
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT / "src"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from taiwan_stock_broker_analysis.domain.analysis import load_report  # noqa: E402
+from taiwan_stock_broker_analysis.domain.leaderboard import SOURCE_COLUMNS, SOURCE_REPORT  # noqa: E402
+from taiwan_stock_broker_analysis.services.market_service import _fold_outdirs  # noqa: E402
+
+TOP_K = 10
+
+
+def write_outdirs(root: Path, n_stocks: int, n_brokers: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    names = np.array([f"{1000 + index:04d}券商{index}" for index in range(n_brokers)], dtype=object)
+    outdirs = []
+    for index in range(n_stocks):
+        brokers = np.sort(rng.choice(names, min(n_brokers, int(rng.integers(50, 400))), replace=False))
+        buy = rng.integers(0, 200, len(brokers)) * 1000
+        sell = rng.integers(0, 200, len(brokers)) * 1000
+        net = rng.integers(-2_000_000, 2_000_000, len(brokers))
+        frame = pd.DataFrame({
+            "回轉股數(FIFO)": np.minimum(buy, sell),
+            "已實現毛利(FIFO)": net + 500,
+            "手續費合計(FIFO)": np.full(len(brokers), 300),
+            "證交稅合計(FIFO)": np.full(len(brokers), 200),
+            "已實現淨損益(FIFO)": net,
+            "買股數(全日)": buy,
+            "賣股數(全日)": sell,
+            "均買價(全日)": np.where(buy > 0, rng.integers(1000, 90000, len(brokers)) / 100, np.nan),
+            "均賣價(全日)": np.where(sell > 0, rng.integers(1000, 90000, len(brokers)) / 100, np.nan),
+        }, index=pd.Index(brokers, name="母券商"))
+        outdir = root / f"analysis_{1000 + index}_2026-01-01"
+        outdir.mkdir()
+        frame.to_csv(outdir / "step5_fifo_with_carry.csv", encoding="utf-8-sig")
+        outdirs.append(outdir)
+    return outdirs
+
+
+def full_frame(outdirs) -> tuple:
+    frames = [
+        load_report(outdir, SOURCE_REPORT, columns=SOURCE_COLUMNS).reset_index().assign(股票代碼=outdir.name.split("_")[1])
+        for outdir in outdirs
+    ]
+    stacked = pd.concat(frames, ignore_index=True)
+    totals = stacked.groupby("母券商")["已實現淨損益(FIFO)"].sum().sort_values(ascending=False)
+    pairs = stacked.sort_values("已實現淨損益(FIFO)", ascending=False).head(TOP_K)
+    return totals[totals > 0].head(TOP_K).index.tolist(), pairs["已實現淨損益(FIFO)"].tolist()
+
+
+def streaming(outdirs) -> tuple:
+    reports = _fold_outdirs(outdirs, TOP_K)[0].reports()
+    return (
+        reports["market_step6_top_profit"]["母券商"].tolist(),
+        reports["market_stock_top_profit"]["已實現淨損益(FIFO)"].tolist(),
+    )
+
+
+def measure(function, outdirs):
+    started = time.perf_counter()
+    result = function(outdirs)
+    seconds = time.perf_counter() - started
+    # 峰值另跑一次量：tracemalloc 會拖慢逐列的 Python 程式碼，不能和計時混在一起
+    tracemalloc.start()
+    function(outdirs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="跨股票排行：整表排序 vs 串流 top-K")
+    parser.add_argument("--stocks", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--brokers", type=int, default=600)
+    args = parser.parse_args()
+
+    print(f"{'股票數':>8} {'全表秒':>8} {'串流秒':>8} {'全表峰值MB':>11} {'串流峰值MB':>11} {'排行相同':>6}")
+    for n_stocks in args.stocks:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            outdirs = write_outdirs(Path(temp_dir), n_stocks, args.brokers)
+            expected, full_seconds, full_peak = measure(full_frame, outdirs)
+            actual, stream_seconds, stream_peak = measure(streaming, outdirs)
+            print(
+                f"{n_stocks:>8,} {full_seconds:>8.3f} {stream_seconds:>8.3f} {full_peak / 1e6:>11.1f} "
+                f"{stream_peak / 1e6:>11.1f} {'✅' if actual == expected else '❌':>6}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
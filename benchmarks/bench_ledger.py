@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+step2 到 step5 計算時間：舊版各步驟各自 groupby / 逐券商過濾 vs 共用券商帳本
+用法：
+  python benchmarks/bench_ledger.py --rows 100000 400000 --brokers 100 1000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_avg_method_pnl, legacy_fifo_pnl_with_carry, legacy_group_by_broker  # noqa: E402
+from bench_fifo import make_mother_frame  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import (  # noqa: E402
+    avg_method_pnl,
+    fifo_pnl_with_carry,
+    group_by_broker,
+)
+from taiwan_stock_broker_analysis.domain.ledger import build_broker_ledger  # noqa: E402
+from taiwan_stock_broker_analysis.domain.schema import to_compact  # noqa: E402
+
+
+def legacy_steps(frame):
+    legacy_group_by_broker(frame, "券商")
+    legacy_group_by_broker(frame, "母券商")
+    legacy_avg_method_pnl(frame, 0.28, 0.0015)
+    return legacy_fifo_pnl_with_carry(frame, 0.28, 0.0015)
+
+
+def ledger_steps(frame):
+    group_by_broker(frame, "券商", ledger=build_broker_ledger(frame, "券商"))
+    ledger = build_broker_ledger(frame, "母券商")
+    group_by_broker(frame, "母券商", ledger=ledger)
+    avg_method_pnl(frame, 0.28, 0.0015, ledger=ledger)
+    return fifo_pnl_with_carry(frame, 0.28, 0.0015, ledger=ledger)
+
+
+def _time(func, frame):
+    started = time.perf_counter()
+    result = func(frame)
+    return time.perf_counter() - started, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="共用券商帳本效能比較")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 400_000])
+    parser.add_argument("--brokers", type=int, nargs="+", default=[100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'brokers':>8} {'舊版秒':>8} {'帳本秒':>8} {'加速':>7}  step5 相同")
+    for rows in args.rows:
+        for brokers in args.brokers:
+            frame = make_mother_frame(rows, n_brokers=brokers)
+            old_time, old_out = _time(legacy_steps, frame)
+            new_time, new_out = _time(ledger_steps, to_compact(frame))
+            print(
+                f"{rows:>9} {brokers:>8} {old_time:>8.2f} {new_time:>8.2f} "
+                f"{old_time / new_time:>6.1f}x  {old_out.equals(new_out)}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
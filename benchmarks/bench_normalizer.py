@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+母券商正規化效能比較：逐列 regex vs 去重 + trie + 記憶化
+用法：
+  python benchmarks/bench_normalizer.py
+  python benchmarks/bench_normalizer.py --rows 1000000 --distinct 400
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_normalize_to_mother  # noqa: E402
+from taiwan_stock_broker_analysis.domain.broker_names import (  # noqa: E402
+    BRANCH_SUFFIXES,
+    BRANCH_TOKENS,
+    BROKER_PREFIXES,
+    BrokerNameNormalizer,
+)
+
+_EXTRA_NAMES = ["府城", "敦北", "館前", "大益", "日盛", "犇亞", "宏遠", "福邦"]
+
+
+def make_branch_names(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        code = "".join(rng.choice("0123456789ABCDEFabcdef") for _ in range(rng.randint(0, 5)))
+        mother = rng.choice(BROKER_PREFIXES + _EXTRA_NAMES)
+        branch = rng.choice(BRANCH_TOKENS + _EXTRA_NAMES + [""])
+        suffix = rng.choice(BRANCH_SUFFIXES + ["", "", ""])
+        spacer = rng.choice(["", "　", " "])
+        names.add(f"{code}{spacer}{mother}{branch}{suffix}")
+    return sorted(names)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="母券商正規化效能比較")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=400)
+    args = parser.parse_args()
+
+    names = make_branch_names(args.distinct)
+    fuzz = make_branch_names(20_000, seed=1)
+    checker = BrokerNameNormalizer()
+    mismatches = [name for name in fuzz if checker.resolve(name) != legacy_normalize_to_mother(name)]
+    print(f"fuzz 比對 {len(fuzz)} 個名稱，不一致 {len(mismatches)} 個")
+
+    rng = random.Random(2)
+    series = pd.Series([rng.choice(names) for _ in range(args.rows)], dtype=object)
+
+    started = time.perf_counter()
+    legacy = series.map(legacy_normalize_to_mother)
+    legacy_time = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = Path(temp_dir) / "broker_mother_map.json"
+        started = time.perf_counter()
+        cold = BrokerNameNormalizer(cache_path=cache_path).map_series(series)
+        cold_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        warm_normalizer = BrokerNameNormalizer(cache_path=cache_path)
+        warm = warm_normalizer.map_series(series)
+        warm_time = time.perf_counter() - started
+
+    per_million = 1_000_000 / args.rows
+    print(f"{'mode':<22} {'秒/100萬列':>12} {'加速':>8}")
+    print(f"{'legacy Series.map':<22} {legacy_time * per_million:>12.3f} {'1.0x':>8}")
+    print(f"{'trie (冷快取)':<22} {cold_time * per_million:>12.3f} {legacy_time / cold_time:>7.1f}x")
+    print(f"{'trie (磁碟快取)':<22} {warm_time * per_million:>12.3f} {legacy_time / warm_time:>7.1f}x")
+    print(f"結果一致: {legacy.equals(cold) and legacy.equals(warm)}，磁碟快取重新解析 {warm_normalizer.stats['resolved']} 個名稱")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+驗證碼 OCR：每個爬蟲各自載入 ddddocr vs 全行程共用、可設定副本數與 intra-op 執行緒的 OCR 服務
+用法：
+  python benchmarks/bench_ocr.py --scrapers 4 --images 200 --replicas 1 2 --threads 1
+"""
+import argparse
+import io
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT / "src"))
+
+import ddddocr  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+
+from taiwan_stock_broker_analysis.services.ocr_service import OcrService  # noqa: E402
+
+
+def make_captcha_images(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.new("RGB", (110, 32), "white")
+        draw = ImageDraw.Draw(image)
+        draw.text((12, 10), "".join(rng.choice("0123456789ABCDEFGHJKLMNPQRSTUVWXYZ") for _ in range(5)), fill="black")
+        for _ in range(6):
+            draw.line([(rng.randint(0, 110), rng.randint(0, 32)), (rng.randint(0, 110), rng.randint(0, 32))], fill="gray")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def run_threads(solvers, images):
+    chunks = [images[index::len(solvers)] for index in range(len(solvers))]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(solvers)) as executor:
+        list(executor.map(lambda pair: [pair[0](image) for image in pair[1]], zip(solvers, chunks)))
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="驗證碼 OCR 服務效能比較")
+    parser.add_argument("--scrapers", type=int, default=4, help="同時執行的爬蟲執行緒數")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--threads", type=int, default=1, help="OCR 服務的 intra-op 執行緒數")
+    args = parser.parse_args()
+
+    images = make_captcha_images(args.images)
+    print(f"{'模式':<26} {'載入秒':>7} {'辨識秒':>7} {'張/秒':>7}")
+
+    started = time.perf_counter()
+    models = [ddddocr.DdddOcr(show_ad=False) for _ in range(args.scrapers)]
+    load_time = time.perf_counter() - started
+    elapsed = run_threads([model.classification for model in models], images)
+    print(f"{f'各自載入 ×{args.scrapers}（預設執行緒）':<26} {load_time:>7.2f} {elapsed:>7.2f} {args.images / elapsed:>7.1f}")
+
+    for replicas in args.replicas:
+        service = OcrService(replicas=replicas, intra_op_threads=args.threads)
+        elapsed = run_threads([service.classify] * args.scrapers, images)
+        stats = service.stats()
+        label = f"共用服務 副本 {replicas} × 執行緒 {args.threads}"
+        print(f"{label:<26} {stats['load_seconds']:>7.2f} {elapsed - stats['load_seconds']:>7.2f} "
+              f"{args.images / (elapsed - stats['load_seconds']):>7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+原始 CSV 快取：同一交易日重跑清單時，冷快取 vs 熱快取
+本機假站模擬查詢延遲與驗證碼錯誤率；第二次執行應完全不送出查詢。
+用法：
+  python benchmarks/bench_raw_cache.py --stocks 20 --concurrency 4 --min-interval 0.3
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "tests"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from bench_scheduler import make_solver  # noqa: E402
+from fake_twse_server import FakeTwseServer  # noqa: E402
+from taiwan_stock_broker_analysis.domain.raw_cache import RawCsvCache  # noqa: E402
+from taiwan_stock_broker_analysis.services.download_scheduler import DownloadScheduler  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="原始 CSV 快取效能比較")
+    parser.add_argument("--stocks", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--min-interval", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.05, help="每個請求的模擬延遲秒數")
+    parser.add_argument("--captcha-error-rate", type=float, default=0.4)
+    args = parser.parse_args()
+
+    stock_codes = [f"{1000 + index}" for index in range(args.stocks)]
+    cache_dir = Path(tempfile.mkdtemp(prefix="bench_raw_cache_"))
+    rows = []
+    try:
+        for label in ["冷快取", "熱快取（新行程）"]:
+            cache = RawCsvCache(cache_dir)
+            with FakeTwseServer(latency=args.latency) as server:
+                scheduler = DownloadScheduler(
+                    make_solver(args.captcha_error_rate, seed=0),
+                    max_concurrency=args.concurrency,
+                    min_interval=args.min_interval,
+                    max_retries=10,
+                    base_url=server.base_url,
+                    raw_cache=cache,
+                )
+                started = time.perf_counter()
+                results = scheduler.run(stock_codes)
+                elapsed = time.perf_counter() - started
+            ok = sum(result["ok"] for result in results)
+            rows.append((label, elapsed, ok, len(server.submits), server.tokens, cache.stats()))
+    finally:
+        shutil.rmtree(cache_dir)
+
+    baseline = rows[0][1]
+    print(f"{'模式':<12} {'秒':>7} {'加速':>8} {'成功':>7} {'送出數':>6} {'表單數':>6} {'命中':>4} {'檔案':>4}")
+    for label, elapsed, ok, submits, forms, stats in rows:
+        print(
+            f"{label:<12} {elapsed:>7.3f} {baseline / elapsed:>7.0f}x {ok:>3}/{args.stocks:<3} {submits:>6} {forms:>6} "
+            f"{stats['hits']:>4} {stats['blobs']:>4}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+報表寫出：同步寫檔 vs 背景寫檔執行緒（分析下一步驟時同時寫前一步驟的 CSV / xlsx）
+每檔都關閉增量快取重新計算；manifest 的 writes 欄位記錄寫檔總秒數與因佇列滿而等待的秒數。
+--latency-ms 在每個檔案改名前加上固定延遲，模擬網路磁碟 / 同步資料夾等慢速儲存（延遲期間不佔 GIL）。
+用法：
+  python benchmarks/bench_report_writer.py --stocks 10 --rows 200000 --repeat 3
+  python benchmarks/bench_report_writer.py --stocks 10 --rows 20000 --latency-ms 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain import report_writer  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import analyze_csv_file  # noqa: E402
+
+
+def _with_latency(seconds: float):
+    atomic_write = report_writer.atomic_write
+
+    def slow_atomic_write(path, write):
+        def slow_write(temp_name):
+            write(temp_name)
+            time.sleep(seconds)
+
+        return atomic_write(path, slow_write)
+
+    return slow_atomic_write
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="背景寫檔與同步寫檔比較")
+    parser.add_argument("--stocks", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--brokers", type=int, default=900)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.latency_ms > 0:
+        report_writer.atomic_write = _with_latency(args.latency_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        inputs = [
+            write_twse_csv(temp_dir / f"stock{index}.csv", args.rows, n_brokers=args.brokers, seed=index)
+            for index in range(args.stocks)
+        ]
+        analyze_csv_file(inputs[0], temp_dir / "warmup", 0.28, 0.0015, incremental=False)
+
+        results = {}
+        for _ in range(args.repeat):
+            for label, background in [("同步寫檔", False), ("背景寫檔", True)]:
+                started = time.perf_counter()
+                write_seconds = blocked_seconds = 0.0
+                for input_csv in inputs:
+                    manifest = analyze_csv_file(
+                        input_csv,
+                        temp_dir / label / input_csv.stem,
+                        0.28,
+                        0.0015,
+                        incremental=False,
+                        background_writes=background,
+                    )
+                    write_seconds += manifest["writes"]["write_seconds"]
+                    blocked_seconds += manifest["writes"]["blocked_seconds"]
+                results.setdefault(label, []).append((time.perf_counter() - started, write_seconds, blocked_seconds))
+
+    print(
+        f"{args.stocks} 檔 × {args.rows:,} 列，{args.brokers} 家分點；每檔寫入延遲 {args.latency_ms:g} ms；"
+        f"{args.repeat} 次中位數，CPU {os.cpu_count()} 核"
+    )
+    print(f"{'模式':<10} {'總秒':>8} {'每檔秒':>8} {'寫檔秒':>8} {'佇列等待秒':>10}")
+    baseline = statistics.median(run[0] for run in results["同步寫檔"])
+    for label, runs in results.items():
+        total = statistics.median(run[0] for run in runs)
+        write = statistics.median(run[1] for run in runs)
+        blocked = statistics.median(run[2] for run in runs)
+        print(f"{label:<10} {total:>8.2f} {total / args.stocks:>8.3f} {write:>8.2f} {blocked:>10.2f}  {baseline / total:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
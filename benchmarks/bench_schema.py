@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+展平交易表每列記憶體：舊版 object / float64 欄位 vs 精簡型別 schema
+用法：
+  python benchmarks/bench_schema.py --rows 1000000
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from _legacy import legacy_flatten_two_groups, legacy_normalize_to_mother, legacy_read_raw_csv  # noqa: E402
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import add_mother_column, read_flat_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.schema import memory_per_row  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="展平交易表記憶體比較")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = write_twse_csv(Path(temp_dir) / "schema.csv", args.rows)
+        raw_df, _ = legacy_read_raw_csv(path)
+        legacy = legacy_flatten_two_groups(raw_df)
+        legacy["母券商"] = legacy["券商"].map(legacy_normalize_to_mother)
+        compact = add_mother_column(read_flat_csv(path))
+
+    legacy_bytes = memory_per_row(legacy)
+    compact_bytes = memory_per_row(compact)
+    print(f"舊版: {legacy_bytes:.1f} bytes/列  {dict(legacy.dtypes.astype(str))}")
+    print(f"精簡: {compact_bytes:.1f} bytes/列  {dict(compact.dtypes.astype(str))}")
+    print(f"縮小 {legacy_bytes / compact_bytes:.1f} 倍")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
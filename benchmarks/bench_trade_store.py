@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+歷史區間查詢：逐檔讀 CSV vs 分割式成交資料庫（catalog + memory map）
+情境：N 檔股票 × D 個交易日，每日一份已處理 CSV；查詢 2 檔股票最近 5 個交易日。
+- CSV 全讀後篩選：沒有索引時最常見的做法
+- CSV 依檔名篩選：已知檔名規則時的最佳情況，仍要逐檔解析文字
+- 資料庫：只讀 catalog 命中的分割，欄位直接映射
+用法：
+  python benchmarks/bench_trade_store.py --stocks 10 --days 20 --rows 20000 --repeat 3
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from synthetic import write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import read_flat_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.trade_store import TradeStore  # noqa: E402
+
+
+def _median_seconds(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _trading_days(count: int):
+    days, day = [], date(2026, 1, 5)
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="歷史成交資料庫區間查詢比較")
+    parser.add_argument("--stocks", type=int, default=10)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    codes = [f"{1101 + index}" for index in range(args.stocks)]
+    days = _trading_days(args.days)
+    wanted_codes, wanted_days = set(codes[:2]), set(days[-5:])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        csv_dir = temp_dir / "csv"
+        csv_dir.mkdir()
+        store = TradeStore(temp_dir / "store", fmt="npy")
+        template = write_twse_csv(temp_dir / "template.csv", args.rows)
+        flat = read_flat_csv(template)
+        text = template.read_text(encoding="utf-8-sig")
+        for code in codes:
+            for day in days:
+                (csv_dir / f"{code}_{day:%Y%m%d}.csv").write_text(text, encoding="utf-8-sig")
+                store.append(code, day, flat)
+
+        def parse_name(path: Path):
+            code, stamp = path.stem.split("_")
+            return code, date(int(stamp[:4]), int(stamp[4:6]), int(stamp[6:]))
+
+        def csv_scan_all():
+            frames = []
+            for path in sorted(csv_dir.glob("*.csv")):
+                code, day = parse_name(path)
+                frame = read_flat_csv(path)
+                if code in wanted_codes and day in wanted_days:
+                    frames.append(frame.assign(股票代碼=code, 日期=pd.Timestamp(day)))
+            return pd.concat(frames, ignore_index=True)
+
+        def csv_by_name():
+            frames = []
+            for path in sorted(csv_dir.glob("*.csv")):
+                code, day = parse_name(path)
+                if code in wanted_codes and day in wanted_days:
+                    frames.append(read_flat_csv(path).assign(股票代碼=code, 日期=pd.Timestamp(day)))
+            return pd.concat(frames, ignore_index=True)
+
+        def store_query():
+            return TradeStore(temp_dir / "store").read(sorted(wanted_codes), min(wanted_days), max(wanted_days))
+
+        expected_rows = len(store_query())
+        cases = [
+            ("CSV 全讀後篩選", csv_scan_all),
+            ("CSV 依檔名篩選", csv_by_name),
+            ("資料庫 read()", store_query),
+        ]
+        rows = []
+        for label, function in cases:
+            assert len(function()) == expected_rows
+            rows.append((label, _median_seconds(function, args.repeat)))
+
+    baseline = rows[0][1]
+    print(
+        f"{args.stocks} 檔 × {args.days} 日 × {args.rows:,} 列；查詢 2 檔 × 5 日 = {expected_rows:,} 列，"
+        f"{args.repeat} 次中位數"
+    )
+    print(f"{'方式':<16} {'秒':>8} {'加速':>8}")
+    for label, seconds in rows:
+        print(f"{label:<16} {seconds:>8.4f} {baseline / seconds:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+分析各階段的效能基準：在多種資料量下量測每個階段的耗時，結果存成 JSON 供回歸比較
+用法：
+  python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000 --output bench_results.json
+  python benchmarks/run_benchmarks.py --encoding cp950 --compare bench_results.json --threshold 1.25
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from statistics import median
+
+os.environ["TSBA_BROKER_CACHE"] = ""
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+for path_text in [str(REPO_ROOT / "src"), str(REPO_ROOT / "benchmarks")]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from synthetic import ENCODINGS, TICK_RULES, write_twse_csv  # noqa: E402
+from taiwan_stock_broker_analysis.domain.analysis import (  # noqa: E402
+    add_mother_column,
+    avg_method_pnl,
+    export_analysis,
+    fifo_pnl_with_carry,
+    flatten_two_groups,
+    group_by_broker,
+    read_flat_csv,
+    read_raw_csv,
+)
+
+RESULT_VERSION = 1
+FEE_DISCOUNT = 0.28
+DAY_TRADE_TAX = 0.0015
+STAGES = [
+    "read_raw_csv",
+    "flatten_two_groups",
+    "read_flat_csv",
+    "add_mother_column",
+    "group_by_broker",
+    "avg_method_pnl",
+    "fifo_pnl_with_carry",
+    "export_analysis",
+]
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def time_call(function, repeat: int):
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - started)
+    return result, seconds
+
+
+def run_size(path: Path, rows: int, repeat: int, workdir: Path) -> list:
+    raw_frame = [None]
+    outputs = {}
+    exports = count()
+
+    def read_raw():
+        raw_frame[0] = read_raw_csv(path)[0]
+
+    def export():
+        outdir = workdir / f"export_{rows}_{next(exports)}"
+        return export_analysis(outputs["read_flat_csv"], outdir, FEE_DISCOUNT, DAY_TRADE_TAX)
+
+    stages = {
+        "read_raw_csv": read_raw,
+        "flatten_two_groups": lambda: flatten_two_groups(raw_frame[0]),
+        "read_flat_csv": lambda: read_flat_csv(path),
+        "add_mother_column": lambda: add_mother_column(outputs["flatten_two_groups"]),
+        "group_by_broker": lambda: group_by_broker(outputs["add_mother_column"], "券商"),
+        "avg_method_pnl": lambda: avg_method_pnl(outputs["add_mother_column"], FEE_DISCOUNT, DAY_TRADE_TAX),
+        "fifo_pnl_with_carry": lambda: fifo_pnl_with_carry(outputs["add_mother_column"], FEE_DISCOUNT, DAY_TRADE_TAX),
+        "export_analysis": export,
+    }
+    records = []
+    for stage in STAGES:
+        outputs[stage], seconds = time_call(stages[stage], repeat)
+        best = median(seconds)
+        records.append({
+            "stage": stage,
+            "rows": rows,
+            "median_seconds": round(best, 6),
+            "min_seconds": round(min(seconds), 6),
+            "rows_per_second": round(rows / best) if best > 0 else None,
+            "repeat": repeat,
+        })
+    return records
+
+
+def result_key(record: dict, encoding: str):
+    return record["stage"], record["rows"], encoding
+
+
+def compare(current: dict, baseline: dict, threshold: float, noise_floor: float) -> list:
+    previous = {result_key(record, baseline["params"]["encoding"]): record for record in baseline["results"]}
+    encoding = current["params"]["encoding"]
+    regressions = []
+    print(f"\n與 {baseline['environment'].get('commit') or '基準'}（{baseline['environment'].get('timestamp', '')}）比較最快一次：")
+    print(f"{'階段':<22} {'列數':>10} {'基準秒':>9} {'本次秒':>9} {'比值':>7}")
+    for record in current["results"]:
+        old = previous.get(result_key(record, encoding))
+        if old is None or not old["min_seconds"]:
+            continue
+        ratio = record["min_seconds"] / old["min_seconds"]
+        slower = ratio > threshold and record["min_seconds"] - old["min_seconds"] > noise_floor
+        print(
+            f"{record['stage']:<22} {record['rows']:>10,} {old['min_seconds']:>9.3f} "
+            f"{record['min_seconds']:>9.3f} {ratio:>6.2f}x{'  ⚠ 變慢' if slower else ''}"
+        )
+        if slower:
+            regressions.append({**record, "baseline_seconds": old["min_seconds"], "ratio": round(ratio, 3)})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="分析各階段效能基準（JSON 輸出，可與前次結果比較）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="每個階段重複次數，取中位數")
+    parser.add_argument("--brokers", type=int, default=300)
+    parser.add_argument("--base-price", type=float, default=100.0)
+    parser.add_argument("--levels", type=int, default=40)
+    parser.add_argument("--tick-rule", choices=TICK_RULES, default="twse")
+    parser.add_argument("--skew", type=float, default=1.0, help="分點成交集中度（Zipf 指數）")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8-sig")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果 JSON 路徑（預設只印出）")
+    parser.add_argument("--compare", help="前次結果 JSON，比較同階段、同列數、同編碼的最快一次")
+    parser.add_argument("--threshold", type=float, default=1.25, help="本次 / 基準 超過此比值視為變慢")
+    parser.add_argument("--noise-floor", type=float, default=0.02, help="相差不到此秒數的階段不算變慢")
+    args = parser.parse_args(argv)
+
+    params = {
+        "sizes": args.sizes,
+        "repeat": args.repeat,
+        "brokers": args.brokers,
+        "base_price": args.base_price,
+        "levels": args.levels,
+        "tick_rule": args.tick_rule,
+        "skew": args.skew,
+        "encoding": args.encoding,
+        "seed": args.seed,
+        "fee_discount": FEE_DISCOUNT,
+        "day_trade_tax": DAY_TRADE_TAX,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        for rows in args.sizes:
+            path = write_twse_csv(
+                temp_dir / f"twse_{rows}.csv", rows, n_brokers=args.brokers, encoding=args.encoding, seed=args.seed,
+                base_price=args.base_price, price_levels=args.levels, tick_rule=args.tick_rule,
+                broker_skew=args.skew,
+            )
+            print(f"{rows:,} 列（{path.stat().st_size / 1e6:.1f} MB，{args.encoding}）")
+            for record in run_size(path, rows, args.repeat, temp_dir):
+                results.append(record)
+                print(
+                    f"  {record['stage']:<22} 中位數 {record['median_seconds']:>8.3f} 秒  "
+                    f"最快 {record['min_seconds']:>8.3f} 秒  {record['rows_per_second'] or 0:>12,} 列/秒"
+                )
+
+    report = {"version": RESULT_VERSION, "environment": environment(), "params": params, "results": results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n結果已寫入 {args.output}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold, args.noise_floor)
+        if regressions:
+            print(f"\n{len(regressions)} 個階段比基準慢超過 {args.threshold:.2f}x")
+            return 1
+        print("\n沒有超過門檻的回歸")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
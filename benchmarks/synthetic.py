@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+合成 TWSE 券商買賣明細（雙欄 CSV）
+用法：
+  python benchmarks/synthetic.py out.csv --rows 100000
+  python benchmarks/synthetic.py out_cp950.csv --rows 100000 --brokers 600 --base-price 48 --tick-rule twse --encoding cp950
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 合成的分點名稱不寫進使用者的券商名稱快取；需要磁碟快取的基準自行指到暫存路徑
+os.environ["TSBA_BROKER_CACHE"] = ""
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from taiwan_stock_broker_analysis.domain.broker_names import BRANCH_TOKENS, BROKER_PREFIXES  # noqa: E402
+
+HEADER = "序號,券商,價格,買進股數,賣出股數,,序號,券商,價格,買進股數,賣出股數"
+ENCODINGS = ("utf-8-sig", "cp950")
+TICK_RULES = ("fixed", "twse")
+# 上市股票升降單位（單位：分）：價格下限 → 檔位
+TWSE_TICKS_CENTS = [(0, 1), (1000, 5), (5000, 10), (10000, 50), (50000, 100), (100000, 500)]
+
+
+def tick_cents(price_cents: int) -> int:
+    tick = TWSE_TICKS_CENTS[0][1]
+    for floor, size in TWSE_TICKS_CENTS:
+        if price_cents >= floor:
+            tick = size
+    return tick
+
+
+def price_ladder(base_price: float, levels: int, tick_rule: str = "twse") -> np.ndarray:
+    if tick_rule not in TICK_RULES:
+        raise ValueError(f"不支援的檔位規則：{tick_rule}（可用 {', '.join(TICK_RULES)}）")
+    base = int(round(base_price * 100))
+    base -= base % tick_cents(base)
+    if tick_rule == "fixed":
+        cents = base + np.arange(-levels, levels) * tick_cents(base)
+    else:
+        below, above = [], [base]
+        price = base
+        for _ in range(levels):
+            price -= tick_cents(price - 1)
+            if price <= 0:
+                break
+            below.append(price)
+        price = base
+        for _ in range(levels - 1):
+            price += tick_cents(price)
+            above.append(price)
+        cents = np.array(below[::-1] + above)
+    if (cents <= 0).any():
+        raise ValueError(f"參考價 {base_price} 往下 {levels} 檔會跌破 0")
+    return np.round(cents / 100, 2)
+
+
+def make_broker_names(n_brokers: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    names = []
+    for index in range(n_brokers):
+        mother = BROKER_PREFIXES[index % len(BROKER_PREFIXES)]
+        branch = BRANCH_TOKENS[int(rng.integers(0, len(BRANCH_TOKENS)))]
+        names.append(f"{1000 + index:04d}{mother}　{branch}")
+    return names
+
+
+def write_twse_csv(
+    path: Path,
+    n_rows: int,
+    n_brokers: int = 300,
+    encoding: str = "utf-8-sig",
+    seed: int = 0,
+    base_price: float = 100.0,
+    price_levels: int = 40,
+    tick_rule: str = "fixed",
+    broker_skew: float = 0.0,
+    stock_code: str = "9999",
+):
+    rng = np.random.default_rng(seed)
+    names = np.array(make_broker_names(n_brokers, seed=seed), dtype=object)
+    if broker_skew > 0:
+        weights = 1.0 / np.arange(1, n_brokers + 1) ** broker_skew
+        brokers = names[rng.choice(n_brokers, n_rows, p=weights / weights.sum())]
+    else:
+        brokers = names[rng.integers(0, n_brokers, n_rows)]
+    ladder = price_ladder(base_price, price_levels, tick_rule)
+    prices = ladder[rng.integers(0, len(ladder), n_rows)]
+    is_buy = rng.random(n_rows) < 0.5
+    shares = rng.integers(1, 50, n_rows) * 1000
+
+    lines = [f"股票代碼: {stock_code} - 券商買賣明細", "下載時間: 2026-01-01 15:00:00", "", HEADER]
+    records = [
+        f"{index + 1},{brokers[index]},{prices[index]:.2f},{shares[index] if is_buy[index] else 0},"
+        f"{0 if is_buy[index] else shares[index]}"
+        for index in range(n_rows)
+    ]
+    for start in range(0, n_rows, 2):
+        pair = records[start:start + 2]
+        lines.append(",,".join(pair) if len(pair) == 2 else pair[0] + ",,")
+    Path(path).write_text("\n".join(lines) + "\n", encoding=encoding)
+    return Path(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="產生合成的 TWSE 雙欄券商買賣明細 CSV")
+    parser.add_argument("output", help="輸出 CSV 路徑")
+    parser.add_argument("--rows", type=int, default=100_000, help="成交筆數（左右兩欄合計）")
+    parser.add_argument("--brokers", type=int, default=300, help="分點家數")
+    parser.add_argument("--base-price", type=float, default=100.0, help="參考價")
+    parser.add_argument("--levels", type=int, default=40, help="參考價上下各幾檔")
+    parser.add_argument("--tick-rule", choices=TICK_RULES, default="twse",
+                        help="fixed：全部用參考價所在檔位；twse：依上市升降單位跨檔位")
+    parser.add_argument("--skew", type=float, default=0.0, help="分點成交集中度（Zipf 指數，0 為平均）")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8-sig")
+    parser.add_argument("--stock", default="9999", help="前言列的股票代碼")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path = write_twse_csv(
+        Path(args.output), args.rows, n_brokers=args.brokers, encoding=args.encoding, seed=args.seed,
+        base_price=args.base_price, price_levels=args.levels, tick_rule=args.tick_rule,
+        broker_skew=args.skew, stock_code=args.stock,
+    )
+    print(f"已產生 {path}（{args.rows:,} 筆、{args.brokers} 家分點、{path.stat().st_size / 1e6:.1f} MB、{args.encoding}）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,27 @@
 # -*- coding: utf-8 -*-
 
-from .domain.analysis import analyze_csv_file
-from .domain.scraping import download_csv_text, log_broker_summary, save_processed_csv, save_raw_csv
-from .services.pipeline_service import run_all
+from ._lazy import lazy_exports
+
+_EXPORTS = {
+    "analyze_csv_file": ".domain.analysis",
+    "download_csv_text": ".domain.scraping",
+    "load_report": ".domain.analysis",
+    "load_table": ".domain.columnar",
+    "log_broker_summary": ".domain.scraping",
+    "run_all": ".services.pipeline_service",
+    "save_processed_csv": ".domain.scraping",
+    "save_raw_csv": ".domain.scraping",
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), _EXPORTS)
 
 __all__ = [
     "analyze_csv_file",
     "download_csv_text",
+    "load_report",
+    "load_table",
     "log_broker_summary",
     "run_all",
     "save_processed_csv",
     "save_raw_csv",
-]
\ No newline at end of file
+]
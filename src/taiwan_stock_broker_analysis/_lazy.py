@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+
+def lazy_exports(package: str, namespace: dict, exports: dict):
+    def __getattr__(name):
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
@@ -3,31 +3,183 @@ import argparse
 import sys
 from pathlib import Path
 
-from ..services.analysis_service import analyze_existing_csv, build_analysis_output_dir
+from ..domain.analysis import chunk_rows_for_budget
+from ..domain.columnar import COLUMNAR_FORMATS, resolve_format
+from ..domain.tracing import trace_session
+from ..domain.workbook import EXCEL_MODES
+from ..services.analysis_service import analyze_existing_csv, analyze_stream, build_analysis_output_dir
+from ..services.daemon_client import DAEMON_ENV_VAR, DEFAULT_URL, forward_to_daemon
+from ..services.batch_service import (
+    analyze_csv_batch,
+    collect_input_files,
+    default_worker_count,
+    format_batch_summary,
+    is_batch_target,
+)
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="券商分點資料處理與 FIFO 撮合全流程")
-    parser.add_argument("input", type=str, help="輸入的 CSV 檔案路徑")
+    parser.add_argument("input", type=str, help="輸入的 CSV 檔案路徑，或資料夾 / glob（批次模式）；- 表示從標準輸入讀取")
     parser.add_argument("--outdir", type=str, default="output", help="輸出資料夾")
     parser.add_argument("--fee_discount", type=float, default=0.28, help="手續費折扣 (預設 0.28)")
     parser.add_argument("--day_trade_tax", type=float, default=0.0015, help="當沖交易稅率 (預設 0.0015)")
-    return parser.parse_args()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_worker_count(),
+        help=f"批次模式的平行行程數 (預設 CPU 核心數 {default_worker_count()})",
+    )
+    parser.add_argument("--force", action="store_true", help="忽略增量快取，重新計算所有步驟")
+    parser.add_argument(
+        "--columnar",
+        choices=COLUMNAR_FORMATS,
+        default=None,
+        help="另存欄式二進位報表：auto（有 pyarrow 用 Feather，否則 npy）/ feather / npy",
+    )
+    parser.add_argument(
+        "--excel",
+        choices=EXCEL_MODES,
+        default="separate",
+        help="Excel 輸出：separate（各步驟各一檔，預設）/ consolidated（單一串流寫入的活頁簿）/ none（不產生，可事後用 tsba excel 補產）",
+    )
+    parser.add_argument("--sync-writes", action="store_true", help="報表在主執行緒依序寫出（預設由背景執行緒邊算邊寫）")
+    parser.add_argument(
+        "--carry",
+        type=str,
+        default=None,
+        help="跨日 FIFO 結轉：從此資料夾承接前一交易日的未平倉部位，並存回當日快照（批次模式依交易日順序處理）",
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="同時把各分點 / 母券商當日買賣寫入券商索引資料夾（增量更新，可用 tsba index 查詢）",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        help="分塊模式：以固定筆數分塊讀取並累加各券商帳本，解析時的記憶體峰值約不超過此 MB 數；只輸出 step2–step4（適合合併多檔的大型研究檔）",
+    )
+    parser.add_argument("--trace", type=Path, default=None, help="把各階段耗時、列數、位元組數寫成 JSON 追蹤檔（Chrome trace 格式）")
+    parser.add_argument("--trace-memory", action="store_true", help="追蹤時一併以 tracemalloc 記錄各階段記憶體峰值（較慢）")
+    parser.add_argument("--profile", type=Path, default=None, help="以 cProfile 剖析整次執行並存成 .prof 檔")
+    parser.add_argument("--daemon", action="store_true", help=f"送到常駐服務執行（位址 ${DAEMON_ENV_VAR}，預設 {DEFAULT_URL}；需先執行 tsba daemon start）")
+    return parser.parse_args(argv)
 
 
-def main() -> int:
-    args = parse_args()
+def _print_chunked_mode(args):
+    if args.memory_budget is not None:
+        rows = chunk_rows_for_budget(args.memory_budget)
+        print(f"分塊模式: 記憶體預算 {args.memory_budget:g} MB，每塊 {rows:,} 筆，只輸出 step2–step4")
+
+
+def run_batch(args, tracer=None) -> int:
+    files = collect_input_files(args.input)
+    if not files:
+        print(f"找不到任何 CSV 檔案: {args.input}")
+        return 1
+
+    print(f"批次模式: {len(files)} 個檔案，{args.workers} 個行程")
+    _print_chunked_mode(args)
+    print(f"輸出資料夾: {Path(args.outdir)}")
+    print("=" * 50)
+
+    summary = analyze_csv_batch(
+        files,
+        Path(args.outdir),
+        fee_discount=args.fee_discount,
+        day_trade_tax=args.day_trade_tax,
+        workers=args.workers,
+        logger=print,
+        incremental=not args.force,
+        columnar=args.columnar,
+        carry_dir=None if args.carry is None else Path(args.carry),
+        excel=args.excel,
+        background_writes=not args.sync_writes,
+        tracer=tracer,
+        index_dir=None if args.index is None else Path(args.index),
+        memory_budget=args.memory_budget,
+    )
+    print("=" * 50)
+    for line in format_batch_summary(summary):
+        print(line)
+    return 0 if not summary["failed"] else 1
+
+
+def run_stdin(args, tracer=None) -> int:
+    print("輸入檔案: <標準輸入>")
+    print("=" * 50)
+    output_dir = analyze_stream(
+        sys.stdin.buffer,
+        Path(args.outdir),
+        fee_discount=args.fee_discount,
+        day_trade_tax=args.day_trade_tax,
+        incremental=not args.force,
+        logger=print,
+        columnar=args.columnar,
+        carry_dir=None if args.carry is None else Path(args.carry),
+        excel=args.excel,
+        background_writes=not args.sync_writes,
+        tracer=tracer,
+        index_dir=None if args.index is None else Path(args.index),
+    )
+    print(f"輸出資料夾: {output_dir}")
+    return 0
+
+
+def run_single(args, tracer=None) -> int:
     input_path = Path(args.input)
     output_root = Path(args.outdir)
     output_dir = build_analysis_output_dir(input_path, output_root)
 
     print(f"輸入檔案: {args.input}")
     print(f"輸出資料夾: {output_dir}")
+    _print_chunked_mode(args)
     print("=" * 50)
 
-    analyze_existing_csv(input_path, output_root, fee_discount=args.fee_discount, day_trade_tax=args.day_trade_tax)
+    analyze_existing_csv(
+        input_path,
+        output_root,
+        fee_discount=args.fee_discount,
+        day_trade_tax=args.day_trade_tax,
+        incremental=not args.force,
+        logger=print,
+        columnar=args.columnar,
+        carry_dir=None if args.carry is None else Path(args.carry),
+        excel=args.excel,
+        background_writes=not args.sync_writes,
+        tracer=tracer,
+        index_dir=None if args.index is None else Path(args.index),
+        memory_budget=args.memory_budget,
+    )
     return 0
 
 
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.daemon:
+        return forward_to_daemon("analyze", sys.argv[1:] if argv is None else argv)
+    if args.columnar is not None:
+        try:
+            resolve_format(args.columnar)
+        except RuntimeError as exc:
+            print(f"❌ {exc}")
+            return 1
+    with trace_session(args.trace, memory=args.trace_memory, profile_path=args.profile, logger=print) as tracer:
+        if args.memory_budget is not None and args.memory_budget <= 0:
+            print("❌ --memory-budget 必須大於 0")
+            return 1
+        if args.memory_budget is not None and (args.input == "-" or args.carry is not None or args.excel == "consolidated"):
+            print("❌ --memory-budget 需要檔案路徑，且不能搭配 --carry 或 --excel consolidated")
+            return 1
+        if args.input == "-":
+            return run_stdin(args, tracer)
+        if is_batch_target(args.input):
+            return run_batch(args, tracer)
+        return run_single(args, tracer)
+
+
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import argparse
+import sys
+
+from ..services.daemon_client import (
+    DAEMON_COMMANDS,
+    DAEMON_ENV_VAR,
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    DEFAULT_URL,
+    daemon_status,
+    format_daemon_status,
+    format_job,
+    forward_to_daemon,
+    list_jobs,
+    shutdown_daemon,
+    submit_job,
+    wait_for_job,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本機常駐服務：保留已載入的模組、OCR 模型、HTTP 連線池與券商名稱快取，依序執行送來的工作")
+    parser.add_argument("--url", type=str, default=None, help=f"常駐服務位址 (預設 ${DAEMON_ENV_VAR} 或 {DEFAULT_URL})")
+    subparsers = parser.add_subparsers(dest="action", required=True, metavar="<動作>")
+
+    start_parser = subparsers.add_parser("start", help="在前景啟動常駐服務（Ctrl+C 結束）")
+    start_parser.add_argument("--host", type=str, default=DEFAULT_HOST, help=f"監聽位址 (預設 {DEFAULT_HOST}，只接受本機連線)")
+    start_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"監聽埠 (預設 {DEFAULT_PORT})")
+    start_parser.add_argument("--preload-ocr", action="store_true", help="啟動時就載入驗證碼 OCR 模型")
+
+    submit_parser = subparsers.add_parser("submit", help="送出工作，例如 tsba daemon submit run 2330")
+    submit_parser.add_argument("--detach", action="store_true", help="只送出工作並印出編號，不等待結果")
+    submit_parser.add_argument("job_command", choices=DAEMON_COMMANDS, metavar="<子命令>", help=" / ".join(DAEMON_COMMANDS))
+    submit_parser.add_argument("job_args", nargs=argparse.REMAINDER, help="該子命令的參數")
+
+    log_parser = subparsers.add_parser("log", help="顯示工作的輸出（執行中會持續跟隨）")
+    log_parser.add_argument("job_id", help="工作編號")
+
+    subparsers.add_parser("status", help="顯示常駐服務狀態與已預熱的快取")
+    subparsers.add_parser("jobs", help="列出最近的工作")
+    subparsers.add_parser("stop", help="結束常駐服務（排隊中的工作會取消）")
+    return parser.parse_args(argv)
+
+
+def run_start(args) -> int:
+    from .main import main as run_command
+    from ..services.daemon_service import serve_daemon
+
+    try:
+        serve_daemon(
+            lambda command, argv: run_command([command, *argv]),
+            host=args.host,
+            port=args.port,
+            warm_ocr=args.preload_ocr,
+        )
+    except OSError as exc:
+        print(f"❌ 無法在 {args.host}:{args.port} 啟動常駐服務：{exc}")
+        return 1
+    return 0
+
+
+def run_submit(args) -> int:
+    if not args.detach:
+        return forward_to_daemon(args.job_command, args.job_args, url=args.url)
+    job = submit_job(args.job_command, args.job_args, url=args.url)
+    print(job["id"])
+    return 0
+
+
+def run_log(args) -> int:
+    job = wait_for_job(args.job_id, url=args.url)
+    return 0 if job["state"] == "done" else 1
+
+
+def run_status(args) -> int:
+    for line in format_daemon_status(daemon_status(url=args.url)):
+        print(line)
+    return 0
+
+
+def run_jobs(args) -> int:
+    jobs = list_jobs(url=args.url)
+    if not jobs:
+        print("沒有工作")
+    for job in jobs:
+        print(format_job(job))
+    return 0
+
+
+def run_stop(args) -> int:
+    shutdown_daemon(url=args.url)
+    print("已通知常駐服務結束")
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    handlers = {
+        "start": run_start,
+        "submit": run_submit,
+        "log": run_log,
+        "status": run_status,
+        "jobs": run_jobs,
+        "stop": run_stop,
+    }
+    try:
+        return handlers[args.action](args)
+    except RuntimeError as exc:
+        print(f"❌ {exc}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import argparse
+import glob
+import sys
+from pathlib import Path
+
+from ..services.analysis_service import build_report_workbooks
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="從已存的分析報表產生單一 Excel 活頁簿（analysis_report.xlsx）")
+    parser.add_argument("outdirs", nargs="+", help="分析輸出資料夾（可用 glob，例如 output/analysis_*）")
+    parser.add_argument("--force", action="store_true", help="即使活頁簿比報表新也重新產生")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    outdirs = []
+    for target in args.outdirs:
+        matches = sorted(Path(path) for path in glob.glob(target) if Path(path).is_dir())
+        outdirs += matches or [Path(target)]
+    summary = build_report_workbooks(outdirs, force=args.force, logger=print)
+    print(
+        f"完成：產生 {len(summary['written'])} 個、沿用 {len(summary['fresh'])} 個、失敗 {len(summary['failed'])} 個"
+    )
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
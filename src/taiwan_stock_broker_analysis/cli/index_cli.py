@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from ..domain.broker_index import INDEX_FIELDS, BrokerIndex, format_postings
+from ..services.daemon_client import DAEMON_ENV_VAR, DEFAULT_URL, forward_to_daemon
+from ..services.index_service import format_index_summary, index_csv_files
+
+INDEX_ENV_VAR = "TSBA_INDEX"
+DEFAULT_INDEX_DIR = "broker_index"
+
+
+def _parse_day(text: str) -> date:
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式應為 YYYY-MM-DD: {text}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="券商索引：查詢某分點 / 母券商在哪些股票、哪些交易日買賣")
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=os.environ.get(INDEX_ENV_VAR, DEFAULT_INDEX_DIR),
+        help=f"索引資料夾 (預設 ${INDEX_ENV_VAR} 或 {DEFAULT_INDEX_DIR})",
+    )
+    parser.add_argument("--daemon", action="store_true", help=f"送到常駐服務執行（位址 ${DAEMON_ENV_VAR}，預設 {DEFAULT_URL}；需先執行 tsba daemon start）")
+    subparsers = parser.add_subparsers(dest="action", required=True, metavar="<動作>")
+
+    add_parser = subparsers.add_parser("add", help="把已處理的 CSV 補進索引（單檔、資料夾或 glob，已索引的檔案會略過）")
+    add_parser.add_argument("inputs", nargs="+", help="輸入的 CSV 檔案、資料夾或 glob")
+    add_parser.add_argument("--stock", type=str, default=None, help="股票代碼（預設讀取檔頭或檔名）")
+    add_parser.add_argument("--date", type=_parse_day, default=None, help="交易日 YYYY-MM-DD（預設依下載時間推算）")
+
+    query_parser = subparsers.add_parser("query", help="查詢券商名稱（完整名稱或 --prefix 前綴）")
+    query_parser.add_argument("name", help="券商名稱，例如 凱基台北、凱基")
+    query_parser.add_argument("--prefix", action="store_true", help="以前綴比對（例如 凱基 會找到所有凱基分點）")
+    query_parser.add_argument("--field", choices=INDEX_FIELDS, default=None, help="只查分點（券商）或母券商（預設兩者）")
+    query_parser.add_argument("--stock", nargs="*", default=None, help="只看指定股票")
+    query_parser.add_argument("--start", type=_parse_day, default=None, help="起始交易日 YYYY-MM-DD")
+    query_parser.add_argument("--end", type=_parse_day, default=None, help="結束交易日 YYYY-MM-DD")
+    query_parser.add_argument("--limit", type=int, default=20, help="畫面上最多顯示幾筆 (預設 20)")
+    query_parser.add_argument("--output", type=str, default=None, help="完整結果另存 CSV")
+
+    names_parser = subparsers.add_parser("names", help="列出符合前綴的券商名稱")
+    names_parser.add_argument("prefix", nargs="?", default="", help="名稱前綴（預設全部）")
+    names_parser.add_argument("--field", choices=INDEX_FIELDS, default=None)
+
+    subparsers.add_parser("compact", help="把所有分段合併成一個（刪除被取代的舊資料）")
+    subparsers.add_parser("ls", help="顯示索引概況")
+    return parser.parse_args(argv)
+
+
+def run_add(args) -> int:
+    summary = index_csv_files(args.inputs, Path(args.index), stock_code=args.stock, day=args.date, logger=print)
+    if not summary["files"]:
+        print(f"找不到任何 CSV 檔案: {' '.join(args.inputs)}")
+        return 1
+    for line in format_index_summary(summary):
+        print(line)
+    return 0 if not summary["skipped"] else 1
+
+
+def run_query(args) -> int:
+    index = BrokerIndex(args.index)
+    started = time.perf_counter()
+    result = index.lookup(args.name, prefix=args.prefix, field=args.field, start=args.start, end=args.end, stocks=args.stock)
+    elapsed = time.perf_counter() - started
+    for line in format_postings(result, limit=args.limit):
+        print(line)
+    print(f"查詢耗時 {elapsed * 1000:.1f} ms（讀取 {index.segments_read} 個分段）")
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        result.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"已輸出: {args.output}")
+    return 0 if len(result) else 1
+
+
+def run_names(args) -> int:
+    for name in BrokerIndex(args.index).terms(args.prefix, field=args.field):
+        print(name)
+    return 0
+
+
+def run_list(args) -> int:
+    stats = BrokerIndex(args.index).stats()
+    print(
+        f"索引 {args.index}：{stats['segments']} 個分段、{stats['stocks']} 檔股票、{stats['pairs']:,} 個（股票, 交易日），"
+        f"分點 {stats['terms']['券商']:,} 家、母券商 {stats['terms']['母券商']:,} 家，{stats['bytes'] / 1e6:.1f} MB"
+    )
+    return 0
+
+
+def run_compact(args) -> int:
+    print("已合併" if BrokerIndex(args.index).compact() else "不需合併（分段少於 2 個，或另一個行程正在合併）")
+    return run_list(args)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.daemon:
+        return forward_to_daemon("index", sys.argv[1:] if argv is None else argv)
+    handlers = {"add": run_add, "query": run_query, "names": run_names, "compact": run_compact, "ls": run_list}
+    return handlers[args.action](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
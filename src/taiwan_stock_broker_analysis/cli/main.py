@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import argparse
+import importlib
+import sys
+
+from ..services.daemon_client import DAEMON_COMMANDS, DAEMON_OPTION, forward_to_daemon
+
+COMMANDS = {
+    "analyze": ("broker_pipeline_cli", "分析既有 CSV（單檔、資料夾或 glob）"),
+    "run": ("run_pipeline_cli", "下載並分析（單檔或多檔排程）"),
+    "scrape": ("stock_scraper_cli", "OCR 驗證碼下載"),
+    "scrape-manual": ("stock_scraper_manual_cli", "手動驗證碼下載"),
+    "download": ("simple_downloader_cli", "最小化下載"),
+    "market": ("market_cli", "跨股票母券商排行（彙總多檔 step5 報表）"),
+    "excel": ("excel_cli", "從已存報表產生單一 Excel 活頁簿"),
+    "store": ("store_cli", "歷史成交資料庫：匯入、列出與區間查詢"),
+    "index": ("index_cli", "券商索引：查詢分點 / 母券商在哪些股票與交易日買賣"),
+    "daemon": ("daemon_cli", "本機常駐服務：預熱快取並依序執行送來的工作"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="tsba",
+        description="台股券商分點下載與分析工具",
+        epilog="各子命令的參數請用 `tsba <子命令> --help` 查看",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="<子命令>")
+    for command, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(command, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    if not argv or argv[0] not in COMMANDS:
+        parser.parse_args(argv[:1])
+        parser.print_help()
+        return 1
+
+    if argv[0] in DAEMON_COMMANDS and DAEMON_OPTION in argv[1:]:
+        # 直接轉送，不載入子命令模組（pandas 等只在常駐服務裡載入一次）
+        return forward_to_daemon(argv[0], argv[1:])
+    module_name, _ = COMMANDS[argv[0]]
+    module = importlib.import_module(f"{__package__}.{module_name}")
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
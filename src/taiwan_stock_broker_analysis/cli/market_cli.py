@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import argparse
+import glob
+import sys
+from pathlib import Path
+
+from ..domain.leaderboard import DEFAULT_TOP_K
+from ..services.batch_service import default_worker_count
+from ..services.market_service import build_market_leaderboard, format_market_summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="跨股票母券商排行：逐檔讀取 step5 報表，彙總成全市場 step6 / step7 排行")
+    parser.add_argument("outdirs", nargs="+", help="同一交易日的分析輸出資料夾（可用 glob，例如 output/analysis_*）")
+    parser.add_argument("--output", type=str, default="market_report", help="排行報表輸出資料夾")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_K, help=f"每張排行的筆數 (預設 {DEFAULT_TOP_K})")
+    parser.add_argument("--workers", type=int, default=1, help="平行讀取的行程數，各自彙總後再合併 (預設 1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.top < 1:
+        print(f"❌ --top 必須大於 0：{args.top}")
+        return 1
+    outdirs = []
+    for target in args.outdirs:
+        matches = sorted(Path(path) for path in glob.glob(target) if Path(path).is_dir())
+        outdirs += matches or [Path(target)]
+    summary = build_market_leaderboard(
+        outdirs, Path(args.output), top_k=args.top, workers=args.workers or default_worker_count(), logger=print
+    )
+    for line in format_market_summary(summary):
+        print(line)
+    return 0 if summary["stocks"] and not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,31 +4,115 @@ import re
 import sys
 from pathlib import Path
 
-from ..services.pipeline_service import run_all
+from ..services.daemon_client import DAEMON_ENV_VAR, DEFAULT_URL, forward_to_daemon
+from ..services.download_scheduler import DEFAULT_CONCURRENCY, DEFAULT_MIN_INTERVAL, DEFAULT_POOL_SIZE, read_watchlist
+from ..domain.tracing import trace_session
+from ..services.pipeline_service import run_all, run_watchlist
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="一鍵下載與分析券商進出明細")
-    parser.add_argument("stock_code", type=str, help="股票代碼（4位數，例如 2330）")
+    parser.add_argument("stock_code", type=str, nargs="*", help="股票代碼（4位數，例如 2330），可一次給多檔")
+    parser.add_argument("--watchlist", type=Path, default=None, help="股票代碼清單檔（每行或以逗號分隔，# 為註解）")
     parser.add_argument("--retries", type=int, default=5, help="爬蟲最大重試次數（預設 5）")
     parser.add_argument("--outdir", type=Path, default=Path("output"), help="輸出根目錄（預設 output/）")
     parser.add_argument("--fee-discount", type=float, default=0.28, help="手續費折扣（預設 0.28）")
     parser.add_argument("--day-trade-tax", type=float, default=0.0015, help="當沖稅率（預設 0.0015）")
-    return parser.parse_args()
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"多檔模式同時下載的股票數（預設 {DEFAULT_CONCURRENCY}）",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL,
+        help=f"全域查詢間隔秒數（預設 {DEFAULT_MIN_INTERVAL:g}）",
+    )
+    parser.add_argument("--stock-timeout", type=float, default=None, help="單檔股票下載期限秒數（預設不限）")
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f"HTTP keep-alive 連線池大小（預設 {DEFAULT_POOL_SIZE}，至少為並行數）",
+    )
+    parser.add_argument("--refresh", action="store_true", help="忽略本機原始 CSV 快取，強制重新下載")
+    parser.add_argument("--store", type=Path, default=None, help="同時把展平資料寫入歷史成交資料庫資料夾")
+    parser.add_argument("--carry", type=Path, default=None, help="跨日 FIFO 結轉：從此資料夾承接前一交易日未平倉並存回當日快照")
+    parser.add_argument("--index", type=Path, default=None, help="同時把各分點 / 母券商當日買賣寫入券商索引資料夾（tsba index 查詢）")
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="下載內容只解析一次，直接在記憶體分析與摘要，不寫原始 / 處理後 CSV",
+    )
+    parser.add_argument("--archive", action="store_true", help="搭配 --in-memory：仍保存一份下載的原始 CSV")
+    parser.add_argument("--trace", type=Path, default=None, help="把各階段耗時、列數、位元組數寫成 JSON 追蹤檔（Chrome trace 格式）")
+    parser.add_argument("--trace-memory", action="store_true", help="追蹤時一併以 tracemalloc 記錄各階段記憶體峰值（較慢）")
+    parser.add_argument("--profile", type=Path, default=None, help="以 cProfile 剖析整次執行並存成 .prof 檔")
+    parser.add_argument("--daemon", action="store_true", help=f"送到常駐服務執行（位址 ${DAEMON_ENV_VAR}，預設 {DEFAULT_URL}；需先執行 tsba daemon start）")
+    return parser.parse_args(argv)
 
 
-def main() -> int:
-    args = parse_args()
-    if not re.fullmatch(r"\d{4}", args.stock_code):
-        print(f"股票代碼格式不正確：{args.stock_code}（應為 4 位數字）")
-        return 1
-
+def run(args, stock_codes, tracer=None) -> int:
     try:
-        run_all(args.stock_code, args.outdir, args.retries, args.fee_discount, args.day_trade_tax)
+        if len(stock_codes) == 1 and args.watchlist is None:
+            run_all(
+                stock_codes[0],
+                args.outdir,
+                args.retries,
+                args.fee_discount,
+                args.day_trade_tax,
+                refresh=args.refresh,
+                store=args.store,
+                carry=args.carry,
+                tracer=tracer,
+                in_memory=args.in_memory,
+                archive=args.archive,
+                index=args.index,
+            )
+            return 0
+        results = run_watchlist(
+            stock_codes,
+            args.outdir,
+            args.retries,
+            args.fee_discount,
+            args.day_trade_tax,
+            concurrency=args.concurrency,
+            min_interval=args.min_interval,
+            stock_timeout=args.stock_timeout,
+            pool_size=args.pool_size,
+            refresh=args.refresh,
+            store=args.store,
+            carry=args.carry,
+            tracer=tracer,
+            in_memory=args.in_memory,
+            archive=args.archive,
+            index=args.index,
+        )
     except Exception as exc:
         print(f"❌ 發生錯誤：{exc}")
         return 1
-    return 0
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.daemon:
+        return forward_to_daemon("run", sys.argv[1:] if argv is None else argv)
+    stock_codes = list(args.stock_code)
+    if args.watchlist is not None:
+        stock_codes += [code for code in read_watchlist(args.watchlist) if code not in stock_codes]
+    if not stock_codes:
+        print("請提供股票代碼或 --watchlist 清單檔")
+        return 1
+    for stock_code in stock_codes:
+        if not re.fullmatch(r"\d{4}", stock_code):
+            print(f"股票代碼格式不正確：{stock_code}（應為 4 位數字）")
+            return 1
+
+    with trace_session(args.trace, memory=args.trace_memory, profile_path=args.profile, logger=print) as tracer:
+        return run(args, stock_codes, tracer)
 
 
 if __name__ == "__main__":
@@ -5,14 +5,15 @@ import sys
 from ..services.scraping_service import simple_download_stock_csv
 
 
-def main() -> int:
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
     print("=" * 50)
     print("   台灣證券交易所券商進出明細下載工具")
     print("=" * 50)
     print()
 
-    if len(sys.argv) > 1:
-        stock_code = sys.argv[1]
+    if argv:
+        stock_code = argv[0]
     else:
         print("常見股票代碼:")
         print("  2317 - 鴻海     2330 - 台積電")
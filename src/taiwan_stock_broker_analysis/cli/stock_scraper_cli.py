@@ -4,10 +4,11 @@ import re
 import sys
 import argparse
 
+from ..services.daemon_client import DAEMON_ENV_VAR, DEFAULT_URL, forward_to_daemon
 from ..services.scraping_service import AutomaticCaptchaScraper
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description="台灣證券交易所券商進出明細爬蟲工具",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -20,7 +21,9 @@ def parse_args():
     )
     parser.add_argument("stock_code", nargs="?", help="股票代碼 (例如: 2317, 4958)")
     parser.add_argument("--retries", type=int, default=5, help="最大重試次數 (預設: 5)")
-    return parser.parse_args()
+    parser.add_argument("--refresh", action="store_true", help="忽略本機原始 CSV 快取，強制重新下載")
+    parser.add_argument("--daemon", action="store_true", help=f"送到常駐服務執行（位址 ${DAEMON_ENV_VAR}，預設 {DEFAULT_URL}；需先執行 tsba daemon start）")
+    return parser.parse_args(argv)
 
 
 def _resolve_stock_code(stock_code):
@@ -45,17 +48,20 @@ def _resolve_stock_code(stock_code):
         print("股票代碼不能為空，請重新輸入")
 
 
-def main() -> int:
-    args = parse_args()
+def main(argv=None) -> int:
+    args = parse_args(argv)
     stock_code = _resolve_stock_code(args.stock_code)
 
     if not re.match(r"^\d{4}$", stock_code):
         print(f"錯誤: 股票代碼格式不正確 '{stock_code}'，應為4位數字")
         return 1
+    if args.daemon:
+        argv = sys.argv[1:] if argv is None else list(argv)
+        return forward_to_daemon("scrape", argv if args.stock_code else [stock_code, *argv])
 
     scraper = AutomaticCaptchaScraper()
     try:
-        success, csv_file, error = scraper.download_stock_data(stock_code, args.retries)
+        success, csv_file, error = scraper.download_stock_data(stock_code, args.retries, refresh=args.refresh)
         if success:
             print("\n🎉 成功完成！")
             print(f"📄 CSV 檔案: {csv_file}")
@@ -7,7 +7,7 @@ import argparse
 from ..services.scraping_service import ManualCaptchaScraper
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description="台灣證券交易所券商進出明細爬蟲工具 (手動驗證碼版本)",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -20,7 +20,8 @@ def parse_args():
     )
     parser.add_argument("stock_code", nargs="?", help="股票代碼 (例如: 2317, 4958)")
     parser.add_argument("--retries", type=int, default=5, help="最大重試次數 (預設: 5)")
-    return parser.parse_args()
+    parser.add_argument("--refresh", action="store_true", help="忽略本機原始 CSV 快取，強制重新下載")
+    return parser.parse_args(argv)
 
 
 def _resolve_stock_code(stock_code):
@@ -45,8 +46,8 @@ def _resolve_stock_code(stock_code):
         print("股票代碼不能為空，請重新輸入")
 
 
-def main() -> int:
-    args = parse_args()
+def main(argv=None) -> int:
+    args = parse_args(argv)
     stock_code = _resolve_stock_code(args.stock_code)
 
     if not re.match(r"^\d{4}$", stock_code):
@@ -55,7 +56,7 @@ def main() -> int:
 
     scraper = ManualCaptchaScraper()
     try:
-        success, csv_file, error = scraper.download_stock_data(stock_code, args.retries)
+        success, csv_file, error = scraper.download_stock_data(stock_code, args.retries, refresh=args.refresh)
         if success:
             print("\n🎉 成功完成！")
             print(f"📄 CSV 檔案: {csv_file}")
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+from ..domain.columnar import COLUMNAR_FORMATS
+from ..domain.schema import to_display
+from ..domain.trade_store import TradeStore
+from ..services.store_service import format_ingest_summary, ingest_csv_files
+
+STORE_ENV_VAR = "TSBA_STORE"
+DEFAULT_STORE_DIR = "trade_store"
+
+
+def _parse_day(text: str) -> date:
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式應為 YYYY-MM-DD: {text}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="歷史成交資料庫（依股票與交易日分割的欄式儲存）")
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=os.environ.get(STORE_ENV_VAR, DEFAULT_STORE_DIR),
+        help=f"資料庫資料夾 (預設 ${STORE_ENV_VAR} 或 {DEFAULT_STORE_DIR})",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True, metavar="<動作>")
+
+    add_parser = subparsers.add_parser("add", help="匯入已處理的 CSV（單檔、資料夾或 glob）")
+    add_parser.add_argument("inputs", nargs="+", help="輸入的 CSV 檔案、資料夾或 glob")
+    add_parser.add_argument("--stock", type=str, default=None, help="股票代碼（預設讀取檔頭或檔名）")
+    add_parser.add_argument("--date", type=_parse_day, default=None, help="交易日 YYYY-MM-DD（預設依下載時間推算）")
+    add_parser.add_argument("--format", choices=COLUMNAR_FORMATS, default="auto", help="分割檔格式")
+
+    list_parser = subparsers.add_parser("ls", help="列出已儲存的分割")
+    list_parser.add_argument("--stock", nargs="*", default=None, help="只列出指定股票")
+
+    query_parser = subparsers.add_parser("query", help="依股票與日期區間讀出資料")
+    query_parser.add_argument("--stock", nargs="*", default=None, help="股票代碼（可多個，預設全部）")
+    query_parser.add_argument("--start", type=_parse_day, default=None, help="起始交易日 YYYY-MM-DD")
+    query_parser.add_argument("--end", type=_parse_day, default=None, help="結束交易日 YYYY-MM-DD")
+    query_parser.add_argument("--output", type=str, default=None, help="輸出 CSV 路徑（預設只顯示摘要）")
+    return parser.parse_args(argv)
+
+
+def run_add(args) -> int:
+    try:
+        summary = ingest_csv_files(
+            args.inputs, Path(args.store), stock_code=args.stock, day=args.date, fmt=args.format, logger=print
+        )
+    except RuntimeError as exc:
+        print(f"❌ {exc}")
+        return 1
+    if not summary["files"]:
+        print(f"找不到任何 CSV 檔案: {' '.join(args.inputs)}")
+        return 1
+    for line in format_ingest_summary(summary):
+        print(line)
+    return 0 if not summary["skipped"] else 1
+
+
+def run_list(args) -> int:
+    table = TradeStore(args.store).summary()
+    if args.stock:
+        table = table[table["股票代碼"].isin(args.stock)]
+    if table.empty:
+        print(f"資料庫是空的: {args.store}")
+        return 0
+    print(table.to_string(index=False))
+    print(f"共 {table['股票代碼'].nunique()} 檔股票、{len(table)} 個分割、{table['筆數'].sum():,} 筆")
+    return 0
+
+
+def run_query(args) -> int:
+    store = TradeStore(args.store)
+    frame = store.read(args.stock or None, args.start, args.end)
+    print(f"讀取 {store.partitions_read} 個分割，共 {len(frame):,} 筆")
+    if args.output:
+        output = to_display(frame)
+        output["日期"] = frame["日期"].dt.strftime("%Y-%m-%d")
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        output.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"已輸出: {args.output}")
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    handlers = {"add": run_add, "ls": run_list, "query": run_query}
+    return handlers[args.action](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,29 @@
 # -*- coding: utf-8 -*-
 
-from .analysis import analyze_csv_file
-from .scraping import download_csv_text, log_broker_summary, save_processed_csv, save_raw_csv
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    "TradeStore": ".trade_store",
+    "analyze_csv_file": ".analysis",
+    "download_csv_text": ".scraping",
+    "fetch_csv_text": ".scraping",
+    "load_report": ".analysis",
+    "load_table": ".columnar",
+    "log_broker_summary": ".scraping",
+    "save_processed_csv": ".scraping",
+    "save_raw_csv": ".scraping",
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), _EXPORTS)
 
 __all__ = [
+    "TradeStore",
     "analyze_csv_file",
     "download_csv_text",
+    "fetch_csv_text",
+    "load_report",
+    "load_table",
     "log_broker_summary",
     "save_processed_csv",
     "save_raw_csv",
-]
\ No newline at end of file
+]
@@ -1,113 +1,50 @@
 # -*- coding: utf-8 -*-
 import math
-import re
-from collections import deque
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+from .analysis_cache import AnalysisCache, file_fingerprint, fingerprint, frame_fingerprint
+from .broker_names import BRANCH_RE, BRANCH_TOKENS, BROKER_PREFIXES, get_default_normalizer
+from .columnar import find_table, load_table, remove_table, resolve_format, write_table
+from .fifo import build_fifo_events, build_opening_lots, closing_lots_frame, match_fifo
+from .ledger import LedgerAccumulator, build_broker_ledger
+from .report_writer import ReportWriter
+from .schema import numeric_array, to_compact, to_display
+from .tracing import get_tracer
+from .twse_csv import iter_twse_flat_chunks, read_twse_flat, read_twse_raw, read_twse_text, source_encodings
+from .workbook import EXCEL_MODES, WORKBOOK_NAME, write_workbook
+
 FEE_RATE_STD = 0.001425
-BRANCH_TOKENS = [
-    "台北","臺北","新北","桃園","台中","臺中","台南","臺南","高雄","基隆","新竹","嘉義","台東","臺東","花蓮","宜蘭",
-    "內湖","信義","松山","大安","中山","中正","萬華","文山","南港","士林","北投","板橋","三重","新莊","永和","新店","汐止",
-    "中和","林口","淡水","蘆洲","三峽","鶯歌","樹林","五股","泰山","八里","蘆竹","龜山","大園","平鎮","中壢","楊梅","龍潭",
-    "竹北","竹南","香山","湖口","新豐","竹東","頭份","苗栗","豐原","北屯","西屯","南屯","大里","太平","霧峰","大甲","沙鹿",
-    "員林","彰化","斗六","斗南","虎尾","太保","朴子","新營","永康","仁德","岡山","楠梓","左營","鳳山","小港","屏東","羅東",
-    "敦南","復興","南京","忠孝","松德","松江","館前","西門","光復","八德","重慶","建國","文心","中港","中華","民族","民權","民生",
-]
-BRANCH_RE = "(" + "|".join(map(re.escape, BRANCH_TOKENS)) + ").*"
-BROKER_PREFIXES = [
-    "中國信託",
-    "中信託",
-    "美商高盛",
-    "台灣摩根",
-    "摩根大通",
-    "港商野村",
-    "法銀巴黎",
-    "花旗環球",
-    "港麥格理",
-    "上海匯豐",
-    "大和國泰",
-    "國票",
-    "國泰",
-    "元大",
-    "凱基",
-    "永豐",
-    "富邦",
-    "統一",
-    "華南",
-    "台新",
-    "群益",
-    "第一",
-    "兆豐",
-    "玉山",
-    "合庫",
-    "瑞銀",
-    "美林",
-    "企銀",
-    "聯邦",
-    "新光",
-    "康和",
-    "土銀",
-    "元富",
-    "美好",
+STOCK_TRANSACTION_TAX = 0.003
+STEP_OUTPUTS = {
+    "step1": ["step1_flattened.csv"],
+    "step2": ["step2_branch_summary.csv", "step2_branch_summary.xlsx"],
+    "step3": ["step3_mother_summary.csv", "step3_mother_summary.xlsx"],
+    "step4": ["step4_avg_method_pnl.csv", "step4_avg_method_pnl.xlsx"],
+    "step5": ["step5_fifo_with_carry.csv", "step5_fifo_with_carry.xlsx"],
+    "step6": ["step6_top10_profit.csv", "step6_top10_loss.csv"],
+    "step7": ["step7_top10_netbuy_pnl.csv", "step7_top10_netsell_pnl.csv", "step7_netbuy_netsell_pnl.xlsx"],
+}
+CHUNKED_STEPS = ("step2", "step3", "step4")
+BYTES_PER_CHUNK_ROW = 600
+MIN_CHUNK_ROWS = 4096
+INDEXED_REPORTS = {"step2_branch_summary", "step3_mother_summary", "step4_avg_method_pnl", "step5_fifo_with_carry"}
+WORKBOOK_TABLES = [
+    "step2_branch_summary",
+    "step3_mother_summary",
+    "step4_avg_method_pnl",
+    "step5_fifo_with_carry",
+    "step6_top10_profit",
+    "step6_top10_loss",
+    "step7_top10_netbuy_pnl",
+    "step7_top10_netsell_pnl",
 ]
 
 
 def read_raw_csv(file_path: Path):
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"檔案不存在: {file_path}")
-
-    raw_bytes = path.read_bytes()
-    for encoding in ["utf-8-sig", "utf-8", "cp950"]:
-        try:
-            content = raw_bytes.decode(encoding)
-            break
-        except UnicodeDecodeError:
-            continue
-    else:
-        raise ValueError("無法解析檔案編碼")
-
-    lines = content.splitlines()
-    header_row = None
-    header_line = None
-
-    for i, line in enumerate(lines):
-        if "序號" in line and "券商" in line:
-            header_row = i
-            header_line = line
-            break
-
-    if header_row is None:
-        raise ValueError("找不到包含'序號'和'券商'的標題行")
-
-    if header_line.count("序號") >= 2:
-        parts = header_line.split(",,")
-        if len(parts) == 2:
-            left_columns = [col.strip() for col in parts[0].split(",")]
-            right_columns = [col.strip() for col in parts[1].split(",")]
-            all_records = []
-            for line in lines[header_row + 1:]:
-                if not line.strip():
-                    continue
-                data_parts = line.split(",,")
-                if len(data_parts) == 2:
-                    left_data = [val.strip() for val in data_parts[0].split(",")]
-                    if len(left_data) == len(left_columns) and left_data[0]:
-                        all_records.append(left_data)
-
-                    right_data = [val.strip() for val in data_parts[1].split(",")]
-                    if len(right_data) == len(right_columns) and right_data[0]:
-                        all_records.append(right_data)
-            df = pd.DataFrame(all_records, columns=left_columns)
-        else:
-            df = pd.read_csv(file_path, skiprows=header_row, encoding="utf-8-sig")
-    else:
-        df = pd.read_csv(file_path, skiprows=header_row, encoding="utf-8-sig")
-
-    return df, header_line
+    return read_twse_raw(file_path)
 
 
 def flatten_two_groups(df: pd.DataFrame) -> pd.DataFrame:
@@ -133,78 +70,76 @@ def flatten_two_groups(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def read_flat_csv(file_path: Path) -> pd.DataFrame:
-    raw_df, _ = read_raw_csv(file_path)
-    return flatten_two_groups(raw_df)
+    frame, _, is_flat = read_twse_flat(file_path)
+    return to_compact(frame if is_flat else flatten_two_groups(frame))
 
 
-def normalize_to_mother(bname: str) -> str:
-    if not isinstance(bname, str):
-        bname = str(bname)
+def read_flat_text(text: str) -> pd.DataFrame:
+    frame, _, is_flat = read_twse_text(text)
+    return to_compact(frame if is_flat else flatten_two_groups(frame))
 
-    name = str(bname).replace("\u3000", "").strip()
-    match = re.match(r"^[0-9A-Za-z]{1,4}([\u4e00-\u9fff].*)$", name)
-    if match:
-        name = match.group(1)
 
-    name = re.sub(r"^\d{3,4}", "", name)
-    name = re.sub("(分公司|分行|營業部|營業處)$", "", name)
+def chunk_rows_for_budget(memory_budget_mb: float) -> int:
+    if memory_budget_mb <= 0:
+        raise ValueError(f"記憶體預算必須大於 0 MB：{memory_budget_mb}")
+    return max(int(memory_budget_mb * 1024 * 1024 / BYTES_PER_CHUNK_ROW), MIN_CHUNK_ROWS)
 
-    for prefix in BROKER_PREFIXES:
-        if name.startswith(prefix):
-            return prefix
 
-    name = re.sub(BRANCH_RE, "", name)
-    name = re.sub("(分公司|分行|營業部|營業處)$", "", name)
+def read_ledgers_chunked(file_path: Path, memory_budget_mb: float, tracer=None):
+    tracer = get_tracer(tracer)
+    chunk_rows = chunk_rows_for_budget(memory_budget_mb)
+    for encoding in source_encodings(file_path):
+        accumulator = LedgerAccumulator()
+        try:
+            with tracer.span("analysis.chunks", file=Path(file_path).name, chunk_rows=chunk_rows) as span:
+                for chunk in iter_twse_flat_chunks(file_path, encoding, chunk_rows):
+                    accumulator.add(chunk, "券商")
+                span.set(rows=accumulator.rows, chunks=accumulator.chunks, brokers=len(accumulator.names))
+        except UnicodeDecodeError:
+            continue
+        break
+    else:
+        raise ValueError("無法解析檔案編碼")
+    mothers = get_default_normalizer().map_series(pd.Series(accumulator.names, dtype=object))
+    return accumulator.ledger("券商"), accumulator.ledger("母券商", groups=mothers.to_numpy(dtype=object))
 
-    for prefix in BROKER_PREFIXES:
-        if name.startswith(prefix):
-            return prefix
 
-    return name or bname
+def normalize_to_mother(bname: str) -> str:
+    return get_default_normalizer().resolve(bname)
 
 
 def add_mother_column(df: pd.DataFrame) -> pd.DataFrame:
-    d = df.copy()
-    d["母券商"] = d["券商"].map(normalize_to_mother)
-    return d
-
-
-def group_by_broker(df: pd.DataFrame, by_col: str) -> pd.DataFrame:
-    d = df.copy()
-    for column in ["價格", "買進股數", "賣出股數"]:
-        d[column] = pd.to_numeric(d[column], errors="coerce")
-    d["買金額"] = d["價格"] * d["買進股數"]
-    d["賣金額"] = d["價格"] * d["賣出股數"]
-    grouped = d.groupby(by_col, dropna=False).agg(
-        買股數=("買進股數", "sum"),
-        賣股數=("賣出股數", "sum"),
-        買金額=("買金額", "sum"),
-        賣金額=("賣金額", "sum"),
-    )
+    return df.assign(母券商=get_default_normalizer().map_series(df["券商"]))
+
+
+def group_by_broker(df: pd.DataFrame, by_col: str, ledger: pd.DataFrame = None) -> pd.DataFrame:
+    return summarize_ledger(build_broker_ledger(df, by_col) if ledger is None else ledger)
+
+
+def summarize_ledger(grouped: pd.DataFrame) -> pd.DataFrame:
     out = pd.DataFrame({
         "買張": (grouped["買股數"] / 1000).round(0).astype(int),
         "賣張": (grouped["賣股數"] / 1000).round(0).astype(int),
     }, index=grouped.index)
     out["買賣超"] = out["買張"] - out["賣張"]
-    out["均買價"] = np.where(grouped["買股數"] > 0, grouped["買金額"] / grouped["買股數"], np.nan).round(2)
-    out["均賣價"] = np.where(grouped["賣股數"] > 0, grouped["賣金額"] / grouped["賣股數"], np.nan).round(2)
+    out["均買價"] = grouped["均買價"].to_numpy().round(2)
+    out["均賣價"] = grouped["均賣價"].to_numpy().round(2)
     return out.sort_values(by=["買賣超", "買張", "賣張"], ascending=[False, False, True])
 
 
-def avg_method_pnl(df_mother: pd.DataFrame, fee_discount: float, day_trade_tax: float) -> pd.DataFrame:
-    d = df_mother.copy()
-    for column in ["價格", "買進股數", "賣出股數"]:
-        d[column] = pd.to_numeric(d[column], errors="coerce")
-    d["買金額"] = d["價格"] * d["買進股數"]
-    d["賣金額"] = d["價格"] * d["賣出股數"]
-    grouped = d.groupby("母券商", dropna=False).agg(
-        買股數=("買進股數", "sum"),
-        賣股數=("賣出股數", "sum"),
-        買金額=("買金額", "sum"),
-        賣金額=("賣金額", "sum"),
-    )
-    avg_buy = np.where(grouped["買股數"] > 0, grouped["買金額"] / grouped["買股數"], np.nan)
-    avg_sell = np.where(grouped["賣股數"] > 0, grouped["賣金額"] / grouped["賣股數"], np.nan)
+def avg_method_pnl(
+    df_mother: pd.DataFrame,
+    fee_discount: float,
+    day_trade_tax: float,
+    ledger: pd.DataFrame = None,
+) -> pd.DataFrame:
+    grouped = build_broker_ledger(df_mother, "母券商") if ledger is None else ledger
+    return ledger_avg_pnl(grouped, fee_discount, day_trade_tax)
+
+
+def ledger_avg_pnl(grouped: pd.DataFrame, fee_discount: float, day_trade_tax: float) -> pd.DataFrame:
+    avg_buy = grouped["均買價"].to_numpy()
+    avg_sell = grouped["均賣價"].to_numpy()
     matched = np.minimum(grouped["買股數"], grouped["賣股數"])
     spread = avg_sell - avg_buy
     gross = matched * spread
@@ -229,73 +164,67 @@ def avg_method_pnl(df_mother: pd.DataFrame, fee_discount: float, day_trade_tax:
     }).set_index("母券商").sort_values("淨損益(均價法)", ascending=False)
 
 
-def fifo_pnl_with_carry(df_mother: pd.DataFrame, fee_discount: float, day_trade_tax: float) -> pd.DataFrame:
-    d = df_mother.copy()
-    for column in ["序號", "價格", "買進股數", "賣出股數"]:
-        d[column] = pd.to_numeric(d[column], errors="coerce")
-    d = d.dropna(subset=["序號"])
-    buy_ev = d.loc[d["買進股數"] > 0, ["序號", "母券商", "價格", "買進股數"]].rename(columns={"買進股數": "數量"})
-    buy_ev["方向"] = "B"
-    sell_ev = d.loc[d["賣出股數"] > 0, ["序號", "母券商", "價格", "賣出股數"]].rename(columns={"賣出股數": "數量"})
-    sell_ev["方向"] = "S"
-    events = pd.concat([buy_ev, sell_ev], ignore_index=True).sort_values(["母券商", "序號", "方向"])
+def fifo_pnl_with_carry(
+    df_mother: pd.DataFrame,
+    fee_discount: float,
+    day_trade_tax: float,
+    ledger: pd.DataFrame = None,
+) -> pd.DataFrame:
+    return fifo_carry(df_mother, fee_discount, day_trade_tax, ledger=ledger)[0]
+
+
+def fifo_carry(
+    df_mother: pd.DataFrame,
+    fee_discount: float,
+    day_trade_tax: float,
+    ledger: pd.DataFrame = None,
+    opening_lots: pd.DataFrame = None,
+    carry_tax: float = STOCK_TRANSACTION_TAX,
+):
+    d = df_mother
+    valid_seq = ~np.isnan(numeric_array(d, "序號"))
+    if not valid_seq.all():
+        d = d[valid_seq]
+        ledger = None
+    brokers = None
+    if opening_lots is not None and len(opening_lots):
+        brokers = pd.Index(sorted(set(d["母券商"].dropna()) | set(opening_lots["母券商"])))
+    ev_broker, ev_side, ev_qty, ev_px, brokers = build_fifo_events(d, brokers)
     fee_rate = FEE_RATE_STD * fee_discount
+    broker_ids, state = match_fifo(
+        ev_broker,
+        ev_side,
+        ev_qty,
+        ev_px,
+        fee_rate,
+        day_trade_tax,
+        opening=build_opening_lots(opening_lots, brokers),
+        carry_tax=carry_tax,
+    )
+    if ledger is None:
+        ledger = build_broker_ledger(d, "母券商")
+    broker_names = np.asarray(brokers[broker_ids], dtype=object)
+    closing = closing_lots_frame(state.get("closing"), brokers)
+    totals = ledger.reindex(broker_names).fillna(0)
+    buy_totals = totals["買股數"].tolist()
+    sell_totals = totals["賣股數"].tolist()
+    buy_amounts = totals["買金額"].tolist()
+    sell_amounts = totals["賣金額"].tolist()
 
     rows = []
-    for broker, group in events.groupby("母券商", sort=False):
-        long_lots, short_lots = deque(), deque()
-        realized = 0.0
-        fee_sum = 0.0
-        tax_sum = 0.0
-        matched_shares = 0
-        for _, row in group.sort_values(["序號", "方向"]).iterrows():
-            side = row["方向"]
-            qty = int(row["數量"])
-            px = float(row["價格"])
-            if side == "B":
-                while qty > 0 and short_lots:
-                    short_qty, short_px = short_lots[0]
-                    matched = min(qty, short_qty)
-                    realized += matched * (short_px - px)
-                    fee_sum += (matched * px) * fee_rate + (matched * short_px) * fee_rate
-                    tax_sum += (matched * short_px) * day_trade_tax
-                    matched_shares += matched
-                    qty -= matched
-                    short_qty -= matched
-                    if short_qty == 0:
-                        short_lots.popleft()
-                    else:
-                        short_lots[0] = (short_qty, short_px)
-                if qty > 0:
-                    long_lots.append((qty, px))
-            else:
-                while qty > 0 and long_lots:
-                    long_qty, long_px = long_lots[0]
-                    matched = min(qty, long_qty)
-                    realized += matched * (px - long_px)
-                    fee_sum += (matched * long_px) * fee_rate + (matched * px) * fee_rate
-                    tax_sum += (matched * px) * day_trade_tax
-                    matched_shares += matched
-                    qty -= matched
-                    long_qty -= matched
-                    if long_qty == 0:
-                        long_lots.popleft()
-                    else:
-                        long_lots[0] = (long_qty, long_px)
-                if qty > 0:
-                    short_lots.append((qty, px))
-
-        rem_long_qty = sum(qty for qty, _ in long_lots)
-        rem_short_qty = sum(qty for qty, _ in short_lots)
-        rem_long_amt = sum(qty * px for qty, px in long_lots)
-        rem_short_amt = sum(qty * px for qty, px in short_lots)
-        rem_long_avg = (rem_long_amt / rem_long_qty) if rem_long_qty > 0 else np.nan
-        rem_short_avg = (rem_short_amt / rem_short_qty) if rem_short_qty > 0 else np.nan
-        broker_df = d[d["母券商"] == broker]
-        buy_shares = int(broker_df["買進股數"].sum())
-        sell_shares = int(broker_df["賣出股數"].sum())
-        buy_amt = float((broker_df["價格"] * broker_df["買進股數"]).sum())
-        sell_amt = float((broker_df["價格"] * broker_df["賣出股數"]).sum())
+    for slot, broker in enumerate(broker_names):
+        matched_shares = int(state["matched"][slot])
+        realized = float(state["realized"][slot])
+        fee_sum = float(state["fee"][slot])
+        tax_sum = float(state["tax"][slot])
+        rem_long_qty = int(state["rem_long_qty"][slot])
+        rem_short_qty = int(state["rem_short_qty"][slot])
+        rem_long_avg = (float(state["rem_long_amt"][slot]) / rem_long_qty) if rem_long_qty > 0 else np.nan
+        rem_short_avg = (float(state["rem_short_amt"][slot]) / rem_short_qty) if rem_short_qty > 0 else np.nan
+        buy_shares = int(buy_totals[slot])
+        sell_shares = int(sell_totals[slot])
+        buy_amt = float(buy_amounts[slot])
+        sell_amt = float(sell_amounts[slot])
         avg_buy = (buy_amt / buy_shares) if buy_shares > 0 else np.nan
         avg_sell = (sell_amt / sell_shares) if sell_shares > 0 else np.nan
         net_pos = rem_long_qty - rem_short_qty
@@ -333,7 +262,7 @@ def fifo_pnl_with_carry(df_mother: pd.DataFrame, fee_discount: float, day_trade_
     out = pd.DataFrame(rows).set_index("母券商").copy()
     for column in ["已實現毛利(FIFO)", "手續費合計(FIFO)", "證交稅合計(FIFO)", "已實現淨損益(FIFO)"]:
         out[column] = pd.to_numeric(out[column], errors="coerce").round(0).astype("Int64")
-    return out.sort_values("已實現淨損益(FIFO)", ascending=False)
+    return out.sort_values("已實現淨損益(FIFO)", ascending=False), closing
 
 
 def top10_profit_loss(fifo_df: pd.DataFrame):
@@ -342,6 +271,36 @@ def top10_profit_loss(fifo_df: pd.DataFrame):
     return pos, neg
 
 
+def format_broker_summary(flat: pd.DataFrame, stock_code: str) -> list:
+    brokers = flat["券商"].astype("category")
+    names = brokers.cat.categories.str.replace(r"[0-9A-Za-z]+", "", regex=True).str.strip()
+    grouped = pd.DataFrame({
+        "券商": names.take(brokers.cat.codes.to_numpy()),
+        "買進": numeric_array(flat, "買進股數"),
+        "賣出": numeric_array(flat, "賣出股數"),
+    })
+    grouped = grouped[grouped["券商"] != ""]
+    totals = grouped.groupby("券商", sort=False)[["買進", "賣出"]].sum() / 1000
+    totals["買超"] = totals["買進"] - totals["賣出"]
+    totals = totals.sort_values("買超", ascending=False, kind="stable")
+
+    lines = [
+        f"=== 資料分析結果 (股票代碼: {stock_code}) ===",
+        f"總交易筆數: {len(grouped)}",
+        f"券商家數: {len(totals)}",
+        "前 10 大買超券商:",
+    ]
+    for index, (broker, row) in enumerate(totals.head(10).iterrows(), start=1):
+        lines.append(f"  {index:2d}. {broker:<10} 買超: {row['買超']:8.0f}張 (買: {row['買進']:8.0f}張, 賣: {row['賣出']:8.0f}張)")
+    if len(totals) > 10:
+        lines.append("前 10 大賣超券商:")
+        for index, (broker, row) in enumerate(totals.tail(10).iterrows(), start=1):
+            lines.append(
+                f"  {index:2d}. {broker:<10} 賣超: {abs(row['買超']):8.0f}張 (買: {row['買進']:8.0f}張, 賣: {row['賣出']:8.0f}張)"
+            )
+    return lines
+
+
 def top10_netflow(fifo_df: pd.DataFrame):
     df = fifo_df.copy()
     if "母券商" not in df.columns:
@@ -360,57 +319,313 @@ def top10_netflow(fifo_df: pd.DataFrame):
     return top_netbuy[cols_out].copy(), top_netsell[cols_out].copy()
 
 
-def export_analysis(flat: pd.DataFrame, outdir: Path, fee_discount: float, day_trade_tax: float) -> None:
+def export_analysis(
+    flat,
+    outdir: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    input_fingerprint: str = None,
+    columnar: str = None,
+    opening_lots: pd.DataFrame = None,
+    save_lots=None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    tracer=None,
+    save_postings=None,
+    ledgers=None,
+) -> dict:
+    if excel not in EXCEL_MODES:
+        raise ValueError(f"不支援的 Excel 模式：{excel}（可用 {', '.join(EXCEL_MODES)}）")
+    if ledgers is not None and (excel == "consolidated" or save_lots is not None):
+        raise ValueError("分塊模式只輸出 step2–step4，不能搭配單一活頁簿或跨日 FIFO 結轉")
     outdir.mkdir(parents=True, exist_ok=True)
-    flat.to_csv(outdir / "step1_flattened.csv", index=False, encoding="utf-8-sig")
-
-    branch_sum = group_by_broker(flat, "券商")
-    branch_sum.to_csv(outdir / "step2_branch_summary.csv", encoding="utf-8-sig")
-    branch_sum.to_excel(outdir / "step2_branch_summary.xlsx")
-
-    with_mother = add_mother_column(flat)
-    mother_sum = group_by_broker(with_mother, "母券商")
-    mother_sum.to_csv(outdir / "step3_mother_summary.csv", encoding="utf-8-sig")
-    mother_sum.to_excel(outdir / "step3_mother_summary.xlsx")
-
-    avg_pnl = avg_method_pnl(with_mother, fee_discount=fee_discount, day_trade_tax=day_trade_tax)
-    avg_pnl.to_csv(outdir / "step4_avg_method_pnl.csv", encoding="utf-8-sig")
-    avg_pnl.to_excel(outdir / "step4_avg_method_pnl.xlsx")
-
-    fifo_ext = fifo_pnl_with_carry(with_mother, fee_discount=fee_discount, day_trade_tax=day_trade_tax)
-    fifo_ext.to_csv(outdir / "step5_fifo_with_carry.csv", encoding="utf-8-sig")
-    fifo_ext.to_excel(outdir / "step5_fifo_with_carry.xlsx")
-
-    top_profit, top_loss = top10_profit_loss(fifo_ext.reset_index())
-    top_profit.to_csv(outdir / "step6_top10_profit.csv", encoding="utf-8-sig", index=False)
-    top_loss.to_csv(outdir / "step6_top10_loss.csv", encoding="utf-8-sig", index=False)
-
-    top_netbuy, top_netsell = top10_netflow(fifo_ext.reset_index())
-    top_netbuy.to_csv(outdir / "step7_top10_netbuy_pnl.csv", encoding="utf-8-sig", index=False)
-    top_netsell.to_csv(outdir / "step7_top10_netsell_pnl.csv", encoding="utf-8-sig", index=False)
-    with pd.ExcelWriter(outdir / "step7_netbuy_netsell_pnl.xlsx", engine="openpyxl") as writer:
-        top_netbuy.to_excel(writer, sheet_name="買超_TOP10", index=False)
-        top_netsell.to_excel(writer, sheet_name="賣超_TOP10", index=False)
+    tracer = get_tracer(tracer)
+    columnar = None if columnar is None else resolve_format(columnar)
+    separate_xlsx = excel == "separate"
+    fresh_tables = {}
+    extras = [extra for extra in (columnar, "xlsx" if separate_xlsx else None) if extra is not None]
+    cache = AnalysisCache(outdir, enabled=input_fingerprint is not None)
+    normalizer = get_default_normalizer()
+    flat_key = fingerprint("flat", input_fingerprint)
+    mother_key = fingerprint("mother", input_fingerprint, normalizer.rules_fingerprint)
+    pnl_key = fingerprint("pnl", mother_key, fee_discount, day_trade_tax)
+    fifo_key = fingerprint("fifo", pnl_key, frame_fingerprint(opening_lots))
+
+    def write_csv(name, frame, **options):
+        reports.write(outdir / f"{name}.csv", lambda temp: frame.to_csv(temp, encoding="utf-8-sig", **options))
+
+    def write_xlsx(name, frame, **options):
+        if separate_xlsx:
+            reports.write(outdir / f"{name}.xlsx", lambda temp: frame.to_excel(temp, **options))
+
+    def write_columnar(name, *tables):
+        fresh_tables.update(tables)
+        outputs = [output for output in STEP_OUTPUTS[name] if separate_xlsx or not output.endswith(".xlsx")]
+        for output in STEP_OUTPUTS[name]:
+            if output not in outputs:
+                (outdir / output).unlink(missing_ok=True)
+        for stem, frame in tables:
+            remove_table(outdir / stem)
+            if columnar is not None:
+                outputs += [str(path.relative_to(outdir)) for path in write_table(frame, outdir / stem, columnar)]
+        return outputs
+
+    def get_flat():
+        return cache.value("flat", flat_key, flat if callable(flat) else lambda: flat)
+
+    def get_mother():
+        def compute():
+            flat_frame = get_flat()
+            with tracer.span("analysis.mother", rows=len(flat_frame)) as span:
+                mother = normalizer.map_series(flat_frame["券商"])
+                ledger = build_broker_ledger(flat_frame.assign(母券商=mother), "母券商")
+                span.set(brokers=len(ledger))
+            return {"mother": mother, "ledger": ledger}
+
+        return cache.value("mother", mother_key, compute)
+
+    def get_ledgers():
+        return cache.value("ledgers", mother_key, ledgers)
+
+    def get_branch_ledger():
+        if ledgers is not None:
+            return get_ledgers()[0]
+        return cache.value("branch_ledger", flat_key, lambda: build_broker_ledger(get_flat(), "券商"))
+
+    def get_mother_ledger():
+        return get_ledgers()[1] if ledgers is not None else get_mother()["ledger"]
+
+    def get_with_mother():
+        return get_flat().assign(母券商=get_mother()["mother"])
+
+    def get_fifo_state():
+        def compute():
+            with_mother, ledger = get_with_mother(), get_mother()["ledger"]
+            with tracer.span("analysis.fifo", rows=len(with_mother)) as span:
+                state = fifo_carry(
+                    with_mother,
+                    fee_discount=fee_discount,
+                    day_trade_tax=day_trade_tax,
+                    ledger=ledger,
+                    opening_lots=opening_lots,
+                )
+                span.set(open_lots=len(state[1]))
+            return state
+
+        return cache.value("fifo", fifo_key, compute)
+
+    def get_fifo():
+        return get_fifo_state()[0]
+
+    def step1():
+        write_csv("step1_flattened", to_display(get_flat()), index=False)
+        return write_columnar("step1", ("step1_flattened", get_flat()))
+
+    def step2():
+        branch_sum = summarize_ledger(get_branch_ledger())
+        write_csv("step2_branch_summary", branch_sum)
+        write_xlsx("step2_branch_summary", branch_sum)
+        return write_columnar("step2", ("step2_branch_summary", branch_sum))
+
+    def step3():
+        mother_sum = summarize_ledger(get_mother_ledger())
+        write_csv("step3_mother_summary", mother_sum)
+        write_xlsx("step3_mother_summary", mother_sum)
+        return write_columnar("step3", ("step3_mother_summary", mother_sum))
+
+    def step4():
+        avg_pnl = ledger_avg_pnl(get_mother_ledger(), fee_discount=fee_discount, day_trade_tax=day_trade_tax)
+        write_csv("step4_avg_method_pnl", avg_pnl)
+        write_xlsx("step4_avg_method_pnl", avg_pnl)
+        return write_columnar("step4", ("step4_avg_method_pnl", avg_pnl))
+
+    def step5():
+        fifo_ext = get_fifo()
+        write_csv("step5_fifo_with_carry", fifo_ext)
+        write_xlsx("step5_fifo_with_carry", fifo_ext)
+        return write_columnar("step5", ("step5_fifo_with_carry", fifo_ext))
+
+    def step6():
+        top_profit, top_loss = top10_profit_loss(get_fifo().reset_index())
+        write_csv("step6_top10_profit", top_profit, index=False)
+        write_csv("step6_top10_loss", top_loss, index=False)
+        return write_columnar("step6", ("step6_top10_profit", top_profit), ("step6_top10_loss", top_loss))
+
+    def step7():
+        top_netbuy, top_netsell = top10_netflow(get_fifo().reset_index())
+        write_csv("step7_top10_netbuy_pnl", top_netbuy, index=False)
+        write_csv("step7_top10_netsell_pnl", top_netsell, index=False)
+
+        def write_netflow_xlsx(temp):
+            with pd.ExcelWriter(temp, engine="openpyxl") as writer:
+                top_netbuy.to_excel(writer, sheet_name="買超_TOP10", index=False)
+                top_netsell.to_excel(writer, sheet_name="賣超_TOP10", index=False)
+
+        if separate_xlsx:
+            reports.write(outdir / "step7_netbuy_netsell_pnl.xlsx", write_netflow_xlsx)
+        return write_columnar("step7", ("step7_top10_netbuy_pnl", top_netbuy), ("step7_top10_netsell_pnl", top_netsell))
+
+    def workbook():
+        reports.write(outdir / WORKBOOK_NAME, lambda temp: build_workbook(outdir, force=True, path=temp, tables=fresh_tables))
+        return [WORKBOOK_NAME]
+
+    steps = [
+        ("step1", flat_key, step1),
+        ("step2", flat_key, step2),
+        ("step3", mother_key, step3),
+        ("step4", pnl_key, step4),
+        ("step5", fifo_key, step5),
+        ("step6", fifo_key, step6),
+        ("step7", fifo_key, step7),
+    ]
+    if ledgers is not None:
+        # 分塊模式只有各券商的累計帳本，需要整張表的 step1 與 FIFO（step5–7）不輸出，並移除舊結果避免混用
+        steps = [step for step in steps if step[0] in CHUNKED_STEPS]
+        for name in STEP_OUTPUTS:
+            if name not in CHUNKED_STEPS:
+                for output in STEP_OUTPUTS[name]:
+                    (outdir / output).unlink(missing_ok=True)
+                for stem in (Path(output).stem for output in STEP_OUTPUTS[name] if output.endswith(".csv")):
+                    remove_table(outdir / stem)
+        (outdir / WORKBOOK_NAME).unlink(missing_ok=True)
+
+    with tracer.span("analysis", outdir=outdir.name), ReportWriter(background=background_writes, tracer=tracer) as reports:
+        for name, key, produce in steps:
+            with tracer.span(f"analysis.{name}") as span:
+                span.set(status="computed" if cache.step(name, key, produce, extras=extras) else "reused")
+        if excel == "consolidated":
+            with tracer.span("analysis.workbook") as span:
+                workbook_key = fingerprint("workbook", flat_key, mother_key, pnl_key, fifo_key)
+                span.set(status="computed" if cache.step("workbook", workbook_key, workbook) else "reused")
+        elif any(entry["status"] == "computed" for entry in cache.steps.values()):
+            (outdir / WORKBOOK_NAME).unlink(missing_ok=True)
+        if save_lots is not None:
+            with tracer.span("analysis.save_lots"):
+                save_lots(get_fifo_state()[1])
+        if save_postings is not None:
+            with tracer.span("analysis.index") as span:
+                added = save_postings(mother_key, lambda: (get_branch_ledger(), get_mother_ledger()))
+                span.set(status="computed" if added else "reused")
+        with tracer.span("analysis.flush"):
+            reports.flush()
+    return cache.save(writes=reports.stats())
+
+
+def analyze_csv_file(
+    input_csv: Path,
+    outdir: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    incremental: bool = True,
+    columnar: str = None,
+    opening_lots: pd.DataFrame = None,
+    save_lots=None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    tracer=None,
+    save_postings=None,
+    memory_budget: float = None,
+) -> dict:
+    tracer = get_tracer(tracer)
+    input_fingerprint = file_fingerprint(input_csv) if incremental else None
+    if memory_budget is not None:
+        chunk_rows_for_budget(memory_budget)
+        return export_analysis(
+            None,
+            outdir,
+            fee_discount=fee_discount,
+            day_trade_tax=day_trade_tax,
+            input_fingerprint=input_fingerprint,
+            columnar=columnar,
+            save_lots=save_lots,
+            excel=excel,
+            background_writes=background_writes,
+            tracer=tracer,
+            save_postings=save_postings,
+            ledgers=lambda: read_ledgers_chunked(input_csv, memory_budget, tracer),
+        )
+
+    def parse():
+        with tracer.span("analysis.parse", file=Path(input_csv).name, bytes=Path(input_csv).stat().st_size) as span:
+            frame = read_flat_csv(input_csv)
+            span.set(rows=len(frame))
+        return frame
+
+    return export_analysis(
+        parse,
+        outdir,
+        fee_discount=fee_discount,
+        day_trade_tax=day_trade_tax,
+        input_fingerprint=input_fingerprint,
+        columnar=columnar,
+        opening_lots=opening_lots,
+        save_lots=save_lots,
+        excel=excel,
+        background_writes=background_writes,
+        tracer=tracer,
+        save_postings=save_postings,
+    )
 
 
-def analyze_csv_file(input_csv: Path, outdir: Path, fee_discount: float, day_trade_tax: float) -> None:
-    flat = read_flat_csv(input_csv)
-    export_analysis(flat, outdir, fee_discount=fee_discount, day_trade_tax=day_trade_tax)
+def load_report(outdir: Path, name: str, columns=None, mmap: bool = True) -> pd.DataFrame:
+    path = find_table(Path(outdir) / name)
+    if path is not None:
+        return load_table(path, columns=columns, mmap=mmap)
+    csv_path = Path(outdir) / f"{name}.csv"
+    if not csv_path.exists():
+        raise FileNotFoundError(f"找不到報表：{csv_path}")
+    index_col = 0 if name in INDEXED_REPORTS else None
+    frame = pd.read_csv(csv_path, encoding="utf-8-sig", index_col=index_col)
+    return frame if columns is None else frame[list(columns)]
+
+
+def build_workbook(outdir: Path, force: bool = False, path: Path = None, tables: dict = None):
+    outdir = Path(outdir)
+    path = outdir / WORKBOOK_NAME if path is None else Path(path)
+    if not outdir.is_dir():
+        raise FileNotFoundError(f"找不到分析輸出資料夾：{outdir}")
+    sources = [outdir / f"{name}.csv" for name in WORKBOOK_TABLES]
+    missing = [source.name for source in sources if not source.exists()]
+    if missing and not force:
+        raise FileNotFoundError(f"找不到報表，請先執行分析：{', '.join(missing)}")
+    if not force and path.exists() and path.stat().st_mtime >= max(source.stat().st_mtime for source in sources):
+        return path, False
+    tables = tables or {}
+    sheets = (
+        (name, tables[name] if name in tables else load_report(outdir, name, mmap=False), name in INDEXED_REPORTS)
+        for name in WORKBOOK_TABLES
+    )
+    return write_workbook(sheets, path), True
 
 __all__ = [
     "BRANCH_RE",
     "BRANCH_TOKENS",
+    "BROKER_PREFIXES",
+    "CHUNKED_STEPS",
     "FEE_RATE_STD",
+    "INDEXED_REPORTS",
+    "STOCK_TRANSACTION_TAX",
+    "STEP_OUTPUTS",
+    "WORKBOOK_TABLES",
     "add_mother_column",
     "analyze_csv_file",
     "avg_method_pnl",
+    "build_workbook",
+    "chunk_rows_for_budget",
     "export_analysis",
+    "fifo_carry",
     "fifo_pnl_with_carry",
     "flatten_two_groups",
+    "format_broker_summary",
     "group_by_broker",
+    "ledger_avg_pnl",
+    "load_report",
     "normalize_to_mother",
     "read_flat_csv",
+    "read_flat_text",
+    "read_ledgers_chunked",
     "read_raw_csv",
+    "summarize_ledger",
     "top10_netflow",
     "top10_profit_loss",
 ]
\ No newline at end of file
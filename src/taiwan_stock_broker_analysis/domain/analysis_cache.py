@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import pickle
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .report_writer import atomic_write
+
+MANIFEST_NAME = "manifest.json"
+INTERMEDIATE_DIR = ".tsba_cache"
+CACHE_VERSION = 2
+
+
+def file_fingerprint(path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_fingerprint(data) -> str:
+    return hashlib.sha256(data.encode("utf-8") if isinstance(data, str) else bytes(data)).hexdigest()
+
+
+def frame_fingerprint(frame: pd.DataFrame) -> str:
+    if frame is None:
+        return None
+    hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes() + "|".join(map(str, frame.columns)).encode("utf-8")).hexdigest()
+
+
+def fingerprint(*parts) -> str:
+    payload = json.dumps([CACHE_VERSION, pd.__version__, *parts], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, outdir: Path, enabled: bool = True):
+        self.outdir = Path(outdir)
+        self.enabled = enabled
+        self.previous = self._read_manifest() if enabled else {}
+        self.steps = {}
+        self.intermediates = {}
+        self._values = {}
+
+    def step(self, name: str, key: str, produce, extras=()) -> bool:
+        previous = self.previous.get("steps", {}).get(name, {})
+        if (
+            self.enabled
+            and previous.get("fingerprint") == key
+            and set(extras) <= set(previous.get("extras", []))
+            and self._outputs_intact(previous.get("outputs", {}))
+        ):
+            self.steps[name] = {**previous, "status": "reused", "seconds": 0.0}
+            return False
+        started = time.perf_counter()
+        outputs = produce()
+        self.steps[name] = {
+            "status": "computed",
+            "fingerprint": key,
+            "extras": sorted(extras),
+            "seconds": round(time.perf_counter() - started, 6),
+            "outputs": list(outputs),
+        }
+        return True
+
+    def value(self, name: str, key: str, compute):
+        cached = self._values.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        path = self.outdir / INTERMEDIATE_DIR / f"{name}-{key[:16]}.pkl"
+        started = time.perf_counter()
+        value, status = None, "computed"
+        if self.enabled and path.exists():
+            try:
+                with open(path, "rb") as file_obj:
+                    value, status = pickle.load(file_obj), "loaded"
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                value = None
+        if value is None:
+            value = compute()
+            self._store(name, path, value)
+        self.intermediates[name] = {
+            "status": status,
+            "fingerprint": key,
+            "seconds": round(time.perf_counter() - started, 6),
+        }
+        self._values[name] = (key, value)
+        return value
+
+    def save(self, writes: dict = None):
+        for entry in self.steps.values():
+            if entry["status"] == "computed" and isinstance(entry["outputs"], list):
+                entry["outputs"] = {output: (self.outdir / output).stat().st_size for output in entry["outputs"]}
+        manifest = {
+            "version": CACHE_VERSION,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "steps": self.steps,
+            "intermediates": self.intermediates,
+            "reused": sorted(name for name, entry in self.steps.items() if entry["status"] == "reused"),
+            "computed": sorted(name for name, entry in self.steps.items() if entry["status"] == "computed"),
+        }
+        if writes is not None:
+            manifest["writes"] = writes
+        text = json.dumps(manifest, ensure_ascii=False, indent=2)
+        atomic_write(self.outdir / MANIFEST_NAME, lambda temp_name: Path(temp_name).write_text(text, encoding="utf-8"))
+        return manifest
+
+    def _outputs_intact(self, outputs: dict) -> bool:
+        if not outputs:
+            return False
+        for output, size in outputs.items():
+            path = self.outdir / output
+            if not path.is_file() or path.stat().st_size != size:
+                return False
+        return True
+
+    def _store(self, name: str, path: Path, value):
+        if not self.enabled:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            for stale in path.parent.glob(f"{name}-*.pkl"):
+                stale.unlink()
+            atomic_write(path, lambda temp_name: Path(temp_name).write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+        except OSError:
+            pass
+
+    def _read_manifest(self) -> dict:
+        try:
+            manifest = json.loads((self.outdir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return manifest if manifest.get("version") == CACHE_VERSION else {}
+
+
+def format_manifest_summary(manifest: dict) -> str:
+    seconds = sum(entry["seconds"] for entry in manifest["steps"].values())
+    return (
+        f"增量分析：重用 {len(manifest['reused'])} 個步驟，重新計算 {len(manifest['computed'])} 個"
+        f"（{', '.join(manifest['computed']) or '無'}），耗時 {seconds:.2f}s"
+    )
+
+
+__all__ = [
+    "AnalysisCache",
+    "INTERMEDIATE_DIR",
+    "MANIFEST_NAME",
+    "content_fingerprint",
+    "file_fingerprint",
+    "fingerprint",
+    "format_manifest_summary",
+    "frame_fingerprint",
+]
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .report_writer import atomic_write
+
+INDEX_SUFFIX = ".tsbaidx"
+INDEX_MAGIC = b"TSBAIDX1"
+INDEX_VERSION = 1
+INDEX_FIELDS = ("券商", "母券商")
+DEFAULT_MAX_SEGMENTS = 16
+LOCK_NAME = ".compact.lock"
+STALE_LOCK_SECONDS = 600
+# 每筆 posting：(股票, 交易日) 編號 + 當日買賣股數 + 成交金額（單位：分，價格檔位 × 股數，整數不失真）
+POSTING_ARRAYS = [("pair", "<i4"), ("buy", "<i8"), ("sell", "<i8"), ("buy_cents", "<i8"), ("sell_cents", "<i8")]
+PAIR_ARRAYS = [("pair_stock", "<i4"), ("pair_day", "<i4"), ("pair_key", "<u8")]
+RESULT_COLUMNS = ["欄位", "券商名稱", "股票代碼", "交易日", "買股數", "賣股數", "買超股數", "均買價", "均賣價", "買金額", "賣金額"]
+
+
+def _as_date(value) -> date:
+    if value is None or type(value) is date:
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _key_number(key) -> int:
+    return int(str(key)[:16], 16) if key else 0
+
+
+def _ledger_postings(ledger: pd.DataFrame) -> pd.DataFrame:
+    names = pd.Series(ledger.index, dtype=object)
+    keep = names.notna().to_numpy() & (names.astype(str).str.strip() != "").to_numpy()
+    ledger = ledger[keep]
+    return pd.DataFrame({
+        "term": names[keep].astype(str).str.strip().to_numpy(),
+        "buy": ledger["買股數"].to_numpy(dtype=np.int64),
+        "sell": ledger["賣股數"].to_numpy(dtype=np.int64),
+        "buy_cents": np.rint(ledger["買金額"].to_numpy(dtype=np.float64) * 100).astype(np.int64),
+        "sell_cents": np.rint(ledger["賣金額"].to_numpy(dtype=np.float64) * 100).astype(np.int64),
+    })
+
+
+def write_segment(path: Path, pairs: pd.DataFrame, postings: dict) -> Path:
+    stocks = sorted(pairs["stock"].unique().tolist())
+    stock_ids = {stock: slot for slot, stock in enumerate(stocks)}
+    arrays, header_fields = [], {}
+    arrays += [
+        ("pair_stock", pairs["stock"].map(stock_ids).to_numpy(dtype="<i4")),
+        ("pair_day", pairs["day"].to_numpy(dtype="<i4")),
+        ("pair_key", pairs["key"].to_numpy(dtype="<u8")),
+    ]
+    for field in INDEX_FIELDS:
+        frame = postings[field].sort_values(["term", "pair"], kind="stable")
+        terms, first = np.unique(frame["term"].to_numpy(dtype=str), return_index=True)
+        header_fields[field] = {"terms": terms.tolist(), "rows": len(frame)}
+        arrays.append((f"{field}.start", np.append(first, len(frame)).astype("<i8")))
+        arrays += [(f"{field}.{name}", frame[name].to_numpy(dtype=dtype)) for name, dtype in POSTING_ARRAYS]
+
+    layout, offset = {}, 0
+    for name, values in arrays:
+        layout[name] = [offset, len(values), values.dtype.str]
+        offset += -(-values.nbytes // 8) * 8
+    header = json.dumps({
+        "version": INDEX_VERSION,
+        "stocks": stocks,
+        "pairs": len(pairs),
+        "fields": header_fields,
+        "arrays": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+
+    def write(temp_name):
+        with open(temp_name, "wb") as file_obj:
+            file_obj.write(INDEX_MAGIC + struct.pack("<Q", len(header)) + header)
+            for _, values in arrays:
+                data = values.tobytes()
+                file_obj.write(data + b"\0" * (-len(data) % 8))
+
+    return atomic_write(path, write)
+
+
+class IndexSegment:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as file_obj:
+            magic, header_len = file_obj.read(8), struct.unpack("<Q", file_obj.read(8))[0]
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"不是券商索引檔：{self.path}")
+            header = json.loads(file_obj.read(header_len).decode("utf-8"))
+        if header.get("version") != INDEX_VERSION:
+            raise ValueError(f"不支援的索引版本：{header.get('version')}")
+        self.data_start = 16 + header_len
+        self.stocks = header["stocks"]
+        self.fields = header["fields"]
+        self.layout = header["arrays"]
+        self.pairs = pd.DataFrame({name: self.read(name) for name, _ in PAIR_ARRAYS})
+        self.pairs["stock"] = np.asarray(self.stocks, dtype=object).take(self.pairs["pair_stock"].to_numpy())
+
+    def read(self, name: str, start: int = 0, stop: int = None) -> np.ndarray:
+        offset, length, dtype = self.layout[name]
+        dtype = np.dtype(dtype)
+        stop = length if stop is None else stop
+        if stop <= start:
+            return np.empty(0, dtype=dtype)
+        return np.fromfile(self.path, dtype=dtype, count=stop - start, offset=self.data_start + offset + start * dtype.itemsize)
+
+    def term_range(self, field: str, name: str, prefix: bool):
+        terms = self.fields[field]["terms"]
+        first = bisect_left(terms, name)
+        if prefix:
+            last = bisect_left(terms, name + "\U0010ffff")
+        else:
+            last = first + 1 if first < len(terms) and terms[first] == name else first
+        return first, last
+
+    def postings(self, field: str, first: int = 0, last: int = None) -> pd.DataFrame:
+        terms = self.fields[field]["terms"]
+        last = len(terms) if last is None else last
+        starts = self.read(f"{field}.start", first, last + 1) if last > first else np.zeros(1, dtype=np.int64)
+        frame = pd.DataFrame({
+            name: self.read(f"{field}.{name}", int(starts[0]), int(starts[-1])) for name, _ in POSTING_ARRAYS
+        })
+        frame.insert(0, "term", np.repeat(np.asarray(terms[first:last], dtype=object), np.diff(starts)))
+        return frame
+
+
+class BrokerIndex:
+    def __init__(self, root, max_segments: int = DEFAULT_MAX_SEGMENTS):
+        self.root = Path(root)
+        self.max_segments = max(int(max_segments), 2)
+        self.segments_read = 0
+        self._segments = {}
+
+    def segment_paths(self) -> list:
+        if not self.root.is_dir():
+            return []
+        return sorted(self.root.glob(f"*{INDEX_SUFFIX}"))
+
+    def add(self, stock_code: str, day, branch_ledger: pd.DataFrame, mother_ledger: pd.DataFrame, key: str = None) -> Path:
+        stock_code, day = str(stock_code).strip(), _as_date(day)
+        pairs = pd.DataFrame({"stock": [stock_code], "day": [day.toordinal()], "key": [_key_number(key)]})
+        postings = {}
+        for field, ledger in zip(INDEX_FIELDS, (branch_ledger, mother_ledger)):
+            frame = _ledger_postings(ledger)
+            frame.insert(1, "pair", np.zeros(len(frame), dtype=np.int32))
+            postings[field] = frame
+        name = f"{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}{INDEX_SUFFIX}"
+        path = write_segment(self.root / name, pairs, postings)
+        if len(self.segment_paths()) > self.max_segments:
+            self.compact(force=False)
+        return path
+
+    def contains(self, stock_code: str, day, key: str = None) -> bool:
+        stock_code, day = str(stock_code).strip(), _as_date(day)
+        for segment in reversed(self._open_segments()):
+            pairs = segment.pairs
+            hit = pairs[(pairs["stock"] == stock_code) & (pairs["pair_day"] == day.toordinal())]
+            if len(hit):
+                return key is None or int(hit["pair_key"].iloc[0]) == _key_number(key)
+        return False
+
+    def terms(self, prefix: str = "", field: str = None) -> list:
+        names = set()
+        for segment in self._open_segments():
+            for name in self._fields(field):
+                first, last = segment.term_range(name, prefix, prefix=True)
+                names.update(segment.fields[name]["terms"][first:last])
+        return sorted(names)
+
+    def lookup(self, name: str, prefix: bool = False, field: str = None, start=None, end=None, stocks=None) -> pd.DataFrame:
+        for attempt in range(2):
+            try:
+                return self._lookup(name.strip(), prefix, field, _as_date(start), _as_date(end), stocks)
+            except FileNotFoundError:
+                # 查詢途中遇到合併刪掉的分段，重新列出分段再查一次
+                if attempt:
+                    raise
+
+    def compact(self, force: bool = True) -> bool:
+        lock = self.root / LOCK_NAME
+        try:
+            if lock.exists() and time.time() - lock.stat().st_mtime > STALE_LOCK_SECONDS:
+                lock.unlink()
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        try:
+            paths = self.segment_paths()
+            chosen = paths if force else self._merge_run(paths)
+            if len(chosen) < 2:
+                return False
+            segments = [IndexSegment(path) for path in chosen]
+            owned = self._ownership(segments)
+            pair_tables = []
+            for segment, mask in zip(segments, owned):
+                table = segment.pairs[mask][["stock", "pair_day", "pair_key"]].rename(columns={"pair_day": "day", "pair_key": "key"})
+                pair_tables.append(table.assign(source=np.flatnonzero(mask)))
+            merged_pairs = pd.concat(pair_tables, ignore_index=True)
+            postings = {}
+            for field in INDEX_FIELDS:
+                frames = []
+                offset = 0
+                for segment, mask, table in zip(segments, owned, pair_tables):
+                    remap = np.full(len(mask), -1, dtype=np.int64)
+                    remap[table["source"].to_numpy()] = np.arange(offset, offset + len(table))
+                    offset += len(table)
+                    frame = segment.postings(field)
+                    frame["pair"] = remap[frame["pair"].to_numpy()]
+                    frames.append(frame[frame["pair"] >= 0])
+                postings[field] = pd.concat(frames, ignore_index=True)
+            write_segment(chosen[-1], merged_pairs.drop(columns="source"), postings)
+            for path in chosen[:-1]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            return True
+        finally:
+            lock.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        segments = self._open_segments()
+        owned = self._ownership(segments)
+        return {
+            "segments": len(segments),
+            "pairs": int(sum(mask.sum() for mask in owned)),
+            "stocks": len({stock for segment in segments for stock in segment.stocks}),
+            "terms": {field: len(self.terms(field=field)) for field in INDEX_FIELDS},
+            "bytes": sum(segment.path.stat().st_size for segment in segments),
+        }
+
+    def _lookup(self, name, prefix, field, start, end, stocks) -> pd.DataFrame:
+        wanted = None if stocks is None else {str(code).strip() for code in ([stocks] if isinstance(stocks, str) else stocks)}
+        segments = self._open_segments()
+        owned = self._ownership(segments)
+        frames = []
+        for segment, mask in zip(segments, owned):
+            for field_name in self._fields(field):
+                first, last = segment.term_range(field_name, name, prefix)
+                if last <= first:
+                    continue
+                frame = segment.postings(field_name, first, last)
+                pairs = segment.pairs.iloc[frame["pair"].to_numpy()]
+                keep = mask[frame["pair"].to_numpy()]
+                days = pairs["pair_day"].to_numpy()
+                if start is not None:
+                    keep &= days >= start.toordinal()
+                if end is not None:
+                    keep &= days <= end.toordinal()
+                if wanted is not None:
+                    keep &= pairs["stock"].isin(wanted).to_numpy()
+                frame = frame[keep]
+                frame.insert(0, "field", field_name)
+                frame["stock"] = pairs["stock"].to_numpy()[keep]
+                frame["day"] = days[keep]
+                frames.append(frame)
+        return self._result(frames)
+
+    def _result(self, frames) -> pd.DataFrame:
+        if not frames:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        frame = pd.concat(frames, ignore_index=True)
+        buy, sell = frame["buy"].to_numpy(), frame["sell"].to_numpy()
+        result = pd.DataFrame({
+            "欄位": frame["field"].to_numpy(),
+            "券商名稱": frame["term"].to_numpy(),
+            "股票代碼": frame["stock"].to_numpy(),
+            "交易日": [date.fromordinal(int(day)) for day in frame["day"]],
+            "買股數": buy,
+            "賣股數": sell,
+            "買超股數": buy - sell,
+            "均買價": np.round(np.where(buy > 0, frame["buy_cents"] / 100 / np.maximum(buy, 1), np.nan), 2),
+            "均賣價": np.round(np.where(sell > 0, frame["sell_cents"] / 100 / np.maximum(sell, 1), np.nan), 2),
+            "買金額": frame["buy_cents"].to_numpy() / 100,
+            "賣金額": frame["sell_cents"].to_numpy() / 100,
+        })
+        return result.sort_values(["交易日", "欄位", "券商名稱", "股票代碼"], kind="stable").reset_index(drop=True)
+
+    def _open_segments(self) -> list:
+        # 分段寫入後不再修改（合併時以新檔取代），以路徑 + mtime + 大小判斷能否沿用已讀入的檔頭
+        segments, cache = [], {}
+        for path in self.segment_paths():
+            stat = path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            cached = self._segments.get(path)
+            if cached is None or cached[0] != signature:
+                cached = (signature, IndexSegment(path))
+                self.segments_read += 1
+            cache[path] = cached
+            segments.append(cached[1])
+        self._segments = cache
+        return segments
+
+    @staticmethod
+    def _fields(field: str = None):
+        if field is not None and field not in INDEX_FIELDS:
+            raise ValueError(f"不支援的索引欄位：{field}（可用 {', '.join(INDEX_FIELDS)}）")
+        return INDEX_FIELDS if field is None else (field,)
+
+    @staticmethod
+    def _ownership(segments) -> list:
+        # 同一 (股票, 交易日) 以最新的分段為準；較舊分段的同一組資料視為已被取代
+        stock_ids = {}
+        seen = np.empty(0, dtype=np.int64)
+        owned = []
+        for segment in reversed(segments):
+            codes = np.array([stock_ids.setdefault(stock, len(stock_ids)) for stock in segment.stocks], dtype=np.int64)
+            pair_stock = segment.pairs["pair_stock"].to_numpy()
+            keys = (codes[pair_stock] if len(codes) else pair_stock.astype(np.int64)) << 32
+            keys |= segment.pairs["pair_day"].to_numpy().astype(np.int64)
+            owned.append(~np.isin(keys, seen))
+            seen = np.union1d(seen, keys)
+        return owned[::-1]
+
+    def _merge_run(self, paths) -> list:
+        # 從最新的分段往回併，遇到比已累積筆數大兩倍以上的舊分段就停，大的舊分段不必每次重寫
+        sizes = [path.stat().st_size for path in paths]
+        run, total = [], 0
+        for path, size in zip(reversed(paths), reversed(sizes)):
+            if len(run) >= 2 and size > 2 * total:
+                break
+            run.append(path)
+            total += size
+        return run[::-1]
+
+
+def format_postings(result: pd.DataFrame, limit: int = 20) -> list:
+    if result.empty:
+        return ["查無資料"]
+    lines = [
+        f"共 {len(result):,} 筆（{result['股票代碼'].nunique()} 檔股票、{result['交易日'].nunique()} 個交易日），"
+        f"買 {result['買股數'].sum() / 1000:,.0f} 張、賣 {result['賣股數'].sum() / 1000:,.0f} 張",
+    ]
+    shown = result.sort_values(["交易日", "買金額"], ascending=[False, False], kind="stable").head(limit)
+    for row in shown.itertuples(index=False):
+        buy_price = "-" if np.isnan(row.均買價) else f"{row.均買價:.2f}"
+        sell_price = "-" if np.isnan(row.均賣價) else f"{row.均賣價:.2f}"
+        lines.append(
+            f"  {row.交易日.isoformat()} {row.股票代碼:<6} {row.券商名稱:<10} 買 {row.買股數 / 1000:>8,.0f} 張 @ {buy_price:>8}"
+            f"  賣 {row.賣股數 / 1000:>8,.0f} 張 @ {sell_price:>8}"
+        )
+    if len(result) > limit:
+        lines.append(f"  ……其餘 {len(result) - limit:,} 筆請用 --output 輸出")
+    return lines
+
+
+__all__ = [
+    "BrokerIndex",
+    "DEFAULT_MAX_SEGMENTS",
+    "INDEX_FIELDS",
+    "IndexSegment",
+    "RESULT_COLUMNS",
+    "format_postings",
+    "write_segment",
+]
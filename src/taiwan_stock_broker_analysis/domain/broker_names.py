@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .report_writer import atomic_write
+
+BRANCH_TOKENS = [
+    "台北","臺北","新北","桃園","台中","臺中","台南","臺南","高雄","基隆","新竹","嘉義","台東","臺東","花蓮","宜蘭",
+    "內湖","信義","松山","大安","中山","中正","萬華","文山","南港","士林","北投","板橋","三重","新莊","永和","新店","汐止",
+    "中和","林口","淡水","蘆洲","三峽","鶯歌","樹林","五股","泰山","八里","蘆竹","龜山","大園","平鎮","中壢","楊梅","龍潭",
+    "竹北","竹南","香山","湖口","新豐","竹東","頭份","苗栗","豐原","北屯","西屯","南屯","大里","太平","霧峰","大甲","沙鹿",
+    "員林","彰化","斗六","斗南","虎尾","太保","朴子","新營","永康","仁德","岡山","楠梓","左營","鳳山","小港","屏東","羅東",
+    "敦南","復興","南京","忠孝","松德","松江","館前","西門","光復","八德","重慶","建國","文心","中港","中華","民族","民權","民生",
+]
+BRANCH_RE = "(" + "|".join(map(re.escape, BRANCH_TOKENS)) + ").*"
+BROKER_PREFIXES = [
+    "中國信託",
+    "中信託",
+    "美商高盛",
+    "台灣摩根",
+    "摩根大通",
+    "港商野村",
+    "法銀巴黎",
+    "花旗環球",
+    "港麥格理",
+    "上海匯豐",
+    "大和國泰",
+    "國票",
+    "國泰",
+    "元大",
+    "凱基",
+    "永豐",
+    "富邦",
+    "統一",
+    "華南",
+    "台新",
+    "群益",
+    "第一",
+    "兆豐",
+    "玉山",
+    "合庫",
+    "瑞銀",
+    "美林",
+    "企銀",
+    "聯邦",
+    "新光",
+    "康和",
+    "土銀",
+    "元富",
+    "美好",
+]
+BRANCH_SUFFIXES = ["分公司", "分行", "營業部", "營業處"]
+CACHE_ENV_VAR = "TSBA_BROKER_CACHE"
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "taiwan_stock_broker_analysis" / "broker_mother_map.json"
+# 實際約一千家分點；上限只為擋住合成資料或異常名稱讓快取無限成長
+MAX_CACHED_NAMES = 20000
+
+_TERMINAL = ""
+_LEGACY_CODE_RE = re.compile(r"^[0-9A-Za-z]{1,4}([\u4e00-\u9fff].*)$")
+_LEGACY_SUFFIX_RE = re.compile("(" + "|".join(BRANCH_SUFFIXES) + ")$")
+
+
+def _build_trie(words):
+    root = {}
+    for priority, word in enumerate(words):
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node.setdefault(_TERMINAL, priority)
+    return root
+
+
+def _is_ascii_alnum(char):
+    return char.isascii() and char.isalnum()
+
+
+class BrokerNameNormalizer:
+    def __init__(self, prefixes=None, branch_tokens=None, cache_path=None, max_names: int = MAX_CACHED_NAMES):
+        self.prefixes = list(BROKER_PREFIXES if prefixes is None else prefixes)
+        self.branch_tokens = list(BRANCH_TOKENS if branch_tokens is None else branch_tokens)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._prefix_trie = _build_trie(self.prefixes)
+        self._branch_trie = _build_trie(self.branch_tokens)
+        self._branch_re = "(" + "|".join(map(re.escape, self.branch_tokens)) + ").*"
+        self._prefix_set = set(self.prefixes)
+        self.max_names = max_names
+        # 同一個正規化器會被排程執行緒與常駐服務的工作共用，memo 的增刪與序列化都要持鎖
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._disk_loaded = False
+        self._dirty = False
+        self.stats = {"lookups": 0, "resolved": 0, "disk_hits": 0}
+
+    @property
+    def cached_names(self) -> int:
+        return len(self._memo)
+
+    @property
+    def rules_fingerprint(self):
+        payload = json.dumps([self.prefixes, self.branch_tokens, BRANCH_SUFFIXES], ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def resolve(self, bname):
+        if not isinstance(bname, str):
+            return self._resolve_uncached(bname)
+        mother = self._memo.get(bname)
+        if mother is None:
+            mother = self._resolve_uncached(bname)
+            with self._lock:
+                self._remember(bname, mother)
+                self.stats["resolved"] += 1
+        self.stats["lookups"] += 1
+        return mother
+
+    def map_series(self, series: pd.Series) -> pd.Series:
+        self.load()
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            mothers = [self.resolve(name) for name in series.cat.categories]
+            mother_codes, mother_names = pd.factorize(pd.Series(mothers, dtype=object), sort=True)
+            mapped = np.where(codes >= 0, mother_codes[codes], -1) if len(mother_codes) else codes
+            out = pd.Series(
+                pd.Categorical.from_codes(mapped, categories=mother_names),
+                index=series.index,
+                name=series.name,
+            )
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=False)
+            mothers = pd.Series([self.resolve(name) for name in uniques])
+            out = pd.Series(mothers.to_numpy()[codes], index=series.index, name=series.name, dtype=mothers.dtype)
+        self.save()
+        return out
+
+    def load(self):
+        if self._disk_loaded or self.cache_path is None:
+            return
+        try:
+            payload = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            payload = {}
+        names = payload.get("names", {}) if payload.get("rules") == self.rules_fingerprint else {}
+        with self._lock:
+            if self._disk_loaded:
+                return
+            self._disk_loaded = True
+            for name, mother in list(names.items())[-self.max_names:]:
+                if name not in self._memo:
+                    self._remember(name, mother, dirty=False)
+            self.stats["disk_hits"] = len(names)
+
+    def save(self):
+        if not self._dirty or self.cache_path is None:
+            return
+        # 只存比對到券商前綴的名稱；無法辨識的名稱每次重算即可，不必落地
+        with self._lock:
+            names = {name: mother for name, mother in self._memo.items() if mother in self._prefix_set}
+            self._dirty = False
+        try:
+            text = json.dumps({"rules": self.rules_fingerprint, "names": names}, ensure_ascii=False)
+            atomic_write(self.cache_path, lambda temp_name: Path(temp_name).write_text(text, encoding="utf-8"))
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def _remember(self, name, mother, dirty: bool = True):
+        self._memo[name] = mother
+        while len(self._memo) > self.max_names:
+            del self._memo[next(iter(self._memo))]
+        self._dirty = self._dirty or dirty
+
+    def _match_prefix(self, name):
+        node = self._prefix_trie
+        best = None
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            priority = node.get(_TERMINAL)
+            if priority is not None and (best is None or priority < best):
+                best = priority
+        return None if best is None else self.prefixes[best]
+
+    def _cut_branch(self, name):
+        trie = self._branch_trie
+        for start in range(len(name)):
+            node = trie
+            for char in name[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    return name[:start]
+        return name
+
+    def _resolve_uncached(self, bname):
+        if not isinstance(bname, str):
+            bname = str(bname)
+
+        name = str(bname).replace("\u3000", "").strip()
+        if "\n" in name:
+            return self._resolve_with_regex(bname, name)
+
+        code_len = 0
+        while code_len < len(name) and code_len <= 4 and _is_ascii_alnum(name[code_len]):
+            code_len += 1
+        if 1 <= code_len <= 4 and code_len < len(name) and "\u4e00" <= name[code_len] <= "\u9fff":
+            name = name[code_len:]
+
+        digit_len = 0
+        while digit_len < len(name) and digit_len < 4 and name[digit_len].isdecimal():
+            digit_len += 1
+        if digit_len >= 3:
+            name = name[digit_len:]
+        name = self._strip_suffix(name)
+
+        prefix = self._match_prefix(name)
+        if prefix is not None:
+            return prefix
+
+        name = self._strip_suffix(self._cut_branch(name))
+
+        prefix = self._match_prefix(name)
+        if prefix is not None:
+            return prefix
+
+        return name or bname
+
+    def _resolve_with_regex(self, bname, name):
+        match = _LEGACY_CODE_RE.match(name)
+        if match:
+            name = match.group(1)
+        name = re.sub(r"^\d{3,4}", "", name)
+        name = _LEGACY_SUFFIX_RE.sub("", name)
+        prefix = self._match_prefix(name)
+        if prefix is not None:
+            return prefix
+        name = _LEGACY_SUFFIX_RE.sub("", re.sub(self._branch_re, "", name))
+        prefix = self._match_prefix(name)
+        if prefix is not None:
+            return prefix
+        return name or bname
+
+    @staticmethod
+    def _strip_suffix(name):
+        for suffix in BRANCH_SUFFIXES:
+            if name.endswith(suffix):
+                return name[: -len(suffix)]
+        return name
+
+
+_DEFAULT_NORMALIZER = None
+
+
+def default_cache_path():
+    value = os.environ.get(CACHE_ENV_VAR)
+    if value is None:
+        return DEFAULT_CACHE_PATH
+    return Path(value) if value.strip() else None
+
+
+def get_default_normalizer() -> BrokerNameNormalizer:
+    global _DEFAULT_NORMALIZER
+    cache_path = default_cache_path()
+    # 快取路徑（環境變數）改變時換一個新的正規化器，測試與基準可指到暫存目錄
+    if _DEFAULT_NORMALIZER is None or _DEFAULT_NORMALIZER.cache_path != cache_path:
+        _DEFAULT_NORMALIZER = BrokerNameNormalizer(cache_path=cache_path)
+    return _DEFAULT_NORMALIZER
+
+
+__all__ = [
+    "BRANCH_RE",
+    "BRANCH_SUFFIXES",
+    "BRANCH_TOKENS",
+    "BROKER_PREFIXES",
+    "BrokerNameNormalizer",
+    "CACHE_ENV_VAR",
+    "DEFAULT_CACHE_PATH",
+    "MAX_CACHED_NAMES",
+    "default_cache_path",
+    "get_default_normalizer",
+]
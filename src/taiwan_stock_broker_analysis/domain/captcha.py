@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import math
+import re
+import threading
+
+import numpy as np
+
+CAPTCHA_LENGTH = 5
+CAPTCHA_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+CAPTCHA_RE = re.compile(rf"^[{CAPTCHA_CHARSET}]{{{CAPTCHA_LENGTH}}}$")
+
+
+def normalize_answer(text) -> str:
+    return re.sub(r"\s+", "", str(text or "")).upper()
+
+
+def is_plausible_answer(text: str) -> bool:
+    return CAPTCHA_RE.match(text or "") is not None
+
+
+def as_candidates(result) -> list:
+    if result is None:
+        return []
+    if isinstance(result, str):
+        return [(result, None)]
+    candidates = []
+    for item in result:
+        if isinstance(item, str):
+            candidates.append((item, None))
+        else:
+            candidates.append((item[0], None if item[1] is None else float(item[1])))
+    return candidates
+
+
+def pick_candidate(result, min_confidence: float = 0.0):
+    for text, confidence in as_candidates(result):
+        answer = normalize_answer(text)
+        if not is_plausible_answer(answer):
+            continue
+        if confidence is not None and confidence < min_confidence:
+            continue
+        return answer, confidence
+    return None, None
+
+
+def decode_ctc_candidates(probabilities, charset, allowed: str = CAPTCHA_CHARSET, top_k: int = 3) -> list:
+    frames = np.asarray(probabilities, dtype=np.float64)
+    frames = frames.reshape(-1, frames.shape[-1])
+    columns, groups = [0], [0]
+    for index, char in enumerate(charset):
+        upper = str(char).upper()
+        if index and len(upper) == 1 and upper in allowed:
+            columns.append(index)
+            groups.append(allowed.index(upper) + 1)
+    merged = np.zeros((frames.shape[0], len(allowed) + 1))
+    np.add.at(merged.T, np.array(groups), frames[:, columns].T)
+    order = np.argsort(-merged, axis=1)
+
+    chars, confidences, runner_ups = [], [], []
+    previous = None
+    for frame, group in enumerate(order[:, 0].tolist()):
+        if group != previous and group != 0:
+            chars.append(allowed[group - 1])
+            confidences.append(float(merged[frame, group]))
+            second = next((int(g) for g in order[frame, 1:] if g != 0), None)
+            runner_ups.append(None if second is None else (allowed[second - 1], float(merged[frame, second])))
+        previous = group
+
+    if not chars:
+        return []
+    best_confidence = float(np.prod(confidences))
+    candidates = [("".join(chars), best_confidence)]
+    for position in np.argsort(confidences).tolist():
+        if len(candidates) >= top_k:
+            break
+        if runner_ups[position] is None:
+            continue
+        char, probability = runner_ups[position]
+        swapped = "".join(chars[:position] + [char] + chars[position + 1:])
+        if all(swapped != text for text, _ in candidates):
+            candidates.append((swapped, best_confidence / confidences[position] * probability))
+    return candidates
+
+
+class CaptchaStats:
+    def __init__(self, target: float = 0.999, min_samples: int = 10):
+        self.target = target
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.submitted = 0
+        self.accepted = 0
+        self.rejected_locally = 0
+
+    def record_attempt(self):
+        with self._lock:
+            self.attempts += 1
+
+    def record_submit(self, accepted: bool):
+        with self._lock:
+            self.submitted += 1
+            self.accepted += int(bool(accepted))
+
+    def record_local_reject(self):
+        with self._lock:
+            self.rejected_locally += 1
+
+    @property
+    def success_rate(self) -> float:
+        with self._lock:
+            # 只看真正送出的答案；本地檢查就換圖的嘗試不算伺服器拒絕
+            return (self.accepted + 1) / (self.submitted + 2)
+
+    def retry_budget(self, default: int) -> int:
+        # 使用者給的重試次數是送出上限，通過率高時只會減少、不會增加
+        if self.submitted < self.min_samples:
+            return default
+        rate = min(max(self.success_rate, 1e-3), 1 - 1e-9)
+        needed = math.ceil(math.log(1 - self.target) / math.log(1 - rate))
+        return max(1, min(needed, default))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts, submitted, accepted, rejected = self.attempts, self.submitted, self.accepted, self.rejected_locally
+        return {
+            "attempts": attempts,
+            "submitted": submitted,
+            "accepted": accepted,
+            "rejected_locally": rejected,
+            "success_rate": (accepted / submitted) if submitted else 0.0,
+        }
+
+
+def format_captcha_stats(stats: dict) -> str:
+    return (
+        f"驗證碼：嘗試 {stats['attempts']} 次，送出 {stats['submitted']} 次，通過 {stats['accepted']} 次"
+        f"（{stats['success_rate']:.0%}），本地檢查直接換圖 {stats['rejected_locally']} 次"
+    )
+
+
+__all__ = [
+    "CAPTCHA_CHARSET",
+    "CAPTCHA_LENGTH",
+    "CaptchaStats",
+    "as_candidates",
+    "decode_ctc_candidates",
+    "format_captcha_stats",
+    "is_plausible_answer",
+    "normalize_answer",
+    "pick_candidate",
+]
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .report_writer import DIRECTORY_MODE
+
+COLUMNAR_FORMATS = ("auto", "feather", "npy")
+FEATHER_SUFFIX = ".feather"
+NPY_SUFFIX = ".npcols"
+SCHEMA_NAME = "schema.json"
+SCHEMA_VERSION = 1
+
+
+def has_pyarrow() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_format(fmt: str) -> str:
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"不支援的欄式格式：{fmt}（可用 {', '.join(COLUMNAR_FORMATS)}）")
+    if fmt == "auto":
+        return "feather" if has_pyarrow() else "npy"
+    if fmt == "feather" and not has_pyarrow():
+        raise RuntimeError("未安裝 pyarrow，無法輸出 Feather；請改用 npy 或 auto")
+    return fmt
+
+
+def table_path(stem: Path, fmt: str) -> Path:
+    suffix = FEATHER_SUFFIX if resolve_format(fmt) == "feather" else NPY_SUFFIX
+    return Path(stem).with_name(Path(stem).name + suffix)
+
+
+def write_table(df: pd.DataFrame, stem: Path, fmt: str = "auto") -> list:
+    fmt = resolve_format(fmt)
+    path = table_path(stem, fmt)
+    if fmt == "feather":
+        return [_write_feather(df, path)]
+    return _write_npy(df, path)
+
+
+def load_table(path, columns=None, mmap: bool = True) -> pd.DataFrame:
+    path = Path(path)
+    if path.suffix == FEATHER_SUFFIX:
+        from pyarrow import feather
+
+        table = feather.read_table(path, columns=columns, memory_map=mmap)
+        return table.to_pandas(split_blocks=True)
+    if path.suffix == NPY_SUFFIX:
+        return _load_npy(path, columns, mmap)
+    raise ValueError(f"無法辨識的欄式檔案：{path}")
+
+
+def find_table(stem: Path):
+    for suffix in (FEATHER_SUFFIX, NPY_SUFFIX):
+        path = Path(stem).with_name(Path(stem).name + suffix)
+        if path.exists():
+            return path
+    return None
+
+
+def remove_table(stem: Path):
+    while True:
+        path = find_table(stem)
+        if path is None:
+            return
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+def _write_feather(df: pd.DataFrame, path: Path) -> Path:
+    from pyarrow import feather
+
+    temp_path = path.with_name(path.name + ".tmp")
+    # 不壓縮才能以 memory map 零複製讀回
+    feather.write_feather(df, temp_path, compression="uncompressed")
+    os.replace(temp_path, path)
+    return path
+
+
+def _encode(series: pd.Series, file_stem: str, directory: Path) -> dict:
+    dtype = series.dtype
+    entry = {"dtype": str(dtype), "file": f"{file_stem}.npy"}
+    if isinstance(dtype, pd.CategoricalDtype):
+        entry.update(
+            kind="category",
+            categories=dtype.categories.tolist(),
+            categories_dtype=str(dtype.categories.dtype),
+            ordered=bool(dtype.ordered),
+        )
+        values = series.array.codes
+    elif isinstance(dtype, pd.StringDtype) or dtype == object:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        if not all(isinstance(value, str) for value in uniques):
+            raise TypeError(f"欄位 {series.name} 含非字串物件，無法以 npy 儲存")
+        entry.update(kind="string", categories=list(uniques))
+        values = codes.astype(np.int32)
+    elif isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        if not hasattr(series.array, "_mask"):
+            raise TypeError(f"欄位 {series.name} 的型別 {dtype} 無法以 npy 儲存")
+        entry.update(kind="masked", mask_file=f"{file_stem}.mask.npy")
+        np.save(directory / entry["mask_file"], series.isna().to_numpy())
+        values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+    else:
+        entry.update(kind="numeric")
+        values = series.to_numpy()
+        if values.dtype == object:
+            raise TypeError(f"欄位 {series.name} 的型別 {dtype} 無法以 npy 儲存")
+    np.save(directory / entry["file"], np.ascontiguousarray(values), allow_pickle=False)
+    return entry
+
+
+def _load_array(path: Path, mmap: bool) -> np.ndarray:
+    values = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    # 以 ndarray view 交給 pandas：仍共用同一段映射記憶體，但下游不會看到 memmap 子類別
+    return values.view(np.ndarray) if isinstance(values, np.memmap) else values
+
+
+def _decode(entry: dict, directory: Path, mmap: bool):
+    values = _load_array(directory / entry["file"], mmap)
+    kind = entry["kind"]
+    if kind == "category":
+        categories = pd.Index(entry["categories"], dtype=entry["categories_dtype"])
+        dtype = pd.CategoricalDtype(categories, ordered=entry["ordered"])
+        return pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+    if kind == "string":
+        categories = np.array(entry["categories"] + [None], dtype=object)
+        return pd.array(categories[values], dtype=entry["dtype"])
+    if kind == "masked":
+        mask = _load_array(directory / entry["mask_file"], mmap)
+        return pd.api.types.pandas_dtype(entry["dtype"]).construct_array_type()(values, mask)
+    return values
+
+
+def _write_npy(df: pd.DataFrame, path: Path) -> list:
+    if isinstance(df.index, pd.MultiIndex) or isinstance(df.columns, pd.MultiIndex):
+        raise TypeError("npy 欄式格式不支援 MultiIndex")
+    temp_dir = Path(tempfile.mkdtemp(prefix=path.name + ".", dir=path.parent))
+    os.chmod(temp_dir, DIRECTORY_MODE)
+    try:
+        columns = []
+        for position, name in enumerate(df.columns):
+            entry = _encode(df.iloc[:, position], f"c{position:03d}", temp_dir)
+            columns.append({"name": str(name), **entry})
+        index = df.index
+        if isinstance(index, pd.RangeIndex):
+            index_entry = {"kind": "range", "start": index.start, "stop": index.stop, "step": index.step}
+        else:
+            index_entry = _encode(index.to_series(index=pd.RangeIndex(len(index))), "index", temp_dir)
+        index_entry["name"] = index.name
+        schema = {"version": SCHEMA_VERSION, "rows": len(df), "index": index_entry, "columns": columns}
+        (temp_dir / SCHEMA_NAME).write_text(json.dumps(schema, ensure_ascii=False, indent=2), encoding="utf-8")
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(temp_dir, path)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    written = [path / SCHEMA_NAME]
+    for entry in columns + ([] if index_entry["kind"] == "range" else [index_entry]):
+        written.append(path / entry["file"])
+        if "mask_file" in entry:
+            written.append(path / entry["mask_file"])
+    return written
+
+
+def _load_npy(path: Path, columns, mmap: bool) -> pd.DataFrame:
+    schema = json.loads((path / SCHEMA_NAME).read_text(encoding="utf-8"))
+    if schema.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"不支援的 schema 版本：{schema.get('version')}")
+    entries = schema["columns"]
+    if columns is not None:
+        by_name = {entry["name"]: entry for entry in entries}
+        missing = [name for name in columns if name not in by_name]
+        if missing:
+            raise KeyError(f"欄位不存在：{', '.join(missing)}")
+        entries = [by_name[name] for name in columns]
+    index_entry = schema["index"]
+    if index_entry["kind"] == "range":
+        index = pd.RangeIndex(index_entry["start"], index_entry["stop"], index_entry["step"], name=index_entry["name"])
+    else:
+        index = pd.Index(_decode(index_entry, path, mmap), name=index_entry["name"], copy=False)
+    data = {entry["name"]: _decode(entry, path, mmap) for entry in entries}
+    return pd.DataFrame(data, index=index, columns=[entry["name"] for entry in entries], copy=False)
+
+
+__all__ = [
+    "COLUMNAR_FORMATS",
+    "FEATHER_SUFFIX",
+    "NPY_SUFFIX",
+    "find_table",
+    "has_pyarrow",
+    "load_table",
+    "remove_table",
+    "resolve_format",
+    "table_path",
+    "write_table",
+]
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from .schema import numeric_array, price_array
+
+SIDE_BUY = 0
+SIDE_SELL = 1
+
+
+class LotQueue:
+    __slots__ = ("qty", "px", "head", "tail")
+
+    def __init__(self, capacity):
+        self.qty = array("q", bytes(8 * max(int(capacity), 1)))
+        self.px = array("d", bytes(8 * max(int(capacity), 1)))
+        self.head = 0
+        self.tail = 0
+
+    def reset(self):
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def lots(self):
+        return list(zip(self.qty[self.head:self.tail], self.px[self.head:self.tail]))
+
+    def remaining(self):
+        total_qty = 0
+        total_amt = 0
+        for index in range(self.head, self.tail):
+            qty = self.qty[index]
+            total_qty += qty
+            total_amt += qty * self.px[index]
+        return total_qty, total_amt
+
+
+def build_fifo_events(d: pd.DataFrame, brokers: pd.Index = None):
+    if brokers is None:
+        broker_codes, brokers = pd.factorize(d["母券商"], sort=True)
+    else:
+        broker_codes = brokers.get_indexer(d["母券商"])
+    seq = numeric_array(d, "序號")
+    price = price_array(d)
+    buy = numeric_array(d, "買進股數")
+    sell = numeric_array(d, "賣出股數")
+
+    valid = broker_codes >= 0
+    buy_mask = valid & (buy > 0)
+    sell_mask = valid & (sell > 0)
+    ev_broker = np.concatenate([broker_codes[buy_mask], broker_codes[sell_mask]])
+    ev_seq = np.concatenate([seq[buy_mask], seq[sell_mask]])
+    ev_side = np.concatenate([
+        np.full(int(buy_mask.sum()), SIDE_BUY, dtype=np.int8),
+        np.full(int(sell_mask.sum()), SIDE_SELL, dtype=np.int8),
+    ])
+    ev_qty = np.concatenate([buy[buy_mask], sell[sell_mask]]).astype(np.int64)
+    ev_px = np.concatenate([price[buy_mask], price[sell_mask]])
+
+    order = np.lexsort((ev_side, ev_seq, ev_broker))
+    return (
+        np.ascontiguousarray(ev_broker[order]),
+        np.ascontiguousarray(ev_side[order]),
+        np.ascontiguousarray(ev_qty[order]),
+        np.ascontiguousarray(ev_px[order]),
+        brokers,
+    )
+
+
+def _empty_lots():
+    return tuple(np.empty(0, dtype=dtype) for dtype in (np.int64, np.int8, np.int64, np.float64))
+
+
+def build_opening_lots(lots: pd.DataFrame, brokers: pd.Index):
+    if lots is None or len(lots) == 0:
+        return None
+    lot_broker = brokers.get_indexer(lots["母券商"])
+    order = np.argsort(lot_broker, kind="stable")
+    return (
+        np.ascontiguousarray(lot_broker[order]),
+        np.ascontiguousarray(np.where(lots["方向"].to_numpy() == "空", SIDE_SELL, SIDE_BUY).astype(np.int8)[order]),
+        np.ascontiguousarray(lots["股數"].to_numpy(dtype=np.int64)[order]),
+        np.ascontiguousarray(lots["價格"].to_numpy(dtype=np.float64)[order]),
+    )
+
+
+def match_fifo(
+    ev_broker,
+    ev_side,
+    ev_qty,
+    ev_px,
+    fee_rate: float,
+    day_trade_tax: float,
+    opening=None,
+    carry_tax: float = None,
+):
+    if opening is None:
+        opening = _empty_lots()
+    lot_broker, lot_side, lot_qty, lot_px = opening
+    carry_tax = day_trade_tax if carry_tax is None else carry_tax
+    n_events = len(ev_broker)
+    n_lots = len(lot_broker)
+    if n_events + n_lots == 0:
+        return np.empty(0, dtype=np.int64), {}
+
+    broker_ids = np.union1d(ev_broker, lot_broker).astype(np.int64)
+    starts = np.searchsorted(ev_broker, broker_ids, side="left")
+    stops = np.searchsorted(ev_broker, broker_ids, side="right")
+    lot_starts = np.searchsorted(lot_broker, broker_ids, side="left")
+    lot_stops = np.searchsorted(lot_broker, broker_ids, side="right")
+
+    sides = ev_side.tolist()
+    qtys = ev_qty.tolist()
+    pxs = ev_px.tolist()
+    open_sides = lot_side.tolist()
+    open_qtys = lot_qty.tolist()
+    open_pxs = lot_px.tolist()
+    long_lots = LotQueue(n_events + n_lots)
+    short_lots = LotQueue(n_events + n_lots)
+
+    n_brokers = len(broker_ids)
+    matched_out = np.zeros(n_brokers, dtype=np.int64)
+    realized_out = np.zeros(n_brokers, dtype=np.float64)
+    fee_out = np.zeros(n_brokers, dtype=np.float64)
+    tax_out = np.zeros(n_brokers, dtype=np.float64)
+    rem_long_qty = np.zeros(n_brokers, dtype=np.int64)
+    rem_long_amt = np.zeros(n_brokers, dtype=np.float64)
+    rem_short_qty = np.zeros(n_brokers, dtype=np.int64)
+    rem_short_amt = np.zeros(n_brokers, dtype=np.float64)
+    closing_slot = array("q")
+    closing_side = array("b")
+    closing_qty = array("q")
+    closing_px = array("d")
+
+    long_q, long_p = long_lots.qty, long_lots.px
+    short_q, short_p = short_lots.qty, short_lots.px
+    ranges = zip(starts.tolist(), stops.tolist(), lot_starts.tolist(), lot_stops.tolist())
+    for slot, (start, stop, lot_start, lot_stop) in enumerate(ranges):
+        long_head = long_tail = 0
+        short_head = short_tail = 0
+        for index in range(lot_start, lot_stop):
+            if open_sides[index] == SIDE_BUY:
+                long_q[long_tail] = open_qtys[index]
+                long_p[long_tail] = open_pxs[index]
+                long_tail += 1
+            else:
+                short_q[short_tail] = open_qtys[index]
+                short_p[short_tail] = open_pxs[index]
+                short_tail += 1
+        long_carried = long_tail
+        short_carried = short_tail
+        realized = 0.0
+        fee_sum = 0.0
+        tax_sum = 0.0
+        matched_shares = 0
+        for index in range(start, stop):
+            qty = qtys[index]
+            px = pxs[index]
+            if sides[index] == SIDE_BUY:
+                while qty > 0 and short_head < short_tail:
+                    short_qty = short_q[short_head]
+                    short_px = short_p[short_head]
+                    matched = qty if qty < short_qty else short_qty
+                    realized += matched * (short_px - px)
+                    fee_sum += (matched * px) * fee_rate + (matched * short_px) * fee_rate
+                    tax_sum += (matched * short_px) * (carry_tax if short_head < short_carried else day_trade_tax)
+                    matched_shares += matched
+                    qty -= matched
+                    short_qty -= matched
+                    if short_qty == 0:
+                        short_head += 1
+                    else:
+                        short_q[short_head] = short_qty
+                if qty > 0:
+                    long_q[long_tail] = qty
+                    long_p[long_tail] = px
+                    long_tail += 1
+            else:
+                while qty > 0 and long_head < long_tail:
+                    long_qty = long_q[long_head]
+                    long_px = long_p[long_head]
+                    matched = qty if qty < long_qty else long_qty
+                    realized += matched * (px - long_px)
+                    fee_sum += (matched * long_px) * fee_rate + (matched * px) * fee_rate
+                    tax_sum += (matched * px) * (carry_tax if long_head < long_carried else day_trade_tax)
+                    matched_shares += matched
+                    qty -= matched
+                    long_qty -= matched
+                    if long_qty == 0:
+                        long_head += 1
+                    else:
+                        long_q[long_head] = long_qty
+                if qty > 0:
+                    short_q[short_tail] = qty
+                    short_p[short_tail] = px
+                    short_tail += 1
+
+        long_lots.head, long_lots.tail = long_head, long_tail
+        short_lots.head, short_lots.tail = short_head, short_tail
+        matched_out[slot] = matched_shares
+        realized_out[slot] = realized
+        fee_out[slot] = fee_sum
+        tax_out[slot] = tax_sum
+        rem_long_qty[slot], rem_long_amt[slot] = long_lots.remaining()
+        rem_short_qty[slot], rem_short_amt[slot] = short_lots.remaining()
+        for side, queue in ((SIDE_BUY, long_lots), (SIDE_SELL, short_lots)):
+            head, tail = queue.head, queue.tail
+            if tail > head:
+                closing_slot.extend([slot] * (tail - head))
+                closing_side.extend([side] * (tail - head))
+                closing_qty.extend(queue.qty[head:tail])
+                closing_px.extend(queue.px[head:tail])
+
+    return broker_ids, {
+        "matched": matched_out,
+        "realized": realized_out,
+        "fee": fee_out,
+        "tax": tax_out,
+        "rem_long_qty": rem_long_qty,
+        "rem_long_amt": rem_long_amt,
+        "rem_short_qty": rem_short_qty,
+        "rem_short_amt": rem_short_amt,
+        "closing": (
+            broker_ids[np.frombuffer(closing_slot, dtype=np.int64)],
+            np.frombuffer(closing_side, dtype=np.int8).copy(),
+            np.frombuffer(closing_qty, dtype=np.int64).copy(),
+            np.frombuffer(closing_px, dtype=np.float64).copy(),
+        ),
+    }
+
+
+def closing_lots_frame(closing, brokers: pd.Index) -> pd.DataFrame:
+    if closing is None:
+        closing = _empty_lots()
+    lot_broker, lot_side, lot_qty, lot_px = closing
+    return pd.DataFrame({
+        "母券商": pd.Categorical(np.asarray(brokers, dtype=object)[lot_broker]),
+        "方向": pd.Categorical(np.where(lot_side == SIDE_SELL, "空", "多"), categories=["多", "空"]),
+        "股數": lot_qty,
+        "價格": lot_px,
+    })
+
+
+__all__ = [
+    "LotQueue",
+    "SIDE_BUY",
+    "SIDE_SELL",
+    "build_fifo_events",
+    "build_opening_lots",
+    "closing_lots_frame",
+    "match_fifo",
+]
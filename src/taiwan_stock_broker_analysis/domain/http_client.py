@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+
+class PooledHttpClient:
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+    ):
+        self.pool_size = max(int(pool_size), 1)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self._lock = threading.Lock()
+        self._retired = {"requests": 0, "new_connections": 0}
+        self._adapter.poolmanager.pools.dispose_func = self._retire_pool
+        self.sessions = 0
+
+    def new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount("http://", self._adapter)
+        session.mount("https://", self._adapter)
+        with self._lock:
+            self.sessions += 1
+        return session
+
+    def timeout(self, read_timeout: float = None):
+        read_timeout = self.read_timeout if read_timeout is None else read_timeout
+        return min(self.connect_timeout, read_timeout), read_timeout
+
+    def stats(self) -> dict:
+        with self._lock:
+            total_requests = self._retired["requests"]
+            new_connections = self._retired["new_connections"]
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total_requests += pool.num_requests
+                new_connections += pool.num_connections
+        return {
+            "sessions": self.sessions,
+            "requests": total_requests,
+            "new_connections": new_connections,
+            "reused": max(total_requests - new_connections, 0),
+        }
+
+    def close(self):
+        self._adapter.close()
+
+    def _retire_pool(self, pool):
+        with self._lock:
+            self._retired["requests"] += pool.num_requests
+            self._retired["new_connections"] += pool.num_connections
+        pool.close()
+
+
+def format_http_stats(stats: dict) -> str:
+    reuse_rate = stats["reused"] / stats["requests"] if stats["requests"] else 0.0
+    return (
+        f"HTTP 連線：{stats['requests']} 個請求，新建 {stats['new_connections']} 條連線，"
+        f"重用 {stats['reused']} 次（{reuse_rate:.0%}），{stats['sessions']} 個 session"
+    )
+
+
+_DEFAULT_CLIENT = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def get_default_http_client(pool_size: int = None) -> PooledHttpClient:
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = PooledHttpClient(pool_size=pool_size or DEFAULT_POOL_SIZE)
+        elif pool_size is not None and pool_size > _DEFAULT_CLIENT.pool_size:
+            _DEFAULT_CLIENT.close()
+            _DEFAULT_CLIENT = PooledHttpClient(pool_size=pool_size)
+        return _DEFAULT_CLIENT
+
+
+__all__ = [
+    "DEFAULT_CONNECT_TIMEOUT",
+    "DEFAULT_POOL_SIZE",
+    "DEFAULT_READ_TIMEOUT",
+    "PooledHttpClient",
+    "format_http_stats",
+    "get_default_http_client",
+]
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import heapq
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOP_K = 10
+STOCK_DIR_RE = re.compile(r"^analysis_(?P<stock_code>[0-9A-Za-z]+)(?:_|$)")
+SOURCE_REPORT = "step5_fifo_with_carry"
+SOURCE_COLUMNS = [
+    "回轉股數(FIFO)",
+    "已實現毛利(FIFO)",
+    "手續費合計(FIFO)",
+    "證交稅合計(FIFO)",
+    "已實現淨損益(FIFO)",
+    "買股數(全日)",
+    "賣股數(全日)",
+    "均買價(全日)",
+    "均賣價(全日)",
+]
+# 跨股票股數不能相加，買賣超改用金額（股數 × step5 的全日均價）
+TOTAL_COLUMNS = [
+    "股票數",
+    "已實現毛利(FIFO)",
+    "手續費合計(FIFO)",
+    "證交稅合計(FIFO)",
+    "已實現淨損益(FIFO)",
+    "買金額(全日)",
+    "賣金額(全日)",
+]
+MOTHER_COLUMNS = [
+    "母券商",
+    "股票數",
+    "買金額(全日)",
+    "賣金額(全日)",
+    "買超金額",
+    "已實現毛利(FIFO)",
+    "手續費合計(FIFO)",
+    "證交稅合計(FIFO)",
+    "已實現淨損益(FIFO)",
+]
+PAIR_COLUMNS = [
+    "股票代碼",
+    "母券商",
+    "買股數(全日)",
+    "賣股數(全日)",
+    "買超張數",
+    "買超金額",
+    "回轉張數(FIFO)",
+    "已實現淨損益(FIFO)",
+]
+MARKET_REPORTS = [
+    "market_step6_top_profit",
+    "market_step6_top_loss",
+    "market_step7_top_netbuy",
+    "market_step7_top_netsell",
+    "market_stock_top_profit",
+    "market_stock_top_loss",
+    "market_stock_top_netbuy",
+    "market_stock_top_netsell",
+]
+
+
+def stock_code_from_outdir(outdir: Path):
+    match = STOCK_DIR_RE.match(Path(outdir).name)
+    return match.group("stock_code") if match else None
+
+
+class TopK:
+    def __init__(self, k: int):
+        self.k = k
+        self.heap = []
+
+    def push(self, key, payload):
+        item = (key, payload)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            heapq.heapreplace(self.heap, item)
+
+    def merge(self, other: "TopK"):
+        for key, payload in other.heap:
+            self.push(key, payload)
+
+    def items(self) -> list:
+        return [payload for _, payload in sorted(self.heap, reverse=True)]
+
+
+class MarketLeaderboard:
+    def __init__(self, k: int = DEFAULT_TOP_K):
+        if k < 1:
+            raise ValueError(f"排行榜筆數必須大於 0：{k}")
+        self.k = k
+        self.stocks = 0
+        self.rows = 0
+        self._slots = {}
+        self._totals = np.zeros((0, len(TOTAL_COLUMNS)))
+        self._pairs = {name: TopK(k) for name in MARKET_REPORTS[4:]}
+
+    def add(self, stock_code: str, fifo: pd.DataFrame):
+        brokers = (fifo["母券商"] if "母券商" in fifo.columns else fifo.index).astype(str).tolist()
+        matrix = np.nan_to_num(fifo[SOURCE_COLUMNS].to_numpy(dtype=np.float64, na_value=np.nan))
+        values = dict(zip(SOURCE_COLUMNS, matrix.T))
+        buy_amount = values["買股數(全日)"] * values["均買價(全日)"]
+        sell_amount = values["賣股數(全日)"] * values["均賣價(全日)"]
+        stacked = np.column_stack([
+            np.ones(len(brokers)),
+            values["已實現毛利(FIFO)"],
+            values["手續費合計(FIFO)"],
+            values["證交稅合計(FIFO)"],
+            values["已實現淨損益(FIFO)"],
+            buy_amount,
+            sell_amount,
+        ])
+        np.add.at(self._totals_for(brokers), [self._slots[broker] for broker in brokers], stacked)
+        self.stocks += 1
+        self.rows += len(brokers)
+
+        net = values["已實現淨損益(FIFO)"]
+        net_amount = buy_amount - sell_amount
+        stock_code = str(stock_code)
+        for name, scores in [
+            ("market_stock_top_profit", net),
+            ("market_stock_top_loss", -net),
+            ("market_stock_top_netbuy", net_amount),
+            ("market_stock_top_netsell", -net_amount),
+        ]:
+            heap = self._pairs[name]
+            candidates = np.flatnonzero(scores > 0)
+            if len(heap.heap) == self.k:
+                candidates = candidates[scores[candidates] >= heap.heap[0][0][0]]
+            if len(candidates) > self.k:
+                candidates = candidates[np.argpartition(scores[candidates], -self.k)[-self.k:]]
+            for row in candidates.tolist():
+                buy_shares = int(values["買股數(全日)"][row])
+                sell_shares = int(values["賣股數(全日)"][row])
+                heap.push((float(scores[row]), stock_code, brokers[row]), (
+                    stock_code,
+                    brokers[row],
+                    buy_shares,
+                    sell_shares,
+                    int(round((buy_shares - sell_shares) / 1000)),
+                    round(float(net_amount[row])),
+                    int(round(values["回轉股數(FIFO)"][row] / 1000)),
+                    int(net[row]),
+                ))
+
+    def merge(self, other: "MarketLeaderboard"):
+        if other.k != self.k:
+            raise ValueError(f"排行榜筆數不同，無法合併：{self.k} vs {other.k}")
+        brokers = list(other._slots)
+        if brokers:
+            np.add.at(self._totals_for(brokers), [self._slots[broker] for broker in brokers], other._totals)
+        for name, heap in self._pairs.items():
+            heap.merge(other._pairs[name])
+        self.stocks += other.stocks
+        self.rows += other.rows
+
+    def totals(self) -> pd.DataFrame:
+        frame = pd.DataFrame(self._totals, index=pd.Index(list(self._slots), name="母券商"), columns=TOTAL_COLUMNS)
+        frame["買超金額"] = frame["買金額(全日)"] - frame["賣金額(全日)"]
+        for column in TOTAL_COLUMNS:
+            frame[column] = frame[column].round(0).astype("int64")
+        frame["買超金額"] = frame["買超金額"].round(0).astype("int64")
+        return frame.reset_index()[MOTHER_COLUMNS]
+
+    def reports(self) -> dict:
+        totals = self.totals()
+        net = totals["已實現淨損益(FIFO)"]
+        netflow = totals["買超金額"]
+        reports = {
+            "market_step6_top_profit": self._rank(totals[net > 0], "已實現淨損益(FIFO)", False),
+            "market_step6_top_loss": self._rank(totals[net < 0], "已實現淨損益(FIFO)", True),
+            "market_step7_top_netbuy": self._rank(totals[netflow > 0], "買超金額", False),
+            "market_step7_top_netsell": self._rank(totals[netflow < 0], "買超金額", True),
+        }
+        for name, heap in self._pairs.items():
+            reports[name] = pd.DataFrame(heap.items(), columns=PAIR_COLUMNS)
+        return reports
+
+    def _rank(self, frame: pd.DataFrame, column: str, ascending: bool) -> pd.DataFrame:
+        ordered = frame.sort_values([column, "母券商"], ascending=[ascending, True], kind="stable")
+        return ordered.head(self.k).reset_index(drop=True)
+
+    def _totals_for(self, brokers) -> np.ndarray:
+        added = [broker for broker in dict.fromkeys(brokers) if broker not in self._slots]
+        for broker in added:
+            self._slots[broker] = len(self._slots)
+        if added:
+            self._totals = np.vstack([self._totals, np.zeros((len(added), len(TOTAL_COLUMNS)))])
+        return self._totals
+
+
+__all__ = [
+    "DEFAULT_TOP_K",
+    "MARKET_REPORTS",
+    "MarketLeaderboard",
+    "SOURCE_COLUMNS",
+    "SOURCE_REPORT",
+    "TopK",
+    "stock_code_from_outdir",
+]
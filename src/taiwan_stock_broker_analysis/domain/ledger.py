@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from .schema import PRICE_TICK_COLUMN, SHARE_COLUMNS, TICK_SCALE, numeric_array, price_array
+
+LEDGER_COLUMNS = ["買股數", "賣股數", "買金額", "賣金額", "均買價", "均賣價"]
+
+
+def _plain_index(index: pd.Index) -> pd.Index:
+    if isinstance(index, pd.CategoricalIndex):
+        return pd.Index(np.asarray(index), name=index.name)
+    return index
+
+
+def _with_averages(ledger: pd.DataFrame) -> pd.DataFrame:
+    ledger["均買價"] = np.where(ledger["買股數"] > 0, ledger["買金額"] / ledger["買股數"], np.nan)
+    ledger["均賣價"] = np.where(ledger["賣股數"] > 0, ledger["賣金額"] / ledger["賣股數"], np.nan)
+    return ledger
+
+
+def build_broker_ledger(df: pd.DataFrame, by_col: str = "母券商") -> pd.DataFrame:
+    price = price_array(df)
+    buy = numeric_array(df, "買進股數")
+    sell = numeric_array(df, "賣出股數")
+    amounts = pd.DataFrame({
+        "買股數": buy,
+        "賣股數": sell,
+        "買金額": price * buy,
+        "賣金額": price * sell,
+    }, index=df.index)
+    ledger = amounts.groupby(df[by_col], sort=True, observed=True, dropna=False).sum()
+    ledger.index = _plain_index(ledger.index)
+    return _with_averages(ledger)
+
+
+class LedgerAccumulator:
+    # 分塊累加各券商的股數與金額；價格為整數檔位、股數為整數時金額以「分」整數累加，與塊的切法無關
+    def __init__(self):
+        self.names = []
+        self.rows = 0
+        self.chunks = 0
+        self._slots = {}
+        self._shares = np.zeros((2, 0), dtype=np.float64)
+        self._cents = np.zeros((2, 0), dtype=np.int64)
+        self._amounts = np.zeros((2, 0), dtype=np.float64)
+
+    def add(self, chunk: pd.DataFrame, by_col: str = "券商"):
+        brokers = chunk[by_col]
+        if not isinstance(brokers.dtype, pd.CategoricalDtype):
+            brokers = brokers.astype("category")
+        codes = brokers.cat.codes.to_numpy()
+        categories = brokers.cat.categories
+        lookup = np.full(len(categories), -1, dtype=np.int64)
+        for code in np.unique(codes):
+            lookup[code] = self._slot(categories[code])
+        self._grow()
+        slots = lookup[codes]
+        size = len(self.names)
+        shares = [numeric_array(chunk, column) for column in SHARE_COLUMNS]
+        ticks = self._ticks(chunk)
+        for side, values in enumerate(shares):
+            self._shares[side] += np.bincount(slots, weights=np.nan_to_num(values), minlength=size)
+            integral = chunk[SHARE_COLUMNS[side]].dtype.kind in "iu"
+            if ticks is not None and integral:
+                np.add.at(self._cents[side], slots, ticks * chunk[SHARE_COLUMNS[side]].to_numpy(dtype=np.int64))
+            else:
+                amounts = np.nan_to_num(price_array(chunk) * values)
+                self._amounts[side] += np.bincount(slots, weights=amounts, minlength=size)
+        self.rows += len(chunk)
+        self.chunks += 1
+
+    def ledger(self, by_col: str = "券商", groups=None) -> pd.DataFrame:
+        names = np.array(self.names + [""], dtype=object)[:-1]
+        shares, cents, amounts = self._shares, self._cents, self._amounts
+        if groups is None:
+            order = np.argsort(names, kind="stable")
+            keys, shares, cents, amounts = names[order], shares[:, order], cents[:, order], amounts[:, order]
+        else:
+            keys, inverse = np.unique(np.asarray(groups, dtype=object), return_inverse=True)
+            shares, cents, amounts = (self._reduce(values, inverse, len(keys)) for values in (shares, cents, amounts))
+        ledger = pd.DataFrame({
+            "買股數": shares[0],
+            "賣股數": shares[1],
+            "買金額": cents[0] / TICK_SCALE + amounts[0],
+            "賣金額": cents[1] / TICK_SCALE + amounts[1],
+        }, index=pd.Index(keys, name=by_col))
+        return _with_averages(ledger)
+
+    @staticmethod
+    def _reduce(values: np.ndarray, inverse: np.ndarray, size: int) -> np.ndarray:
+        reduced = np.zeros((values.shape[0], size), dtype=values.dtype)
+        for side in range(values.shape[0]):
+            np.add.at(reduced[side], inverse, values[side])
+        return reduced
+
+    @staticmethod
+    def _ticks(chunk: pd.DataFrame):
+        if PRICE_TICK_COLUMN in chunk.columns:
+            return chunk[PRICE_TICK_COLUMN].to_numpy(dtype=np.int64)
+        prices = price_array(chunk)
+        ticks = np.rint(prices * TICK_SCALE)
+        if np.isnan(prices).any() or not np.array_equal(ticks / TICK_SCALE, prices):
+            return None
+        return ticks.astype(np.int64)
+
+    def _slot(self, name) -> int:
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = len(self.names)
+            self.names.append(name)
+        return slot
+
+    def _grow(self):
+        missing = len(self.names) - self._shares.shape[1]
+        if missing > 0:
+            self._shares = np.pad(self._shares, ((0, 0), (0, missing)))
+            self._cents = np.pad(self._cents, ((0, 0), (0, missing)))
+            self._amounts = np.pad(self._amounts, ((0, 0), (0, missing)))
+
+
+__all__ = [
+    "LEDGER_COLUMNS",
+    "LedgerAccumulator",
+    "build_broker_ledger",
+]
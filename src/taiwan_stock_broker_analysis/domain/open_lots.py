@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from .columnar import find_table, load_table, remove_table, resolve_format, write_table
+
+LOT_COLUMNS = ["母券商", "方向", "股數", "價格"]
+
+
+class OpenLotStore:
+    def __init__(self, root, fmt: str = "auto"):
+        self.root = Path(root)
+        self.fmt = resolve_format(fmt)
+
+    def days(self, stock_code: str) -> list:
+        stock_dir = self.root / str(stock_code).strip()
+        if not stock_dir.is_dir():
+            return []
+        days = set()
+        for child in stock_dir.iterdir():
+            try:
+                days.add(date.fromisoformat(child.name.split(".")[0]))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    def save(self, stock_code: str, day: date, lots: pd.DataFrame):
+        stem = self.root / str(stock_code).strip() / day.isoformat()
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        remove_table(stem)
+        return write_table(lots[LOT_COLUMNS].reset_index(drop=True), stem, self.fmt)
+
+    def load(self, stock_code: str, day: date, mmap: bool = True) -> pd.DataFrame:
+        path = find_table(self.root / str(stock_code).strip() / day.isoformat())
+        if path is None:
+            raise FileNotFoundError(f"找不到未平倉快照：{stock_code} {day.isoformat()}")
+        return load_table(path, mmap=mmap)
+
+    def latest_before(self, stock_code: str, day: date):
+        earlier = [snapshot_day for snapshot_day in self.days(stock_code) if snapshot_day < day]
+        if not earlier:
+            return None, None
+        return earlier[-1], self.load(stock_code, earlier[-1])
+
+
+def format_open_lots(stock_code: str, day: date, lots: pd.DataFrame, opened_from: date = None) -> str:
+    source = f"承接 {opened_from.isoformat()} 未平倉" if opened_from else "無前日未平倉"
+    shares = int(lots["股數"].sum()) if len(lots) else 0
+    brokers = lots["母券商"].nunique() if len(lots) else 0
+    return f"FIFO 結轉：{stock_code} {day.isoformat()}（{source}），期末 {brokers} 家券商 {len(lots):,} 筆未平倉、{shares:,} 股"
+
+
+__all__ = [
+    "LOT_COLUMNS",
+    "OpenLotStore",
+    "format_open_lots",
+]
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+
+from .report_writer import atomic_write, file_lock
+from .twse_csv import read_text_preamble
+
+CACHE_ENV_VAR = "TSBA_RAW_CACHE"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "taiwan_stock_broker_analysis" / "raw_csv"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+TAIPEI_TZ = timezone(timedelta(hours=8))
+PUBLISH_TIME = dtime(16, 0)
+INDEX_NAME = "index.json"
+LOCK_NAME = "index.lock"
+# 其他行程剛寫入、還沒登記到索引的檔案不會被回收
+DEFAULT_BLOB_GRACE_SECONDS = 3600
+
+
+def trading_date(now: datetime = None, publish_time: dtime = PUBLISH_TIME) -> date:
+    # 券商分點資料於收盤後公布；公布前查到的仍是前一個交易日（以平日近似，不含國定假日）
+    now = datetime.now(TAIPEI_TZ) if now is None else now
+    if now.tzinfo is not None:
+        now = now.astimezone(TAIPEI_TZ)
+    day = now.date()
+    if now.time() < publish_time:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def content_hash(csv_text: str) -> str:
+    return hashlib.sha256(csv_text.encode("utf-8")).hexdigest()
+
+
+class RawCsvCache:
+    def __init__(
+        self,
+        cache_dir,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+        clock=time.time,
+        blob_grace_seconds: float = DEFAULT_BLOB_GRACE_SECONDS,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.clock = clock
+        self.blob_grace_seconds = blob_grace_seconds
+        self._lock = threading.Lock()
+        self._index = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(stock_code: str, day: date = None) -> str:
+        day = trading_date() if day is None else day
+        return f"{str(stock_code).strip()}@{day.isoformat()}"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / f"{digest}.csv"
+
+    def get(self, stock_code: str, day: date = None):
+        day = trading_date() if day is None else day
+        key = self.key(stock_code, day)
+        with self._lock:
+            entry = self._load_index().get(key)
+            if entry is None:
+                # 其他行程（CLI / 常駐服務）可能已寫入，重讀一次磁碟上的索引
+                self._index = self._read_index()
+                entry = self._index.get(key)
+            if entry is not None and self._expired(entry):
+                entry = None
+            text = None
+            if entry is not None:
+                try:
+                    text = self.blob_path(entry["sha256"]).read_bytes().decode("utf-8")
+                except OSError:
+                    text = None
+                if text is not None and content_hash(text) != entry["sha256"]:
+                    text = None
+                # 檔頭沒有資料日期或日期不是要的那天（時鐘推算錯誤、舊版快取）時不能確定是當天資料，視為未命中
+                if text is not None and read_text_preamble(text)["trade_date"] != day:
+                    text = None
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return text
+
+    def path_for(self, stock_code: str, day: date = None):
+        with self._lock:
+            entry = self._load_index().get(self.key(stock_code, day))
+        return None if entry is None else self.blob_path(entry["sha256"])
+
+    def put(self, stock_code: str, csv_text: str, day: date = None) -> Path:
+        # 以下載內容的資料日期為鍵，沒有時才用時鐘推算
+        day = read_text_preamble(csv_text)["trade_date"] if day is None else day
+        key = self.key(stock_code, day)
+        digest = content_hash(csv_text)
+        path = self.blob_path(digest)
+        with self._lock:
+            try:
+                with self._index_lock():
+                    # 以磁碟上最新的索引為準再加入這一筆，不會蓋掉其他行程同時寫入的項目
+                    index = self._read_index()
+                    if not path.exists():
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        self._write_text(path, csv_text)
+                    index[key] = {"sha256": digest, "size": path.stat().st_size, "stored_at": self.clock()}
+                    self.stores += 1
+                    self._evict(index)
+                    self._save_index(index)
+                    self._index = index
+            except OSError:
+                return None
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            digests = {entry["sha256"]: entry["size"] for entry in index.values()}
+            return {
+                "entries": len(index),
+                "blobs": len(digests),
+                "bytes": sum(digests.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+    def prune(self) -> int:
+        with self._lock, self._index_lock():
+            index = self._read_index()
+            before = self.evictions
+            self._evict(index)
+            self._save_index(index)
+            self._index = index
+            return self.evictions - before
+
+    def _expired(self, entry) -> bool:
+        if self.max_age_days is None:
+            return False
+        return self.clock() - entry["stored_at"] > self.max_age_days * 86400
+
+    def _evict(self, index):
+        for key in [key for key, entry in index.items() if self._expired(entry)]:
+            del index[key]
+            self.evictions += 1
+        if self.max_bytes is not None:
+            sizes = {}
+            for entry in index.values():
+                sizes[entry["sha256"]] = entry["size"]
+            total = sum(sizes.values())
+            for key, entry in sorted(index.items(), key=lambda item: item[1]["stored_at"]):
+                if total <= self.max_bytes:
+                    break
+                del index[key]
+                self.evictions += 1
+                if all(other["sha256"] != entry["sha256"] for other in index.values()):
+                    total -= sizes[entry["sha256"]]
+        self._collect_blobs(index)
+
+    def _collect_blobs(self, index):
+        live = {entry["sha256"] for entry in index.values()}
+        blob_root = self.cache_dir / "blobs"
+        if not blob_root.is_dir():
+            return
+        cutoff = time.time() - self.blob_grace_seconds
+        for path in blob_root.glob("*/*.csv"):
+            if path.stem not in live:
+                try:
+                    if path.stat().st_mtime <= cutoff:
+                        path.unlink()
+                except OSError:
+                    pass
+
+    def _load_index(self) -> dict:
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def _read_index(self) -> dict:
+        try:
+            payload = json.loads((self.cache_dir / INDEX_NAME).read_text(encoding="utf-8"))
+            return dict(payload.get("entries", {}))
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _index_lock(self):
+        # 跨行程的索引鎖：讀取、合併、寫回索引與回收檔案都在鎖內完成
+        return file_lock(self.cache_dir / LOCK_NAME)
+
+    def _save_index(self, index):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._write_text(self.cache_dir / INDEX_NAME, json.dumps({"entries": index}, ensure_ascii=False))
+
+    @staticmethod
+    def _write_text(path: Path, text: str):
+        atomic_write(path, lambda temp_name: Path(temp_name).write_text(text, encoding="utf-8", newline=""))
+
+
+def format_raw_cache_stats(stats: dict) -> str:
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups if lookups else 0.0
+    return (
+        f"原始 CSV 快取：命中 {stats['hits']} 次，未命中 {stats['misses']} 次（命中率 {hit_rate:.0%}），"
+        f"新增 {stats['stores']} 筆，淘汰 {stats['evictions']} 筆，"
+        f"共 {stats['entries']} 筆 / {stats['blobs']} 個檔案 / {stats['bytes'] / 1024:.0f} KB"
+    )
+
+
+def default_cache_dir():
+    value = os.environ.get(CACHE_ENV_VAR)
+    if value is None:
+        return DEFAULT_CACHE_DIR
+    return Path(value) if value.strip() else None
+
+
+_DEFAULT_CACHE = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_raw_csv_cache():
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            cache_dir = default_cache_dir()
+            _DEFAULT_CACHE = False if cache_dir is None else RawCsvCache(cache_dir)
+        return _DEFAULT_CACHE or None
+
+
+__all__ = [
+    "CACHE_ENV_VAR",
+    "DEFAULT_BLOB_GRACE_SECONDS",
+    "DEFAULT_CACHE_DIR",
+    "RawCsvCache",
+    "content_hash",
+    "default_cache_dir",
+    "format_raw_cache_stats",
+    "get_raw_csv_cache",
+    "trading_date",
+]
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+
+from .tracing import get_tracer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_MAX_PENDING = 4
+
+
+def _current_umask() -> int:
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# 暫存檔建立時為 0600，換上前改回一般檔案的權限（與 open() 建檔相同）
+FILE_MODE = 0o666 & ~_current_umask()
+DIRECTORY_MODE = 0o777 & ~_current_umask()
+
+
+def atomic_write(path: Path, write) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=path.suffix, delete=False) as file_obj:
+        temp_name = file_obj.name
+    try:
+        write(temp_name)
+        os.chmod(temp_name, FILE_MODE)
+        os.replace(temp_name, path)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+        raise
+    return path
+
+
+@contextmanager
+def file_lock(path: Path):
+    # 跨行程的互斥鎖（CLI 與常駐服務共用同一個目錄時），鎖檔本身不放內容
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ReportWriter:
+    def __init__(self, background: bool = True, max_pending: int = DEFAULT_MAX_PENDING, tracer=None):
+        self.background = background
+        self.tracer = get_tracer(tracer)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tsba-report") if background else None
+        self._slots = threading.BoundedSemaphore(max(int(max_pending), 1))
+        self._futures = []
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+    def write(self, path: Path, write) -> Path:
+        path = Path(path)
+        self.submit(lambda: self._write(path, write))
+        return path
+
+    def submit(self, task):
+        self._raise_failed()
+        if self._executor is None:
+            self._run(task)
+            return
+        started = time.perf_counter()
+        self._slots.acquire()
+        self.blocked_seconds += time.perf_counter() - started
+        try:
+            self._futures.append(self._executor.submit(self._run, task, True))
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def flush(self):
+        futures, self._futures = self._futures, []
+        wait(futures)
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "background": self.background,
+            "writes": self.writes,
+            "write_seconds": round(self.write_seconds, 6),
+            "blocked_seconds": round(self.blocked_seconds, 6),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+            return False
+        wait(self._futures)
+        self._futures = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        return False
+
+    def _write(self, path: Path, write):
+        with self.tracer.span(f"write.{path.suffix.lstrip('.') or 'file'}", file=path.name) as span:
+            atomic_write(path, write)
+            span.set(bytes=path.stat().st_size)
+
+    def _run(self, task, release: bool = False):
+        started = time.perf_counter()
+        try:
+            task()
+        finally:
+            with self._lock:
+                self.writes += 1
+                self.write_seconds += time.perf_counter() - started
+            if release:
+                self._slots.release()
+
+    def _raise_failed(self):
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                self.flush()
+
+
+__all__ = [
+    "DEFAULT_MAX_PENDING",
+    "ReportWriter",
+    "DIRECTORY_MODE",
+    "FILE_MODE",
+    "atomic_write",
+    "file_lock",
+]
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+TICK_SCALE = 100
+PRICE_COLUMN = "價格"
+PRICE_TICK_COLUMN = "價格_tick"
+SHARE_COLUMNS = ["買進股數", "賣出股數"]
+CATEGORY_COLUMNS = ["券商", "母券商"]
+COMPACT_COLUMNS = ["序號", "券商", PRICE_TICK_COLUMN, "買進股數", "賣出股數", "母券商"]
+DISPLAY_COLUMNS = ["序號", "券商", PRICE_COLUMN, "買進股數", "賣出股數", "母券商"]
+
+
+def is_compact(df: pd.DataFrame) -> bool:
+    return PRICE_TICK_COLUMN in df.columns
+
+
+def price_array(df: pd.DataFrame) -> np.ndarray:
+    if PRICE_TICK_COLUMN in df.columns:
+        return df[PRICE_TICK_COLUMN].to_numpy(dtype=np.float64) / TICK_SCALE
+    return pd.to_numeric(df[PRICE_COLUMN], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def numeric_array(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column == PRICE_COLUMN:
+        return price_array(df)
+    values = df[column]
+    if values.dtype.kind in "iuf":
+        return values.to_numpy(dtype=np.float64)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _smallest_int(values: np.ndarray, dtype):
+    info = np.iinfo(dtype)
+    if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+        return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def _as_integer(values: np.ndarray, dtype):
+    if values.dtype.kind in "iu":
+        return _smallest_int(values, dtype)
+    if np.isnan(values).any() or not np.all(values == np.trunc(values)):
+        return None
+    return _smallest_int(values.astype(np.int64), dtype)
+
+
+def _as_category(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    return series.astype("category")
+
+
+def to_compact(df: pd.DataFrame) -> pd.DataFrame:
+    if is_compact(df):
+        return df
+
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if column == "序號":
+            values = pd.to_numeric(series, errors="coerce").to_numpy()
+            compact = _as_integer(values, np.int32)
+            columns[column] = series if compact is None else pd.Series(compact, index=df.index)
+        elif column == PRICE_COLUMN:
+            prices = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+            ticks = np.rint(prices * TICK_SCALE)
+            exact = not np.isnan(prices).any() and np.array_equal(ticks / TICK_SCALE, prices)
+            if exact:
+                columns[PRICE_TICK_COLUMN] = pd.Series(_smallest_int(ticks.astype(np.int64), np.int32), index=df.index)
+            else:
+                columns[column] = pd.Series(prices, index=df.index)
+        elif column in SHARE_COLUMNS:
+            values = pd.to_numeric(series, errors="coerce").to_numpy()
+            compact = _as_integer(values, np.int64)
+            columns[column] = pd.Series(values if compact is None else compact, index=df.index)
+        elif column in CATEGORY_COLUMNS:
+            columns[column] = _as_category(series)
+        else:
+            columns[column] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _display_prices(ticks: np.ndarray) -> np.ndarray:
+    # 整張表都是整數價時輸出整數（100 而非 100.0），與直接解析整數價文字的結果相同
+    if np.all(ticks % TICK_SCALE == 0):
+        return ticks.astype(np.int64) // TICK_SCALE
+    return ticks.astype(np.float64) / TICK_SCALE
+
+
+def to_display(df: pd.DataFrame) -> pd.DataFrame:
+    if not is_compact(df):
+        return df
+    columns = {}
+    for column in df.columns:
+        if column == PRICE_TICK_COLUMN:
+            columns[PRICE_COLUMN] = pd.Series(_display_prices(df[column].to_numpy()), index=df.index)
+        else:
+            columns[column] = df[column]
+    return pd.DataFrame(columns, index=df.index)
+
+
+def memory_per_row(df: pd.DataFrame) -> float:
+    if len(df) == 0:
+        return 0.0
+    return float(df.memory_usage(index=False, deep=True).sum()) / len(df)
+
+
+__all__ = [
+    "COMPACT_COLUMNS",
+    "DISPLAY_COLUMNS",
+    "PRICE_TICK_COLUMN",
+    "TICK_SCALE",
+    "is_compact",
+    "memory_per_row",
+    "numeric_array",
+    "price_array",
+    "to_compact",
+    "to_display",
+]
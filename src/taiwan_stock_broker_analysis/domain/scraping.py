@@ -1,68 +1,199 @@
 # -*- coding: utf-8 -*-
 import re
-from collections import defaultdict
+import time
 from datetime import datetime
+from urllib.parse import urljoin
 
-import requests
+import pandas as pd
 from bs4 import BeautifulSoup
 
+from .analysis import format_broker_summary, read_flat_text
+from .captcha import pick_candidate
+from .http_client import get_default_http_client
+from .tracing import get_tracer
+from .twse_csv import TRADE_DATE_LABEL, parse_trade_date, read_text_preamble
+
 BASE_URL = "https://bsr.twse.com.tw/bshtm/bsMenu.aspx"
 
 
-def download_csv_text(stock_code, captcha_solver, max_retries=5, logger=None, timeout=30, verify=False):
+def download_csv_text(
+    stock_code,
+    captcha_solver,
+    max_retries=5,
+    logger=None,
+    timeout=30,
+    verify=False,
+    base_url=BASE_URL,
+    rate_limiter=None,
+    deadline=None,
+    http_client=None,
+    captcha_stats=None,
+    min_confidence=0.0,
+    max_captcha_refreshes=3,
+    tracer=None,
+):
     if logger is None:
         logger = lambda message: None
+    tracer = get_tracer(tracer)
+    with tracer.span("download", stock_code=stock_code) as download_span:
+        success, csv_text, error, attempts = _download_attempts(
+            stock_code,
+            captcha_solver,
+            max_retries,
+            logger,
+            timeout,
+            verify,
+            base_url,
+            rate_limiter,
+            deadline,
+            http_client,
+            captcha_stats,
+            min_confidence,
+            max_captcha_refreshes,
+            tracer,
+        )
+        download_span.set(ok=success, attempts=attempts)
+    return success, csv_text, error
+
+
+def _download_attempts(
+    stock_code,
+    captcha_solver,
+    max_retries,
+    logger,
+    timeout,
+    verify,
+    base_url,
+    rate_limiter,
+    deadline,
+    http_client,
+    captcha_stats,
+    min_confidence,
+    max_captcha_refreshes,
+    tracer,
+):
+    if http_client is None:
+        http_client = get_default_http_client()
+    if captcha_stats is not None:
+        max_retries = captcha_stats.retry_budget(max_retries)
+
+    def request_timeout():
+        if deadline is None:
+            return http_client.timeout(timeout)
+        return http_client.timeout(max(min(timeout, deadline - time.monotonic()), 0.1))
 
     for attempt in range(1, max_retries + 1):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False, None, f"超過下載期限，已嘗試 {attempt - 1} 次", attempt - 1
         try:
-            logger(f"第 {attempt} 次嘗試...")
-            session = requests.Session()
-
-            logger("正在連接證交所網站...")
-            response = session.get(BASE_URL, verify=verify, timeout=timeout)
-            if response.status_code != 200:
-                logger(f"網站連線失敗: HTTP {response.status_code}")
-                continue
-
-            soup = BeautifulSoup(response.text, "lxml")
-            params = _extract_form_params(soup)
-
-            logger("正在下載驗證碼圖片...")
-            captcha_bytes = _download_captcha_bytes(session, soup, timeout=timeout, verify=verify)
-            if captcha_bytes is None:
-                continue
-
-            captcha_code = captcha_solver(captcha_bytes)
-            if not captcha_code:
-                continue
-
-            params["CaptchaControl1"] = captcha_code
-            params["TextBox_Stkno"] = stock_code
-
-            logger("正在提交查詢表單...")
-            response = session.post(BASE_URL, data=params, verify=verify, timeout=timeout)
-            if response.status_code != 200:
-                logger(f"表單提交失敗: HTTP {response.status_code}")
-                continue
-
-            soup = BeautifulSoup(response.text, "lxml")
-            download_links = soup.select("#HyperLink_DownloadCSV")
-            if not download_links:
-                logger("找不到下載連結，可能是驗證碼錯誤")
-                continue
-
-            logger("正在下載 CSV 檔案...")
-            download_url = "https://bsr.twse.com.tw/bshtm/" + download_links[0]["href"]
-            csv_response = session.get(download_url, verify=verify, timeout=timeout)
-            if csv_response.status_code != 200:
-                logger("CSV 檔案下載失敗")
-                continue
-
-            return True, csv_response.text, None
+            with tracer.span("download.attempt", attempt=attempt) as attempt_span:
+                logger(f"第 {attempt} 次嘗試...")
+                if captcha_stats is not None:
+                    captcha_stats.record_attempt()
+                session = http_client.new_session()
+
+                params, captcha_code = _fetch_form_and_answer(
+                    session,
+                    base_url,
+                    captcha_solver,
+                    logger,
+                    request_timeout,
+                    verify,
+                    min_confidence,
+                    max_captcha_refreshes,
+                    captcha_stats,
+                    tracer,
+                )
+                if not captcha_code:
+                    attempt_span.set(outcome="no_captcha")
+                    continue
+
+                params["CaptchaControl1"] = captcha_code
+                params["TextBox_Stkno"] = stock_code
+
+                if rate_limiter is not None:
+                    with tracer.span("download.rate_limit"):
+                        acquired = rate_limiter.acquire(deadline=deadline)
+                    if not acquired:
+                        return False, None, f"超過下載期限，等待查詢間隔時放棄（已嘗試 {attempt} 次）", attempt
+
+                logger("正在提交查詢表單...")
+                with tracer.span("download.post") as span:
+                    response = session.post(base_url, data=params, verify=verify, timeout=request_timeout())
+                    span.set(status=response.status_code, bytes=len(response.content))
+                if response.status_code != 200:
+                    logger(f"表單提交失敗: HTTP {response.status_code}")
+                    attempt_span.set(outcome="post_failed")
+                    continue
+
+                soup = BeautifulSoup(response.text, "lxml")
+                download_links = soup.select("#HyperLink_DownloadCSV")
+                if captcha_stats is not None:
+                    captcha_stats.record_submit(bool(download_links))
+                if not download_links:
+                    logger("找不到下載連結，可能是驗證碼錯誤")
+                    attempt_span.set(outcome="captcha_rejected")
+                    continue
+
+                trade_day = parse_result_trade_date(soup)
+                logger("正在下載 CSV 檔案...")
+                download_url = urljoin(base_url, download_links[0]["href"])
+                with tracer.span("download.csv") as span:
+                    csv_response = session.get(download_url, verify=verify, timeout=request_timeout())
+                    span.set(status=csv_response.status_code, bytes=len(csv_response.content))
+                    if csv_response.status_code == 200:
+                        csv_text = csv_response.text
+                        span.set(rows=csv_text.count("\n"))
+                if csv_response.status_code != 200:
+                    logger("CSV 檔案下載失敗")
+                    attempt_span.set(outcome="csv_failed")
+                    continue
+
+                attempt_span.set(outcome="ok")
+                return True, with_trade_date(csv_text, trade_day), None, attempt
         except Exception as exc:
             logger(f"第 {attempt} 次嘗試失敗: {exc}")
 
-    return False, None, f"所有 {max_retries} 次嘗試均失敗"
+    return False, None, f"所有 {max_retries} 次嘗試均失敗", max_retries
+
+
+def parse_result_trade_date(soup):
+    # 查詢結果頁上的資料日期（#receive_date），找不到時再找頁面上標示「資料日期 / 交易日期」的文字
+    node = soup.select_one("#receive_date")
+    if node is not None:
+        day = parse_trade_date(f"{TRADE_DATE_LABEL}: {node.get_text(strip=True)}")
+        if day is not None:
+            return day
+    return parse_trade_date(soup.get_text(" ", strip=True))
+
+
+def with_trade_date(csv_text: str, day):
+    # 證交所 CSV 本身沒有日期；把結果頁的資料日期記在檔頭，快取、處理後 CSV 與記憶體模式都讀得到
+    if day is None or read_text_preamble(csv_text)["trade_date"] is not None:
+        return csv_text
+    newline = "\r\n" if "\r\n" in csv_text else "\n"
+    return f"{TRADE_DATE_LABEL}: {day.isoformat()}{newline}{csv_text}"
+
+
+def fetch_csv_text(
+    stock_code, captcha_solver, raw_cache=None, refresh=False, logger=None, tracer=None, **download_options
+):
+    if logger is None:
+        logger = lambda message: None
+    tracer = get_tracer(tracer)
+    if raw_cache is not None and not refresh:
+        with tracer.span("download.raw_cache", stock_code=stock_code) as span:
+            csv_text = raw_cache.get(stock_code)
+            span.set(hit=csv_text is not None)
+        if csv_text is not None:
+            logger(f"使用快取資料 {raw_cache.key(stock_code)}，略過下載")
+            return True, csv_text, None, True
+    success, csv_text, error = download_csv_text(
+        stock_code, captcha_solver, logger=logger, tracer=tracer, **download_options
+    )
+    if success and raw_cache is not None:
+        raw_cache.put(stock_code, csv_text)
+    return success, csv_text, error, False
 
 
 def save_raw_csv(csv_text, stock_code, label="爬蟲資料", encoding="utf-8-sig"):
@@ -89,62 +220,11 @@ def save_processed_csv(csv_text, stock_code, out_csv=None, encoding="utf-8-sig")
     return out_csv
 
 
-def log_broker_summary(csv_text, stock_code, logger):
+def log_broker_summary(source, stock_code, logger):
     try:
-        lines = csv_text.split("\n")[2:]
-        flattened_lines = []
-        for line in lines:
-            for segment in line.split(",,"):
-                cleaned = segment.replace("\u3000", "")
-                if cleaned.strip():
-                    flattened_lines.append(cleaned)
-
-        records = []
-        for line in flattened_lines:
-            fields = line.split(",")
-            if len(fields) >= 5:
-                fields[1] = re.sub(r"[0-9A-Za-z]+", "", fields[1])
-                records.append(fields)
-
-        if len(records) > 2:
-            records = records[2:]
-
-        broker_stats = defaultdict(lambda: {"買進": 0, "賣出": 0, "次數": 0})
-        total_records = 0
-        for row in records:
-            if len(row) < 5:
-                continue
-            try:
-                broker = row[1].strip()
-                if not broker:
-                    continue
-                buy_vol = float(row[3].replace(",", "")) if row[3].strip() else 0
-                sell_vol = float(row[4].replace(",", "")) if row[4].strip() else 0
-                broker_stats[broker]["買進"] += buy_vol
-                broker_stats[broker]["賣出"] += sell_vol
-                broker_stats[broker]["次數"] += 1
-                total_records += 1
-            except (ValueError, IndexError):
-                continue
-
-        logger(f"=== 資料分析結果 (股票代碼: {stock_code}) ===")
-        logger(f"總交易筆數: {total_records}")
-        logger(f"券商家數: {len(broker_stats)}")
-
-        broker_netbuy = []
-        for broker, stats in broker_stats.items():
-            net_buy = (stats["買進"] - stats["賣出"]) / 1000
-            broker_netbuy.append((broker, net_buy, stats["買進"] / 1000, stats["賣出"] / 1000))
-        broker_netbuy.sort(key=lambda item: item[1], reverse=True)
-
-        logger("前 10 大買超券商:")
-        for index, (broker, net_buy, buy, sell) in enumerate(broker_netbuy[:10], start=1):
-            logger(f"  {index:2d}. {broker:<10} 買超: {net_buy:8.0f}張 (買: {buy:8.0f}張, 賣: {sell:8.0f}張)")
-
-        if len(broker_netbuy) > 10:
-            logger("前 10 大賣超券商:")
-            for index, (broker, net_buy, buy, sell) in enumerate(broker_netbuy[-10:], start=1):
-                logger(f"  {index:2d}. {broker:<10} 賣超: {abs(net_buy):8.0f}張 (買: {buy:8.0f}張, 賣: {sell:8.0f}張)")
+        flat = source if isinstance(source, pd.DataFrame) else read_flat_text(source)
+        for line in format_broker_summary(flat, stock_code):
+            logger(line)
     except Exception as exc:
         logger(f"資料分析時發生錯誤: {exc}")
 
@@ -159,7 +239,48 @@ def _extract_form_params(soup):
     return params
 
 
-def _download_captcha_bytes(session, soup, timeout, verify):
+def _fetch_form_and_answer(
+    session,
+    base_url,
+    captcha_solver,
+    logger,
+    request_timeout,
+    verify,
+    min_confidence,
+    max_captcha_refreshes,
+    captcha_stats,
+    tracer,
+):
+    for refresh in range(max_captcha_refreshes + 1):
+        logger("正在連接證交所網站..." if refresh == 0 else f"驗證碼明顯錯誤，重新取得表單 ({refresh}/{max_captcha_refreshes})...")
+        with tracer.span("download.form") as span:
+            response = session.get(base_url, verify=verify, timeout=request_timeout())
+            span.set(status=response.status_code, bytes=len(response.content))
+        if response.status_code != 200:
+            logger(f"網站連線失敗: HTTP {response.status_code}")
+            return None, None
+
+        soup = BeautifulSoup(response.text, "lxml")
+        params = _extract_form_params(soup)
+
+        logger("正在下載驗證碼圖片...")
+        with tracer.span("download.captcha") as span:
+            captcha_bytes = _download_captcha_bytes(session, soup, base_url, timeout=request_timeout(), verify=verify)
+            span.set(bytes=0 if captcha_bytes is None else len(captcha_bytes))
+        if captcha_bytes is None:
+            return None, None
+
+        with tracer.span("download.ocr", bytes=len(captcha_bytes)) as span:
+            captcha_code, confidence = pick_candidate(captcha_solver(captcha_bytes), min_confidence=min_confidence)
+            span.set(accepted=bool(captcha_code), confidence=None if confidence is None else float(confidence))
+        if captcha_code:
+            return params, captcha_code
+        if captcha_stats is not None:
+            captcha_stats.record_local_reject()
+    return None, None
+
+
+def _download_captcha_bytes(session, soup, base_url, timeout, verify):
     captcha_images = soup.select("#Panel_bshtm img")
     if not captcha_images:
         return None
@@ -168,7 +289,7 @@ def _download_captcha_bytes(session, soup, timeout, verify):
     if re.search(r"guid=(.+)", captcha_image) is None:
         return None
 
-    captcha_url = "https://bsr.twse.com.tw/bshtm/" + captcha_image
+    captcha_url = urljoin(base_url, captcha_image)
     response = session.get(captcha_url, verify=verify, timeout=timeout)
     if response.status_code != 200:
         return None
@@ -177,7 +298,10 @@ def _download_captcha_bytes(session, soup, timeout, verify):
 __all__ = [
     "BASE_URL",
     "download_csv_text",
+    "fetch_csv_text",
     "log_broker_summary",
+    "parse_result_trade_date",
     "save_processed_csv",
     "save_raw_csv",
+    "with_trade_date",
 ]
\ No newline at end of file
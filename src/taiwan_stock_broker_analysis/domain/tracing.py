@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "peak", "memory_start")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.peak = 0
+        self.memory_start = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    enabled = False
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        yield _NULL_SPAN
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        stack = self._stack()
+        span = _Span(name, attrs)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            span.memory_start = span.peak = current
+        stack.append(span)
+        wall = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield span
+        except BaseException as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            stack.pop()
+            record = {
+                "name": name,
+                "start": wall,
+                "seconds": seconds,
+                "pid": os.getpid(),
+                "thread": threading.current_thread().name,
+                "depth": len(stack),
+                "attrs": span.attrs,
+            }
+            if self.memory:
+                span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+                record["peak_bytes"] = span.peak - span.memory_start
+                if stack:
+                    stack[-1].peak = max(stack[-1].peak, span.peak)
+            if error is not None:
+                record["error"] = error
+            with self._lock:
+                self.records.append(record)
+
+    def merge(self, records):
+        with self._lock:
+            self.records.extend(records)
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def summary(self) -> list:
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record["name"], {"name": record["name"], "count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += record["seconds"]
+            entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+            for key in ("rows", "bytes"):
+                value = record["attrs"].get(key)
+                if isinstance(value, int):
+                    entry[key] = entry.get(key, 0) + value
+            if "peak_bytes" in record:
+                entry["peak_bytes"] = max(entry.get("peak_bytes", 0), record["peak_bytes"])
+            if "error" in record:
+                entry["errors"] = entry.get("errors", 0) + 1
+        return sorted(totals.values(), key=lambda entry: entry["seconds"], reverse=True)
+
+    def to_chrome_trace(self) -> dict:
+        threads = {}
+        events = []
+        for record in sorted(self.records, key=lambda record: record["start"]):
+            tid = threads.setdefault((record["pid"], record["thread"]), len(threads) + 1)
+            args = dict(record["attrs"])
+            for key in ("peak_bytes", "error"):
+                if key in record:
+                    args[key] = record[key]
+            events.append({
+                "name": record["name"],
+                "cat": record["name"].split(".")[0],
+                "ph": "X",
+                "ts": round(record["start"] * 1e6),
+                "dur": round(record["seconds"] * 1e6),
+                "pid": record["pid"],
+                "tid": tid,
+                "args": args,
+            })
+        for (pid, thread), tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary()}
+
+    def write_json(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace(), ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+        return path
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+def get_tracer(tracer=None):
+    return NULL_TRACER if tracer is None else tracer
+
+
+def format_trace_summary(tracer: Tracer, limit: int = 15) -> list:
+    lines = [f"{'階段':<26} {'次數':>5} {'總秒':>9} {'最長秒':>9} {'列數':>11} {'位元組':>13} {'記憶體峰值':>11}"]
+    for entry in tracer.summary()[:limit]:
+        rows = f"{entry['rows']:,}" if "rows" in entry else "-"
+        size = f"{entry['bytes']:,}" if "bytes" in entry else "-"
+        peak = f"{entry['peak_bytes'] / 1e6:.1f} MB" if "peak_bytes" in entry else "-"
+        lines.append(
+            f"{entry['name']:<26} {entry['count']:>5} {entry['seconds']:>9.3f} {entry['max_seconds']:>9.3f} "
+            f"{rows:>11} {size:>13} {peak:>11}"
+        )
+    return lines
+
+
+@contextmanager
+def trace_session(trace_path=None, memory: bool = False, profile_path=None, logger=None):
+    tracer = Tracer(memory=memory) if trace_path is not None or memory else NULL_TRACER
+    profiler = cProfile.Profile() if profile_path is not None else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield tracer
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            Path(profile_path).parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(profile_path))
+            if logger is not None:
+                logger(f"cProfile 結果已寫入 {profile_path}（可用 python -m pstats 或 snakeviz 檢視）")
+        if tracer.enabled:
+            tracer.close()
+            if logger is not None:
+                for line in format_trace_summary(tracer):
+                    logger(line)
+            if trace_path is not None:
+                tracer.write_json(trace_path)
+                if logger is not None:
+                    logger(f"追蹤紀錄已寫入 {trace_path}（可用 chrome://tracing 或 Perfetto 開啟）")
+
+
+__all__ = [
+    "NULL_TRACER",
+    "NullTracer",
+    "Tracer",
+    "format_trace_summary",
+    "get_tracer",
+    "trace_session",
+]
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .columnar import load_table, remove_table, resolve_format, table_path, write_table
+from .raw_cache import trading_date
+from .report_writer import atomic_write, file_lock
+from .schema import to_compact, to_display
+from .twse_csv import read_preamble
+
+CATALOG_NAME = "catalog.json"
+CATALOG_LOCK_NAME = "catalog.lock"
+CATALOG_VERSION = 1
+STOCK_COLUMN = "股票代碼"
+DATE_COLUMN = "日期"
+FILENAME_RE = re.compile(r"^(?P<stock_code>[0-9A-Za-z]+)_.*_(?P<stamp>\d{8}_\d{6})$")
+
+
+def _as_date(value) -> date:
+    if value is None or type(value) is date:
+        return value
+    return pd.Timestamp(value).date()
+
+
+def infer_partition(input_csv: Path, stock_code: str = None, day=None):
+    meta = read_preamble(input_csv)
+    match = FILENAME_RE.match(Path(input_csv).stem) if isinstance(input_csv, (str, Path)) else None
+    stock_code = stock_code or meta["stock_code"] or (match.group("stock_code") if match else None)
+    if day is None and meta["trade_date"] is not None:
+        day = meta["trade_date"]
+    if day is None:
+        downloaded_at = meta["downloaded_at"]
+        if downloaded_at is None and match:
+            downloaded_at = datetime.strptime(match.group("stamp"), "%Y%m%d_%H%M%S")
+        day = None if downloaded_at is None else trading_date(downloaded_at)
+    return stock_code, _as_date(day)
+
+
+class TradeStore:
+    def __init__(self, root, fmt: str = "auto"):
+        self.root = Path(root)
+        self.fmt = resolve_format(fmt)
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._catalog_stamp = None
+        self.partitions_read = 0
+
+    def append(self, stock_code: str, day, flat: pd.DataFrame, source: str = None) -> dict:
+        stock_code, day = str(stock_code).strip(), _as_date(day)
+        frame = to_compact(flat).drop(columns=["母券商"], errors="ignore").reset_index(drop=True)
+        stem = self.root / stock_code / day.isoformat()
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._catalog_lock():
+            remove_table(stem)
+            write_table(frame, stem, self.fmt)
+            entry = {
+                "path": table_path(stem, self.fmt).relative_to(self.root).as_posix(),
+                "rows": len(frame),
+                "source": source,
+                "stored_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            # 以磁碟上最新的 catalog 為準再加入這個分割，不會蓋掉其他行程（CLI / 常駐服務）同時寫入的分割
+            catalog = self._load_catalog()
+            catalog.setdefault(stock_code, {})[day.isoformat()] = entry
+            self._save_catalog(catalog)
+        return entry
+
+    def remove(self, stock_code: str, day) -> bool:
+        stock_code, day = str(stock_code).strip(), _as_date(day)
+        with self._lock, self._catalog_lock():
+            catalog = self._load_catalog()
+            if catalog.get(stock_code, {}).pop(day.isoformat(), None) is None:
+                return False
+            if not catalog[stock_code]:
+                del catalog[stock_code]
+            remove_table(self.root / stock_code / day.isoformat())
+            self._save_catalog(catalog)
+        return True
+
+    def stocks(self) -> list:
+        with self._lock:
+            return sorted(self._load_catalog())
+
+    def partitions(self, stocks=None, start=None, end=None) -> list:
+        start, end = _as_date(start), _as_date(end)
+        wanted = None if stocks is None else {str(code).strip() for code in ([stocks] if isinstance(stocks, str) else stocks)}
+        with self._lock:
+            catalog = self._load_catalog()
+        selected = []
+        for stock_code in sorted(catalog):
+            if wanted is not None and stock_code not in wanted:
+                continue
+            for day_text in sorted(catalog[stock_code]):
+                day = date.fromisoformat(day_text)
+                if (start is None or day >= start) and (end is None or day <= end):
+                    selected.append((stock_code, day, catalog[stock_code][day_text]))
+        return selected
+
+    def iter_partitions(self, stocks=None, start=None, end=None, columns=None, mmap: bool = True):
+        for stock_code, day, entry in self.partitions(stocks, start, end):
+            self.partitions_read += 1
+            yield stock_code, day, load_table(self.root / entry["path"], columns=columns, mmap=mmap)
+
+    def read(self, stocks=None, start=None, end=None, columns=None, mmap: bool = True) -> pd.DataFrame:
+        frames, stock_codes, days = [], [], []
+        for stock_code, day, frame in self.iter_partitions(stocks, start, end, columns, mmap):
+            frames.append(frame)
+            stock_codes.append(stock_code)
+            days.append(day)
+        if not frames:
+            return pd.DataFrame(columns=[STOCK_COLUMN, DATE_COLUMN] + list(columns or []))
+        if any(list(frame.columns) != list(frames[0].columns) for frame in frames):
+            frames = [to_display(frame) for frame in frames]
+
+        lengths = np.array([len(frame) for frame in frames])
+        stock_names = sorted(set(stock_codes))
+        stock_ids = np.repeat([stock_names.index(code) for code in stock_codes], lengths)
+        data = {
+            STOCK_COLUMN: pd.Categorical.from_codes(stock_ids, categories=stock_names),
+            DATE_COLUMN: np.repeat(np.array(days, dtype="datetime64[ns]"), lengths),
+        }
+        for column in frames[0].columns:
+            parts = [frame[column] for frame in frames]
+            if isinstance(parts[0].dtype, pd.CategoricalDtype):
+                data[column] = union_categoricals([part.array for part in parts], sort_categories=True)
+            else:
+                data[column] = pd.concat(parts, ignore_index=True)
+        return pd.DataFrame(data)
+
+    def summary(self) -> pd.DataFrame:
+        rows = [
+            {STOCK_COLUMN: stock_code, DATE_COLUMN: day, "筆數": entry["rows"], "來源": entry.get("source")}
+            for stock_code, day, entry in self.partitions()
+        ]
+        return pd.DataFrame(rows, columns=[STOCK_COLUMN, DATE_COLUMN, "筆數", "來源"])
+
+    def _catalog_lock(self):
+        return file_lock(self.root / CATALOG_LOCK_NAME)
+
+    def _stamp(self):
+        try:
+            stat = (self.root / CATALOG_NAME).stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load_catalog(self) -> dict:
+        # 其他行程改過 catalog.json（換成新檔）時重讀
+        stamp = self._stamp()
+        if self._catalog is None or stamp != self._catalog_stamp:
+            try:
+                payload = json.loads((self.root / CATALOG_NAME).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                payload = {}
+            self._catalog = payload.get("partitions", {}) if payload.get("version") == CATALOG_VERSION else {}
+            self._catalog_stamp = stamp
+        return self._catalog
+
+    def _save_catalog(self, catalog: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        payload = {"version": CATALOG_VERSION, "partitions": catalog}
+        text = json.dumps(payload, ensure_ascii=False, indent=1, sort_keys=True)
+        atomic_write(self.root / CATALOG_NAME, lambda temp_name: Path(temp_name).write_text(text, encoding="utf-8"))
+        self._catalog = catalog
+        self._catalog_stamp = self._stamp()
+
+
+__all__ = [
+    "CATALOG_LOCK_NAME",
+    "CATALOG_NAME",
+    "DATE_COLUMN",
+    "STOCK_COLUMN",
+    "TradeStore",
+    "infer_partition",
+]
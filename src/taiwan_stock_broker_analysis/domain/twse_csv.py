@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+import codecs
+import gc
+import io
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ENCODING_CANDIDATES = ["utf-8-sig", "utf-8", "cp950"]
+SNIFF_BYTES = 64 * 1024
+FLAT_COLUMNS = ["序號", "券商", "價格", "買進股數", "賣出股數"]
+NUMERIC_COLUMNS = ["序號", "價格", "買進股數", "賣出股數"]
+_BYTES_PER_RECORD = 32
+CHUNK_RECORDS = 64 * 1024
+PREAMBLE_LINES = 10
+_STOCK_CODE_RE = re.compile(r'股票代碼\s*[:：,]\s*=?"?([0-9A-Za-z]+)')
+_DOWNLOADED_AT_RE = re.compile(r"下載時間\s*[:：]\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+_TRADE_DATE_RE = re.compile(r'(?:資料|交易)日期\s*[:：,]?\s*=?"?(\d{2,4})\s*[-/年]\s*(\d{1,2})\s*[-/月]\s*(\d{1,2})')
+TRADE_DATE_LABEL = "資料日期"
+
+
+def sniff_encoding(prefix: bytes, candidates=None):
+    for encoding in candidates or ENCODING_CANDIDATES:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(prefix, final=False)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    raise ValueError("無法解析檔案編碼")
+
+
+def open_binary_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(bytes(source)), len(source)
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        if not path.exists():
+            raise FileNotFoundError(f"檔案不存在: {source}")
+        return open(path, "rb"), path.stat().st_size
+    if not source.seekable():
+        data = source.read()
+        return io.BytesIO(data), len(data)
+    return source, None
+
+
+class _TypedColumn:
+    def __init__(self, capacity):
+        self.data = np.zeros(max(int(capacity), 1024), dtype=np.int64)
+        self.size = 0
+
+    def append(self, values):
+        if values.dtype.kind == "f" and self.data.dtype.kind != "f":
+            self.data = self.data.astype(np.float64)
+        elif values.dtype.kind != "f" and self.data.dtype.kind == "f":
+            values = values.astype(np.float64)
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.zeros(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def values(self):
+        return self.data[:self.size]
+
+
+def _to_numeric(texts):
+    try:
+        return np.array(texts, dtype=np.int64)
+    except (ValueError, OverflowError):
+        pass
+    try:
+        return np.array(texts, dtype=np.float64)
+    except ValueError:
+        return pd.to_numeric(np.array(texts, dtype=object), errors="coerce").astype(np.float64)
+
+
+class _FlatBuilder:
+    def __init__(self, capacity):
+        self.columns = {column: _TypedColumn(capacity) for column in NUMERIC_COLUMNS}
+        self.broker = _TypedColumn(capacity)
+        self.broker_codes = {}
+        self.broker_names = []
+
+    def add_chunk(self, records):
+        if not records:
+            return
+        seq, broker, price, buy, sell = zip(*records)
+        for column, texts in zip(NUMERIC_COLUMNS, (seq, price, buy, sell)):
+            self.columns[column].append(_to_numeric(texts))
+        codes, uniques = pd.factorize(np.array(broker, dtype=object))
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for index, name in enumerate(uniques):
+            code = self.broker_codes.get(name)
+            if code is None:
+                code = self.broker_codes[name] = len(self.broker_names)
+                self.broker_names.append("".join(name.replace("\u3000", "").split()))
+            lookup[index] = code
+        self.broker.append(lookup[codes])
+
+    def build(self, sort: bool = True):
+        data = {column: self.columns[column].values() for column in NUMERIC_COLUMNS}
+        keep = ~np.isnan(data["序號"]) if data["序號"].dtype.kind == "f" else None
+        if keep is not None and not keep.all():
+            data = {column: values[keep] for column, values in data.items()}
+            codes = self.broker.values()[keep]
+        else:
+            codes = self.broker.values()
+        cleaned = np.array(self.broker_names + [""], dtype=object)[:-1]
+        category_codes, categories = pd.factorize(cleaned, sort=True)
+        data["券商"] = pd.Categorical.from_codes(category_codes[codes], categories=categories.astype(str))
+        flat = pd.DataFrame({column: data[column] for column in FLAT_COLUMNS})
+        seq_values = flat["序號"].to_numpy()
+        if sort and len(seq_values) > 1 and not np.all(seq_values[1:] > seq_values[:-1]):
+            flat = flat.sort_values(["序號", "券商", "價格"], ignore_index=True)
+        return flat
+
+
+def _find_header(text_stream):
+    for line in text_stream:
+        if "序號" in line and "券商" in line:
+            return line.rstrip("\r\n")
+    raise ValueError("找不到包含'序號'和'券商'的標題行")
+
+
+def _split_header(header_line):
+    if header_line.count("序號") < 2:
+        return None
+    parts = header_line.split(",,")
+    if len(parts) != 2:
+        return None
+    return [[column.strip() for column in part.split(",")] for part in parts]
+
+
+def _iter_group_records(text_stream, widths):
+    left_width, right_width = widths
+    for line in text_stream:
+        parts = line.rstrip("\r\n").split(",,")
+        if len(parts) != 2:
+            continue
+        left_data = parts[0].split(",")
+        if len(left_data) == left_width and left_data[0].strip():
+            yield left_data
+        right_data = parts[1].split(",")
+        if len(right_data) == right_width and right_data[0].strip():
+            yield right_data
+
+
+def _flat_record_chunks(text_stream, chunk_records: int = CHUNK_RECORDS):
+    records = []
+    append = records.append
+    for line in text_stream:
+        fields = line.rstrip("\r\n").split(",")
+        if len(fields) == 11 and not fields[5] and all(fields[1:5]) and all(fields[6:10]):
+            if fields[0].strip():
+                append(fields[0:5])
+            if fields[6].strip():
+                append(fields[6:11])
+        else:
+            records.extend(_iter_group_records([line], (5, 5)))
+        if len(records) >= chunk_records:
+            yield records
+            records = []
+            append = records.append
+    yield records
+
+
+def _fill_flat(text_stream, builder: _FlatBuilder):
+    for records in _flat_record_chunks(text_stream):
+        builder.add_chunk(records)
+
+
+def _fallback_frame(text_stream, header_line):
+    return pd.read_csv(io.StringIO(header_line + "\n" + text_stream.read()))
+
+
+def _read(source, flat: bool):
+    stream, size_hint = open_binary_source(source)
+    try:
+        prefix = stream.read(SNIFF_BYTES)
+        stream.seek(0)
+        encoding = sniff_encoding(prefix)
+        remaining = ENCODING_CANDIDATES[ENCODING_CANDIDATES.index(encoding):]
+        for encoding in remaining:
+            stream.seek(0)
+            text_stream = io.TextIOWrapper(stream, encoding=encoding, newline="")
+            try:
+                result = _read_text(text_stream, flat, size_hint)
+            except UnicodeDecodeError:
+                text_stream.detach()
+                continue
+            text_stream.detach()
+            return result
+        raise ValueError("無法解析檔案編碼")
+    finally:
+        if isinstance(source, (str, Path)):
+            stream.close()
+
+
+def _read_text(text_stream, flat: bool, size_hint):
+    header_line = _find_header(text_stream)
+    groups = _split_header(header_line)
+    if groups is None:
+        return _fallback_frame(text_stream, header_line), header_line, False
+
+    widths = (len(groups[0]), len(groups[1]))
+    if flat and groups[0] == FLAT_COLUMNS and groups[1] == FLAT_COLUMNS:
+        builder = _FlatBuilder((size_hint or 0) // _BYTES_PER_RECORD)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            _fill_flat(text_stream, builder)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return builder.build(), header_line, True
+
+    records = [[value.strip() for value in record] for record in _iter_group_records(text_stream, widths)]
+    return pd.DataFrame(records, columns=groups[0]), header_line, False
+
+
+def source_encodings(source) -> list:
+    stream, _ = open_binary_source(source)
+    try:
+        prefix = stream.read(SNIFF_BYTES)
+        if not isinstance(source, (str, Path)):
+            stream.seek(0)
+    finally:
+        if isinstance(source, (str, Path)):
+            stream.close()
+    encoding = sniff_encoding(prefix)
+    return ENCODING_CANDIDATES[ENCODING_CANDIDATES.index(encoding):]
+
+
+def iter_twse_flat_chunks(source, encoding: str, chunk_records: int = CHUNK_RECORDS):
+    # 逐塊產生展平表（不排序、不保留前一塊），記憶體只跟 chunk_records 有關；解碼錯誤由呼叫端換編碼重讀
+    stream, _ = open_binary_source(source)
+    text_stream = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        groups = _split_header(_find_header(text_stream))
+        if groups is None or groups[0] != FLAT_COLUMNS or groups[1] != FLAT_COLUMNS:
+            raise ValueError(f"分塊讀取只支援 TWSE 雙欄格式（左右各一組 {','.join(FLAT_COLUMNS)}）")
+        for records in _flat_record_chunks(text_stream, max(int(chunk_records), 1)):
+            if records:
+                builder = _FlatBuilder(len(records))
+                builder.add_chunk(records)
+                records.clear()
+                yield builder.build(sort=False)
+    finally:
+        if isinstance(source, (str, Path)):
+            text_stream.close()
+        else:
+            text_stream.detach()
+
+
+def read_preamble(source) -> dict:
+    stream, _ = open_binary_source(source)
+    try:
+        prefix = stream.read(SNIFF_BYTES)
+        if not isinstance(source, (str, Path)):
+            stream.seek(0)
+    finally:
+        if isinstance(source, (str, Path)):
+            stream.close()
+    return read_text_preamble(prefix.decode(sniff_encoding(prefix), errors="ignore"))
+
+
+def parse_trade_date(text: str):
+    # 「資料日期: 2026-03-18」「交易日期 115/03/18」（民國年）等寫法
+    match = _TRADE_DATE_RE.search(text)
+    if match is None:
+        return None
+    year, month, day = (int(value) for value in match.groups())
+    try:
+        return date(year + 1911 if year < 1911 else year, month, day)
+    except ValueError:
+        return None
+
+
+def read_text_preamble(text: str) -> dict:
+    meta = {"stock_code": None, "downloaded_at": None, "trade_date": None}
+    for line in text.splitlines()[:PREAMBLE_LINES]:
+        if "序號" in line and "券商" in line:
+            break
+        match = _STOCK_CODE_RE.search(line)
+        if match and meta["stock_code"] is None:
+            meta["stock_code"] = match.group(1)
+        match = _DOWNLOADED_AT_RE.search(line)
+        if match and meta["downloaded_at"] is None:
+            meta["downloaded_at"] = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+        if meta["trade_date"] is None:
+            meta["trade_date"] = parse_trade_date(line)
+    return meta
+
+
+def read_twse_raw(source):
+    frame, header_line, _ = _read(source, flat=False)
+    return frame, header_line
+
+
+def read_twse_flat(source):
+    frame, header_line, is_flat = _read(source, flat=True)
+    return frame, header_line, is_flat
+
+
+def read_twse_text(text: str):
+    return _read_text(io.StringIO(text, newline=""), True, len(text))
+
+
+__all__ = [
+    "ENCODING_CANDIDATES",
+    "FLAT_COLUMNS",
+    "iter_twse_flat_chunks",
+    "TRADE_DATE_LABEL",
+    "open_binary_source",
+    "parse_trade_date",
+    "read_preamble",
+    "read_text_preamble",
+    "read_twse_flat",
+    "read_twse_raw",
+    "read_twse_text",
+    "sniff_encoding",
+    "source_encodings",
+]
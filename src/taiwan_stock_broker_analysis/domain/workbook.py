@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .report_writer import atomic_write
+
+EXCEL_MODES = ("separate", "consolidated", "none")
+WORKBOOK_NAME = "analysis_report.xlsx"
+MAX_SHEET_TITLE = 31
+HEADER_FONT = Font(bold=True)
+
+
+def _python_values(values) -> list:
+    if isinstance(values, pd.Index):
+        values = pd.Series(values)
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iub":
+        return values.tolist()
+    objects = values.to_numpy(dtype=object)
+    objects[values.isna().to_numpy()] = None
+    return objects.tolist()
+
+
+def _header(sheet, labels) -> list:
+    cells = []
+    for label in labels:
+        cell = WriteOnlyCell(sheet, value=label)
+        cell.font = HEADER_FONT
+        cells.append(cell)
+    return cells
+
+
+def write_workbook(sheets, path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook = Workbook(write_only=True)
+    for title, frame, index in sheets:
+        sheet = workbook.create_sheet(title=title[:MAX_SHEET_TITLE])
+        labels = ([frame.index.name or ""] if index else []) + [str(column) for column in frame.columns]
+        sheet.append(_header(sheet, labels))
+        columns = ([frame.index] if index else []) + [frame[column] for column in frame.columns]
+        for row in zip(*(_python_values(column) for column in columns)):
+            sheet.append(row)
+    return atomic_write(path, workbook.save)
+
+
+__all__ = [
+    "EXCEL_MODES",
+    "WORKBOOK_NAME",
+    "write_workbook",
+]
@@ -1,14 +1,31 @@
 # -*- coding: utf-8 -*-
 
-from .analysis_service import analyze_existing_csv, build_analysis_output_dir
-from .pipeline_service import run_all
-from .scraping_service import AutomaticCaptchaScraper, ManualCaptchaScraper, simple_download_stock_csv
+from .._lazy import lazy_exports
+
+_EXPORTS = {
+    "AutomaticCaptchaScraper": ".scraping_service",
+    "ManualCaptchaScraper": ".scraping_service",
+    "analyze_csv_batch": ".batch_service",
+    "analyze_existing_csv": ".analysis_service",
+    "build_analysis_output_dir": ".analysis_service",
+    "build_market_leaderboard": ".market_service",
+    "collect_input_files": ".batch_service",
+    "ingest_csv_files": ".store_service",
+    "run_all": ".pipeline_service",
+    "simple_download_stock_csv": ".scraping_service",
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), _EXPORTS)
 
 __all__ = [
     "AutomaticCaptchaScraper",
     "ManualCaptchaScraper",
+    "analyze_csv_batch",
     "analyze_existing_csv",
     "build_analysis_output_dir",
+    "build_market_leaderboard",
+    "collect_input_files",
+    "ingest_csv_files",
     "run_all",
     "simple_download_stock_csv",
-]
\ No newline at end of file
+]
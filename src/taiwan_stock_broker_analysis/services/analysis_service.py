@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 from pathlib import Path
 
-from ..domain.analysis import analyze_csv_file
+from ..domain.analysis import analyze_csv_file, build_workbook, export_analysis, read_flat_csv
+from ..domain.analysis_cache import content_fingerprint, format_manifest_summary
+from ..domain.broker_index import BrokerIndex
+from ..domain.open_lots import OpenLotStore, format_open_lots
+from ..domain.trade_store import infer_partition
+from ..domain.tracing import get_tracer
 
 
 def build_analysis_output_dir(input_csv: Path, output_root: Path) -> Path:
@@ -9,9 +14,172 @@ def build_analysis_output_dir(input_csv: Path, output_root: Path) -> Path:
     return Path(output_root) / f"analysis_{input_path.stem}"
 
 
-def analyze_existing_csv(input_csv: Path, output_root: Path, fee_discount: float, day_trade_tax: float) -> Path:
+def _carry_hooks(carry_dir: Path, stock_code: str, day, label: str, logger=None):
+    if carry_dir is None:
+        return None, None
+    if stock_code is None or day is None:
+        raise ValueError(f"無法判斷股票代碼或交易日，不能做跨日 FIFO 結轉: {label}")
+    lot_store = OpenLotStore(carry_dir)
+    opened_from, opening_lots = lot_store.latest_before(stock_code, day)
+
+    def save_lots(lots):
+        lot_store.save(stock_code, day, lots)
+        if logger is not None:
+            logger(format_open_lots(stock_code, day, lots, opened_from))
+
+    return opening_lots, save_lots
+
+
+def _index_hook(index_dir: Path, stock_code: str, day, label: str):
+    if index_dir is None:
+        return None
+    if stock_code is None or day is None:
+        raise ValueError(f"無法判斷股票代碼或交易日，不能寫入券商索引: {label}")
+    index = BrokerIndex(index_dir)
+
+    def save_postings(key, ledgers):
+        if index.contains(stock_code, day, key):
+            return False
+        index.add(stock_code, day, *ledgers(), key=key)
+        return True
+
+    return save_postings
+
+
+def analyze_existing_csv(
+    input_csv: Path,
+    output_root: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    incremental: bool = True,
+    logger=None,
+    columnar: str = None,
+    carry_dir: Path = None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    tracer=None,
+    index_dir: Path = None,
+    memory_budget: float = None,
+) -> Path:
+    if memory_budget is not None and carry_dir is not None:
+        raise ValueError("分塊模式只輸出 step2–step4，不能搭配跨日 FIFO 結轉（--carry）")
     input_path = Path(input_csv)
     out_dir = build_analysis_output_dir(input_path, output_root)
     out_dir.mkdir(parents=True, exist_ok=True)
-    analyze_csv_file(input_path, out_dir, fee_discount=fee_discount, day_trade_tax=day_trade_tax)
-    return out_dir
\ No newline at end of file
+    opening_lots = save_lots = save_postings = None
+    if carry_dir is not None or index_dir is not None:
+        stock_code, day = infer_partition(input_path)
+        opening_lots, save_lots = _carry_hooks(carry_dir, stock_code, day, input_path.name, logger)
+        save_postings = _index_hook(index_dir, stock_code, day, input_path.name)
+
+    manifest = analyze_csv_file(
+        input_path,
+        out_dir,
+        fee_discount=fee_discount,
+        day_trade_tax=day_trade_tax,
+        incremental=incremental,
+        columnar=columnar,
+        opening_lots=opening_lots,
+        save_lots=save_lots,
+        excel=excel,
+        background_writes=background_writes,
+        tracer=tracer,
+        save_postings=save_postings,
+        memory_budget=memory_budget,
+    )
+    if logger is not None:
+        logger(format_manifest_summary(manifest))
+    return out_dir
+
+
+def analyze_flat_frame(
+    flat,
+    out_dir: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    input_fingerprint: str = None,
+    stock_code: str = None,
+    day=None,
+    logger=None,
+    columnar: str = None,
+    carry_dir: Path = None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    tracer=None,
+    index_dir: Path = None,
+) -> Path:
+    out_dir = Path(out_dir)
+    opening_lots, save_lots = _carry_hooks(carry_dir, stock_code, day, out_dir.name, logger)
+    save_postings = _index_hook(index_dir, stock_code, day, out_dir.name)
+    manifest = export_analysis(
+        flat,
+        out_dir,
+        fee_discount=fee_discount,
+        day_trade_tax=day_trade_tax,
+        input_fingerprint=input_fingerprint,
+        columnar=columnar,
+        opening_lots=opening_lots,
+        save_lots=save_lots,
+        excel=excel,
+        background_writes=background_writes,
+        tracer=tracer,
+        save_postings=save_postings,
+    )
+    if logger is not None:
+        logger(format_manifest_summary(manifest))
+    return out_dir
+
+
+def analyze_stream(
+    stream,
+    output_root: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    incremental: bool = True,
+    logger=None,
+    columnar: str = None,
+    carry_dir: Path = None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    tracer=None,
+    index_dir: Path = None,
+) -> Path:
+    tracer = get_tracer(tracer)
+    data = stream.read()
+    stock_code, day = infer_partition(data)
+    with tracer.span("analysis.parse", file="<stdin>", bytes=len(data)) as span:
+        flat = read_flat_csv(data)
+        span.set(rows=len(flat))
+    name = "_".join(str(part) for part in (stock_code or "stdin", day) if part is not None)
+    return analyze_flat_frame(
+        flat,
+        Path(output_root) / f"analysis_{name}",
+        fee_discount=fee_discount,
+        day_trade_tax=day_trade_tax,
+        input_fingerprint=content_fingerprint(data) if incremental else None,
+        stock_code=stock_code,
+        day=day,
+        logger=logger,
+        columnar=columnar,
+        carry_dir=carry_dir,
+        excel=excel,
+        background_writes=background_writes,
+        tracer=tracer,
+        index_dir=index_dir,
+    )
+
+
+def build_report_workbooks(outdirs, force: bool = False, logger=None) -> dict:
+    if logger is None:
+        logger = lambda message: None
+    written, fresh, failed = [], [], []
+    for outdir in outdirs:
+        try:
+            path, was_written = build_workbook(outdir, force=force)
+        except Exception as exc:
+            failed.append((Path(outdir), f"{type(exc).__name__}: {exc}"))
+            logger(f"❌ {outdir}: {exc}")
+            continue
+        (written if was_written else fresh).append(path)
+        logger(f"{'✅ 已產生' if was_written else '➖ 已是最新'}: {path}")
+    return {"written": written, "fresh": fresh, "failed": failed}
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+from .analysis_service import analyze_existing_csv
+from ..domain.tracing import Tracer
+from ..domain.trade_store import infer_partition
+
+GLOB_CHARS = set("*?[")
+
+
+def collect_input_files(target) -> list:
+    text = str(target)
+    if GLOB_CHARS & set(text):
+        return sorted(Path(path) for path in glob.glob(text, recursive=True) if Path(path).is_file())
+    path = Path(target)
+    if path.is_dir():
+        return sorted(child for child in path.glob("*.csv") if child.is_file())
+    return [path]
+
+
+def is_batch_target(target) -> bool:
+    return bool(GLOB_CHARS & set(str(target))) or Path(target).is_dir()
+
+
+def default_worker_count() -> int:
+    return max(os.cpu_count() or 1, 1)
+
+
+def _analyze_one(
+    input_csv: Path,
+    output_root: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    incremental: bool = True,
+    columnar: str = None,
+    carry_dir: Path = None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    index_dir: Path = None,
+    memory_budget: float = None,
+    tracer=None,
+):
+    started = time.perf_counter()
+    try:
+        out_dir = analyze_existing_csv(
+            input_csv,
+            output_root,
+            fee_discount=fee_discount,
+            day_trade_tax=day_trade_tax,
+            incremental=incremental,
+            columnar=columnar,
+            carry_dir=carry_dir,
+            excel=excel,
+            background_writes=background_writes,
+            tracer=tracer,
+            index_dir=index_dir,
+            memory_budget=memory_budget,
+        )
+    except Exception as exc:
+        return input_csv, None, time.perf_counter() - started, f"{type(exc).__name__}: {exc}"
+    return input_csv, out_dir, time.perf_counter() - started, None
+
+
+def _analyze_group(input_csvs, options, tracer=None):
+    # 跨日結轉時同一檔股票依日期串成一組；某天失敗後，之後的日子會接到更早的期末批次，只能整段停下
+    carry = options[5] is not None
+    for position, input_csv in enumerate(input_csvs):
+        result = _analyze_one(input_csv, *options, tracer)
+        yield (*result, False)
+        if carry and result[3] is not None:
+            for later_csv in input_csvs[position + 1:]:
+                yield later_csv, None, 0.0, f"{input_csv.name} 分析失敗，跨日結轉中斷", True
+            return
+
+
+def _analyze_series(input_csvs, trace_memory, *options):
+    if trace_memory is None:
+        return list(_analyze_group(input_csvs, options)), []
+    tracer = Tracer(memory=trace_memory)
+    try:
+        return list(_analyze_group(input_csvs, options, tracer)), tracer.records
+    finally:
+        tracer.close()
+
+
+def group_for_carry(files) -> list:
+    series = {}
+    for input_csv in files:
+        stock_code, day = infer_partition(input_csv)
+        series.setdefault(stock_code, []).append((day or date.min, input_csv))
+    return [[input_csv for _, input_csv in sorted(items)] for _, items in sorted(series.items(), key=lambda item: str(item[0]))]
+
+
+def analyze_csv_batch(
+    inputs,
+    output_root: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    workers: int = None,
+    logger=None,
+    incremental: bool = True,
+    columnar: str = None,
+    carry_dir: Path = None,
+    excel: str = "separate",
+    background_writes: bool = True,
+    tracer=None,
+    index_dir: Path = None,
+    memory_budget: float = None,
+):
+    if logger is None:
+        logger = lambda message: None
+
+    files = [Path(path) for path in inputs]
+    groups = [[input_csv] for input_csv in files] if carry_dir is None else group_for_carry(files)
+    workers = max(1, min(workers or default_worker_count(), len(groups) or 1))
+    options = (output_root, fee_discount, day_trade_tax, incremental, columnar, carry_dir, excel, background_writes, index_dir, memory_budget)
+    started = time.perf_counter()
+    succeeded, failed, skipped = [], [], []
+
+    def record(result):
+        input_csv, out_dir, elapsed, error, carry_break = result
+        done = len(succeeded) + len(failed) + len(skipped) + 1
+        if carry_break:
+            skipped.append((input_csv, error))
+            logger(f"[{done}/{len(files)}] ⏭️ {input_csv.name}: 略過（{error}）")
+        elif error is None:
+            succeeded.append((input_csv, out_dir, elapsed))
+            logger(f"[{done}/{len(files)}] ✅ {input_csv.name} ({elapsed:.2f}s)")
+        else:
+            failed.append((input_csv, error))
+            logger(f"[{done}/{len(files)}] ❌ {input_csv.name}: {error}")
+
+    if workers == 1:
+        for group in groups:
+            for result in _analyze_group(group, options, tracer):
+                record(result)
+    else:
+        trace_memory = tracer.memory if tracer is not None and tracer.enabled else None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_analyze_series, group, trace_memory, *options) for group in groups]
+            for future in as_completed(futures):
+                results, records = future.result()
+                if records:
+                    tracer.merge(records)
+                for result in results:
+                    record(result)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(files),
+        "workers": workers,
+        "succeeded": succeeded,
+        "failed": failed,
+        "skipped": skipped,
+        "elapsed": elapsed,
+        "files_per_sec": (len(files) / elapsed) if elapsed > 0 else 0.0,
+    }
+
+
+def format_batch_summary(summary) -> list:
+    lines = [
+        f"批次完成：{len(summary['succeeded'])}/{summary['files']} 成功，{len(summary['failed'])} 失敗"
+        + (f"，{len(summary['skipped'])} 略過" if summary["skipped"] else ""),
+        f"工作行程數：{summary['workers']}，總耗時 {summary['elapsed']:.2f}s，"
+        f"吞吐量 {summary['files_per_sec']:.2f} 檔/秒",
+    ]
+    for input_csv, error in summary["failed"]:
+        lines.append(f"  ❌ {input_csv}: {error}")
+    for input_csv, reason in summary["skipped"]:
+        lines.append(f"  ⏭️ {input_csv}: {reason}")
+    return lines
+
+
+__all__ = [
+    "analyze_csv_batch",
+    "collect_input_files",
+    "default_worker_count",
+    "format_batch_summary",
+    "group_for_carry",
+    "is_batch_target",
+]
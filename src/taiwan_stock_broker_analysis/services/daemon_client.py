@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlencode, urlparse
+
+DAEMON_ENV_VAR = "TSBA_DAEMON"
+TOKEN_ENV_VAR = "TSBA_DAEMON_TOKEN"
+TOKEN_HEADER = "X-TSBA-Token"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+TOKEN_DIR = Path.home() / ".cache" / "taiwan_stock_broker_analysis"
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+DAEMON_OPTION = "--daemon"
+DAEMON_COMMANDS = ("run", "analyze", "scrape", "download", "index", "store", "market", "excel")
+LONG_POLL_SECONDS = 10.0
+
+
+def daemon_url(url: str = None) -> str:
+    return (url or os.environ.get(DAEMON_ENV_VAR) or DEFAULT_URL).rstrip("/")
+
+
+def token_path(port: int) -> Path:
+    return TOKEN_DIR / f"daemon-{port}.token"
+
+
+def daemon_token(url: str = None) -> str:
+    # 環境變數優先，否則讀 tsba daemon start 寫下的權杖檔（Unix 上僅本人可讀）
+    token = os.environ.get(TOKEN_ENV_VAR)
+    if token:
+        return token
+    try:
+        return token_path(urlparse(daemon_url(url)).port or 80).read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def request_json(path: str, payload: dict = None, url: str = None, timeout: float = 30.0) -> dict:
+    base = daemon_url(url)
+    data = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    request = urllib.request.Request(base + path, data=data, method="GET" if data is None else "POST")
+    request.add_header("Content-Type", "application/json; charset=utf-8")
+    token = daemon_token(url)
+    if token:
+        request.add_header(TOKEN_HEADER, token)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as exc:
+        try:
+            message = json.loads(exc.read().decode("utf-8")).get("error", exc.reason)
+        except ValueError:
+            message = exc.reason
+        raise RuntimeError(f"常駐服務回應 {exc.code}：{message}")
+    except (urllib.error.URLError, ConnectionError, TimeoutError) as exc:
+        reason = getattr(exc, "reason", exc)
+        raise RuntimeError(f"無法連線到常駐服務 {base}（{reason}），請先執行 tsba daemon start")
+
+
+def strip_daemon_option(argv) -> list:
+    return [arg for arg in argv if arg != DAEMON_OPTION]
+
+
+def submit_job(command: str, argv, cwd=None, url: str = None) -> dict:
+    payload = {"command": command, "argv": list(argv), "cwd": str(cwd or os.getcwd())}
+    return request_json("/jobs", payload, url=url)
+
+
+def get_job(job_id: str, since: int = 0, wait: float = 0.0, url: str = None) -> dict:
+    query = urlencode({"since": since, "wait": wait})
+    return request_json(f"/jobs/{job_id}?{query}", url=url, timeout=wait + 30.0)
+
+
+def list_jobs(url: str = None) -> list:
+    return request_json("/jobs", url=url)["jobs"]
+
+
+def daemon_status(url: str = None) -> dict:
+    return request_json("/status", url=url)
+
+
+def shutdown_daemon(url: str = None) -> dict:
+    return request_json("/shutdown", {}, url=url)
+
+
+def wait_for_job(job_id: str, url: str = None, logger=print) -> dict:
+    since = 0
+    while True:
+        job = get_job(job_id, since=since, wait=LONG_POLL_SECONDS, url=url)
+        for line in job["log"]:
+            logger(line)
+        since = job["log_end"]
+        if job["state"] not in ("queued", "running"):
+            return job
+
+
+def forward_to_daemon(command: str, argv, url: str = None, logger=print) -> int:
+    argv = strip_daemon_option(argv)
+    if command == "analyze" and "-" in argv:
+        logger("❌ 常駐服務無法讀取本機標準輸入，請改傳檔案路徑")
+        return 1
+    job = None
+    try:
+        job = submit_job(command, argv, url=url)
+        if job["position"]:
+            logger(f"已送出工作 {job['id']}，前面還有 {job['position']} 個工作")
+        job = wait_for_job(job["id"], url=url, logger=logger)
+    except RuntimeError as exc:
+        logger(f"❌ {exc}")
+        return 1
+    except KeyboardInterrupt:
+        if job is not None:
+            logger(f"\n⏹️  停止等待；工作 {job['id']} 仍在常駐服務中執行（tsba daemon jobs 查看）")
+        return 1
+    return job["exit_code"] if job["state"] != "cancelled" else 1
+
+
+def format_job(job: dict) -> str:
+    elapsed = "" if job["elapsed"] is None else f"，{job['elapsed']:.2f}s"
+    exit_code = "" if job["exit_code"] is None else f"，結束碼 {job['exit_code']}"
+    return f"{job['id']}  {job['state']:<9} tsba {job['command']} {' '.join(job['argv'])}{elapsed}{exit_code}"
+
+
+def format_daemon_status(status: dict) -> list:
+    lines = [
+        f"常駐服務 pid {status['pid']}，已執行 {status['uptime']:.0f}s，"
+        f"排隊 {status['queued']} 個、執行中 {status['running'] or '無'}，"
+        f"完成 {status['done']} 個、失敗 {status['failed']} 個",
+    ]
+    warm = status["warm"]
+    lines.append(f"  已載入模組：{'、'.join(warm['modules']) or '無'}")
+    lines.append(f"  券商名稱快取：{warm['broker_names']:,} 筆")
+    lines.append(f"  {warm['http']}")
+    lines.append(f"  {warm['ocr']}")
+    return lines
+
+
+__all__ = [
+    "DAEMON_COMMANDS",
+    "DAEMON_ENV_VAR",
+    "DAEMON_OPTION",
+    "DEFAULT_HOST",
+    "DEFAULT_PORT",
+    "DEFAULT_URL",
+    "LOOPBACK_HOSTS",
+    "TOKEN_DIR",
+    "TOKEN_ENV_VAR",
+    "TOKEN_HEADER",
+    "daemon_status",
+    "daemon_token",
+    "daemon_url",
+    "format_daemon_status",
+    "format_job",
+    "forward_to_daemon",
+    "get_job",
+    "list_jobs",
+    "request_json",
+    "shutdown_daemon",
+    "strip_daemon_option",
+    "submit_job",
+    "token_path",
+    "wait_for_job",
+]
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+import hmac
+import io
+import itertools
+import json
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .daemon_client import (
+    DAEMON_COMMANDS,
+    DAEMON_OPTION,
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    LOOPBACK_HOSTS,
+    TOKEN_ENV_VAR,
+    TOKEN_HEADER,
+    token_path,
+)
+
+MAX_FINISHED_JOBS = 200
+MAX_LOG_LINES = 20000
+MAX_WAIT_SECONDS = 30.0
+WARM_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "requests", "onnxruntime", "ddddocr")
+
+
+class DaemonJob:
+    def __init__(self, job_id: str, command: str, argv, cwd: str):
+        self.id = job_id
+        self.command = command
+        self.argv = list(argv)
+        self.cwd = cwd
+        self.state = "queued"
+        self.exit_code = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.lines = []
+        self.dropped = 0
+
+    def snapshot(self, since: int = None) -> dict:
+        snapshot = {
+            "id": self.id,
+            "command": self.command,
+            "argv": self.argv,
+            "cwd": self.cwd,
+            "state": self.state,
+            "exit_code": self.exit_code,
+            "submitted": self.submitted,
+            "elapsed": None if self.started is None else (self.finished or time.time()) - self.started,
+            "log_end": self.dropped + len(self.lines),
+        }
+        if since is not None:
+            snapshot["log"] = self.lines[max(since - self.dropped, 0):]
+        return snapshot
+
+
+class _JobOutput(io.TextIOBase):
+    def __init__(self, daemon, job: DaemonJob):
+        self.daemon = daemon
+        self.job = job
+        self._partial = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        if lines:
+            self.daemon._append_log(self.job, lines)
+        return len(text)
+
+    def flush(self):
+        if self._partial:
+            self.daemon._append_log(self.job, [self._partial])
+            self._partial = ""
+
+
+class AnalysisDaemon:
+    def __init__(self, runner, logger=None, max_finished: int = MAX_FINISHED_JOBS):
+        self.runner = runner
+        self.logger = logger or (lambda message: None)
+        self.max_finished = max_finished
+        self.started = time.time()
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._changed = threading.Condition()
+        self._ids = itertools.count(1)
+        self._running = None
+        self._stopping = False
+        self._worker = threading.Thread(target=self._work, name="tsba-daemon-worker", daemon=True)
+
+    def start(self):
+        self._worker.start()
+        return self
+
+    def submit(self, command: str, argv, cwd: str) -> dict:
+        if command not in DAEMON_COMMANDS:
+            raise ValueError(f"常駐服務不支援的子命令：{command}（可用：{' / '.join(DAEMON_COMMANDS)}）")
+        if DAEMON_OPTION in argv:
+            raise ValueError(f"送到常駐服務的參數不可再帶 {DAEMON_OPTION}")
+        if not os.path.isdir(cwd):
+            raise ValueError(f"工作目錄不存在：{cwd}")
+        with self._changed:
+            if self._stopping:
+                raise ValueError("常駐服務正在關閉")
+            job = DaemonJob(f"{next(self._ids):05d}", command, argv, cwd)
+            self._jobs[job.id] = job
+            position = self._queue.qsize() + (self._running is not None)
+            self._queue.put(job)
+        self.logger(f"收到工作 {job.id}：tsba {command} {' '.join(job.argv)}")
+        return dict(job.snapshot(), position=position)
+
+    def job(self, job_id: str, since: int = 0, wait: float = 0.0) -> dict:
+        deadline = time.monotonic() + min(max(wait, 0.0), MAX_WAIT_SECONDS)
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            while (
+                job.state in ("queued", "running")
+                and job.dropped + len(job.lines) <= since
+                and self._changed.wait(max(deadline - time.monotonic(), 0.0))
+            ):
+                pass
+            return job.snapshot(since)
+
+    def jobs(self) -> list:
+        with self._changed:
+            return [job.snapshot() for job in self._jobs.values()]
+
+    def status(self) -> dict:
+        with self._changed:
+            states = [job.state for job in self._jobs.values()]
+            running = None if self._running is None else self._running.id
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "queued": states.count("queued"),
+            "running": running,
+            "done": states.count("done"),
+            "failed": states.count("failed"),
+            "warm": warm_status(),
+        }
+
+    def stop(self, timeout: float = None):
+        with self._changed:
+            self._stopping = True
+            for job in self._jobs.values():
+                if job.state == "queued":
+                    job.state = "cancelled"
+            self._changed.notify_all()
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def _append_log(self, job: DaemonJob, lines):
+        with self._changed:
+            job.lines.extend(lines)
+            overflow = len(job.lines) - MAX_LOG_LINES
+            if overflow > 0:
+                del job.lines[:overflow]
+                job.dropped += overflow
+            self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._changed:
+                if job.state != "queued":
+                    continue
+                job.state = "running"
+                job.started = time.time()
+                self._running = job
+                self._changed.notify_all()
+            exit_code = self._run(job)
+            with self._changed:
+                job.exit_code = exit_code
+                job.state = "done" if exit_code == 0 else "failed"
+                job.finished = time.time()
+                self._running = None
+                self._forget_finished()
+                self._changed.notify_all()
+            self.logger(f"工作 {job.id} {'完成' if exit_code == 0 else '失敗'}（{job.finished - job.started:.2f}s）")
+
+    def _run(self, job: DaemonJob) -> int:
+        # 一次只跑一個工作，執行期間整個行程的 stdout / stderr / 工作目錄都屬於這個工作
+        output = _JobOutput(self, job)
+        previous_cwd = os.getcwd()
+        previous_stdin = sys.stdin
+        sys.stdin = io.StringIO()
+        try:
+            os.chdir(job.cwd)
+            with redirect_stdout(output), redirect_stderr(output):
+                try:
+                    exit_code = self.runner(job.command, job.argv)
+                except SystemExit as exc:
+                    exit_code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+                    if isinstance(exc.code, str):
+                        print(exc.code)
+                except Exception:
+                    traceback.print_exc()
+                    exit_code = 1
+                output.flush()
+        finally:
+            sys.stdin = previous_stdin
+            os.chdir(previous_cwd)
+        return exit_code or 0
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state not in ("queued", "running")]
+        for job_id in finished[: max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+
+def warm_up(ocr: bool = False, logger=None) -> float:
+    started = time.perf_counter()
+    from ..domain import analysis  # noqa: F401  預先載入 pandas / numpy 與分析模組
+    from ..domain.broker_names import get_default_normalizer
+    from ..domain.http_client import get_default_http_client
+
+    get_default_normalizer().load()
+    get_default_http_client()
+    if ocr:
+        from .ocr_service import get_ocr_service
+
+        try:
+            get_ocr_service().load()
+        except Exception as exc:
+            if logger is not None:
+                logger(f"⚠️ OCR 模型預載失敗，第一次下載時再載入：{exc}")
+    return time.perf_counter() - started
+
+
+def warm_status() -> dict:
+    package = __package__.rsplit(".", 1)[0]
+    normalizer = sys.modules.get(f"{package}.domain.broker_names")
+    http_client = sys.modules.get(f"{package}.domain.http_client")
+    ocr_service = sys.modules.get(f"{package}.services.ocr_service")
+    ocr = "OCR 模型尚未載入"
+    if ocr_service is not None and ocr_service.get_ocr_service().loaded:
+        ocr = ocr_service.format_ocr_stats(ocr_service.get_ocr_service().stats())
+    return {
+        "modules": [name for name in WARM_MODULES if name in sys.modules],
+        "broker_names": 0 if normalizer is None else normalizer.get_default_normalizer().cached_names,
+        "http": "HTTP 連線池尚未建立" if http_client is None
+        else http_client.format_http_stats(http_client.get_default_http_client().stats()),
+        "ocr": ocr,
+    }
+
+
+def _hostname(value: str) -> str:
+    # "127.0.0.1:8765" / "[::1]:8765" / "http://localhost:8765" → 主機名稱
+    value = value.split("://", 1)[-1].split("/", 1)[0]
+    if value.startswith("["):
+        return value[1:].split("]", 1)[0]
+    return value.rsplit(":", 1)[0] if value.count(":") == 1 else value
+
+
+def write_token_file(port: int, token: str):
+    path = token_path(port)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # 已存在的檔案 os.open 不會改權限；Windows（Python 3.13 以前）沒有 fchmod，只能靠使用者目錄本身的 ACL
+    if hasattr(os, "fchmod"):
+        os.fchmod(descriptor, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as file_obj:
+        file_obj.write(token)
+    return path
+
+
+def make_server(daemon: AnalysisDaemon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, token: str = None):
+    # 一律要求權杖、JSON 內容與本機 Host / Origin：瀏覽器的跨站「簡單請求」與 DNS rebinding 都送不進來
+    token = token or os.environ.get(TOKEN_ENV_VAR)
+    if not token:
+        raise ValueError("常駐服務必須設定權杖")
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if parts == ["status"]:
+                return self._reply(200, daemon.status())
+            if parts == ["jobs"]:
+                return self._reply(200, {"jobs": daemon.jobs()})
+            if len(parts) == 2 and parts[0] == "jobs":
+                query = parse_qs(url.query)
+                try:
+                    since = int(query.get("since", ["0"])[0])
+                    wait = float(query.get("wait", ["0"])[0])
+                except ValueError:
+                    return self._reply(400, {"error": "since / wait 參數格式錯誤"})
+                job = daemon.job(parts[1], since=since, wait=wait)
+                if job is None:
+                    return self._reply(404, {"error": f"找不到工作 {parts[1]}"})
+                return self._reply(200, job)
+            self._reply(404, {"error": f"未知路徑 {url.path}"})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            path = urlparse(self.path).path.strip("/")
+            if self.headers.get_content_type() != "application/json":
+                return self._reply(415, {"error": "請求內容必須是 application/json"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            except ValueError:
+                return self._reply(400, {"error": "請求內容不是 JSON"})
+            if path == "jobs":
+                try:
+                    job = daemon.submit(payload.get("command"), list(payload.get("argv", [])), payload.get("cwd") or os.getcwd())
+                except (TypeError, ValueError) as exc:
+                    return self._reply(400, {"error": str(exc)})
+                return self._reply(202, job)
+            if path == "shutdown":
+                self._reply(200, {"stopping": True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            self._reply(404, {"error": f"未知路徑 /{path}"})
+
+        def _authorized(self) -> bool:
+            if _hostname(self.headers.get("Host", "")) not in LOOPBACK_HOSTS:
+                self._reply(403, {"error": "只接受以本機位址連線"})
+                return False
+            origin = self.headers.get("Origin")
+            if origin is not None and _hostname(origin) not in LOOPBACK_HOSTS:
+                self._reply(403, {"error": f"拒絕來自 {origin} 的請求"})
+                return False
+            if not hmac.compare_digest(self.headers.get(TOKEN_HEADER, "").encode("utf-8"), token.encode("utf-8")):
+                self._reply(401, {"error": f"缺少或錯誤的 {TOKEN_HEADER}"})
+                return False
+            return True
+
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_daemon(runner, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, warm_ocr: bool = False, logger=None):
+    if logger is None:
+        # 工作執行時 stdout 會導向該工作的紀錄，服務本身的訊息固定寫到啟動時的終端機
+        console = sys.stdout
+        logger = lambda message: print(message, file=console, flush=True)
+    token = os.environ.get(TOKEN_ENV_VAR) or secrets.token_urlsafe(32)
+    daemon = AnalysisDaemon(runner, logger=logger).start()
+    try:
+        server = make_server(daemon, host, port, token=token)
+    except BaseException:
+        daemon.stop()
+        raise
+    port = server.server_address[1]
+    token_file = write_token_file(port, token)
+    logger(f"權杖已寫入 {token_file}（客戶端會自動讀取）")
+    logger(f"預熱完成（{warm_up(ocr=warm_ocr, logger=logger):.2f}s）")
+    logger(f"常駐服務已啟動：http://{host}:{port}（pid {os.getpid()}），Ctrl+C 或 tsba daemon stop 結束")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            if token_file.read_text(encoding="utf-8") == token:
+                token_file.unlink()
+        except OSError:
+            pass
+        logger("停止接受新工作，等待執行中的工作結束…")
+        daemon.stop()
+        logger("常駐服務已結束")
+
+
+__all__ = [
+    "AnalysisDaemon",
+    "DaemonJob",
+    "make_server",
+    "serve_daemon",
+    "warm_status",
+    "warm_up",
+    "write_token_file",
+]
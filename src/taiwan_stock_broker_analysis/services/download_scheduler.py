@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ..domain.captcha import CaptchaStats
+from ..domain.http_client import DEFAULT_POOL_SIZE, PooledHttpClient
+from ..domain.scraping import BASE_URL, fetch_csv_text
+
+DEFAULT_MIN_INTERVAL = 10.0
+DEFAULT_CONCURRENCY = 4
+WATCHLIST_SEPARATOR_RE = re.compile(r"[\s,，]+")
+
+
+class RateLimiter:
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = float(min_interval)
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot = None
+        self.granted = 0
+        self.waited = 0.0
+
+    def acquire(self, deadline=None) -> bool:
+        with self._lock:
+            now = self.clock()
+            slot = now if self._next_slot is None else max(now, self._next_slot)
+            if deadline is not None and slot > deadline:
+                return False
+            self._next_slot = slot + self.min_interval
+            self.granted += 1
+            self.waited += slot - now
+        if slot > now:
+            self.sleep(slot - now)
+        return True
+
+
+def read_watchlist(path) -> list:
+    codes = []
+    for line in Path(path).read_text(encoding="utf-8-sig").splitlines():
+        line = line.split("#", 1)[0]
+        for code in WATCHLIST_SEPARATOR_RE.split(line.strip()):
+            if code and code not in codes:
+                codes.append(code)
+    return codes
+
+
+class DownloadScheduler:
+    def __init__(
+        self,
+        captcha_solver,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        stock_timeout: float = None,
+        max_retries: int = 5,
+        logger=None,
+        base_url: str = BASE_URL,
+        timeout: float = 30,
+        verify: bool = False,
+        rate_limiter: RateLimiter = None,
+        http_client: PooledHttpClient = None,
+        captcha_stats: CaptchaStats = None,
+        raw_cache=None,
+        refresh: bool = False,
+        tracer=None,
+    ):
+        self.captcha_solver = captcha_solver
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.stock_timeout = stock_timeout
+        self.max_retries = max_retries
+        self.logger = logger if logger is not None else (lambda message: None)
+        self.base_url = base_url
+        self.timeout = timeout
+        self.verify = verify
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(min_interval)
+        if http_client is None:
+            http_client = PooledHttpClient(pool_size=max(self.max_concurrency, DEFAULT_POOL_SIZE))
+        self.http_client = http_client
+        self.captcha_stats = captcha_stats if captcha_stats is not None else CaptchaStats()
+        self.raw_cache = raw_cache
+        self.refresh = refresh
+        self.tracer = tracer
+        self.cache_hits = set()
+
+    def download_one(self, stock_code: str, handler=None):
+        started = time.monotonic()
+        deadline = None if self.stock_timeout is None else started + self.stock_timeout
+        result = {"stock_code": stock_code, "ok": False, "output": None, "error": None, "elapsed": 0.0}
+        try:
+            ok, csv_text, error, from_cache = fetch_csv_text(
+                stock_code,
+                self.captcha_solver,
+                raw_cache=self.raw_cache,
+                refresh=self.refresh,
+                max_retries=self.max_retries,
+                logger=lambda message: self.logger(f"[{stock_code}] {message}"),
+                timeout=self.timeout,
+                verify=self.verify,
+                base_url=self.base_url,
+                rate_limiter=self.rate_limiter,
+                deadline=deadline,
+                http_client=self.http_client,
+                captcha_stats=self.captcha_stats,
+                tracer=self.tracer,
+            )
+            if from_cache:
+                self.cache_hits.add(stock_code)
+            if ok:
+                result["output"] = handler(stock_code, csv_text) if handler is not None else csv_text
+            result["ok"], result["error"] = ok, error
+        except Exception as exc:
+            result["error"] = f"{type(exc).__name__}: {exc}"
+        result["elapsed"] = time.monotonic() - started
+        return result
+
+    def run(self, stock_codes, handler=None, on_result=None):
+        stock_codes = list(stock_codes)
+        results = [None] * len(stock_codes)
+
+        def task(index, stock_code):
+            result = self.download_one(stock_code, handler)
+            results[index] = result
+            status = "✅" if result["ok"] else f"❌ {result['error']}"
+            self.logger(f"[{stock_code}] 完成 ({result['elapsed']:.1f}s) {status}")
+            if on_result is not None:
+                on_result(result)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(stock_codes) or 1)) as executor:
+            for future in [executor.submit(task, index, code) for index, code in enumerate(stock_codes)]:
+                future.result()
+        return results
+
+
+def format_schedule_summary(results, elapsed: float) -> list:
+    failed = [result for result in results if not result["ok"]]
+    lines = [
+        f"排程完成：{len(results) - len(failed)}/{len(results)} 成功，{len(failed)} 失敗，總耗時 {elapsed:.1f}s",
+    ]
+    for result in failed:
+        lines.append(f"  ❌ {result['stock_code']}: {result['error']}")
+    return lines
+
+
+__all__ = [
+    "DEFAULT_CONCURRENCY",
+    "DEFAULT_MIN_INTERVAL",
+    "DEFAULT_POOL_SIZE",
+    "DownloadScheduler",
+    "RateLimiter",
+    "format_schedule_summary",
+    "read_watchlist",
+]
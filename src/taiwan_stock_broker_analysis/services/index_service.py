@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import time
+from pathlib import Path
+
+from .batch_service import collect_input_files
+from ..domain.analysis import add_mother_column, read_flat_csv
+from ..domain.analysis_cache import file_fingerprint
+from ..domain.broker_index import BrokerIndex
+from ..domain.ledger import build_broker_ledger
+from ..domain.trade_store import infer_partition
+
+
+def index_csv(index: BrokerIndex, input_csv: Path, stock_code: str = None, day=None):
+    code, partition_day = infer_partition(input_csv, stock_code, day)
+    if code is None or partition_day is None:
+        raise ValueError("無法判斷股票代碼或交易日，請用 --stock / --date 指定")
+    key = file_fingerprint(input_csv)
+    if index.contains(code, partition_day, key):
+        return code, partition_day, None
+    flat = add_mother_column(read_flat_csv(input_csv))
+    index.add(code, partition_day, build_broker_ledger(flat, "券商"), build_broker_ledger(flat, "母券商"), key=key)
+    return code, partition_day, len(flat)
+
+
+def index_csv_files(inputs, index_root, stock_code: str = None, day=None, logger=None) -> dict:
+    if logger is None:
+        logger = lambda message: None
+    index = BrokerIndex(index_root)
+    files = [path for target in inputs for path in collect_input_files(target)]
+    started = time.perf_counter()
+    added, unchanged, skipped = [], [], []
+    for input_csv in files:
+        try:
+            code, partition_day, rows = index_csv(index, input_csv, stock_code, day)
+        except Exception as exc:
+            skipped.append((input_csv, f"{type(exc).__name__}: {exc}"))
+            logger(f"❌ {Path(input_csv).name}: {exc}")
+            continue
+        if rows is None:
+            unchanged.append((code, partition_day))
+            logger(f"➖ {Path(input_csv).name} → {code} {partition_day.isoformat()}（已在索引中）")
+        else:
+            added.append((code, partition_day, rows))
+            logger(f"✅ {Path(input_csv).name} → {code} {partition_day.isoformat()}（{rows:,} 筆）")
+    return {
+        "files": len(files),
+        "added": added,
+        "unchanged": unchanged,
+        "skipped": skipped,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def format_index_summary(summary: dict) -> list:
+    lines = [
+        f"索引完成：新增 {len(summary['added'])} 個、沿用 {len(summary['unchanged'])} 個、"
+        f"失敗 {len(summary['skipped'])} 個，共 {summary['files']} 個檔案，耗時 {summary['elapsed']:.2f}s",
+    ]
+    for input_csv, error in summary["skipped"]:
+        lines.append(f"  ❌ {input_csv}: {error}")
+    return lines
+
+
+__all__ = [
+    "format_index_summary",
+    "index_csv",
+    "index_csv_files",
+]
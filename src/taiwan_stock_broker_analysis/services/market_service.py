@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from ..domain.analysis import load_report
+from ..domain.leaderboard import (
+    DEFAULT_TOP_K,
+    MARKET_REPORTS,
+    SOURCE_COLUMNS,
+    SOURCE_REPORT,
+    MarketLeaderboard,
+    stock_code_from_outdir,
+)
+from ..domain.report_writer import atomic_write
+
+
+def _fold_outdirs(outdirs, top_k: int):
+    board = MarketLeaderboard(top_k)
+    failed = []
+    for outdir in outdirs:
+        stock_code = stock_code_from_outdir(outdir)
+        try:
+            if stock_code is None:
+                raise ValueError("無法從資料夾名稱判斷股票代碼（應為 analysis_<代碼>_...）")
+            board.add(stock_code, load_report(outdir, SOURCE_REPORT, columns=SOURCE_COLUMNS))
+        except Exception as exc:
+            failed.append((Path(outdir), f"{type(exc).__name__}: {exc}"))
+    return board, failed
+
+
+def build_market_leaderboard(
+    outdirs,
+    output_dir: Path,
+    top_k: int = DEFAULT_TOP_K,
+    workers: int = 1,
+    logger=None,
+) -> dict:
+    if logger is None:
+        logger = lambda message: None
+    outdirs = [Path(outdir) for outdir in outdirs]
+    workers = max(1, min(workers, len(outdirs) or 1))
+    started = time.perf_counter()
+    if workers == 1:
+        board, failed = _fold_outdirs(outdirs, top_k)
+    else:
+        board, failed = MarketLeaderboard(top_k), []
+        chunks = [outdirs[index::workers] for index in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for partial, partial_failed in executor.map(_fold_outdirs, chunks, [top_k] * workers):
+                board.merge(partial)
+                failed += partial_failed
+    for outdir, error in failed:
+        logger(f"❌ {outdir}: {error}")
+
+    output_dir = Path(output_dir)
+    reports = board.reports()
+    written = []
+    for name in MARKET_REPORTS:
+        frame = reports[name]
+        written.append(atomic_write(
+            output_dir / f"{name}.csv", lambda temp: frame.to_csv(temp, encoding="utf-8-sig", index=False)
+        ))
+    return {
+        "stocks": board.stocks,
+        "brokers": len(board.totals()),
+        "failed": failed,
+        "reports": reports,
+        "written": written,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def format_market_summary(summary: dict, limit: int = 5) -> list:
+    lines = [
+        f"市場排行完成：{summary['stocks']} 檔股票、{summary['brokers']} 家母券商，"
+        f"{len(summary['failed'])} 個資料夾失敗，耗時 {summary['elapsed']:.2f}s",
+    ]
+    for title, name, column in [
+        ("已實現淨損益最高", "market_step6_top_profit", "已實現淨損益(FIFO)"),
+        ("已實現淨損失最大", "market_step6_top_loss", "已實現淨損益(FIFO)"),
+        ("買超金額最高", "market_step7_top_netbuy", "買超金額"),
+        ("賣超金額最高", "market_step7_top_netsell", "買超金額"),
+    ]:
+        frame = summary["reports"][name].head(limit)
+        if frame.empty:
+            continue
+        lines.append(f"{title}的母券商：")
+        for index, (_, row) in enumerate(frame.iterrows(), start=1):
+            lines.append(f"  {index:2d}. {row['母券商']:<10} {abs(int(row[column])):>15,} 元（{int(row['股票數'])} 檔）")
+    if summary["written"]:
+        lines.append(f"報表已寫入 {Path(summary['written'][0]).parent}")
+    return lines
+
+
+__all__ = [
+    "build_market_leaderboard",
+    "format_market_summary",
+]
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from ..domain.captcha import decode_ctc_candidates
+
+REPLICAS_ENV_VAR = "TSBA_OCR_REPLICAS"
+THREADS_ENV_VAR = "TSBA_OCR_THREADS"
+DEFAULT_REPLICAS = 1
+DEFAULT_INTRA_OP_THREADS = 1
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(int(os.environ.get(name, default)), 1)
+    except ValueError:
+        return default
+
+
+@contextmanager
+def _capped_inference_sessions(intra_op_threads: int):
+    # ddddocr 不開放 SessionOptions，載入期間暫時替換 InferenceSession 以限制 intra-op 執行緒數
+    import onnxruntime
+
+    original = onnxruntime.InferenceSession
+
+    def capped_session(*args, **kwargs):
+        options = kwargs.get("sess_options") or onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        kwargs["sess_options"] = options
+        return original(*args, **kwargs)
+
+    onnxruntime.InferenceSession = capped_session
+    try:
+        yield
+    finally:
+        onnxruntime.InferenceSession = original
+
+
+class OcrService:
+    def __init__(self, replicas: int = None, intra_op_threads: int = None, model_factory=None):
+        self.replicas = replicas or _env_int(REPLICAS_ENV_VAR, DEFAULT_REPLICAS)
+        self.intra_op_threads = intra_op_threads or _env_int(THREADS_ENV_VAR, DEFAULT_INTRA_OP_THREADS)
+        self.model_factory = model_factory
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._models = None
+        self._idle = queue.Queue()
+        self.load_seconds = 0.0
+        self.inferences = 0
+        self.inference_seconds = 0.0
+        self.max_inference_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._models is not None
+
+    def load(self) -> float:
+        self._ensure_loaded()
+        return self.load_seconds
+
+    def classify(self, image_bytes: bytes) -> str:
+        return self._run(lambda model: model.classification(image_bytes))
+
+    def candidates(self, image_bytes: bytes, top_k: int = 3) -> list:
+        def infer(model):
+            try:
+                return model.classification(image_bytes, probability=True)
+            except TypeError:
+                return model.classification(image_bytes)
+
+        result = self._run(infer)
+        if isinstance(result, dict) and "probabilities" in result:
+            decoded = decode_ctc_candidates(result["probabilities"], result["charset"], top_k=top_k)
+            return decoded or [(result.get("text", ""), result.get("confidence"))]
+        return [(result, None)]
+
+    def _run(self, infer):
+        self._ensure_loaded()
+        model = self._idle.get()
+        try:
+            started = time.perf_counter()
+            result = infer(model)
+            elapsed = time.perf_counter() - started
+        finally:
+            self._idle.put(model)
+        with self._stats_lock:
+            self.inferences += 1
+            self.inference_seconds += elapsed
+            self.max_inference_seconds = max(self.max_inference_seconds, elapsed)
+        return result
+
+    def classify_batch(self, images) -> list:
+        images = list(images)
+        self._ensure_loaded()
+        if self.replicas == 1 or len(images) <= 1:
+            return [self.classify(image_bytes) for image_bytes in images]
+        with ThreadPoolExecutor(max_workers=min(self.replicas, len(images))) as executor:
+            return list(executor.map(self.classify, images))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "replicas": self.replicas,
+                "intra_op_threads": self.intra_op_threads,
+                "load_seconds": self.load_seconds,
+                "inferences": self.inferences,
+                "mean_inference_ms": (self.inference_seconds / self.inferences * 1000) if self.inferences else 0.0,
+                "max_inference_ms": self.max_inference_seconds * 1000,
+            }
+
+    def _ensure_loaded(self):
+        if self._models is not None:
+            return
+        with self._load_lock:
+            if self._models is not None:
+                return
+            started = time.perf_counter()
+            factory = self.model_factory or self._load_ddddocr
+            models = [factory() for _ in range(self.replicas)]
+            self.load_seconds = time.perf_counter() - started
+            for model in models:
+                self._idle.put(model)
+            self._models = models
+
+    def _load_ddddocr(self):
+        import ddddocr  # type: ignore
+
+        with _capped_inference_sessions(self.intra_op_threads):
+            try:
+                return ddddocr.DdddOcr(show_ad=False)
+            except TypeError:
+                return ddddocr.DdddOcr()
+
+
+def format_ocr_stats(stats: dict) -> str:
+    return (
+        f"OCR：{stats['replicas']} 個模型副本 × {stats['intra_op_threads']} 執行緒，"
+        f"載入 {stats['load_seconds']:.2f}s，辨識 {stats['inferences']} 次，"
+        f"平均 {stats['mean_inference_ms']:.1f}ms，最慢 {stats['max_inference_ms']:.1f}ms"
+    )
+
+
+_DEFAULT_SERVICE = None
+_DEFAULT_SERVICE_LOCK = threading.Lock()
+
+
+def get_ocr_service() -> OcrService:
+    global _DEFAULT_SERVICE
+    with _DEFAULT_SERVICE_LOCK:
+        if _DEFAULT_SERVICE is None:
+            _DEFAULT_SERVICE = OcrService()
+        return _DEFAULT_SERVICE
+
+
+__all__ = [
+    "OcrService",
+    "REPLICAS_ENV_VAR",
+    "THREADS_ENV_VAR",
+    "format_ocr_stats",
+    "get_ocr_service",
+]
@@ -1,28 +1,208 @@
 # -*- coding: utf-8 -*-
+import time
 import warnings
 from pathlib import Path
 
 import requests
 
-from .analysis_service import build_analysis_output_dir
+from .analysis_service import analyze_existing_csv, analyze_flat_frame
+from .download_scheduler import DEFAULT_CONCURRENCY, DEFAULT_MIN_INTERVAL, DownloadScheduler, format_schedule_summary
+from .ocr_service import format_ocr_stats
 from .scraping_service import AutomaticCaptchaScraper, timestamped_log
-from ..domain.analysis import analyze_csv_file
+from .store_service import append_csv
+from ..domain.analysis import format_broker_summary, read_flat_text
+from ..domain.analysis_cache import content_fingerprint
+from ..domain.captcha import format_captcha_stats
+from ..domain.http_client import DEFAULT_POOL_SIZE, format_http_stats, get_default_http_client
+from ..domain.raw_cache import format_raw_cache_stats, trading_date
+from ..domain.scraping import save_processed_csv, save_raw_csv
+from ..domain.trade_store import TradeStore
+from ..domain.tracing import get_tracer
+from ..domain.twse_csv import read_text_preamble
 
 warnings.filterwarnings("ignore", category=UserWarning)
 requests.packages.urllib3.disable_warnings()  # type: ignore
 
 
-def run_all(stock_code: str, outdir: Path, retries: int, fee_discount: float, day_trade_tax: float):
-    ok, raw_csv, processed_csv, err = AutomaticCaptchaScraper(logger=timestamped_log).download_for_pipeline(
+def analyze_downloaded_text(
+    stock_code: str,
+    csv_text: str,
+    outdir: Path,
+    fee_discount: float,
+    day_trade_tax: float,
+    archive: bool = False,
+    trade_store: TradeStore = None,
+    carry: Path = None,
+    tracer=None,
+    logger=timestamped_log,
+    index: Path = None,
+):
+    tracer = get_tracer(tracer)
+    day = read_text_preamble(csv_text)["trade_date"]
+    if day is None:
+        day = trading_date()
+        logger(f"⚠️ 下載內容沒有資料日期，改以時鐘推算交易日 {day.isoformat()}（國定假日或隔日補抓可能不正確）")
+    with tracer.span("analysis.parse", file=stock_code, bytes=len(csv_text)) as span:
+        flat = read_flat_text(csv_text)
+        span.set(rows=len(flat))
+    for line in format_broker_summary(flat, stock_code):
+        logger(line)
+    raw_csv = save_raw_csv(csv_text, stock_code, label="爬蟲資料", encoding="utf-8-sig") if archive else None
+    out_dir = analyze_flat_frame(
+        flat,
+        Path(outdir) / f"analysis_{stock_code}_{day.isoformat()}",
+        fee_discount=fee_discount,
+        day_trade_tax=day_trade_tax,
+        input_fingerprint=content_fingerprint(csv_text),
+        stock_code=stock_code,
+        day=day,
+        logger=logger if carry is not None else None,
+        carry_dir=carry,
+        tracer=tracer,
+        index_dir=index,
+    )
+    if trade_store is not None:
+        trade_store.append(stock_code, day, flat, source=raw_csv or "memory")
+        logger(f"已寫入資料庫 {trade_store.root}：{stock_code} {day.isoformat()}（{len(flat):,} 筆）")
+    return out_dir, raw_csv
+
+
+def run_all(
+    stock_code: str,
+    outdir: Path,
+    retries: int,
+    fee_discount: float,
+    day_trade_tax: float,
+    refresh: bool = False,
+    store: Path = None,
+    carry: Path = None,
+    tracer=None,
+    in_memory: bool = False,
+    archive: bool = False,
+    index: Path = None,
+):
+    scraper = AutomaticCaptchaScraper(logger=timestamped_log, tracer=tracer)
+    if in_memory:
+        ok, csv_text, err, _ = scraper.fetch_for_pipeline(stock_code, max_retries=retries, refresh=refresh)
+        if not ok:
+            raise RuntimeError(err)
+        out_dir, _ = analyze_downloaded_text(
+            stock_code,
+            csv_text,
+            outdir,
+            fee_discount,
+            day_trade_tax,
+            archive=archive,
+            trade_store=None if store is None else TradeStore(store),
+            carry=carry,
+            tracer=tracer,
+            index=index,
+        )
+        timestamped_log(f"✅ 全流程完成。輸出目錄：{out_dir.resolve()}")
+        return
+
+    ok, raw_csv, processed_csv, err = scraper.download_for_pipeline(
         stock_code,
         max_retries=retries,
+        refresh=refresh,
     )
     if not ok:
         raise RuntimeError(err)
 
     input_path = Path(processed_csv)
-    out_dir = build_analysis_output_dir(input_path, outdir)
-    out_dir.mkdir(parents=True, exist_ok=True)
+    out_dir = analyze_existing_csv(
+        input_path,
+        outdir,
+        fee_discount=fee_discount,
+        day_trade_tax=day_trade_tax,
+        logger=timestamped_log if carry is not None else None,
+        carry_dir=carry,
+        tracer=tracer,
+        index_dir=index,
+    )
+    if store is not None:
+        _, day, rows = append_csv(TradeStore(store), input_path, stock_code)
+        timestamped_log(f"已寫入資料庫 {store}：{stock_code} {day.isoformat()}（{rows:,} 筆）")
+    timestamped_log(f"✅ 全流程完成。輸出目錄：{out_dir.resolve()}")
 
-    analyze_csv_file(input_path, out_dir, fee_discount=fee_discount, day_trade_tax=day_trade_tax)
-    timestamped_log(f"✅ 全流程完成。輸出目錄：{out_dir.resolve()}")
\ No newline at end of file
+def run_watchlist(
+    stock_codes,
+    outdir: Path,
+    retries: int,
+    fee_discount: float,
+    day_trade_tax: float,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    min_interval: float = DEFAULT_MIN_INTERVAL,
+    stock_timeout: float = None,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    refresh: bool = False,
+    store: Path = None,
+    carry: Path = None,
+    tracer=None,
+    in_memory: bool = False,
+    archive: bool = False,
+    index: Path = None,
+):
+    scraper = AutomaticCaptchaScraper(logger=timestamped_log, tracer=tracer)
+    trade_store = None if store is None else TradeStore(store)
+
+    def analyze_download(stock_code, csv_text):
+        if in_memory:
+            from_cache = stock_code in scheduler.cache_hits
+            out_dir, raw_csv = analyze_downloaded_text(
+                stock_code,
+                csv_text,
+                outdir,
+                fee_discount,
+                day_trade_tax,
+                archive=archive,
+                trade_store=trade_store,
+                carry=carry,
+                tracer=tracer,
+                index=index,
+                logger=lambda message: timestamped_log(f"[{stock_code}] {message}"),
+            )
+            source = raw_csv or ("原始 CSV 快取" if from_cache else "未存檔")
+            timestamped_log(f"[{stock_code}] 下載：{source}，輸出目錄：{out_dir.resolve()}")
+            return out_dir
+        raw_csv = save_raw_csv(csv_text, stock_code, label="爬蟲資料", encoding="utf-8-sig")
+        input_path = Path(save_processed_csv(csv_text, stock_code))
+        out_dir = analyze_existing_csv(
+            input_path,
+            outdir,
+            fee_discount=fee_discount,
+            day_trade_tax=day_trade_tax,
+            logger=timestamped_log if carry is not None else None,
+            carry_dir=carry,
+            tracer=tracer,
+            index_dir=index,
+        )
+        if trade_store is not None:
+            append_csv(trade_store, input_path, stock_code)
+        timestamped_log(f"[{stock_code}] 下載：{raw_csv}，輸出目錄：{out_dir.resolve()}")
+        return out_dir
+
+    scheduler = DownloadScheduler(
+        scraper._solve_captcha,
+        max_concurrency=concurrency,
+        min_interval=min_interval,
+        stock_timeout=stock_timeout,
+        max_retries=retries,
+        logger=timestamped_log,
+        http_client=get_default_http_client(max(pool_size, concurrency)),
+        captcha_stats=scraper.captcha_stats,
+        raw_cache=scraper.raw_cache,
+        refresh=refresh,
+        tracer=tracer,
+    )
+    timestamped_log(f"開始排程 {len(stock_codes)} 檔股票，同時 {concurrency} 檔，查詢間隔 ≥ {min_interval:g} 秒")
+    started = time.monotonic()
+    results = scheduler.run(stock_codes, handler=analyze_download)
+    for line in format_schedule_summary(results, time.monotonic() - started):
+        timestamped_log(line)
+    timestamped_log(format_http_stats(scheduler.http_client.stats()))
+    timestamped_log(format_ocr_stats(scraper.ocr.stats()))
+    timestamped_log(format_captcha_stats(scraper.captcha_stats.snapshot()))
+    if scraper.raw_cache is not None:
+        timestamped_log(format_raw_cache_stats(scraper.raw_cache.stats()))
+    return results
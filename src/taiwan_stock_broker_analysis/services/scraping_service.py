@@ -4,9 +4,10 @@ import subprocess
 import tempfile
 from datetime import datetime
 
-import ddddocr  # type: ignore
-
-from ..domain.scraping import download_csv_text, log_broker_summary, save_processed_csv, save_raw_csv
+from .ocr_service import get_ocr_service
+from ..domain.captcha import CaptchaStats
+from ..domain.raw_cache import get_raw_csv_cache
+from ..domain.scraping import fetch_csv_text, log_broker_summary, save_processed_csv, save_raw_csv
 
 
 def timestamped_log(message: str) -> None:
@@ -14,24 +15,35 @@ def timestamped_log(message: str) -> None:
 
 
 class AutomaticCaptchaScraper:
-    def __init__(self, logger=timestamped_log):
+    def __init__(self, logger=timestamped_log, ocr_service=None, raw_cache=None, tracer=None):
         self.logger = logger
-        self.ocr = ddddocr.DdddOcr()
+        self.tracer = tracer
+        self.ocr = ocr_service if ocr_service is not None else get_ocr_service()
+        self.raw_cache = raw_cache if raw_cache is not None else get_raw_csv_cache()
+        self.captcha_stats = CaptchaStats()
 
-    def download_stock_data(self, stock_code, max_retries=5):
+    def download_stock_data(self, stock_code, max_retries=5, refresh=False):
         self.logger(f"開始爬取股票代碼: {stock_code}")
 
-        success, csv_text, error = download_csv_text(
+        success, csv_text, error, from_cache = fetch_csv_text(
             stock_code,
             self._solve_captcha,
+            raw_cache=self.raw_cache,
+            refresh=refresh,
             max_retries=max_retries,
             logger=self.logger,
+            captcha_stats=self.captcha_stats,
+            tracer=self.tracer,
         )
         if not success:
             return False, None, error
 
+        # 快取檔只供內部使用（可能被淘汰），命中時也照樣在工作目錄寫出原本的 CSV
         csv_filename = save_raw_csv(csv_text, stock_code, label="爬蟲資料", encoding="utf-8-sig")
-        self.logger(f"成功下載！檔案已儲存為: {csv_filename}")
+        if from_cache:
+            self.logger(f"沿用快取資料，檔案已儲存為: {csv_filename}")
+        else:
+            self.logger(f"成功下載！檔案已儲存為: {csv_filename}")
 
         processed_filename = save_processed_csv(csv_text, stock_code)
         self.logger(f"處理後資料已儲存為: {processed_filename}")
@@ -39,42 +51,55 @@ class AutomaticCaptchaScraper:
         log_broker_summary(csv_text, stock_code, self.logger)
         return True, csv_filename, None
 
-    def download_for_pipeline(self, stock_code: str, max_retries: int = 5):
+    def fetch_for_pipeline(self, stock_code: str, max_retries: int = 5, refresh: bool = False):
         self.logger(f"爬取 {stock_code}")
-        success, csv_text, error = download_csv_text(
+        return fetch_csv_text(
             stock_code,
             self._solve_captcha,
+            raw_cache=self.raw_cache,
+            refresh=refresh,
             max_retries=max_retries,
             logger=self.logger,
             timeout=30,
             verify=False,
+            captcha_stats=self.captcha_stats,
+            tracer=self.tracer,
         )
+
+    def download_for_pipeline(self, stock_code: str, max_retries: int = 5, refresh: bool = False):
+        success, csv_text, error, from_cache = self.fetch_for_pipeline(stock_code, max_retries=max_retries, refresh=refresh)
         if not success:
             return False, None, None, error
 
         raw_csv = save_raw_csv(csv_text, stock_code, label="爬蟲資料", encoding="utf-8-sig")
-        self.logger(f"下載完成：{raw_csv}")
+        self.logger(f"{'沿用快取' if from_cache else '下載完成'}：{raw_csv}")
 
         processed_csv = save_processed_csv(csv_text, stock_code)
         self.logger(f"處理後 CSV 已產生：{processed_csv}")
         return True, raw_csv, processed_csv, None
 
     def _solve_captcha(self, image_bytes):
-        captcha_code = self.ocr.classification(image_bytes)
-        self.logger(f"OCR 識別結果: {captcha_code}")
-        return captcha_code
+        candidates = self.ocr.candidates(image_bytes)
+        if candidates:
+            text, confidence = candidates[0]
+            confidence_text = "" if confidence is None else f" (信心 {confidence:.2f})"
+            self.logger(f"OCR 識別結果: {text}{confidence_text}")
+        return candidates
 
 
 class ManualCaptchaScraper:
-    def __init__(self, logger=timestamped_log):
+    def __init__(self, logger=timestamped_log, raw_cache=None):
         self.logger = logger
+        self.raw_cache = raw_cache if raw_cache is not None else get_raw_csv_cache()
 
-    def download_stock_data(self, stock_code, max_retries=5):
+    def download_stock_data(self, stock_code, max_retries=5, refresh=False):
         self.logger(f"開始爬取股票代碼: {stock_code}")
 
-        success, csv_text, error = download_csv_text(
+        success, csv_text, error, from_cache = fetch_csv_text(
             stock_code,
             self._prompt_captcha,
+            raw_cache=self.raw_cache,
+            refresh=refresh,
             max_retries=max_retries,
             logger=self.logger,
         )
@@ -82,7 +107,10 @@ class ManualCaptchaScraper:
             return False, None, error
 
         csv_filename = save_raw_csv(csv_text, stock_code, label="爬蟲資料", encoding="utf-8")
-        self.logger(f"成功下載！檔案已儲存為: {csv_filename}")
+        if from_cache:
+            self.logger(f"沿用快取資料，檔案已儲存為: {csv_filename}")
+        else:
+            self.logger(f"成功下載！檔案已儲存為: {csv_filename}")
 
         log_broker_summary(csv_text, stock_code, self.logger)
         return True, csv_filename, None
@@ -120,16 +148,18 @@ class ManualCaptchaScraper:
 def simple_download_stock_csv(stock_code):
     print(f"🔍 開始下載股票 {stock_code} 的券商進出明細...")
 
-    ocr = ddddocr.DdddOcr()
+    ocr = get_ocr_service()
 
     def solve_captcha(image_bytes):
-        captcha_code = ocr.classification(image_bytes)
-        print(f"  驗證碼: {captcha_code}")
-        return captcha_code
+        candidates = ocr.candidates(image_bytes)
+        print(f"  驗證碼: {candidates[0][0] if candidates else ''}")
+        return candidates
 
-    success, csv_text, _ = download_csv_text(
+    raw_cache = get_raw_csv_cache()
+    success, csv_text, _, from_cache = fetch_csv_text(
         stock_code,
         solve_captcha,
+        raw_cache=raw_cache,
         max_retries=5,
         logger=lambda message: print(f"  {message}"),
     )
@@ -138,7 +168,7 @@ def simple_download_stock_csv(stock_code):
         return None
 
     filename = save_raw_csv(csv_text, stock_code, label="券商明細", encoding="utf-8")
-    print("✅ 下載成功！")
+    print("✅ 使用快取資料" if from_cache else "✅ 下載成功！")
     print(f"📄 檔案: {filename}")
     print(f"📂 位置: {os.path.abspath(filename)}")
     return filename
\ No newline at end of file
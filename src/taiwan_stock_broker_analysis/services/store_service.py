@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import time
+from pathlib import Path
+
+from .batch_service import collect_input_files
+from ..domain.analysis import read_flat_csv
+from ..domain.trade_store import TradeStore, infer_partition
+
+def append_csv(store: TradeStore, input_csv: Path, stock_code: str = None, day=None):
+    code, partition_day = infer_partition(input_csv, stock_code, day)
+    if code is None or partition_day is None:
+        raise ValueError("無法判斷股票代碼或交易日，請用 --stock / --date 指定")
+    flat = read_flat_csv(input_csv)
+    store.append(code, partition_day, flat, source=Path(input_csv).name)
+    return code, partition_day, len(flat)
+
+
+def ingest_csv_files(inputs, store_root, stock_code: str = None, day=None, fmt: str = "auto", logger=None) -> dict:
+    if logger is None:
+        logger = lambda message: None
+    store = TradeStore(store_root, fmt=fmt)
+    files = [path for target in inputs for path in collect_input_files(target)]
+    started = time.perf_counter()
+    added, skipped = [], []
+    for input_csv in files:
+        try:
+            code, partition_day, rows = append_csv(store, input_csv, stock_code, day)
+        except Exception as exc:
+            skipped.append((input_csv, f"{type(exc).__name__}: {exc}"))
+            logger(f"❌ {Path(input_csv).name}: {exc}")
+            continue
+        added.append((code, partition_day, rows))
+        logger(f"✅ {Path(input_csv).name} → {code} {partition_day.isoformat()}（{rows:,} 筆）")
+    return {
+        "files": len(files),
+        "added": added,
+        "skipped": skipped,
+        "rows": sum(rows for _, _, rows in added),
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def format_ingest_summary(summary: dict) -> list:
+    lines = [
+        f"匯入完成：{len(summary['added'])}/{summary['files']} 個檔案，共 {summary['rows']:,} 筆，"
+        f"耗時 {summary['elapsed']:.2f}s",
+    ]
+    for input_csv, error in summary["skipped"]:
+        lines.append(f"  ❌ {input_csv}: {error}")
+    return lines
+
+
+__all__ = [
+    "append_csv",
+    "format_ingest_summary",
+    "ingest_csv_files",
+]
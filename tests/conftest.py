@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_broker_cache(tmp_path, monkeypatch):
+    # 券商名稱快取寫到暫存目錄，不碰使用者的 ~/.cache
+    monkeypatch.setenv("TSBA_BROKER_CACHE", str(tmp_path / "broker_mother_map.json"))
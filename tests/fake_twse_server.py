@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MENU_PATH = "/bshtm/bsMenu.aspx"
+CAPTCHA_PATH = "/bshtm/CaptchaImage.aspx"
+CONTENT_PATH = "/bshtm/bsContent.aspx"
+
+MENU_HTML = """<html><body><form method="post" action="bsMenu.aspx">
+<input type="hidden" name="__VIEWSTATE" value="vs-{token}" />
+<input type="hidden" name="__EVENTVALIDATION" value="ev-{token}" />
+<input type="radio" name="RadioButton_Excd" value="RadioButton_Excd" />
+<input type="text" name="TextBox_Stkno" value="" />
+<input type="text" name="CaptchaControl1" value="" />
+<input type="submit" name="btnOK" value="查詢" />
+<input type="submit" name="Button_Reset" value="重設" />
+<div id="Panel_bshtm"><img src="CaptchaImage.aspx?guid={token}" /></div>
+</form></body></html>"""
+
+RESULT_HTML = """<html><body>
+<span id="receive_date">2026/03/18</span>
+<a id="HyperLink_DownloadCSV" href="bsContent.aspx?StkNo={stock_code}">下載 CSV</a>
+</body></html>"""
+
+FAILED_HTML = "<html><body><span>驗證碼錯誤!</span></body></html>"
+
+CSV_TEMPLATE = """券商買賣股票成交價量資訊
+股票代碼,="{stock_code}"
+序號,券商,價格,買進股數,賣出股數,,序號,券商,價格,買進股數,賣出股數
+1,1234元大台北,100.00,1000,0,,2,9876凱基台北,101.00,0,1000
+"""
+
+
+def captcha_answer(token: str) -> str:
+    return token[-5:].upper()
+
+
+class FakeTwseServer:
+    def __init__(self, latency: float = 0.0, wrong_captcha_tokens=None, handshake_latency: float = 0.0):
+        self.latency = latency
+        self.handshake_latency = handshake_latency
+        self.wrong_captcha_tokens = set(wrong_captcha_tokens or [])
+        self.lock = threading.Lock()
+        self.tokens = 0
+        self.submits = []
+        self.connections = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}{MENU_PATH}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def next_token(self) -> str:
+        with self.lock:
+            self.tokens += 1
+            return f"guid{self.tokens:05d}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = 64 * 1024
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                if fake.handshake_latency:
+                    time.sleep(fake.handshake_latency)
+
+            def _send(self, body, content_type="text/html; charset=utf-8", status=200, cookie=None):
+                payload = body if isinstance(body, bytes) else body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if cookie is not None:
+                    self.send_header("Set-Cookie", f"ASP.NET_SessionId={cookie}; path=/")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _enter(self):
+                with fake.lock:
+                    fake.connections.add(self.client_address)
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+            def do_GET(self):
+                self._enter()
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == MENU_PATH:
+                    token = fake.next_token()
+                    self._send(MENU_HTML.format(token=token), cookie=token)
+                elif url.path == CAPTCHA_PATH:
+                    token = query.get("guid", [""])[0]
+                    self._send(token.encode("ascii"), content_type="image/jpeg")
+                elif url.path == CONTENT_PATH:
+                    stock_code = query.get("StkNo", [""])[0]
+                    self._send(CSV_TEMPLATE.format(stock_code=stock_code), content_type="text/csv; charset=utf-8")
+                else:
+                    self._send("not found", status=404)
+
+            def do_POST(self):
+                self._enter()
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                token = form.get("__VIEWSTATE", [""])[0].replace("vs-", "")
+                stock_code = form.get("TextBox_Stkno", [""])[0]
+                with fake.lock:
+                    fake.submits.append((time.monotonic(), stock_code))
+                cookie = self.headers.get("Cookie", "")
+                correct = form.get("CaptchaControl1", [""])[0] == captcha_answer(token)
+                if correct and cookie == f"ASP.NET_SessionId={token}" and token not in fake.wrong_captcha_tokens:
+                    self._send(RESULT_HTML.format(stock_code=stock_code))
+                else:
+                    self._send(FAILED_HTML)
+
+        return Handler
+
+
+def solve_fake_captcha(image_bytes: bytes) -> str:
+    return captcha_answer(image_bytes.decode("ascii"))
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+def processed_csv(stock_code: str = "0000", downloaded_at: str = "2026-03-18 12:00:00", extra_rows: str = "") -> str:
+    return f"""股票代碼: {stock_code} - 券商買賣明細
+下載時間: {downloaded_at}
+
+序號,券商,價格,買進股數,賣出股數,,序號,券商,價格,買進股數,賣出股數
+1,1234元大台北,100,1000,0,,2,9876凱基台北,101,0,1000
+3,富邦建國,102,2000,0,,4,富邦建國,103,0,1000
+{extra_rows}"""
+
+
+SAMPLE_PROCESSED_CSV = processed_csv()
@@ -1,26 +1,50 @@
+import json
 import shutil
 import sys
 import tempfile
+import threading
 import unittest
+from datetime import date
 from pathlib import Path
+from unittest import mock
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
 
-for path_text in [str(REPO_ROOT), str(SRC_PATH)]:
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
     if path_text not in sys.path:
         sys.path.insert(0, path_text)
 
-from taiwan_stock_broker_analysis.analysis.core import analyze_csv_file, normalize_to_mother, read_flat_csv
+import pandas as pd
+from openpyxl import load_workbook
 
+from sample_data import SAMPLE_PROCESSED_CSV
+from taiwan_stock_broker_analysis.analysis.core import (
+    analyze_csv_file,
+    fifo_pnl_with_carry,
+    normalize_to_mother,
+    read_flat_csv,
+)
+from taiwan_stock_broker_analysis.domain.analysis import build_workbook, fifo_carry
+from taiwan_stock_broker_analysis.domain.broker_names import BrokerNameNormalizer
+from taiwan_stock_broker_analysis.domain.open_lots import OpenLotStore
+from taiwan_stock_broker_analysis.domain.report_writer import FILE_MODE
+from taiwan_stock_broker_analysis.domain.schema import to_display
+from taiwan_stock_broker_analysis.domain.tracing import Tracer
+from taiwan_stock_broker_analysis.domain.workbook import WORKBOOK_NAME
+from taiwan_stock_broker_analysis.domain.scraping import save_processed_csv, with_trade_date
+from taiwan_stock_broker_analysis.domain.twse_csv import parse_trade_date, read_preamble, read_text_preamble
+from taiwan_stock_broker_analysis.services.analysis_service import analyze_existing_csv
+from taiwan_stock_broker_analysis.services.pipeline_service import analyze_downloaded_text
 
-SAMPLE_PROCESSED_CSV = """股票代碼: 0000 - 券商買賣明細
-下載時間: 2026-03-18 12:00:00
 
+DOWNLOADED_CSV = """券商買賣股票成交價量資訊
+股票代碼,="0000"
 序號,券商,價格,買進股數,賣出股數,,序號,券商,價格,買進股數,賣出股數
-1,1234元大台北,100,1000,0,,2,9876凱基台北,101,0,1000
-3,富邦建國,102,2000,0,,4,富邦建國,103,0,1000
+1,1234元大台北　　,100.00,1000,0,,2,9876凱基台北,101.00,0,1000
+3,5920元富　　,102.00,2000,0,,4,5920元富　　,103.00,0,1000
 """
 
 
@@ -41,6 +65,45 @@ class AnalysisCoreTests(unittest.TestCase):
         self.assertEqual(normalize_to_mother("c國票敦北"), "國票")
         self.assertEqual(normalize_to_mother("u元大府城"), "元大")
 
+    def test_broker_name_normalizer_persists_mapping_cache(self):
+        cache_path = self.temp_dir / "broker_mother_map.json"
+        names = pd.Series(["1234元大台北", "9876凱基台北", "1234元大台北", "富邦建國分公司"])
+
+        first = BrokerNameNormalizer(cache_path=cache_path)
+        self.assertListEqual(first.map_series(names).tolist(), ["元大", "凱基", "元大", "富邦"])
+        self.assertEqual(first.stats["resolved"], 3)
+        self.assertTrue(cache_path.exists())
+
+        second = BrokerNameNormalizer(cache_path=cache_path)
+        self.assertListEqual(second.map_series(names).tolist(), ["元大", "凱基", "元大", "富邦"])
+        self.assertEqual(second.stats["resolved"], 0)
+
+    def test_broker_name_normalizer_is_thread_safe_and_bounded(self):
+        cache_path = self.temp_dir / "broker_mother_map.json"
+        normalizer = BrokerNameNormalizer(cache_path=cache_path, max_names=500)
+        batches = [pd.Series([f"{code:04d}元大台北" for code in range(start, start + 400)]) for start in range(0, 1600, 400)]
+        errors = []
+
+        def map_batch(batch):
+            try:
+                for _ in range(5):
+                    normalizer.map_series(batch)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=map_batch, args=(batch,)) for batch in batches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(normalizer.cached_names, 500)
+        normalizer.map_series(pd.Series(["無法辨識的名稱"]))
+        persisted = json.loads(cache_path.read_text(encoding="utf-8"))["names"]
+        self.assertLessEqual(len(persisted), 500)
+        self.assertNotIn("無法辨識的名稱", persisted)
+
     def test_read_flat_csv_flattens_both_csv_groups(self):
         flat = read_flat_csv(self.input_csv)
 
@@ -48,6 +111,90 @@ class AnalysisCoreTests(unittest.TestCase):
         self.assertListEqual(flat["序號"].astype(int).tolist(), [1, 2, 3, 4])
         self.assertIn("1234元大台北", flat["券商"].tolist())
         self.assertIn("9876凱基台北", flat["券商"].tolist())
+        self.assertEqual(str(flat["序號"].dtype), "int32")
+        self.assertEqual(str(flat["券商"].dtype), "category")
+        self.assertEqual(str(flat["買進股數"].dtype), "int64")
+
+    def test_read_flat_csv_handles_cp950_single_group_file(self):
+        cp950_csv = self.temp_dir / "single_group_cp950.csv"
+        cp950_csv.write_text(
+            "序號,券商,價格,買進股數,賣出股數\n1,1234元大台北,100.5,1000,0\n2,富邦建國,101,0,2000\n",
+            encoding="cp950",
+        )
+
+        flat = read_flat_csv(cp950_csv)
+
+        self.assertListEqual(flat["券商"].tolist(), ["1234元大台北", "富邦建國"])
+        self.assertListEqual(flat["價格_tick"].tolist(), [10050, 10100])
+        self.assertListEqual(to_display(flat)["價格"].tolist(), [100.5, 101.0])
+        # 整張表都是整數價時輸出整數，step1 印成 100 而非 100.0
+        whole = to_display(flat.iloc[1:])["價格"]
+        self.assertEqual(str(whole.dtype), "int64")
+        self.assertEqual(whole.to_csv(index=False, header=False), "101\n")
+
+    def test_fifo_pnl_with_carry_matches_partial_lots_in_sequence_order(self):
+        frame = pd.DataFrame({
+            "序號": [1, 2, 3, 4],
+            "券商": ["元大台北", "元大台北", "元大台北", "凱基台北"],
+            "母券商": ["元大", "元大", "元大", "凱基"],
+            "價格": [100.0, 103.0, 104.0, 50.0],
+            "買進股數": [2000, 0, 0, 1000],
+            "賣出股數": [0, 1000, 2000, 0],
+        })
+
+        fifo = fifo_pnl_with_carry(frame, fee_discount=1.0, day_trade_tax=0.0)
+
+        yuanta = fifo.loc["元大"]
+        self.assertEqual(yuanta["回轉股數(FIFO)"], 2000)
+        self.assertEqual(yuanta["已實現毛利(FIFO)"], 7000)
+        self.assertEqual(yuanta["相抵後_賣股數"], 1000)
+        self.assertEqual(yuanta["相抵後_賣均價"], 104.0)
+        self.assertEqual(yuanta["期末淨部位方向"], "空")
+        self.assertEqual(fifo.loc["凱基", "期末淨部位(股)"], 1000)
+
+    def test_fifo_carry_resumes_from_previous_day_open_lots(self):
+        day1 = pd.DataFrame({
+            "序號": [1, 2, 3],
+            "母券商": ["元大", "元大", "凱基"],
+            "價格": [100.0, 101.0, 50.0],
+            "買進股數": [3000, 0, 0],
+            "賣出股數": [0, 1000, 2000],
+        })
+        day2 = pd.DataFrame({
+            "序號": [1, 2, 3],
+            "母券商": ["元大", "凱基", "富邦"],
+            "價格": [110.0, 45.0, 70.0],
+            "買進股數": [0, 1000, 1000],
+            "賣出股數": [1500, 0, 0],
+        })
+        both = pd.concat([day1, day2.assign(序號=day2["序號"] + 3)], ignore_index=True)
+        replay, replay_lots = fifo_carry(both, fee_discount=1.0, day_trade_tax=0.003)
+
+        _, opening = fifo_carry(day1, fee_discount=1.0, day_trade_tax=0.003)
+        self.assertEqual(opening["股數"].tolist(), [2000, 2000])
+        carried, closing = fifo_carry(day2, fee_discount=1.0, day_trade_tax=0.0, opening_lots=opening, carry_tax=0.003)
+
+        self.assertEqual(carried.loc["元大", "已實現毛利(FIFO)"], 15000)
+        self.assertEqual(carried.loc["元大", "證交稅合計(FIFO)"], round(1500 * 110 * 0.003))
+        for column in ["相抵後_買股數", "相抵後_賣股數", "期末淨部位(股)"]:
+            self.assertEqual(carried[column].to_dict(), replay[column].to_dict())
+        pd.testing.assert_frame_equal(closing, replay_lots)
+
+    def test_analyze_existing_csv_persists_and_resumes_open_lots(self):
+        carry_dir = self.temp_dir / "carry"
+        day2_csv = self.temp_dir / "sample_day2.csv"
+        day2_csv.write_text(
+            SAMPLE_PROCESSED_CSV.replace("2026-03-18 12:00:00", "2026-03-18 17:00:00"), encoding="utf-8-sig"
+        )
+
+        analyze_existing_csv(self.input_csv, self.temp_dir / "output", 0.28, 0.0015, carry_dir=carry_dir)
+        analyze_existing_csv(day2_csv, self.temp_dir / "output", 0.28, 0.0015, carry_dir=carry_dir)
+
+        store = OpenLotStore(carry_dir)
+        self.assertEqual([day.isoformat() for day in store.days("0000")], ["2026-03-17", "2026-03-18"])
+        fifo = pd.read_csv(self.temp_dir / "output" / "analysis_sample_day2" / "step5_fifo_with_carry.csv", index_col=0)
+        self.assertEqual(fifo.loc["元大", "相抵後_買股數"], 2000)
+        self.assertEqual(fifo.loc["富邦", "相抵後_買股數"], 2000)
 
     def test_analyze_csv_file_generates_expected_reports(self):
         outdir = self.temp_dir / "output"
@@ -73,6 +220,121 @@ class AnalysisCoreTests(unittest.TestCase):
 
         for filename in expected_files:
             self.assertTrue((outdir / filename).exists(), f"missing report: {filename}")
+        # 原子寫入的暫存檔為 0600，換上後應與一般建檔的權限相同
+        for filename in expected_files + ["manifest.json"]:
+            self.assertEqual((outdir / filename).stat().st_mode & 0o777, FILE_MODE, filename)
+
+    def test_analyze_csv_file_only_recomputes_steps_whose_inputs_changed(self):
+        outdir = self.temp_dir / "output"
+        first = analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015)
+        step1_bytes = (outdir / "step1_flattened.csv").read_bytes()
+
+        rerun = analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015)
+        self.assertEqual(first["reused"], [])
+        self.assertEqual(rerun["computed"], [])
+
+        (outdir / "step2_branch_summary.xlsx").unlink()
+        tweaked = analyze_csv_file(self.input_csv, outdir, fee_discount=0.5, day_trade_tax=0.0015)
+        self.assertEqual(tweaked["reused"], ["step1", "step3"])
+        self.assertEqual(tweaked["computed"], ["step2", "step4", "step5", "step6", "step7"])
+        self.assertEqual(tweaked["intermediates"]["flat"]["status"], "loaded")
+        self.assertEqual((outdir / "step1_flattened.csv").read_bytes(), step1_bytes)
+
+        manifest = json.loads((outdir / "manifest.json").read_text(encoding="utf-8"))
+        self.assertEqual(manifest["computed"], tweaked["computed"])
+
+    def test_tracer_spans_cover_parse_steps_and_report_writes(self):
+        outdir = self.temp_dir / "output"
+        tracer = Tracer(memory=True)
+        try:
+            analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015, tracer=tracer)
+            analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015, tracer=tracer)
+        finally:
+            tracer.close()
+
+        spans = {}
+        for record in tracer.records:
+            spans.setdefault(record["name"], []).append(record)
+        self.assertEqual([span["attrs"]["rows"] for span in spans["analysis.parse"]], [4])
+        self.assertEqual([span["attrs"]["status"] for span in spans["analysis.step5"]], ["computed", "reused"])
+        self.assertEqual(len(spans["analysis.fifo"]), 1)
+        self.assertEqual(len(spans["write.xlsx"]), 5)
+        step1_csv = next(span for span in spans["write.csv"] if span["attrs"]["file"] == "step1_flattened.csv")
+        self.assertEqual(step1_csv["attrs"]["bytes"], (outdir / "step1_flattened.csv").stat().st_size)
+        self.assertTrue(all(record["peak_bytes"] >= 0 for record in tracer.records))
+        self.assertEqual(tracer.to_chrome_trace()["traceEvents"][0]["name"], "analysis")
+
+    def test_in_memory_download_analysis_matches_processed_csv_route(self):
+        processed = Path(save_processed_csv(DOWNLOADED_CSV, "0000", out_csv=self.temp_dir / "0000_處理後資料.csv"))
+        file_dir = analyze_existing_csv(processed, self.temp_dir / "files", fee_discount=0.28, day_trade_tax=0.0015)
+
+        logged = []
+        memory_dir, raw_csv = analyze_downloaded_text(
+            "0000", DOWNLOADED_CSV, self.temp_dir / "memory", fee_discount=0.28, day_trade_tax=0.0015, logger=logged.append
+        )
+
+        self.assertIsNone(raw_csv)
+        self.assertEqual([path.name for path in (self.temp_dir / "memory").iterdir()], [memory_dir.name])
+        self.assertIn("券商家數: 3", logged)
+        self.assertTrue(any(message.startswith("⚠️ 下載內容沒有資料日期") for message in logged))
+        for report in sorted(file_dir.glob("*.csv")):
+            self.assertEqual((memory_dir / report.name).read_bytes(), report.read_bytes(), report.name)
+
+    def test_in_memory_download_analysis_takes_trading_date_from_response(self):
+        csv_text = with_trade_date(DOWNLOADED_CSV, date(2026, 3, 18))
+        self.assertEqual(read_text_preamble(csv_text)["trade_date"], date(2026, 3, 18))
+        self.assertEqual(parse_trade_date("交易日期: 115/03/18"), date(2026, 3, 18))
+
+        logged = []
+        memory_dir, _ = analyze_downloaded_text(
+            "0000", csv_text, self.temp_dir / "memory", fee_discount=0.28, day_trade_tax=0.0015, logger=logged.append
+        )
+
+        self.assertEqual(memory_dir.name, "analysis_0000_2026-03-18")
+        self.assertFalse(any(message.startswith("⚠️") for message in logged))
+        processed = Path(save_processed_csv(csv_text, "0000", out_csv=self.temp_dir / "0000_處理後資料.csv"))
+        self.assertEqual(read_preamble(processed)["trade_date"], date(2026, 3, 18))
+
+    def test_background_report_write_failure_propagates_without_partial_files(self):
+        outdir = self.temp_dir / "output"
+        analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015)
+        manifest_bytes = (outdir / "manifest.json").read_bytes()
+        fifo_xlsx_bytes = (outdir / "step5_fifo_with_carry.xlsx").read_bytes()
+
+        def broken_to_excel(frame, path, *args, **kwargs):
+            Path(path).write_bytes(b"partial")
+            raise OSError("disk full")
+
+        with mock.patch.object(pd.DataFrame, "to_excel", broken_to_excel):
+            with self.assertRaises(OSError):
+                analyze_csv_file(self.input_csv, outdir, fee_discount=0.5, day_trade_tax=0.0015)
+
+        self.assertEqual((outdir / "manifest.json").read_bytes(), manifest_bytes)
+        self.assertEqual((outdir / "step5_fifo_with_carry.xlsx").read_bytes(), fifo_xlsx_bytes)
+        self.assertEqual([path.name for path in outdir.glob(".step*")], [])
+
+    def test_consolidated_workbook_replaces_separate_xlsx_and_builds_on_demand(self):
+        outdir = self.temp_dir / "output"
+        analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015, excel="consolidated")
+
+        self.assertEqual(sorted(path.name for path in outdir.glob("*.xlsx")), [WORKBOOK_NAME])
+        workbook = load_workbook(outdir / WORKBOOK_NAME, read_only=True)
+        self.assertEqual(workbook.sheetnames[0], "step2_branch_summary")
+        fifo_rows = list(workbook["step5_fifo_with_carry"].values)
+        fifo_csv = pd.read_csv(outdir / "step5_fifo_with_carry.csv", encoding="utf-8-sig")
+        self.assertEqual(list(fifo_rows[0]), list(fifo_csv.columns))
+        self.assertEqual([row[0] for row in fifo_rows[1:]], fifo_csv["母券商"].tolist())
+        workbook.close()
+
+        rerun = analyze_csv_file(self.input_csv, outdir, fee_discount=0.28, day_trade_tax=0.0015, excel="none")
+        self.assertEqual(rerun["computed"], [])
+        separate = analyze_csv_file(self.input_csv, outdir, fee_discount=0.5, day_trade_tax=0.0015, excel="none")
+        self.assertIn("step5", separate["computed"])
+        self.assertFalse((outdir / WORKBOOK_NAME).exists())
+
+        path, written = build_workbook(outdir)
+        self.assertTrue(written)
+        self.assertEqual(build_workbook(outdir), (path, False))
 
 
 if __name__ == "__main__":
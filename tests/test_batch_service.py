@@ -0,0 +1,80 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from sample_data import SAMPLE_PROCESSED_CSV
+from taiwan_stock_broker_analysis.services.batch_service import analyze_csv_batch, collect_input_files
+
+
+class BatchServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="batch_service_test_"))
+        self.input_dir = self.temp_dir / "processed"
+        self.input_dir.mkdir()
+        for stock_code in ["1101", "2330"]:
+            (self.input_dir / f"{stock_code}_處理後資料.csv").write_text(SAMPLE_PROCESSED_CSV, encoding="utf-8-sig")
+        (self.input_dir / "9999_broken.csv").write_text("沒有標題行\n", encoding="utf-8-sig")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_collect_input_files_accepts_directory_and_glob(self):
+        self.assertEqual(len(collect_input_files(self.input_dir)), 3)
+        self.assertEqual(len(collect_input_files(str(self.input_dir / "*_處理後資料.csv"))), 2)
+
+    def test_analyze_csv_batch_writes_each_output_dir_and_reports_failures(self):
+        outdir = self.temp_dir / "output"
+
+        summary = analyze_csv_batch(
+            collect_input_files(self.input_dir),
+            outdir,
+            fee_discount=0.28,
+            day_trade_tax=0.0015,
+            workers=2,
+        )
+
+        self.assertEqual(len(summary["succeeded"]), 2)
+        self.assertEqual(len(summary["failed"]), 1)
+        self.assertEqual(summary["failed"][0][0].name, "9999_broken.csv")
+        for stock_code in ["1101", "2330"]:
+            report = outdir / f"analysis_{stock_code}_處理後資料" / "step5_fifo_with_carry.csv"
+            self.assertTrue(report.exists(), f"missing report: {report}")
+
+    def test_carry_series_stops_at_first_failed_day(self):
+        series_dir = self.temp_dir / "series"
+        series_dir.mkdir()
+        for day in ["16", "17", "18"]:
+            text = SAMPLE_PROCESSED_CSV.replace("0000", "2330").replace("2026-03-18 12:00:00", f"2026-03-{day} 17:00:00")
+            if day == "17":
+                text = text.split("序號")[0] + "沒有標題行\n"
+            (series_dir / f"2330_2026-03-{day}.csv").write_text(text, encoding="utf-8-sig")
+
+        summary = analyze_csv_batch(
+            collect_input_files(series_dir),
+            self.temp_dir / "output",
+            fee_discount=0.28,
+            day_trade_tax=0.0015,
+            workers=1,
+            carry_dir=self.temp_dir / "lots",
+        )
+
+        self.assertEqual([path.name for path, _, _ in summary["succeeded"]], ["2330_2026-03-16.csv"])
+        self.assertEqual([path.name for path, _ in summary["failed"]], ["2330_2026-03-17.csv"])
+        self.assertEqual([path.name for path, _ in summary["skipped"]], ["2330_2026-03-18.csv"])
+        self.assertIn("2330_2026-03-17.csv", summary["skipped"][0][1])
+        self.assertFalse((self.temp_dir / "output" / "analysis_2330_2026-03-18").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from taiwan_stock_broker_analysis.domain.broker_index import BrokerIndex
+from taiwan_stock_broker_analysis.services.analysis_service import analyze_existing_csv
+
+
+def processed_csv(stock_code: str, downloaded_at: str, buy: int) -> str:
+    return f"""股票代碼: {stock_code} - 券商買賣明細
+下載時間: {downloaded_at}
+
+序號,券商,價格,買進股數,賣出股數,,序號,券商,價格,買進股數,賣出股數
+1,9200凱基台北,100,{buy},0,,2,9268凱基松山,101,0,1000
+3,9200凱基台北,102,2000,0,,4,富邦建國,103,0,1000
+"""
+
+
+class BrokerIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="broker_index_test_"))
+        self.index_dir = self.temp_dir / "index"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def analyze(self, name: str, text: str):
+        input_csv = self.temp_dir / name
+        input_csv.write_text(text, encoding="utf-8-sig")
+        return analyze_existing_csv(input_csv, self.temp_dir / "output", 0.28, 0.0015, index_dir=self.index_dir)
+
+    def test_analysis_updates_index_incrementally_and_lookups_match_step2(self):
+        out_dir = self.analyze("2330_a.csv", processed_csv("2330", "2026-03-18 16:30:00", 1000))
+        self.analyze("2317_a.csv", processed_csv("2317", "2026-03-19 16:30:00", 3000))
+        index = BrokerIndex(self.index_dir)
+        self.assertEqual(len(index.segment_paths()), 2)
+
+        self.analyze("2330_a.csv", processed_csv("2330", "2026-03-18 16:30:00", 1000))
+        self.assertEqual(len(index.segment_paths()), 2)
+
+        exact = index.lookup("9200凱基台北", field="券商")
+        self.assertEqual(exact["股票代碼"].tolist(), ["2330", "2317"])
+        self.assertEqual(exact["交易日"].tolist(), [date(2026, 3, 18), date(2026, 3, 19)])
+        step2 = pd.read_csv(out_dir / "step2_branch_summary.csv", encoding="utf-8-sig", index_col=0)
+        self.assertEqual(exact["均買價"].iloc[0], step2.loc["9200凱基台北", "均買價"])
+        self.assertEqual(exact["買股數"].tolist(), [3000, 5000])
+
+        prefix = index.lookup("凱基", prefix=True, stocks=["2330"])
+        self.assertEqual(sorted(set(prefix["欄位"])), ["母券商"])
+        self.assertEqual(prefix["買股數"].tolist(), [3000])
+        self.assertEqual(sorted(index.terms("92", field="券商")), ["9200凱基台北", "9268凱基松山"])
+        self.assertTrue(index.lookup("凱基", start="2026-03-20").empty)
+
+        self.analyze("2330_b.csv", processed_csv("2330", "2026-03-18 17:00:00", 7000))
+        before = index.lookup("9200凱基台北", field="券商")
+        self.assertEqual(before["買股數"].tolist(), [9000, 5000])
+        self.assertTrue(index.compact())
+        self.assertEqual(len(index.segment_paths()), 1)
+        pd.testing.assert_frame_equal(index.lookup("9200凱基台北", field="券商"), before)
+        self.assertEqual(index.stats()["pairs"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
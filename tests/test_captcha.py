@@ -0,0 +1,89 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from fake_twse_server import FakeTwseServer, solve_fake_captcha
+from taiwan_stock_broker_analysis.domain.captcha import CaptchaStats, decode_ctc_candidates, pick_candidate
+from taiwan_stock_broker_analysis.domain.http_client import PooledHttpClient
+from taiwan_stock_broker_analysis.domain.scraping import download_csv_text
+
+
+class CaptchaTests(unittest.TestCase):
+    def test_decode_merges_case_drops_disallowed_chars_and_offers_runner_up(self):
+        charset = ["", "a", "A", "7", "亿", "b"]
+        frames = np.array([
+            [0.05, 0.50, 0.30, 0.10, 0.05, 0.00],
+            [0.90, 0.02, 0.02, 0.02, 0.02, 0.02],
+            [0.05, 0.00, 0.00, 0.30, 0.40, 0.25],
+        ])
+
+        candidates = decode_ctc_candidates(frames[:, None, :], charset)
+
+        self.assertEqual([text for text, _ in candidates], ["A7", "AB", "77"])
+        self.assertAlmostEqual(candidates[0][1], 0.80 * 0.30)
+        self.assertAlmostEqual(candidates[1][1], 0.80 * 0.25)
+        self.assertAlmostEqual(candidates[2][1], 0.10 * 0.30)
+
+    def test_pick_candidate_skips_implausible_and_low_confidence_answers(self):
+        self.assertEqual(pick_candidate([("ab", 0.9), ("7k3pn", 0.2), ("8K3PN", 0.6)], min_confidence=0.5), ("8K3PN", 0.6))
+        self.assertEqual(pick_candidate(" 7k3pn "), ("7K3PN", None))
+        self.assertEqual(pick_candidate(""), (None, None))
+
+    def test_retry_budget_follows_observed_success_rate(self):
+        stats = CaptchaStats(target=0.99, min_samples=10)
+        self.assertEqual(stats.retry_budget(5), 5)
+        for index in range(40):
+            stats.record_attempt()
+            stats.record_submit(index % 10 < 8)
+        self.assertEqual(stats.retry_budget(5), 3)
+
+        poor = CaptchaStats(target=0.99, min_samples=10)
+        for index in range(40):
+            poor.record_attempt()
+            poor.record_submit(index % 10 == 0)
+        # 通過率低也不超過使用者給的次數
+        self.assertEqual(poor.retry_budget(5), 5)
+        self.assertEqual(poor.retry_budget(3), 3)
+
+        # 本地檢查攔下的嘗試不算進通過率
+        local = CaptchaStats(target=0.99, min_samples=10)
+        for index in range(40):
+            local.record_attempt()
+            if index % 4:
+                local.record_local_reject()
+            else:
+                local.record_submit(True)
+        self.assertEqual(local.retry_budget(5), 2)
+
+    def test_clearly_wrong_answer_refreshes_form_without_submitting(self):
+        wrong_answers = ["a?", ""]
+
+        def solver(image_bytes):
+            return wrong_answers.pop(0) if wrong_answers else solve_fake_captcha(image_bytes)
+
+        stats = CaptchaStats()
+        client = PooledHttpClient()
+        with FakeTwseServer() as server:
+            ok, _, error = download_csv_text("2330", solver, base_url=server.base_url, http_client=client, captcha_stats=stats)
+
+        self.assertTrue(ok, error)
+        self.assertEqual(len(server.submits), 1)
+        self.assertEqual(server.tokens, 3)
+        self.assertEqual(client.stats()["sessions"], 1)
+        self.assertEqual(stats.snapshot()["rejected_locally"], 2)
+        self.assertEqual(stats.snapshot()["accepted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+import numpy as np
+
+from taiwan_stock_broker_analysis.domain.analysis import CHUNKED_STEPS, read_flat_csv
+from taiwan_stock_broker_analysis.domain.ledger import LedgerAccumulator, build_broker_ledger
+from taiwan_stock_broker_analysis.domain.twse_csv import iter_twse_flat_chunks
+from taiwan_stock_broker_analysis.services.analysis_service import analyze_existing_csv
+
+
+BROKERS = ["1234元大台北", "9876凱基台北", "富邦建國", "5566永豐金", "1020合庫"]
+HEADER = "序號,券商,價格,買進股數,賣出股數,,序號,券商,價格,買進股數,賣出股數\n"
+
+
+def write_sample_csv(path: Path, lines: int, seed: int) -> Path:
+    # 兩段合併的研究檔：第二段重複表頭，價格含兩位小數
+    rng = np.random.default_rng(seed)
+    rows = ["股票代碼: 0000 - 券商買賣明細\n", "下載時間: 2026-03-18 12:00:00\n", "\n", HEADER]
+    for index in range(lines):
+        if index == lines // 2:
+            rows.append(HEADER)
+        cells = []
+        for side in range(2):
+            buy = int(rng.integers(0, 5)) * 1000
+            cells.append(
+                f"{2 * index + side + 1},{BROKERS[rng.integers(len(BROKERS))]},"
+                f"{rng.integers(9000, 11000) / 100:.2f},{buy},{0 if buy else int(rng.integers(1, 5)) * 1000}"
+            )
+        rows.append(",,".join(cells) + "\n")
+    path.write_text("".join(rows), encoding="utf-8-sig")
+    return path
+
+
+class ChunkedAnalysisTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="chunked_test_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_accumulated_ledger_matches_full_table(self):
+        csv_path = write_sample_csv(self.temp_dir / "0000.csv", 200, seed=1)
+        accumulator = LedgerAccumulator()
+        for chunk in iter_twse_flat_chunks(csv_path, "utf-8-sig", chunk_records=7):
+            accumulator.add(chunk)
+
+        expected = build_broker_ledger(read_flat_csv(csv_path), by_col="券商")
+        self.assertEqual(accumulator.rows, 400)
+        self.assertGreater(accumulator.chunks, 1)
+        self.assertTrue(accumulator.ledger().equals(expected))
+
+    def test_memory_budget_writes_identical_ledger_reports(self):
+        csv_path = write_sample_csv(self.temp_dir / "0000_處理後資料.csv", 5000, seed=2)
+        common = dict(fee_discount=0.28, day_trade_tax=0.0015, incremental=False, excel="none")
+        full_dir = analyze_existing_csv(csv_path, self.temp_dir / "full", **common)
+        chunked_dir = analyze_existing_csv(csv_path, self.temp_dir / "chunked", memory_budget=1, **common)
+
+        reports = sorted(path.name for path in chunked_dir.glob("step*.csv"))
+        self.assertEqual([name.split("_")[0] for name in reports], list(CHUNKED_STEPS))
+        for name in reports:
+            self.assertEqual((chunked_dir / name).read_bytes(), (full_dir / name).read_bytes(), name)
+        with self.assertRaises(ValueError):
+            analyze_existing_csv(csv_path, self.temp_dir / "carry", memory_budget=1, carry_dir=self.temp_dir / "lots", **common)
+
+
+if __name__ == "__main__":
+    unittest.main()
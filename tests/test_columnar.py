@@ -0,0 +1,83 @@
+import mmap
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+import numpy as np
+import pandas as pd
+
+from sample_data import processed_csv
+from taiwan_stock_broker_analysis.domain.analysis import analyze_csv_file, load_report, read_flat_csv
+from taiwan_stock_broker_analysis.domain.columnar import NPY_SUFFIX, load_table, write_table
+
+
+SAMPLE_PROCESSED_CSV = processed_csv(extra_rows="5,1234元大台北,104.5,0,3000,,6,9876凱基台北,99.95,2000,0\n")
+
+
+def is_memory_mapped(values) -> bool:
+    while values is not None:
+        if isinstance(values, mmap.mmap):
+            return True
+        values = getattr(values, "base", None)
+    return False
+
+
+class ColumnarStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="columnar_test_"))
+        self.input_csv = self.temp_dir / "sample_processed.csv"
+        self.input_csv.write_text(SAMPLE_PROCESSED_CSV, encoding="utf-8-sig")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_npy_round_trip_keeps_dtypes_and_maps_columns_without_copying(self):
+        frame = pd.DataFrame(
+            {
+                "券商": pd.Categorical(["元大", "凱基", "元大"]),
+                "股數": np.array([1000, 2000, 3000], dtype=np.int64),
+                "淨損益": pd.array([10, None, -5], dtype="Int64"),
+                "方向": pd.Series(["多", "空", None], dtype="str"),
+            },
+            index=pd.Index(["a", "b", "c"], name="母券商"),
+        )
+        write_table(frame, self.temp_dir / "table", "npy")
+        path = self.temp_dir / f"table{NPY_SUFFIX}"
+
+        loaded = load_table(path)
+        pd.testing.assert_frame_equal(loaded, frame)
+        self.assertTrue(is_memory_mapped(loaded["股數"].to_numpy()))
+        self.assertTrue(is_memory_mapped(loaded["券商"].array.codes))
+        pd.testing.assert_frame_equal(load_table(path, mmap=False), frame)
+        self.assertEqual(list(load_table(path, columns=["淨損益"]).columns), ["淨損益"])
+
+    def test_analysis_reports_reload_from_columnar_or_csv(self):
+        csv_dir = self.temp_dir / "csv"
+        npy_dir = self.temp_dir / "npy"
+        analyze_csv_file(self.input_csv, csv_dir, fee_discount=0.28, day_trade_tax=0.0015)
+        analyze_csv_file(self.input_csv, npy_dir, fee_discount=0.28, day_trade_tax=0.0015, columnar="npy")
+
+        pd.testing.assert_frame_equal(load_report(npy_dir, "step1_flattened"), read_flat_csv(self.input_csv))
+        from_csv = load_report(csv_dir, "step5_fifo_with_carry")
+        from_npy = load_report(npy_dir, "step5_fifo_with_carry")
+        self.assertEqual(list(from_npy.index), list(from_csv.index))
+        self.assertEqual(from_npy["已實現淨損益(FIFO)"].tolist(), from_csv["已實現淨損益(FIFO)"].tolist())
+
+        analyze_csv_file(self.input_csv, npy_dir, fee_discount=0.5, day_trade_tax=0.0015)
+        self.assertFalse((npy_dir / f"step5_fifo_with_carry{NPY_SUFFIX}").exists())
+        self.assertTrue((npy_dir / f"step1_flattened{NPY_SUFFIX}").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
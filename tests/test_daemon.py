@@ -0,0 +1,140 @@
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from sample_data import SAMPLE_PROCESSED_CSV
+from taiwan_stock_broker_analysis.cli.main import main as run_command
+from taiwan_stock_broker_analysis.services.daemon_client import (
+    TOKEN_HEADER,
+    daemon_status,
+    daemon_token,
+    forward_to_daemon,
+    list_jobs,
+    submit_job,
+    wait_for_job,
+)
+from taiwan_stock_broker_analysis.services.daemon_service import AnalysisDaemon, make_server, write_token_file
+
+
+def fake_runner(command, argv):
+    if argv == ["exit"]:
+        raise SystemExit(2)
+    if argv == ["prompt"]:
+        input("股票代碼: ")
+    print(f"{command} 第一行")
+    print("第二行", end="")
+    return 0
+
+
+class DaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="daemon_test_"))
+        self.runner = fake_runner
+        token_env = mock.patch.dict(os.environ, {"TSBA_DAEMON_TOKEN": "test-token"})
+        token_env.start()
+        self.addCleanup(token_env.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def start(self):
+        daemon = AnalysisDaemon(lambda command, argv: self.runner(command, argv)).start()
+        server = make_server(daemon, port=0, token="test-token")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            daemon.stop()
+
+        self.addCleanup(stop)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_jobs_run_in_order_with_captured_output_and_exit_codes(self):
+        url = self.start()
+        ids = [submit_job("index", argv, cwd=self.temp_dir, url=url)["id"] for argv in (["ok"], ["exit"], ["prompt"])]
+        lines = []
+        jobs = [wait_for_job(job_id, url=url, logger=lines.append) for job_id in ids]
+
+        self.assertEqual([job["state"] for job in jobs], ["done", "failed", "failed"])
+        self.assertEqual([job["exit_code"] for job in jobs], [0, 2, 1])
+        self.assertEqual(lines[:2], ["index 第一行", "第二行"])
+        self.assertIn("EOFError", "\n".join(lines))
+        self.assertEqual([job["id"] for job in list_jobs(url=url)], ids)
+        status = daemon_status(url=url)
+        self.assertEqual((status["done"], status["failed"], status["queued"]), (1, 2, 0))
+        with self.assertRaisesRegex(RuntimeError, "400"):
+            submit_job("daemon", ["stop"], url=url)
+        with self.assertRaisesRegex(RuntimeError, "400"):
+            submit_job("run", ["2330", "--daemon"], url=url)
+
+    def test_rejects_cross_site_and_unauthenticated_requests(self):
+        url = self.start()
+        port = int(url.rsplit(":", 1)[1])
+        body = json.dumps({"command": "index", "argv": ["ok"], "cwd": str(self.temp_dir)})
+
+        def post(path, **headers):
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            try:
+                connection.request("POST", path, body=body, headers={TOKEN_HEADER: "test-token", **headers})
+                return connection.getresponse().status
+            finally:
+                connection.close()
+
+        # 瀏覽器可不經預檢送出的 text/plain、外站 Origin、DNS rebinding 的 Host、缺權杖
+        self.assertEqual(post("/jobs", **{"Content-Type": "text/plain"}), 415)
+        self.assertEqual(post("/jobs", **{"Content-Type": "application/json", "Origin": "http://evil.example"}), 403)
+        self.assertEqual(post("/shutdown", **{"Content-Type": "application/json", "Host": f"evil.example:{port}"}), 403)
+        self.assertEqual(post("/jobs", **{"Content-Type": "application/json", TOKEN_HEADER: "wrong"}), 401)
+        self.assertEqual(list_jobs(url=url), [])
+        self.assertEqual(post("/jobs", **{"Content-Type": "application/json", "Origin": f"http://localhost:{port}"}), 202)
+
+    def test_token_file_is_written_without_fchmod(self):
+        # Windows 的 Python 3.12 沒有 os.fchmod
+        with mock.patch("taiwan_stock_broker_analysis.services.daemon_client.TOKEN_DIR", self.temp_dir / "tokens"):
+            with mock.patch.dict(os.__dict__):
+                os.__dict__.pop("fchmod", None)
+                path = write_token_file(8765, "file-token")
+            with mock.patch.dict(os.environ, {"TSBA_DAEMON_TOKEN": ""}):
+                self.assertEqual(daemon_token("http://127.0.0.1:8765"), "file-token")
+        if os.name == "posix":
+            self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+
+    def test_forwarded_analysis_uses_client_working_directory(self):
+        self.runner = lambda command, argv: run_command([command, *argv])
+        url = self.start()
+        (self.temp_dir / "0000_處理後資料.csv").write_text(SAMPLE_PROCESSED_CSV, encoding="utf-8-sig")
+        lines = []
+        previous_cwd = Path.cwd()
+        try:
+            os.chdir(self.temp_dir)
+            exit_code = forward_to_daemon(
+                "analyze", ["0000_處理後資料.csv", "--outdir", "output", "--excel", "none", "--daemon"], url=url, logger=lines.append
+            )
+        finally:
+            os.chdir(previous_cwd)
+
+        self.assertEqual(exit_code, 0)
+        self.assertTrue((self.temp_dir / "output" / "analysis_0000_處理後資料" / "step5_fifo_with_carry.csv").exists())
+        self.assertTrue(any("輸出資料夾" in line for line in lines))
+        self.assertEqual(Path.cwd(), previous_cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
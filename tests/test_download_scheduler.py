@@ -0,0 +1,112 @@
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from fake_twse_server import FakeTwseServer, solve_fake_captcha
+from taiwan_stock_broker_analysis.domain.http_client import PooledHttpClient
+from taiwan_stock_broker_analysis.domain.scraping import download_csv_text
+from taiwan_stock_broker_analysis.domain.tracing import Tracer
+from taiwan_stock_broker_analysis.services.download_scheduler import DownloadScheduler, RateLimiter, read_watchlist
+
+
+class DownloadSchedulerTests(unittest.TestCase):
+    def test_download_csv_text_retries_wrong_captcha_against_local_form(self):
+        with FakeTwseServer(wrong_captcha_tokens={"guid00001"}) as server:
+            ok, csv_text, error = download_csv_text("2330", solve_fake_captcha, max_retries=3, base_url=server.base_url)
+
+        self.assertTrue(ok, error)
+        self.assertIn('="2330"', csv_text)
+        self.assertEqual([code for _, code in server.submits], ["2330", "2330"])
+
+    def test_tracer_records_every_download_phase_per_attempt(self):
+        tracer = Tracer()
+        with FakeTwseServer(wrong_captcha_tokens={"guid00001"}) as server:
+            ok, csv_text, error = download_csv_text("2330", solve_fake_captcha, base_url=server.base_url, tracer=tracer)
+
+        self.assertTrue(ok, error)
+        names = [record["name"] for record in tracer.records]
+        for phase in ["download.form", "download.captcha", "download.ocr", "download.post"]:
+            self.assertEqual(names.count(phase), 2, phase)
+        self.assertEqual(names.count("download.csv"), 1)
+        attempts = [record["attrs"]["outcome"] for record in tracer.records if record["name"] == "download.attempt"]
+        self.assertEqual(attempts, ["captcha_rejected", "ok"])
+        csv_span = next(record for record in tracer.records if record["name"] == "download.csv")
+        date_line, downloaded = csv_text.split("\n", 1)
+        self.assertEqual(date_line, "資料日期: 2026-03-18")
+        self.assertEqual(csv_span["attrs"]["bytes"], len(downloaded.encode("utf-8")))
+        self.assertEqual(tracer.records[-1]["attrs"], {"stock_code": "2330", "ok": True, "attempts": 2})
+
+    def test_pooled_client_reuses_connection_across_attempts_and_stocks(self):
+        client = PooledHttpClient(pool_size=2)
+        with FakeTwseServer(wrong_captcha_tokens={"guid00001"}) as server:
+            for stock_code in ["2330", "2317"]:
+                ok, _, error = download_csv_text(stock_code, solve_fake_captcha, base_url=server.base_url, http_client=client)
+                self.assertTrue(ok, error)
+
+        stats = client.stats()
+        self.assertEqual(stats["sessions"], 3)
+        self.assertEqual(stats["requests"], 11)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(len(server.connections), 1)
+
+    def test_scheduler_bounds_concurrency_and_spaces_form_submits(self):
+        min_interval = 0.2
+        stock_codes = ["1101", "2317", "2330", "2454", "3008"]
+        with FakeTwseServer(latency=0.05) as server:
+            scheduler = DownloadScheduler(
+                solve_fake_captcha,
+                max_concurrency=3,
+                min_interval=min_interval,
+                base_url=server.base_url,
+            )
+            results = scheduler.run(stock_codes, handler=lambda code, text: len(text))
+
+        self.assertEqual([result["stock_code"] for result in results], stock_codes)
+        self.assertTrue(all(result["ok"] for result in results))
+        submit_times = sorted(at for at, _ in server.submits)
+        gaps = [later - earlier for earlier, later in zip(submit_times, submit_times[1:])]
+        self.assertGreaterEqual(min(gaps), min_interval * 0.95)
+        self.assertEqual(scheduler.rate_limiter.granted, len(stock_codes))
+
+    def test_stock_deadline_gives_up_instead_of_waiting_for_a_late_slot(self):
+        limiter = RateLimiter(min_interval=60.0)
+        self.assertTrue(limiter.acquire())
+        with FakeTwseServer() as server:
+            scheduler = DownloadScheduler(
+                solve_fake_captcha,
+                stock_timeout=1.0,
+                base_url=server.base_url,
+                rate_limiter=limiter,
+            )
+            started = time.monotonic()
+            result = scheduler.download_one("2330")
+
+        self.assertFalse(result["ok"])
+        self.assertIn("期限", result["error"])
+        self.assertLess(time.monotonic() - started, 5.0)
+        self.assertEqual(server.submits, [])
+
+    def test_read_watchlist_accepts_lines_commas_and_comments(self):
+        temp_dir = Path(tempfile.mkdtemp(prefix="watchlist_test_"))
+        try:
+            path = temp_dir / "watchlist.txt"
+            path.write_text("# 晚間清單\n2330, 2317\n2454  # 聯發科\n2330\n", encoding="utf-8")
+            self.assertEqual(read_watchlist(path), ["2330", "2317", "2454"])
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+if str(TESTS_PATH) not in sys.path:
+    sys.path.insert(0, str(TESTS_PATH))
+
+from sample_data import SAMPLE_PROCESSED_CSV  # noqa: E402
+
+HEAVY_MODULES = ["bs4", "cv2", "ddddocr", "onnxruntime", "requests", "urllib3"]
+IMPORT_BUDGET_SECONDS = float(os.environ.get("TSBA_IMPORT_BUDGET", "3.0"))
+
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {src!r})
+from taiwan_stock_broker_analysis.cli.main import main
+imported = time.perf_counter() - started
+code = main({argv!r})
+print(json.dumps({{"code": code, "import_seconds": imported, "modules": sorted(sys.modules)}}))
+"""
+
+
+def run_probe(argv):
+    script = PROBE.format(src=str(SRC_PATH), argv=list(argv))
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    wall = time.perf_counter() - started
+    return json.loads(completed.stdout.strip().splitlines()[-1]), wall
+
+
+class ImportBudgetTests(unittest.TestCase):
+    def test_analyze_command_skips_scraping_and_ocr_modules_within_budget(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_csv = Path(temp_dir) / "0000_處理後資料.csv"
+            input_csv.write_text(SAMPLE_PROCESSED_CSV, encoding="utf-8-sig")
+            result, wall = run_probe(["analyze", str(input_csv), "--outdir", str(Path(temp_dir) / "output")])
+
+        self.assertEqual(result["code"], 0)
+        loaded = [name for name in HEAVY_MODULES if name in result["modules"]]
+        self.assertEqual(loaded, [], f"analysis-only command imported {loaded}")
+        self.assertLess(wall, IMPORT_BUDGET_SECONDS * 2)
+
+    def test_cli_entry_point_cold_import_stays_under_budget(self):
+        result, wall = run_probe([])
+        self.assertEqual(result["code"], 1)
+        self.assertFalse({"pandas", *HEAVY_MODULES} & set(result["modules"]))
+        self.assertLess(wall, IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from taiwan_stock_broker_analysis.domain.leaderboard import MarketLeaderboard
+from taiwan_stock_broker_analysis.services.market_service import build_market_leaderboard
+
+
+def fake_step5(rng, brokers):
+    buy = rng.integers(0, 50, len(brokers)) * 1000
+    sell = rng.integers(0, 50, len(brokers)) * 1000
+    net = rng.integers(-500_000, 500_000, len(brokers))
+    return pd.DataFrame({
+        "回轉股數(FIFO)": np.minimum(buy, sell),
+        "已實現毛利(FIFO)": pd.array(net + 100, dtype="Int64"),
+        "手續費合計(FIFO)": pd.array(np.full(len(brokers), 60), dtype="Int64"),
+        "證交稅合計(FIFO)": pd.array(np.full(len(brokers), 40), dtype="Int64"),
+        "已實現淨損益(FIFO)": pd.array(net, dtype="Int64"),
+        "買股數(全日)": buy,
+        "賣股數(全日)": sell,
+        "均買價(全日)": np.where(buy > 0, rng.integers(1000, 9000, len(brokers)) / 100, np.nan),
+        "均賣價(全日)": np.where(sell > 0, rng.integers(1000, 9000, len(brokers)) / 100, np.nan),
+    }, index=pd.Index(brokers, name="母券商"))
+
+
+class MarketLeaderboardTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        names = [f"券商{index:02d}" for index in range(40)]
+        self.stocks = {
+            f"{1000 + index}": fake_step5(rng, sorted(rng.choice(names, 25, replace=False)))
+            for index in range(30)
+        }
+
+    def test_streaming_heaps_match_full_sort_and_merge_in_any_order(self):
+        board = MarketLeaderboard(5)
+        for stock_code, frame in self.stocks.items():
+            board.add(stock_code, frame)
+
+        stacked = pd.concat(
+            [frame.reset_index().assign(股票代碼=code) for code, frame in self.stocks.items()], ignore_index=True
+        )
+        expected_pairs = stacked.sort_values("已實現淨損益(FIFO)", ascending=False).head(5)
+        reports = board.reports()
+        self.assertEqual(
+            reports["market_stock_top_profit"]["已實現淨損益(FIFO)"].tolist(),
+            expected_pairs["已實現淨損益(FIFO)"].tolist(),
+        )
+        expected_totals = stacked.groupby("母券商")["已實現淨損益(FIFO)"].sum().sort_values(ascending=False)
+        top_profit = reports["market_step6_top_profit"]
+        self.assertEqual(top_profit["母券商"].tolist(), expected_totals[expected_totals > 0].head(5).index.tolist())
+        self.assertEqual(
+            top_profit["股票數"].tolist(), stacked["母券商"].value_counts()[top_profit["母券商"]].tolist()
+        )
+
+        codes = list(self.stocks)
+        left, right = MarketLeaderboard(5), MarketLeaderboard(5)
+        for code in codes[::2]:
+            left.add(code, self.stocks[code])
+        for code in reversed(codes[1::2]):
+            right.add(code, self.stocks[code])
+        right.merge(left)
+        merged = right.reports()
+        for name, frame in reports.items():
+            pd.testing.assert_frame_equal(merged[name], frame, obj=name)
+
+    def test_build_market_leaderboard_reads_output_dirs_and_reports_failures(self):
+        temp_dir = Path(tempfile.mkdtemp(prefix="leaderboard_test_"))
+        try:
+            outdirs = []
+            for stock_code, frame in list(self.stocks.items())[:4]:
+                outdir = temp_dir / f"analysis_{stock_code}_2026-03-18"
+                outdir.mkdir()
+                frame.to_csv(outdir / "step5_fifo_with_carry.csv", encoding="utf-8-sig")
+                outdirs.append(outdir)
+            (temp_dir / "analysis_9999_empty").mkdir()
+            outdirs.append(temp_dir / "analysis_9999_empty")
+
+            summary = build_market_leaderboard(outdirs, temp_dir / "market", top_k=3)
+
+            self.assertEqual(summary["stocks"], 4)
+            self.assertEqual([path.name for path, _ in summary["failed"]], ["analysis_9999_empty"])
+            report = pd.read_csv(temp_dir / "market" / "market_step7_top_netbuy.csv", encoding="utf-8-sig")
+            self.assertEqual(len(report), 3)
+            self.assertTrue((report["買超金額"].diff().dropna() <= 0).all())
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
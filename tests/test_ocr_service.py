@@ -0,0 +1,50 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from taiwan_stock_broker_analysis.services.ocr_service import OcrService
+
+
+class EchoModel:
+    def __init__(self, registry):
+        self.in_use = threading.Lock()
+        registry.append(self)
+
+    def classification(self, image_bytes):
+        if not self.in_use.acquire(blocking=False):
+            raise AssertionError("model replica used by two threads at once")
+        try:
+            return image_bytes.decode("ascii")
+        finally:
+            self.in_use.release()
+
+
+class OcrServiceTests(unittest.TestCase):
+    def test_models_load_lazily_once_and_batch_keeps_input_order(self):
+        registry = []
+        service = OcrService(replicas=3, intra_op_threads=1, model_factory=lambda: EchoModel(registry))
+        self.assertFalse(service.loaded)
+        self.assertEqual(registry, [])
+
+        images = [f"{index:05d}".encode("ascii") for index in range(20)]
+        self.assertEqual(service.classify_batch(images), [image.decode("ascii") for image in images])
+        self.assertEqual(service.classify(b"12345"), "12345")
+
+        stats = service.stats()
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(stats["inferences"], 21)
+        self.assertGreaterEqual(stats["load_seconds"], 0.0)
+        self.assertGreaterEqual(stats["max_inference_ms"], stats["mean_inference_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest import mock
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+from fake_twse_server import CSV_TEMPLATE, FakeTwseServer, solve_fake_captcha
+from taiwan_stock_broker_analysis.domain.raw_cache import TAIPEI_TZ, RawCsvCache, trading_date
+from taiwan_stock_broker_analysis.domain.scraping import with_trade_date
+from taiwan_stock_broker_analysis.services.download_scheduler import DownloadScheduler
+from taiwan_stock_broker_analysis.services.scraping_service import AutomaticCaptchaScraper
+
+
+class ExplodingOcr:
+    def candidates(self, image_bytes):
+        raise AssertionError("快取命中時不應載入 OCR")
+
+
+def dated_csv(stock_code, day=None):
+    # 下載內容檔頭帶有結果頁的資料日期
+    return with_trade_date(CSV_TEMPLATE.format(stock_code=stock_code), trading_date() if day is None else day)
+
+
+class RawCsvCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="raw_cache_test_"))
+        self.now = [1_000_000.0]
+        self.previous_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+
+    def tearDown(self):
+        os.chdir(self.previous_cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def make_cache(self, **kwargs):
+        return RawCsvCache(self.temp_dir / "cache", clock=lambda: self.now[0], **kwargs)
+
+    def test_trading_date_rolls_back_before_publish_time_and_over_weekends(self):
+        self.assertEqual(trading_date(datetime(2026, 10, 16, 17, 0, tzinfo=TAIPEI_TZ)), date(2026, 10, 16))
+        self.assertEqual(trading_date(datetime(2026, 10, 16, 9, 0, tzinfo=TAIPEI_TZ)), date(2026, 10, 15))
+        self.assertEqual(trading_date(datetime(2026, 10, 18, 20, 0, tzinfo=TAIPEI_TZ)), date(2026, 10, 16))
+        self.assertEqual(trading_date(datetime(2026, 10, 19, 8, 0, tzinfo=TAIPEI_TZ)), date(2026, 10, 16))
+
+    def test_identical_content_is_stored_once_and_survives_reload(self):
+        day = date(2026, 10, 16)
+        cache = self.make_cache()
+        text = dated_csv("2330", day).replace("\n", "\r\n")
+        first = cache.put("2330", text, day)
+        second = cache.put("2330", text, date(2026, 10, 15))
+
+        self.assertEqual(first, second)
+        reloaded = self.make_cache()
+        self.assertEqual(reloaded.get("2330", day), text)
+        self.assertIsNone(reloaded.get("2317", day))
+        stats = reloaded.stats()
+        self.assertEqual((stats["entries"], stats["blobs"], stats["hits"], stats["misses"]), (2, 1, 1, 1))
+
+    def test_entries_are_evicted_by_age_and_by_total_size(self):
+        day = date(2026, 10, 16)
+        cache = self.make_cache(max_age_days=1, max_bytes=400, blob_grace_seconds=0)
+        cache.put("1101", dated_csv("1101", day))
+        self.now[0] += 2 * 86400
+        self.assertIsNone(cache.get("1101", day))
+
+        for offset, code in enumerate(["2317", "2330", "2454"]):
+            self.now[0] += offset + 1
+            cache.put(code, dated_csv(code, day))
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 400)
+        self.assertIsNone(cache.get("2317", day))
+        self.assertIsNotNone(cache.get("2454", day))
+        self.assertEqual(len(list((self.temp_dir / "cache" / "blobs").glob("*/*.csv"))), stats["blobs"])
+
+    def test_instances_sharing_a_directory_keep_each_others_entries(self):
+        day = date(2026, 10, 16)
+        cli, daemon = self.make_cache(), self.make_cache()
+        self.assertIsNone(daemon.get("2330", day))
+        cli_blob = cli.put("2330", dated_csv("2330", day))
+        # daemon 的索引是在 cli 寫入前讀的；寫入時應合併而不是覆蓋，也不能回收 cli 剛寫的檔案
+        daemon.put("2317", dated_csv("2317", day))
+        daemon.prune()
+
+        self.assertTrue(cli_blob.exists())
+        self.assertIsNotNone(daemon.get("2330", day))
+        self.assertIsNotNone(cli.get("2317", day))
+        self.assertEqual(self.make_cache().stats()["entries"], 2)
+
+        orphan = cli.blob_path("0" * 64)
+        orphan.parent.mkdir(parents=True, exist_ok=True)
+        orphan.write_text("未登記", encoding="utf-8")
+        daemon.prune()
+        self.assertTrue(orphan.exists())
+        os.utime(orphan, (0, 0))
+        daemon.prune()
+        self.assertFalse(orphan.exists())
+
+    def test_scrapers_serve_cached_day_without_network_or_ocr(self):
+        cache = self.make_cache()
+        cache.put("2330", dated_csv("2330"))
+        scraper = AutomaticCaptchaScraper(logger=lambda message: None, ocr_service=ExplodingOcr(), raw_cache=cache)
+        ok, csv_file, error = scraper.download_stock_data("2330")
+        self.assertTrue(ok, error)
+        # 工作目錄照樣寫出帶 BOM 的原始 CSV，不回傳快取內部的檔案
+        self.assertEqual(Path(csv_file).resolve().parent, self.temp_dir.resolve())
+        self.assertTrue(Path(csv_file).name.startswith("2330_爬蟲資料_"))
+        self.assertEqual(Path(csv_file).read_text(encoding="utf-8-sig"), cache.get("2330"))
+        self.assertTrue(Path(csv_file).read_bytes().startswith(b"\xef\xbb\xbf"))
+
+        with FakeTwseServer() as server:
+            scheduler = DownloadScheduler(solve_fake_captcha, min_interval=0, base_url=server.base_url, raw_cache=cache)
+            results = scheduler.run(["2330", "2317"])
+
+        self.assertEqual([code for _, code in server.submits], ["2317"])
+        self.assertEqual(scheduler.cache_hits, {"2330"})
+        self.assertTrue(all(result["ok"] for result in results))
+        # 結果頁的資料日期記在原始 CSV 檔頭，並以這個日期為快取的鍵
+        self.assertIn('="2317"', cache.get("2317", date(2026, 3, 18)))
+        self.assertTrue(cache.get("2317", date(2026, 3, 18)).startswith("資料日期: 2026-03-18"))
+
+    def test_cache_keys_on_response_date_not_clock(self):
+        # 時鐘推算為 3/19，但證交所還沒公布，回應的資料日期是 3/18
+        cache = self.make_cache()
+        stale = cache.put("2317", dated_csv("2317", date(2026, 3, 18)), date(2026, 3, 19))
+        self.assertIsNone(cache.get("2317", date(2026, 3, 19)))
+        self.assertIsNone(cache.get("2330", date(2026, 3, 18)))
+        cache.put("2330", CSV_TEMPLATE.format(stock_code="2330"), date(2026, 3, 18))
+        self.assertIsNone(cache.get("2330", date(2026, 3, 18)))
+        self.assertTrue(stale.exists())
+
+        with mock.patch("taiwan_stock_broker_analysis.domain.raw_cache.trading_date", return_value=date(2026, 3, 19)):
+            with FakeTwseServer() as server:
+                for _ in range(2):
+                    scheduler = DownloadScheduler(solve_fake_captcha, min_interval=0, base_url=server.base_url, raw_cache=cache)
+                    self.assertTrue(all(result["ok"] for result in scheduler.run(["2317"])))
+                    self.assertEqual(scheduler.cache_hits, set())
+
+        self.assertEqual([code for _, code in server.submits], ["2317", "2317"])
+        self.assertIsNotNone(cache.get("2317", date(2026, 3, 18)))
+        self.assertIsNone(cache.get("2317", date(2026, 3, 19)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = REPO_ROOT / "src"
+TESTS_PATH = REPO_ROOT / "tests"
+
+for path_text in [str(REPO_ROOT), str(SRC_PATH), str(TESTS_PATH)]:
+    if path_text not in sys.path:
+        sys.path.insert(0, path_text)
+
+import pandas as pd
+
+from sample_data import processed_csv
+from taiwan_stock_broker_analysis.domain.analysis import read_flat_csv
+from taiwan_stock_broker_analysis.domain.trade_store import TradeStore
+from taiwan_stock_broker_analysis.services.store_service import ingest_csv_files
+
+
+def append_partition(root: str, csv_path: str, stock_code: str, day: str) -> int:
+    store = TradeStore(root, fmt="npy")
+    return store.append(stock_code, day, read_flat_csv(Path(csv_path)))["rows"]
+
+
+class TradeStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="trade_store_test_"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_sample(self, code: str, downloaded_at: str) -> Path:
+        path = self.temp_dir / f"{code}_{downloaded_at[:10]}.csv"
+        path.write_text(processed_csv(code, downloaded_at), encoding="utf-8-sig")
+        return path
+
+    def test_range_query_reads_only_matching_partitions(self):
+        flat = read_flat_csv(self.write_sample("2330", "2026-03-18 17:00:00"))
+        store = TradeStore(self.temp_dir / "store", fmt="npy")
+        for code in ["2330", "2317"]:
+            for day in ["2026-03-16", "2026-03-17", "2026-03-18"]:
+                store.append(code, day, flat)
+
+        reopened = TradeStore(self.temp_dir / "store")
+        frame = reopened.read(["2330"], start=date(2026, 3, 17), end="2026-03-18")
+        self.assertEqual(reopened.partitions_read, 2)
+        self.assertEqual(len(frame), 2 * len(flat))
+        self.assertEqual(frame["股票代碼"].unique().tolist(), ["2330"])
+        self.assertEqual(frame["日期"].dt.strftime("%Y-%m-%d").unique().tolist(), ["2026-03-17", "2026-03-18"])
+        self.assertIsInstance(frame["券商"].dtype, pd.CategoricalDtype)
+        self.assertEqual(frame["價格_tick"].tolist()[: len(flat)], flat["價格_tick"].tolist())
+
+        self.assertTrue(reopened.remove("2317", "2026-03-16"))
+        self.assertEqual(len(reopened.partitions(["2317"])), 2)
+
+    def test_stores_sharing_a_directory_keep_each_others_partitions(self):
+        csv_path = self.write_sample("2330", "2026-03-18 17:00:00")
+        flat = read_flat_csv(csv_path)
+        root = self.temp_dir / "store"
+        # 常駐服務的 catalog 是在 CLI 寫入前讀的；寫入時應以磁碟上的為準合併
+        cli, daemon = TradeStore(root, fmt="npy"), TradeStore(root, fmt="npy")
+        self.assertEqual(daemon.stocks(), [])
+        cli.append("2330", "2026-03-18", flat)
+        daemon.append("2317", "2026-03-18", flat)
+        self.assertEqual(cli.stocks(), ["2317", "2330"])
+        self.assertTrue(daemon.remove("2330", "2026-03-18"))
+        self.assertEqual(cli.stocks(), ["2317"])
+
+        days = [f"2026-03-{day:02d}" for day in range(2, 10)]
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(append_partition, [str(root)] * len(days), [str(csv_path)] * len(days), ["1101"] * len(days), days))
+        self.assertEqual(len(TradeStore(root).partitions(["1101"])), len(days))
+
+    def test_ingest_uses_preamble_stock_code_and_trading_date(self):
+        inputs = [
+            self.write_sample("2330", "2026-03-18 17:00:00"),
+            self.write_sample("2317", "2026-03-21 09:00:00"),
+        ]
+        summary = ingest_csv_files([str(path) for path in inputs], self.temp_dir / "store", fmt="npy")
+
+        self.assertEqual(summary["skipped"], [])
+        self.assertEqual(
+            sorted((code, day.isoformat()) for code, day, _ in summary["added"]),
+            [("2317", "2026-03-20"), ("2330", "2026-03-18")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
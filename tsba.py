@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+統一入口：以子命令執行各項功能，只載入該子命令需要的模組
+用法：
+  python tsba.py analyze data/2330_處理後資料.csv
+  python tsba.py analyze data/processed --workers 8
+  python tsba.py run 2330 2317 --concurrency 4
+  python tsba.py scrape 2317
+"""
+
+from _workspace_bootstrap import ensure_src_on_path
+
+ensure_src_on_path()
+
+from taiwan_stock_broker_analysis.cli.main import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())